@@ -9,6 +9,12 @@ les paquets et dépôts du système.
 
 # Import de la classe de base et des types
 from plugins_utils.plugins_utils_base import PluginsUtilsBase
+from plugins_utils.command_cache import FAMILY_DPKG
+from plugins_utils.dpkg_status import DPKG_STATUS
+from plugins_utils.debian_version import version_satisfies
+from plugins_utils.apt_transaction import APT_TRANSACTION
+from plugins_utils.apt_freshness import APT_FRESHNESS
+from plugins_utils.apt_policy import POLICY_BATCH_SIZE, PackagePolicy, parse_policy
 import os
 import re
 import time
@@ -44,18 +50,31 @@ class AptCommands(PluginsUtilsBase):
         self._apt_env["DEBIAN_FRONTEND"] = "noninteractive"
         # Pas de stockage de task_id ici
 
-    def update(self, allow_fail: bool = False, log_levels: Optional[Dict[str, str]] = None) -> bool:
+    def update(self, allow_fail: bool = False, force: bool = False, max_age: Optional[float] = None,
+               log_levels: Optional[Dict[str, str]] = None) -> bool:
         """
         Met à jour la liste des paquets disponibles via apt-get update.
         Cette méthode gère sa propre barre de progression interne via self.run.
 
+        La mise à jour est évitée si les index sont récents et les sources
+        inchangées (voir apt_freshness), sauf avec force=True.
+
         Args:
             allow_fail: Si True, renvoie True même si des erreurs non critiques surviennent.
+            force: Si True, lancer apt-get update même si les index sont frais.
+            max_age: Âge maximal des index en secondes (défaut: PCUTILS_APT_UPDATE_MAX_AGE ou 3600).
             log_levels: Dictionnaire optionnel pour spécifier les niveaux de log.
 
         Returns:
             bool: True si la mise à jour a réussi.
         """
+        if not force:
+            fresh, reason = APT_FRESHNESS.check(max_age)
+            if fresh:
+                self.log_info(f"Mise à jour de la liste des paquets ignorée: {reason}", log_levels=log_levels)
+                return True
+            self.log_debug(f"Mise à jour de la liste des paquets nécessaire: {reason}", log_levels=log_levels)
+
         self.log_info("Mise à jour de la liste des paquets (apt update)", log_levels=log_levels)
 
         cmd = ['apt-get', 'update']
@@ -86,6 +105,7 @@ class AptCommands(PluginsUtilsBase):
         if final_success and not warning_issued:
              final_message += " avec succès."
              self.log_success(final_message, log_levels=log_levels)
+             APT_FRESHNESS.record()
         elif warning_issued:
              final_message += " avec des avertissements."
              self.log_warning(final_message, log_levels=log_levels)
@@ -99,12 +119,14 @@ class AptCommands(PluginsUtilsBase):
                 full_upgrade: bool = False,
                 simulate: bool = False,
                 autoremove: bool = True,
+                force_update: bool = False,
                 log_levels: Optional[Dict[str, str]] = None) -> bool:
         """
         Met à jour les paquets installés.
 
         Args:
             [...]
+            force_update: Si True, relancer apt-get update même si les index sont frais.
             log_levels: Dictionnaire optionnel pour spécifier les niveaux de log.
         """
         if dist_upgrade:
@@ -125,7 +147,7 @@ class AptCommands(PluginsUtilsBase):
         self.log_info(log_prefix, log_levels=log_levels)
 
         self.log_info(f"{log_prefix} - Étape 1: Mise à jour sources", log_levels=log_levels)
-        update_success = self.update(allow_fail=True, log_levels=log_levels)
+        update_success = self.update(allow_fail=True, force=force_update, log_levels=log_levels)
         if not update_success:
             self.log_error("Échec critique de la mise à jour des sources. Annulation.", log_levels=log_levels)
             return False
@@ -171,12 +193,19 @@ class AptCommands(PluginsUtilsBase):
                 no_recommends: bool = False,
                 simulate: bool = False,
                 force_conf: bool = True,
+                defer: bool = False,
                 log_levels: Optional[Dict[str, str]] = None) -> bool:
         """
         Installe un ou plusieurs paquets.
 
+        Dans une séquence, l'installation passe par la transaction apt de l'hôte
+        (voir apt_transaction): les paquets déclarés par les plugins et les
+        installations différées sont installés en un seul apt-get.
+
         Args:
             [...]
+            defer: Si True et qu'une transaction de séquence est active, différer
+                   l'installation jusqu'à la prochaine barrière (retourne True).
             log_levels: Dictionnaire optionnel pour spécifier les niveaux de log.
         """
         if isinstance(package_names, str): packages = [package_names]
@@ -188,6 +217,18 @@ class AptCommands(PluginsUtilsBase):
         action = "Simulation d'installation" if simulate else "Installation"
         package_str = ", ".join(packages)
         log_prefix = f"{action} de: {package_str}"
+
+        # Transaction de séquence (hors version imposée, réinstallation et simulation)
+        if APT_TRANSACTION.enabled and not (version or reinstall or simulate):
+            try:
+                if defer:
+                    APT_TRANSACTION.defer(packages, no_recommends=no_recommends)
+                    self.log_info(f"Installation différée (transaction apt de la séquence): {package_str}", log_levels=log_levels)
+                    return True
+                return self._install_in_transaction(packages, no_recommends, auto_fix, force_conf, log_levels=log_levels)
+            except OSError as e:
+                self.log_warning(f"Transaction apt indisponible ({e}), installation directe.", log_levels=log_levels)
+
         self.log_info(log_prefix, log_levels=log_levels)
 
         target_packages = []
@@ -200,6 +241,20 @@ class AptCommands(PluginsUtilsBase):
         else:
              target_packages = packages
 
+        return self._apt_get_install(target_packages, log_prefix, reinstall=reinstall, auto_fix=auto_fix,
+                                     no_recommends=no_recommends, simulate=simulate, force_conf=force_conf,
+                                     log_levels=log_levels)
+
+    def _apt_get_install(self,
+                         target_packages: List[str],
+                         log_prefix: str,
+                         reinstall: bool = False,
+                         auto_fix: bool = True,
+                         no_recommends: bool = False,
+                         simulate: bool = False,
+                         force_conf: bool = True,
+                         log_levels: Optional[Dict[str, str]] = None) -> bool:
+        """Exécute apt-get install (avec réparation des dépendances si nécessaire)."""
         self.log_info(f"{log_prefix} - Étape 1: Tentative initiale", log_levels=log_levels)
         cmd = ['apt-get', 'install', '-y']
         if force_conf: cmd.extend(['-o', 'Dpkg::Options::=--force-confdef', '-o', 'Dpkg::Options::=--force-confold'])
@@ -249,6 +304,105 @@ class AptCommands(PluginsUtilsBase):
 
         return install_success
 
+    def _install_in_transaction(self, packages: List[str], no_recommends: bool, auto_fix: bool,
+                                force_conf: bool, log_levels: Optional[Dict[str, str]] = None) -> bool:
+        """Installe des paquets via la transaction de séquence et retourne leur résultat."""
+        outcomes = {name: APT_TRANSACTION.outcome(name) for name in packages}
+        # Un échec antérieur est retenté (un plugin précédent a pu ajouter un dépôt),
+        # et un succès enregistré n'est cru que si le paquet est toujours installé
+        # (un plugin a pu le désinstaller depuis, par dpkg ou un script)
+        missing = [name for name, outcome in outcomes.items()
+                   if not (outcome and outcome.get("success") and self.is_installed(name, log_levels=log_levels))]
+        if missing:
+            # Barrière: installer l'union du plan avec les paquets demandés
+            requested = {name: {"requesters": [APT_TRANSACTION.requester], "no_recommends": no_recommends}
+                         for name in missing}
+            self.apply_transaction(auto_fix=auto_fix, force_conf=force_conf, extra=requested, log_levels=log_levels)
+            outcomes = {name: APT_TRANSACTION.outcome(name) for name in packages}
+
+        success = True
+        for name, outcome in outcomes.items():
+            if outcome and outcome.get("success"):
+                self.log_info(f"Paquet '{name}': {outcome.get('message', 'installé')}", log_levels=log_levels)
+            else:
+                success = False
+                message = outcome.get("message") if outcome else "aucun résultat de la transaction apt"
+                self.log_error(f"Paquet '{name}': {message}", log_levels=log_levels)
+        if success:
+            self.log_success(f"Installation de: {', '.join(packages)} réussie", log_levels=log_levels)
+        return success
+
+    def apply_transaction(self,
+                          include_declared: bool = True,
+                          auto_fix: bool = True,
+                          force_conf: bool = True,
+                          extra: Optional[Dict[str, Dict[str, Any]]] = None,
+                          log_levels: Optional[Dict[str, str]] = None) -> Dict[str, bool]:
+        """
+        Barrière de la transaction apt de séquence: installe en un seul apt-get
+        les installations différées, les paquets déclarés par les plugins de la
+        séquence (include_declared) et les paquets supplémentaires (extra).
+
+        Les paquets déclarés déjà installés ne sont pas réinstallés. Si apt-get
+        échoue, les paquets restés absents sont réessayés un par un afin que
+        chaque plugin obtienne le résultat de ses propres paquets.
+
+        Returns:
+            Dict[str, bool]: Paquet -> succès, pour les paquets traités
+        """
+        if not APT_TRANSACTION.enabled:
+            return {}
+        plan = APT_TRANSACTION.unresolved(include_declared=include_declared)
+        for name, entry in (extra or {}).items():
+            planned = plan.setdefault(name, {"requesters": [], "no_recommends": True})
+            planned["declared"] = False
+            # --no-install-recommends seulement si tous les demandeurs le veulent
+            planned["no_recommends"] = bool(planned.get("no_recommends")) and bool(entry.get("no_recommends"))
+            planned["requesters"] = sorted(set(planned.get("requesters", [])) | set(entry.get("requesters", [])))
+
+        outcomes: Dict[str, Dict[str, Any]] = {}
+        # Paquets seulement déclarés et déjà présents: rien à faire
+        for name in [n for n, entry in plan.items() if entry.get("declared")]:
+            if self.is_installed(name, log_levels=log_levels):
+                outcomes[name] = {"success": True, "message": "déjà installé"}
+                del plan[name]
+
+        # Un apt-get par valeur de --no-install-recommends (au plus deux)
+        groups: Dict[bool, List[str]] = {}
+        for name, entry in plan.items():
+            groups.setdefault(bool(entry.get("no_recommends")), []).append(name)
+        for no_recommends, names in sorted(groups.items()):
+            names.sort()
+            log_prefix = f"Transaction apt ({len(names)} paquet(s)): {', '.join(names)}"
+            self.log_info(log_prefix, log_levels=log_levels)
+            if self._apt_get_install(names, log_prefix, auto_fix=auto_fix, no_recommends=no_recommends,
+                                     force_conf=force_conf, log_levels=log_levels):
+                outcomes.update({name: {"success": True, "message": "installé par la transaction apt"} for name in names})
+                continue
+            # Un seul paquet introuvable fait échouer tout l'apt-get: isoler les échecs
+            for name in names:
+                if self.is_installed(name, log_levels=log_levels):
+                    outcomes[name] = {"success": True, "message": "installé par la transaction apt"}
+                elif self._apt_get_install([name], f"Installation de: {name}", auto_fix=auto_fix,
+                                           no_recommends=no_recommends, force_conf=force_conf, log_levels=log_levels):
+                    outcomes[name] = {"success": True, "message": "installé (nouvelle tentative individuelle)"}
+                else:
+                    outcomes[name] = {"success": False, "message": "échec de l'installation"}
+
+        for name, outcome in outcomes.items():
+            requesters = plan.get(name, {}).get("requesters") or []
+            if requesters:
+                outcome["requesters"] = requesters
+        APT_TRANSACTION.record(outcomes)
+        return {name: outcome["success"] for name, outcome in outcomes.items()}
+
+    def get_transaction_outcome(self, package_name: str) -> Optional[Dict[str, Any]]:
+        """
+        Résultat d'un paquet installé (ou différé puis installé) par la transaction
+        apt de la séquence: {success, message, requesters}, ou None.
+        """
+        return APT_TRANSACTION.outcome(package_name)
+
     def uninstall(self,
                   package_names: Union[str, List[str]],
                   purge: bool = False,
@@ -292,6 +446,9 @@ class AptCommands(PluginsUtilsBase):
         if not remove_success:
              self.log_error(f"Échec de '{' '.join(cmd)}'. Stderr:\n{stderr}", log_levels=log_levels)
              return False
+        if not simulate and APT_TRANSACTION.enabled:
+            # Les plugins suivants ne doivent plus croire ces paquets installés
+            APT_TRANSACTION.forget(packages)
 
         autoremove_success = True
         if not simulate and auto_remove:
@@ -531,7 +688,7 @@ class AptCommands(PluginsUtilsBase):
         self.log_success(f"Dépôt ajouté dans {source_file_path}", log_levels=log_levels)
 
         self.log_info("Mise à jour sources après ajout dépôt...", log_levels=log_levels)
-        update_ok = self.update(allow_fail=True, log_levels=log_levels)
+        update_ok = self.update(allow_fail=True, force=True, log_levels=log_levels)
 
         final_message = f"Ajout dépôt {repo_name_base} {'terminé' if update_ok else 'terminé avec erreurs update'}"
 
@@ -546,10 +703,14 @@ class AptCommands(PluginsUtilsBase):
         Vérifie si un paquet est installé.
         """
         self.log_debug(f"Vérification installation paquet: {package_name}", log_levels=log_levels)
-        cmd = ['dpkg-query', '--show', '--showformat=${db:Status-Status}', package_name]
-        # error_as_warning=True car dpkg-query échoue si le paquet n'est pas connu
-        success, stdout, stderr = self.run(cmd, check=False, no_output=True, error_as_warning=True, log_levels=log_levels)
-        is_installed = success and stdout.strip() == 'installed'
+        if DPKG_STATUS.supports(package_name) and DPKG_STATUS.available():
+            record = DPKG_STATUS.get(package_name)
+            is_installed = record is not None and record.installed
+        else:
+            cmd = ['dpkg-query', '--show', '--showformat=${db:Status-Status}', package_name]
+            # error_as_warning=True car dpkg-query échoue si le paquet n'est pas connu
+            success, stdout, stderr = self.run(cmd, check=False, no_output=True, error_as_warning=True, log_levels=log_levels, cache=FAMILY_DPKG)
+            is_installed = success and stdout.strip() == 'installed'
         if not is_installed:
             self.log_debug(f"Paquet '{package_name}' non installé.", log_levels=log_levels)
             return False
@@ -560,9 +721,12 @@ class AptCommands(PluginsUtilsBase):
                  self.log_warning(f"Paquet '{package_name}' installé mais version inconnue.", log_levels=log_levels)
                  return is_installed # Retourner True car installé, mais avertissement
             self.log_debug(f"Comparaison version: {installed_version} >= {min_version}", log_levels=log_levels)
-            cmd_compare = ['dpkg', '--compare-versions', installed_version, 'ge', min_version]
-            success_cmp, _, _ = self.run(cmd_compare, check=False, no_output=True, error_as_warning=True, log_levels=log_levels)
-            if not success_cmp:
+            try:
+                satisfied = version_satisfies(installed_version, 'ge', min_version)
+            except ValueError as e:
+                self.log_warning(f"Comparaison de version impossible pour '{package_name}': {e}", log_levels=log_levels)
+                satisfied = False
+            if not satisfied:
                  self.log_warning(f"Paquet '{package_name}' ({installed_version}) < version min ({min_version}).", log_levels=log_levels)
                  return False
             self.log_info(f"Paquet '{package_name}' ({installed_version}) >= version min ({min_version}).", log_levels=log_levels)
@@ -573,8 +737,17 @@ class AptCommands(PluginsUtilsBase):
     def get_version(self, package_name: str, log_levels: Optional[Dict[str, str]] = None) -> Optional[str]:
         """Obtient la version installée d'un paquet."""
         self.log_debug(f"Récupération version installée de: {package_name}", log_levels=log_levels)
+        if DPKG_STATUS.supports(package_name) and DPKG_STATUS.available():
+            record = DPKG_STATUS.get(package_name)
+            # dpkg-query ne rapporte pas de version pour un paquet jamais installé
+            version = record.version if record is not None and record.status != 'not-installed' else None
+            if version:
+                self.log_debug(f"Version installée de {package_name}: {version}", log_levels=log_levels)
+            else:
+                self.log_debug(f"Paquet '{package_name}' non trouvé dans la base dpkg.", log_levels=log_levels)
+            return version
         cmd = ['dpkg-query', '--show', '--showformat=${Version}', package_name]
-        success, stdout, stderr = self.run(cmd, check=False, no_output=True, error_as_warning=True, log_levels=log_levels)
+        success, stdout, stderr = self.run(cmd, check=False, no_output=True, error_as_warning=True, log_levels=log_levels, cache=FAMILY_DPKG)
         if success and stdout.strip():
             version = stdout.strip()
             self.log_debug(f"Version installée de {package_name}: {version}", log_levels=log_levels)
@@ -587,25 +760,99 @@ class AptCommands(PluginsUtilsBase):
                   self.log_debug(f"Paquet '{package_name}' non trouvé par dpkg-query.", log_levels=log_levels)
              return None
 
+    def get_installed_versions(self, package_names: List[str], log_levels: Optional[Dict[str, str]] = None) -> Dict[str, Optional[str]]:
+        """
+        Obtient en une fois les versions installées de plusieurs paquets.
+
+        Args:
+            package_names: Noms des paquets
+
+        Returns:
+            Dict[str, Optional[str]]: Nom -> version installée (None si non installé)
+        """
+        if not DPKG_STATUS.available() or not all(DPKG_STATUS.supports(name) for name in package_names):
+            return {name: self.get_version(name, log_levels=log_levels) if self.is_installed(name, log_levels=log_levels) else None
+                    for name in package_names}
+        records = DPKG_STATUS.get_many(package_names)
+        return {name: record.version if record is not None and record.installed else None
+                for name, record in records.items()}
+
+    def get_policies(self, package_names: List[str], log_levels: Optional[Dict[str, str]] = None) -> Dict[str, Optional[PackagePolicy]]:
+        """
+        Obtient la politique apt (versions installée et candidate, épinglage) de
+        plusieurs paquets en un seul appel à `apt-cache policy` (par lots de
+        POLICY_BATCH_SIZE paquets).
+
+        Args:
+            package_names: Noms des paquets
+
+        Returns:
+            Dict[str, Optional[PackagePolicy]]: Nom -> politique (None si le paquet est inconnu d'apt)
+        """
+        names = list(dict.fromkeys(package_names))
+        policies: Dict[str, Optional[PackagePolicy]] = {}
+        if not names:
+            return policies
+        self.log_debug(f"Récupération de la politique apt de {len(names)} paquet(s)", log_levels=log_levels)
+        # Sortie en anglais quelle que soit la locale de l'hôte
+        env = dict(self._apt_env, LC_ALL="C")
+        for start in range(0, len(names), POLICY_BATCH_SIZE):
+            batch = names[start:start + POLICY_BATCH_SIZE]
+            # error_as_warning=True car apt-cache peut signaler des paquets inconnus
+            success, stdout, stderr = self.run(['apt-cache', 'policy', '--', *batch], check=False, no_output=True,
+                                               error_as_warning=True, env=env, log_levels=log_levels)
+            if not success:
+                self.log_warning(f"Impossible obtenir policy apt pour {', '.join(batch)}. Stderr: {stderr}", log_levels=log_levels)
+            parsed = parse_policy(stdout) if success else {}
+            for name in batch:
+                # apt-cache n'affiche pas l'architecture native (bash:amd64 -> bash)
+                policies[name] = parsed.get(name) or parsed.get(name.split(':', 1)[0])
+        return policies
+
+    def get_candidate_versions(self, package_names: List[str], log_levels: Optional[Dict[str, str]] = None) -> Dict[str, Optional[str]]:
+        """Obtient en une fois les versions candidates de plusieurs paquets (None si aucune)."""
+        return {name: policy.candidate if policy else None
+                for name, policy in self.get_policies(package_names, log_levels=log_levels).items()}
+
     def get_candidate_version(self, package_name: str, log_levels: Optional[Dict[str, str]] = None) -> Optional[str]:
         """Obtient la version candidate via `apt-cache policy`."""
         self.log_debug(f"Récupération version candidate de: {package_name}", log_levels=log_levels)
-        cmd = ['apt-cache', 'policy', package_name]
-        # error_as_warning=True car apt-cache échoue si paquet inconnu
-        success, stdout, stderr = self.run(cmd, check=False, no_output=True, error_as_warning=True, log_levels=log_levels)
-        if not success:
-             if "unable to locate package" not in stderr.lower():
-                  self.log_warning(f"Impossible obtenir policy apt pour {package_name}. Stderr: {stderr}", log_levels=log_levels)
-             else:
-                  self.log_debug(f"Paquet '{package_name}' non trouvé dans les sources apt.", log_levels=log_levels)
-             return None
+        policy = self.get_policies([package_name], log_levels=log_levels).get(package_name)
+        if policy is None:
+            self.log_debug(f"Paquet '{package_name}' non trouvé dans les sources apt.", log_levels=log_levels)
+            return None
+        self.log_debug(f"Version candidate de {package_name}: {policy.candidate}", log_levels=log_levels)
+        return policy.candidate
+
+    def get_upgradable(self, package_names: List[str], log_levels: Optional[Dict[str, str]] = None) -> Dict[str, Tuple[str, str]]:
+        """
+        Parmi des paquets, ceux dont la version candidate est plus récente que la
+        version installée (un seul appel à apt-cache).
 
-        candidate_version = None
-        for line in stdout.splitlines():
-            line_strip = line.strip()
-            if line_strip.startswith("Candidate:"):
-                version_part = line_strip.split(":", 1)[1].strip()
-                if version_part != '(none)': candidate_version = version_part
-                break
-        self.log_debug(f"Version candidate de {package_name}: {candidate_version}", log_levels=log_levels)
-        return candidate_version
\ No newline at end of file
+        Returns:
+            Dict[str, Tuple[str, str]]: Nom -> (version installée, version candidate)
+        """
+        upgradable: Dict[str, Tuple[str, str]] = {}
+        for name, policy in self.get_policies(package_names, log_levels=log_levels).items():
+            if policy is None or not policy.installed or not policy.candidate:
+                continue
+            try:
+                if version_satisfies(policy.candidate, 'gt', policy.installed):
+                    upgradable[name] = (policy.installed, policy.candidate)
+            except ValueError as e:
+                self.log_warning(f"Comparaison de version impossible pour '{name}': {e}", log_levels=log_levels)
+        return upgradable
+
+    def is_upgradable(self, package_name: str, log_levels: Optional[Dict[str, str]] = None) -> bool:
+        """Indique si la version candidate d'un paquet installé est plus récente que la version installée."""
+        installed_version = self.get_version(package_name, log_levels=log_levels)
+        if not installed_version:
+            return False
+        candidate_version = self.get_candidate_version(package_name, log_levels=log_levels)
+        if not candidate_version:
+            return False
+        try:
+            return version_satisfies(candidate_version, 'gt', installed_version)
+        except ValueError as e:
+            self.log_warning(f"Comparaison de version impossible pour '{package_name}': {e}", log_levels=log_levels)
+            return False
\ No newline at end of file
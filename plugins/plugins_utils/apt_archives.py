@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Amorçage du cache apt local avec des paquets fournis par le contrôleur.
+
+En exécution SSH, l'interface dépose dans le répertoire temporaire du plugin
+les .deb déjà téléchargés par d'autres hôtes (clé de configuration
+apt_archives_dir). Avant l'exécution du plugin, Main les copie dans
+/var/cache/apt/archives sans écraser les fichiers présents: apt-get vérifie
+leur empreinte d'après ses index et ne retélécharge que ce qui manque ou ne
+correspond pas.
+"""
+
+import os
+from typing import List
+
+APT_ARCHIVES_DIR = "/var/cache/apt/archives"
+# Clé de configuration injectée par l'interface (répertoire des .deb déposés)
+CONFIG_KEY = "apt_archives_dir"
+
+
+def seed_apt_archives(runner, source_dir: str, archives_dir: str = APT_ARCHIVES_DIR) -> int:
+    """
+    Copie les .deb d'un répertoire dans le cache apt (sans écraser).
+
+    Args:
+        runner: Instance de PluginsUtilsBase (exécution avec sudo si nécessaire)
+        source_dir: Répertoire contenant les .deb
+        archives_dir: Cache apt de destination
+
+    Returns:
+        int: Nombre de paquets copiés
+    """
+    try:
+        present = set(os.listdir(archives_dir))
+        files: List[str] = [os.path.join(source_dir, name) for name in sorted(os.listdir(source_dir))
+                            if name.endswith(".deb") and name not in present]
+    except OSError as e:
+        runner.log_warning(f"Cache apt non amorcé: {e}")
+        return 0
+    if not files:
+        return 0
+    success, _, stderr = runner.run(['cp', '--no-clobber', '--', *files, archives_dir + '/'],
+                                    check=False, no_output=True, needs_sudo=True)
+    if not success:
+        runner.log_warning(f"Copie des paquets fournis par le contrôleur impossible: {stderr}")
+        return 0
+    runner.log_info(f"{len(files)} paquet(s) fourni(s) par le contrôleur ajouté(s) au cache apt")
+    return len(files)
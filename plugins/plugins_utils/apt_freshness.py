@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Fraîcheur des index apt.
+
+AptCommands.update() ne relance pas apt-get update si les index sont récents
+et que les sources n'ont pas changé: plusieurs plugins d'une même séquence ne
+retéléchargent plus les mêmes index à quelques minutes d'intervalle.
+
+Les index sont jugés frais si, depuis moins de max_age secondes:
+- une mise à jour réussie a été enregistrée avec la même empreinte des sources
+  (sources.list et sources.list.d), ou
+- les fichiers de /var/lib/apt/lists ont été rafraîchis (apt-daily, autre outil)
+  après la dernière modification des sources.
+"""
+
+import os
+import json
+import time
+import hashlib
+import tempfile
+from typing import List, Optional, Tuple
+
+APT_LISTS_DIR = "/var/lib/apt/lists"
+APT_SOURCES_LIST = "/etc/apt/sources.list"
+APT_SOURCES_DIR = "/etc/apt/sources.list.d"
+# Enregistrement de la dernière mise à jour réussie
+UPDATE_STAMP_PATH = "/var/tmp/pcutils_apt_update.json"
+
+# Âge maximal par défaut des index (secondes), modifiable par variable d'environnement
+DEFAULT_UPDATE_MAX_AGE = 3600
+UPDATE_MAX_AGE_ENV_VAR = "PCUTILS_APT_UPDATE_MAX_AGE"
+
+# Fichiers de /var/lib/apt/lists qui ne sont pas des index
+_LISTS_IGNORED = {"lock", "partial", "auxfiles"}
+
+
+def default_max_age() -> float:
+    """Âge maximal des index: variable d'environnement, sinon DEFAULT_UPDATE_MAX_AGE."""
+    try:
+        return float(os.environ.get(UPDATE_MAX_AGE_ENV_VAR, DEFAULT_UPDATE_MAX_AGE))
+    except ValueError:
+        return float(DEFAULT_UPDATE_MAX_AGE)
+
+
+class AptIndexFreshness:
+    """Décide si apt-get update peut être évité et enregistre les mises à jour réussies."""
+
+    def __init__(self, lists_dir: str = APT_LISTS_DIR, sources_list: str = APT_SOURCES_LIST,
+                 sources_dir: str = APT_SOURCES_DIR, stamp_path: str = UPDATE_STAMP_PATH):
+        self.lists_dir = lists_dir
+        self.sources_list = sources_list
+        self.sources_dir = sources_dir
+        self.stamp_path = stamp_path
+
+    def _source_files(self) -> List[str]:
+        files = [self.sources_list]
+        try:
+            files.extend(os.path.join(self.sources_dir, name) for name in sorted(os.listdir(self.sources_dir))
+                         if name.endswith((".list", ".sources")))
+        except OSError:
+            pass
+        return [path for path in files if os.path.isfile(path)]
+
+    def sources_digest(self) -> Tuple[str, float]:
+        """Empreinte SHA-256 des sources apt et date de leur dernière modification."""
+        digest = hashlib.sha256()
+        newest = 0.0
+        for path in self._source_files():
+            try:
+                with open(path, "rb") as f:
+                    content = f.read()
+                newest = max(newest, os.stat(path).st_mtime)
+            except OSError:
+                continue
+            digest.update(path.encode() + b"\0" + content + b"\0")
+        return digest.hexdigest(), newest
+
+    def lists_mtime(self) -> Optional[float]:
+        """Date du dernier rafraîchissement des index (None si aucun index)."""
+        newest = None
+        try:
+            with os.scandir(self.lists_dir) as entries:
+                for entry in entries:
+                    if entry.name in _LISTS_IGNORED or not entry.is_file():
+                        continue
+                    mtime = entry.stat().st_mtime
+                    if newest is None or mtime > newest:
+                        newest = mtime
+        except OSError:
+            return None
+        return newest
+
+    def _read_stamp(self) -> Optional[dict]:
+        try:
+            with open(self.stamp_path, encoding="utf-8") as f:
+                # Un enregistrement d'un autre utilisateur (hors root) est ignoré
+                if os.fstat(f.fileno()).st_uid not in (os.geteuid(), 0):
+                    return None
+                stamp = json.load(f)
+            return stamp if isinstance(stamp, dict) else None
+        except (OSError, ValueError):
+            return None
+
+    def check(self, max_age: Optional[float] = None) -> Tuple[bool, str]:
+        """
+        Indique si les index apt sont assez récents pour éviter apt-get update.
+
+        Args:
+            max_age: Âge maximal en secondes (default_max_age() si None, 0 pour toujours mettre à jour)
+
+        Returns:
+            Tuple[bool, str]: (index frais, raison)
+        """
+        if max_age is None:
+            max_age = default_max_age()
+        if max_age <= 0:
+            return False, "vérification de fraîcheur désactivée"
+        lists_mtime = self.lists_mtime()
+        if lists_mtime is None:
+            return False, "aucun index apt présent"
+
+        now = time.time()
+        sources_hash, sources_mtime = self.sources_digest()
+        stamp = self._read_stamp()
+        if stamp and stamp.get("sources") == sources_hash:
+            age = now - float(stamp.get("time", 0))
+            if 0 <= age < max_age:
+                return True, f"index mis à jour il y a {int(age)}s, sources inchangées"
+        if sources_mtime < lists_mtime and 0 <= now - lists_mtime < max_age:
+            return True, f"index rafraîchis il y a {int(now - lists_mtime)}s, sources inchangées depuis"
+        if stamp and stamp.get("sources") != sources_hash:
+            return False, "sources apt modifiées depuis la dernière mise à jour"
+        return False, "index plus anciens que l'âge maximal"
+
+    def record(self) -> None:
+        """Enregistre une mise à jour réussie avec l'empreinte actuelle des sources."""
+        sources_hash, _ = self.sources_digest()
+        # Fichier temporaire au nom imprévisible (sans suivre de lien) dans le même
+        # répertoire, pour un remplacement atomique; lisible par tous comme avant
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.stamp_path),
+                                            prefix=f"{os.path.basename(self.stamp_path)}.")
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"time": time.time(), "sources": sources_hash}, f)
+                os.fchmod(f.fileno(), 0o644)
+            os.replace(tmp_path, self.stamp_path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+
+# Instance unique par processus plugin
+APT_FRESHNESS = AptIndexFreshness()
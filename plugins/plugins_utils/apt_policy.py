@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Analyse de la sortie de `apt-cache policy` pour plusieurs paquets à la fois.
+
+AptCommands.get_policies() interroge tous les paquets demandés en un seul
+appel à apt-cache (le cache de paquets n'est chargé qu'une fois) et retourne,
+pour chacun, la version installée, la version candidate et la priorité
+d'épinglage de chaque version disponible.
+"""
+
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# Nombre maximal de paquets par appel à apt-cache (limite de la ligne de commande)
+POLICY_BATCH_SIZE = 256
+
+
+class PackagePolicy(NamedTuple):
+    """Politique apt d'un paquet."""
+    installed: Optional[str]             # None si non installé
+    candidate: Optional[str]             # None si aucune version installable
+    versions: Tuple[Tuple[str, int], ...]  # (version, priorité d'épinglage), dans l'ordre d'apt
+
+    def priority(self, version: Optional[str] = None) -> Optional[int]:
+        """Priorité d'épinglage d'une version (la candidate par défaut), None si inconnue."""
+        version = version or self.candidate
+        for candidate_version, priority in self.versions:
+            if candidate_version == version:
+                return priority
+        return None
+
+
+def _field_version(value: str) -> Optional[str]:
+    value = value.strip()
+    return None if not value or value == "(none)" else value
+
+
+def parse_policy(text: str) -> Dict[str, PackagePolicy]:
+    """
+    Analyse la sortie de `apt-cache policy p1 p2 ...` (locale C).
+
+    Args:
+        text: Sortie standard d'apt-cache
+
+    Returns:
+        Dict[str, PackagePolicy]: Nom tel qu'affiché par apt-cache -> politique
+        (les paquets inconnus d'apt sont absents)
+    """
+    policies: Dict[str, PackagePolicy] = {}
+    name: Optional[str] = None
+    installed: Optional[str] = None
+    candidate: Optional[str] = None
+    versions: List[Tuple[str, int]] = []
+
+    def flush() -> None:
+        if name is not None:
+            policies[name] = PackagePolicy(installed, candidate, tuple(versions))
+
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        indent = len(line) - len(line.lstrip())
+        if indent == 0:
+            if line.endswith(":"):
+                flush()
+                name, installed, candidate, versions = line[:-1], None, None, []
+            continue
+        if name is None:
+            continue
+        stripped = line.strip()
+        if stripped.startswith("Installed:"):
+            installed = _field_version(stripped.split(":", 1)[1])
+        elif stripped.startswith("Candidate:"):
+            candidate = _field_version(stripped.split(":", 1)[1])
+        elif indent < 8 and not stripped.endswith(":"):
+            # Ligne de version (" *** 1.2-3 500" pour la version installée);
+            # les sources de chaque version sont plus indentées
+            parts = stripped.split()
+            if parts and parts[0] == "***":
+                parts = parts[1:]
+            if len(parts) == 2 and parts[1].lstrip("-").isdigit():
+                versions.append((parts[0], int(parts[1])))
+    flush()
+    return policies
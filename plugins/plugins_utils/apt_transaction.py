@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Transaction apt partagée par les plugins d'une séquence, sur un hôte.
+
+Les plugins déclarent les paquets dont ils ont besoin dans leur settings.yml
+(clé apt_packages). Avant l'exécution, l'interface calcule l'union de ces
+paquets pour chaque hôte et l'injecte dans la configuration de chaque plugin
+(clé apt_transaction: identifiant d'exécution, paquets, dernier plugin de
+l'hôte). Les plugins peuvent aussi différer une installation avec
+AptCommands.install(..., defer=True).
+
+Le premier appel à AptCommands.install() qui touche un paquet du plan (la
+barrière) installe l'union en un seul apt-get: résolution des dépendances,
+verrou et déclencheurs dpkg (man-db, initramfs) ne sont payés qu'une fois.
+Le résultat de chaque paquet est conservé dans un fichier d'état sur l'hôte,
+où les plugins suivants le retrouvent. Le dernier plugin de l'hôte applique
+les installations différées restantes puis supprime ce fichier.
+"""
+
+import os
+import json
+import fcntl
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+# Répertoire des fichiers d'état (persistant entre les processus plugins d'une séquence)
+TRANSACTION_DIR = "/var/tmp"
+TRANSACTION_FILE_PREFIX = "pcutils_apt_"
+
+# Clé de configuration injectée par l'interface
+CONFIG_KEY = "apt_transaction"
+
+
+def _empty_state() -> Dict[str, Any]:
+    return {"pending": {}, "outcomes": {}}
+
+
+class AptTransaction:
+    """
+    Plan d'installation apt de la séquence en cours pour l'hôte local.
+    Inactif si l'interface n'a pas fourni de plan (plugin lancé seul).
+    """
+
+    def __init__(self):
+        self.configure(None)
+
+    def configure(self, settings: Optional[Dict[str, Any]], requester: str = "") -> None:
+        """
+        Active la transaction à partir de la configuration du plugin.
+
+        Args:
+            settings: Valeur de la clé apt_transaction ({id, packages, flush}), ou None
+            requester: Nom du plugin courant (pour le compte rendu par paquet)
+        """
+        settings = settings if isinstance(settings, dict) else {}
+        transaction_id = str(settings.get("id") or "")
+        self.transaction_id = transaction_id if transaction_id.isalnum() else ""
+        self.declared: List[str] = [str(p) for p in settings.get("packages") or []]
+        self.flush_at_end = bool(settings.get("flush"))
+        self.requester = requester
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.transaction_id)
+
+    @property
+    def state_path(self) -> str:
+        return os.path.join(TRANSACTION_DIR, f"{TRANSACTION_FILE_PREFIX}{self.transaction_id}.json")
+
+    @contextmanager
+    def _locked_state(self) -> Iterator[Dict[str, Any]]:
+        """
+        Ouvre le fichier d'état sous verrou exclusif et le réécrit en sortie.
+        Le fichier est créé en 0600; un lien symbolique ou un fichier d'un autre
+        propriétaire est refusé.
+        """
+        fd = os.open(self.state_path, os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW, 0o600)
+        with os.fdopen(fd, "r+", encoding="utf-8") as f:
+            st = os.fstat(f.fileno())
+            if st.st_uid not in (os.geteuid(), 0):
+                raise PermissionError(f"Fichier de transaction apt d'un autre utilisateur: {self.state_path}")
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            content = f.read()
+            try:
+                state = json.loads(content) if content.strip() else _empty_state()
+            except ValueError:
+                state = _empty_state()
+            yield state
+            f.seek(0)
+            f.truncate()
+            json.dump(state, f)
+
+    def defer(self, packages: Iterable[str], no_recommends: bool = False) -> None:
+        """Ajoute des paquets aux installations différées jusqu'à la barrière."""
+        with self._locked_state() as state:
+            for package in packages:
+                if package in state["outcomes"]:
+                    continue
+                entry = state["pending"].setdefault(package, {"requesters": [], "no_recommends": no_recommends})
+                if self.requester and self.requester not in entry["requesters"]:
+                    entry["requesters"].append(self.requester)
+                # Un seul demandeur qui veut les recommandations suffit à les installer
+                entry["no_recommends"] = entry["no_recommends"] and no_recommends
+
+    def unresolved(self, include_declared: bool = True) -> Dict[str, Dict[str, Any]]:
+        """
+        Paquets du plan encore à installer: installations différées et, si demandé,
+        paquets déclarés sans résultat. Retourne nom -> {requesters, no_recommends, declared}.
+        """
+        with self._locked_state() as state:
+            packages = {name: dict(entry, declared=False) for name, entry in state["pending"].items()}
+            if include_declared:
+                for name in self.declared:
+                    if name not in state["outcomes"]:
+                        packages.setdefault(name, {"requesters": [], "no_recommends": False, "declared": True})
+            return packages
+
+    def has_pending(self) -> bool:
+        """True s'il reste des installations différées."""
+        if not self.enabled:
+            return False
+        try:
+            with self._locked_state() as state:
+                return bool(state["pending"])
+        except OSError:
+            return False
+
+    def record(self, outcomes: Dict[str, Dict[str, Any]]) -> None:
+        """Enregistre le résultat de paquets installés par la transaction."""
+        with self._locked_state() as state:
+            for name, outcome in outcomes.items():
+                state["pending"].pop(name, None)
+                state["outcomes"][name] = dict(outcome, at=time.time())
+
+    def forget(self, packages: Iterable[str]) -> None:
+        """Oublie le résultat de paquets désinstallés depuis leur installation."""
+        if not self.enabled:
+            return
+        try:
+            with self._locked_state() as state:
+                for package in packages:
+                    state["outcomes"].pop(package, None)
+        except OSError:
+            pass
+
+    def outcome(self, package: str) -> Optional[Dict[str, Any]]:
+        """Résultat d'un paquet traité par la transaction ({success, message}), ou None."""
+        if not self.enabled:
+            return None
+        try:
+            with self._locked_state() as state:
+                return state["outcomes"].get(package)
+        except OSError:
+            return None
+
+    def discard(self) -> None:
+        """Supprime le fichier d'état (fin de la séquence sur l'hôte)."""
+        try:
+            os.remove(self.state_path)
+        except OSError:
+            pass
+
+
+# Transaction unique par processus plugin (configurée par Main)
+APT_TRANSACTION = AptTransaction()
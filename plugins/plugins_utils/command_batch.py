@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Exécuteur de lots de commandes.
+
+Ce script est lancé une seule fois par lot par PluginsUtilsBase.run_batch()
+(via sudo ou le courtier privilégié si nécessaire). Il reçoit sur stdin la
+description du lot en JSON, exécute les commandes séquentiellement ou avec une
+concurrence bornée, et écrit sur stdout un résultat JSON par commande terminée:
+    {"index", "rc", "stdout", "stderr", "duration", "error"}
+
+Ce module n'importe que la bibliothèque standard: il est exécuté tel quel,
+éventuellement en root, hors du contexte des plugins.
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Dict, List, Optional
+
+# Chemin du script, utilisé par run_batch() pour lancer l'exécuteur
+BATCH_HELPER_PATH = os.path.abspath(__file__)
+
+
+def _run_one(index: int, argv: List[str], timeout: Optional[float],
+             cwd: Optional[str], env: Optional[Dict[str, str]]) -> Dict[str, Any]:
+    """Exécute une commande du lot et retourne son résultat structuré."""
+    start = time.monotonic()
+    result: Dict[str, Any] = {"index": index, "rc": None, "stdout": "", "stderr": "", "error": None}
+    try:
+        completed = subprocess.run(argv, capture_output=True, text=True, errors='replace',
+                                   timeout=timeout, cwd=cwd, env=env, stdin=subprocess.DEVNULL)
+        result.update(rc=completed.returncode, stdout=completed.stdout, stderr=completed.stderr)
+    except subprocess.TimeoutExpired as e:
+        result.update(rc=-1, error=f"timeout ({timeout}s)",
+                      stdout=e.stdout if isinstance(e.stdout, str) else "",
+                      stderr=e.stderr if isinstance(e.stderr, str) else "")
+    except OSError as e:
+        result.update(rc=127, error=str(e), stderr=str(e))
+    result["duration"] = round(time.monotonic() - start, 6)
+    return result
+
+
+def execute_batch(spec: Dict[str, Any], emit) -> None:
+    """
+    Exécute un lot de commandes.
+
+    Args:
+        spec: Description du lot (commands, stop_on_error, max_workers, timeout, cwd, env)
+        emit: Fonction appelée avec chaque résultat, dès que la commande est terminée
+    """
+    commands: List[List[str]] = spec.get("commands", [])
+    stop_on_error = spec.get("stop_on_error", True)
+    max_workers = max(1, int(spec.get("max_workers") or 1))
+    timeout = spec.get("timeout")
+    cwd = spec.get("cwd")
+    env = spec.get("env")
+
+    if max_workers == 1:
+        for index, argv in enumerate(commands):
+            result = _run_one(index, argv, timeout, cwd, env)
+            emit(result)
+            if stop_on_error and result["rc"] != 0:
+                break
+        return
+
+    failed = threading.Event()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending = set()
+        next_index = 0
+        while next_index < len(commands) or pending:
+            # Ne soumettre de nouvelles commandes que tant qu'aucune n'a échoué
+            while next_index < len(commands) and len(pending) < max_workers and not failed.is_set():
+                pending.add(pool.submit(_run_one, next_index, commands[next_index], timeout, cwd, env))
+                next_index += 1
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                emit(result)
+                if stop_on_error and result["rc"] != 0:
+                    failed.set()
+
+
+def main() -> int:
+    """Lit le lot sur stdin et écrit les résultats sur stdout (une ligne JSON par commande)."""
+    # Le lot tient sur la dernière ligne: une ligne précédente peut être le mot
+    # de passe sudo, non consommé si les identifiants étaient en cache
+    lines = [line for line in sys.stdin.read().splitlines() if line.strip()]
+    try:
+        spec = json.loads(lines[-1]) if lines else {}
+    except json.JSONDecodeError as e:
+        print(json.dumps({"index": -1, "rc": 2, "error": f"Lot invalide: {e}"}), flush=True)
+        return 2
+
+    lock = threading.Lock()
+
+    def emit(result: Dict[str, Any]) -> None:
+        with lock:
+            sys.stdout.write(json.dumps(result, ensure_ascii=False) + "\n")
+            sys.stdout.flush()
+
+    execute_batch(spec, emit)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Cache des résultats de commandes en lecture seule.
+
+Les commandes déclarées pures (run(..., cache="famille")) voient leur résultat
+mémorisé pour la durée du processus plugin, par argv, environnement et mode
+sudo. Chaque entrée appartient à une famille (dpkg, users, printers,
+services...). Toute commande modifiante qui passe par run() invalide les
+familles concernées: automatiquement d'après MUTATION_RULES, ou explicitement
+via run(..., invalidates=[...]).
+"""
+
+import os
+import re
+import shlex
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+# Familles de résultats mis en cache
+FAMILY_DPKG = "dpkg"          # État des paquets installés (dpkg-query)
+FAMILY_APT = "apt"            # Index apt (apt-cache policy/show)
+FAMILY_USERS = "users"        # Comptes et groupes (getent)
+FAMILY_PRINTERS = "printers"  # Imprimantes CUPS (lpstat)
+FAMILY_SERVICES = "services"  # État des services (systemctl is-active/is-enabled)
+
+# Toutes les familles (commande qu'on ne sait pas analyser)
+ALL_FAMILIES = frozenset({FAMILY_DPKG, FAMILY_APT, FAMILY_USERS, FAMILY_PRINTERS, FAMILY_SERVICES})
+
+# Nombre maximal d'entrées conservées par famille
+CACHE_MAX_ENTRIES = 1024
+
+# Sous-commandes apt modifiant l'état des paquets
+_APT_MUTATING = {"install", "remove", "purge", "upgrade", "dist-upgrade", "full-upgrade",
+                 "autoremove", "reinstall", "build-dep", "markauto", "unmarkauto"}
+# Options apt/apt-get/aptitude suivies d'une valeur (-o X, -t release...)
+_APT_OPTIONS_WITH_VALUE = {"-o", "--option", "-c", "--config-file", "-t", "--target-release",
+                           "--default-release", "-a", "--host-architecture", "-F", "--display-format",
+                           "-w", "--width", "-O", "--sort"}
+# Options dpkg en lecture seule (toutes les autres sont considérées modifiantes)
+_DPKG_READ_ONLY = {"--compare-versions", "-l", "--list", "-s", "--status", "-L", "--listfiles",
+                   "-S", "--search", "--get-selections", "--print-architecture", "-p",
+                   "--print-avail", "--audit", "-C", "--version"}
+_SYSTEMCTL_MUTATING = {"start", "stop", "restart", "reload", "try-restart", "reload-or-restart",
+                       "try-reload-or-restart", "enable", "disable", "reenable", "mask", "unmask",
+                       "daemon-reload", "kill", "reset-failed", "isolate", "preset"}
+_SYSTEMCTL_OPTIONS_WITH_VALUE = {"-H", "--host", "-M", "--machine", "-p", "--property", "-P",
+                                 "-t", "--type", "--state", "-n", "--lines", "-o", "--output",
+                                 "--root", "--image", "-s", "--signal", "--kill-whom", "--job-mode",
+                                 "--what", "--timestamp", "--message", "--reboot-argument"}
+
+# Les scripts de maintenance des paquets créent des comptes et (re)démarrent des services
+_PACKAGE_FAMILIES = (FAMILY_DPKG, FAMILY_APT, FAMILY_SERVICES, FAMILY_USERS)
+
+# Programme -> (familles invalidées, prédicat sur les arguments ou None = toujours)
+MUTATION_RULES: Dict[str, Tuple[Tuple[str, ...], Any]] = {
+    "apt": (_PACKAGE_FAMILIES, lambda args: _first_subcommand(args, _APT_OPTIONS_WITH_VALUE) in _APT_MUTATING | {"update"}),
+    "apt-get": (_PACKAGE_FAMILIES, lambda args: _first_subcommand(args, _APT_OPTIONS_WITH_VALUE) in _APT_MUTATING | {"update"}),
+    "aptitude": (_PACKAGE_FAMILIES, lambda args: _first_subcommand(args, _APT_OPTIONS_WITH_VALUE) in _APT_MUTATING | {"update"}),
+    "dpkg": ((FAMILY_DPKG, FAMILY_SERVICES, FAMILY_USERS), lambda args: not any(arg in _DPKG_READ_ONLY for arg in args)),
+    "debconf-set-selections": ((FAMILY_DPKG,), None),
+    "add-apt-repository": ((FAMILY_APT,), None),
+    "useradd": ((FAMILY_USERS,), None),
+    "usermod": ((FAMILY_USERS,), None),
+    "userdel": ((FAMILY_USERS,), None),
+    "adduser": ((FAMILY_USERS,), None),
+    "deluser": ((FAMILY_USERS,), None),
+    "groupadd": ((FAMILY_USERS,), None),
+    "groupmod": ((FAMILY_USERS,), None),
+    "groupdel": ((FAMILY_USERS,), None),
+    "addgroup": ((FAMILY_USERS,), None),
+    "delgroup": ((FAMILY_USERS,), None),
+    "gpasswd": ((FAMILY_USERS,), None),
+    "chpasswd": ((FAMILY_USERS,), None),
+    "lpadmin": ((FAMILY_PRINTERS,), None),
+    "lpoptions": ((FAMILY_PRINTERS,), None),
+    "cupsenable": ((FAMILY_PRINTERS,), None),
+    "cupsdisable": ((FAMILY_PRINTERS,), None),
+    "cupsaccept": ((FAMILY_PRINTERS,), None),
+    "cupsreject": ((FAMILY_PRINTERS,), None),
+    "cupsctl": ((FAMILY_PRINTERS,), None),
+    "systemctl": ((FAMILY_SERVICES,), lambda args: _first_subcommand(args, _SYSTEMCTL_OPTIONS_WITH_VALUE) in _SYSTEMCTL_MUTATING),
+    "service": ((FAMILY_SERVICES,), None),
+}
+
+# Préfixes qui exécutent la commande suivante: programme -> options suivies d'une valeur
+_WRAPPERS: Dict[str, Set[str]] = {
+    "sudo": {"-u", "--user", "-g", "--group", "-h", "--host", "-p", "--prompt", "-r", "--role",
+             "-t", "--type", "-C", "--close-from", "-D", "--chdir", "-R", "--chroot",
+             "-T", "--command-timeout", "-U", "--other-user"},
+    "env": {"-u", "--unset", "-C", "--chdir"},
+    "nice": {"-n", "--adjustment"},
+    "ionice": {"-c", "--class", "-n", "--classdata"},
+    "stdbuf": {"-i", "--input", "-o", "--output", "-e", "--error"},
+    "timeout": {"-s", "--signal", "-k", "--kill-after"},
+    "nohup": set(),
+    "exec": set(),
+    "command": set(),
+}
+# Interpréteurs dont le script (-c) est analysé à son tour
+_SHELLS = {"sh", "bash", "dash", "ksh", "zsh"}
+# Séparateurs de commandes d'une chaîne shell
+_SEPARATORS = {";", "&&", "||", "|", "|&", "&", ";;", "(", ")"}
+_ASSIGNMENT = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*=")
+_REDIRECTION = re.compile(r"^(&|[0-9]*)[<>][<>&|]*$")
+
+
+class _Unparseable(Exception):
+    """Commande dont on ne peut pas déterminer l'effet."""
+
+
+def _first_subcommand(args: List[str], options_with_value: Iterable[str] = ()) -> Optional[str]:
+    """Retourne le premier argument qui n'est ni une option ni la valeur d'une option."""
+    skip_next = False
+    for arg in args:
+        if skip_next:
+            skip_next = False
+        elif arg in options_with_value:
+            skip_next = True
+        elif not arg.startswith("-"):
+            return arg
+    return None
+
+
+def _split_command(cmd: Union[str, List[str]]) -> List[str]:
+    """Découpe une commande (chaîne ou liste) en arguments, sans lever d'exception."""
+    if isinstance(cmd, (list, tuple)):
+        return [str(arg) for arg in cmd]
+    try:
+        return shlex.split(cmd)
+    except ValueError:
+        return str(cmd).split()
+
+
+def _shell_segments(script: str) -> List[List[str]]:
+    """
+    Découpe une chaîne shell en commandes simples (séparateurs ; && || | & et
+    fins de ligne), sans les redirections.
+
+    Raises:
+        _Unparseable: Guillemets non fermés ou substitution de commande.
+    """
+    if "$(" in script or "`" in script:
+        raise _Unparseable(script)
+    lexer = shlex.shlex(script.replace("\n", ";"), posix=True, punctuation_chars=True)
+    lexer.whitespace_split = True
+    try:
+        tokens = list(lexer)
+    except ValueError as e:
+        raise _Unparseable(script) from e
+    segments: List[List[str]] = [[]]
+    skip_target = False
+    for token in tokens:
+        if skip_target:
+            skip_target = False
+        elif token in _SEPARATORS:
+            segments.append([])
+        elif _REDIRECTION.match(token):
+            # La cible d'une redirection (fichier ou descripteur) n'est pas un argument
+            skip_target = True
+        else:
+            segments[-1].append(token)
+    return [segment for segment in segments if segment]
+
+
+def _unwrap(argv: List[str]) -> List[str]:
+    """
+    Retire les préfixes (sudo -u x, env A=b, nice -n 5, timeout 10...) et les
+    affectations de variables devant le programme réellement exécuté.
+    """
+    while argv:
+        program = os.path.basename(argv[0])
+        if _ASSIGNMENT.match(argv[0]):
+            argv = argv[1:]
+            continue
+        options = _WRAPPERS.get(program)
+        if options is None:
+            return argv
+        i = 1
+        while i < len(argv):
+            arg = argv[i]
+            if arg == "--":
+                i += 1
+                break
+            if arg in options:
+                i += 2
+            elif arg.startswith("-") or (program in ("sudo", "env") and _ASSIGNMENT.match(arg)):
+                i += 1
+            else:
+                break
+        if program == "timeout":
+            i += 1  # Durée
+        argv = argv[i:]
+    return argv
+
+
+def _segment_families(argv: List[str], depth: int) -> Set[str]:
+    """Familles invalidées par une commande simple (liste d'arguments)."""
+    argv = _unwrap(argv)
+    if not argv:
+        return set()
+    program = os.path.basename(argv[0])
+    args = argv[1:]
+    if program in _SHELLS:
+        script = None
+        reads_script = False
+        i = 0
+        while i < len(args):
+            arg = args[i]
+            if arg in ("-o", "+o"):
+                i += 2
+                continue
+            if arg.startswith(("-", "+")) and arg not in ("-", "--"):
+                reads_script = reads_script or (arg.startswith("-") and not arg.startswith("--") and "c" in arg[1:])
+                i += 1
+                continue
+            script = arg if reads_script else None
+            break
+        if script is None or depth > 4:
+            # Fichier de script ou entrée standard: contenu inconnu
+            raise _Unparseable(" ".join(argv))
+        return _script_families(script, depth + 1)
+    if program == "eval":
+        return _script_families(" ".join(args), depth + 1)
+    rule = MUTATION_RULES.get(program)
+    if rule is None:
+        return set()
+    rule_families, predicate = rule
+    if predicate is None or predicate(args):
+        return set(rule_families)
+    return set()
+
+
+def _script_families(script: str, depth: int) -> Set[str]:
+    """Familles invalidées par une chaîne shell."""
+    families: Set[str] = set()
+    for segment in _shell_segments(script):
+        families |= _segment_families(segment, depth)
+    return families
+
+
+def families_invalidated_by(cmd: Union[str, List[str]], shell: bool = False) -> Set[str]:
+    """
+    Détermine les familles de cache invalidées par une commande.
+
+    Une chaîne est découpée en commandes simples (; && || | et fins de ligne).
+    Les préfixes sudo, env, nice, timeout... sont ignorés, les options suivies
+    d'une valeur (apt-get -o X install) sautées, et le script de sh -c analysé
+    à son tour. Une commande impossible à analyser (guillemets non fermés,
+    substitution, script lu depuis un fichier) invalide toutes les familles.
+
+    Args:
+        cmd: Commande (liste d'arguments ou chaîne)
+        shell: True si la chaîne est interprétée par le shell (par prudence,
+               une chaîne est découpée comme une chaîne shell dans tous les cas)
+
+    Returns:
+        Set[str]: Familles à invalider
+    """
+    try:
+        if isinstance(cmd, (list, tuple)):
+            return _segment_families([str(arg) for arg in cmd], 0)
+        return _script_families(str(cmd), 0)
+    except _Unparseable:
+        return set(ALL_FAMILIES)
+
+
+def make_cache_key(cmd: Union[str, List[str]], shell: bool = False, cwd: Optional[str] = None,
+                   env: Optional[Dict[str, str]] = None, needs_sudo: Optional[bool] = None) -> Tuple:
+    """
+    Construit la clé de cache d'une commande (argv, environnement, sudo).
+
+    Returns:
+        Tuple: Clé hashable
+    """
+    env_key = tuple(sorted(env.items())) if env else None
+    return (tuple(_split_command(cmd)), shell, cwd, env_key, needs_sudo)
+
+
+class CommandCache:
+    """
+    Mémorisation par famille des résultats (success, stdout, stderr), partagée
+    par toutes les instances d'utilitaires du processus.
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self._max_entries = max_entries
+        self._families: Dict[str, "OrderedDict[Tuple, Tuple[bool, str, str]]"] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, family: str, key: Tuple) -> Optional[Tuple[bool, str, str]]:
+        """Retourne le résultat mémorisé, ou None."""
+        with self._lock:
+            entries = self._families.get(family)
+            if entries is not None and key in entries:
+                entries.move_to_end(key)
+                self.hits += 1
+                return entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, family: str, key: Tuple, result: Tuple[bool, str, str]) -> None:
+        """Mémorise le résultat d'une commande pure."""
+        with self._lock:
+            entries = self._families.setdefault(family, OrderedDict())
+            entries[key] = result
+            entries.move_to_end(key)
+            while len(entries) > self._max_entries:
+                entries.popitem(last=False)
+
+    def invalidate(self, families: Optional[Iterable[str]] = None) -> None:
+        """
+        Invalide des familles de résultats.
+
+        Args:
+            families: Familles à vider (None pour tout vider)
+        """
+        with self._lock:
+            if families is None:
+                self._families.clear()
+                return
+            for family in families:
+                self._families.pop(family, None)
+
+
+# Cache unique par processus plugin
+COMMAND_CACHE = CommandCache()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Résolution partagée des chemins d'exécutables.
+
+Tous les utilitaires (*Commands) du processus plugin partagent une seule table
+nom -> chemin, indexée par la valeur de PATH. Les outils les plus courants
+(PRELOAD_COMMANDS) sont résolus en une seule passe sur les répertoires de PATH
+lors du premier accès; les autres noms sont résolus à la demande via
+shutil.which puis mémorisés. Les absences sont oubliées après une installation
+de paquets (famille de cache dpkg), l'outil ayant pu apparaître entre-temps.
+"""
+
+import os
+import shutil
+import threading
+from typing import Dict, Iterable, Optional
+
+# Outils utilisés par les utilitaires, résolus en une passe au premier accès
+PRELOAD_COMMANDS = (
+    "sudo", "apt", "apt-get", "apt-cache", "dpkg", "dpkg-query",
+    "debconf", "debconf-show", "debconf-set-selections", "debconf-communicate",
+    "systemctl", "journalctl", "tar", "getent", "lpstat", "lpadmin",
+    "ldapsearch", "ldapadd", "ldapmodify", "ldapdelete", "ldappasswd",
+    "lsblk", "findmnt", "df", "efibootmgr", "ufw", "mdadm", "grub-mkconfig", "update-grub",
+)
+
+
+def _is_executable(path: str) -> bool:
+    """Même critère que shutil.which: fichier régulier exécutable."""
+    return os.path.isfile(path) and os.access(path, os.X_OK)
+
+
+class ExecutableResolver:
+    """
+    Cache nom -> chemin des exécutables, par valeur de PATH, partagé par
+    toutes les instances d'utilitaires du processus.
+    """
+
+    def __init__(self, preload: Iterable[str] = PRELOAD_COMMANDS):
+        self._preload = tuple(preload)
+        self._tables: Dict[str, Dict[str, Optional[str]]] = {}
+        self._lock = threading.Lock()
+
+    def _table(self, search_path: str) -> Dict[str, Optional[str]]:
+        """Retourne (en la construisant au besoin) la table associée à un PATH."""
+        table = self._tables.get(search_path)
+        if table is None:
+            table = self._scan(search_path, self._preload)
+            self._tables[search_path] = table
+        return table
+
+    @staticmethod
+    def _scan(search_path: str, names: Iterable[str]) -> Dict[str, Optional[str]]:
+        """
+        Résout une liste de noms en listant chaque répertoire de PATH une seule
+        fois, au lieu d'un stat par nom et par répertoire.
+        """
+        wanted = set(names)
+        table: Dict[str, Optional[str]] = {}
+        seen_dirs = set()
+        for directory in search_path.split(os.pathsep):
+            if not wanted:
+                break
+            directory = directory or os.curdir
+            if directory in seen_dirs:
+                continue
+            seen_dirs.add(directory)
+            try:
+                entries = os.listdir(directory)
+            except OSError:
+                continue
+            for name in wanted.intersection(entries):
+                candidate = os.path.join(directory, name)
+                if _is_executable(candidate):
+                    table[name] = candidate
+                    wanted.discard(name)
+        table.update(dict.fromkeys(wanted))
+        return table
+
+    def which(self, name: str, search_path: Optional[str] = None) -> Optional[str]:
+        """
+        Retourne le chemin complet d'un exécutable, ou None s'il est introuvable.
+
+        Args:
+            name: Nom de la commande (ou chemin contenant un '/')
+            search_path: Valeur de PATH à utiliser (par défaut celle du processus)
+
+        Returns:
+            Optional[str]: Chemin de l'exécutable
+        """
+        if search_path is None:
+            search_path = os.environ.get("PATH", os.defpath)
+        with self._lock:
+            table = self._table(search_path)
+            if name in table:
+                return table[name]
+        path = shutil.which(name, path=search_path)
+        with self._lock:
+            self._table(search_path)[name] = path
+        return path
+
+    def forget_missing(self) -> None:
+        """Oublie les exécutables introuvables (après une installation de paquets)."""
+        with self._lock:
+            for table in self._tables.values():
+                for name in [n for n, path in table.items() if path is None]:
+                    del table[name]
+
+    def invalidate(self) -> None:
+        """Vide entièrement le cache (PATH ou système de fichiers modifiés)."""
+        with self._lock:
+            self._tables.clear()
+
+
+# Résolveur unique par processus plugin
+EXECUTABLE_PATHS = ExecutableResolver()
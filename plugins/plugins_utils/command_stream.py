@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Lecture au fil de l'eau de la sortie des commandes.
+
+PluginsUtilsBase.run_stream() retourne un CommandStream: itérer dessus produit
+les lignes (ou blocs de texte) de stdout dès leur arrivée, sans accumuler la
+sortie complète en mémoire. Seules les dernières lignes de stderr sont
+conservées. Le découpage en lignes (LineSplitter) est partagé avec la lecture
+en temps réel de run().
+"""
+
+import os
+import codecs
+import locale
+import select
+import subprocess
+import threading
+import time
+from collections import deque
+from typing import Callable, Iterator, List, Optional
+
+# Taille des lectures brutes sur les flux des commandes
+READ_CHUNK_SIZE = 64 * 1024
+# Nombre de lignes de stderr conservées par défaut par run_stream()
+STREAM_STDERR_TAIL = 200
+# Délai laissé à une commande interrompue pour se terminer avant SIGKILL
+STREAM_TERMINATE_GRACE = 2.0
+
+
+class LineSplitter:
+    """
+    Découpe un flux d'octets lu par blocs en lignes, avec les mêmes fins de
+    ligne que le mode texte de subprocess (\n, \r\n et \r).
+    """
+
+    def __init__(self, encoding: Optional[str]):
+        self._decoder = codecs.getincrementaldecoder(encoding or 'utf-8')(errors='replace')
+        self._partial = ""
+
+    @staticmethod
+    def _normalize(text: str) -> List[str]:
+        return text.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+
+    def feed(self, data: bytes) -> List[str]:
+        """Retourne les lignes complètes contenues dans le bloc (la fin partielle est conservée)."""
+        text = self._partial + self._decoder.decode(data)
+        # Un '\r' final peut être le début d'un '\r\n' coupé entre deux blocs
+        held = ""
+        if text.endswith('\r'):
+            text, held = text[:-1], '\r'
+        pieces = self._normalize(text)
+        self._partial = pieces.pop() + held
+        return [line.rstrip() for line in pieces]
+
+    def close(self) -> List[str]:
+        """Retourne la dernière ligne non terminée à la fin du flux."""
+        text = self._partial + self._decoder.decode(b'', final=True)
+        self._partial = ""
+        if not text:
+            return []
+        pieces = self._normalize(text)
+        if pieces[-1] == "":
+            pieces.pop()
+        return [line.rstrip() for line in pieces]
+
+
+def stream_encoding(stream) -> str:
+    """Encodage d'un flux de processus (celui du mode texte de subprocess par défaut)."""
+    return getattr(stream, 'encoding', None) or locale.getpreferredencoding(False)
+
+
+def feed_stdin(process, data: bytes,
+               on_error: Optional[Callable[[Exception], None]] = None) -> threading.Thread:
+    """
+    Écrit des données sur stdin d'un processus depuis un thread, puis ferme le flux.
+    L'appelant peut lire stdout/stderr pendant l'écriture: une commande qui
+    remplit ses tubes avant d'avoir tout lu ne bloque plus l'écriture.
+
+    Args:
+        process: Processus dont stdin est un tube
+        data: Octets à écrire
+        on_error: Fonction appelée si l'écriture échoue (tube fermé, ...)
+
+    Returns:
+        threading.Thread: Thread d'écriture (démon)
+    """
+    def write() -> None:
+        try:
+            process.stdin.write(data)
+            process.stdin.flush()
+        except (BrokenPipeError, OSError, ValueError) as e:
+            if on_error is not None:
+                on_error(e)
+        finally:
+            try:
+                process.stdin.close()
+            except (BrokenPipeError, OSError):
+                pass
+
+    thread = threading.Thread(target=write, name="stdin-writer", daemon=True)
+    thread.start()
+    return thread
+
+
+class CommandStream:
+    """
+    Sortie d'une commande consommée au fil de l'eau.
+
+    Exemple:
+        with self.run_stream(['journalctl', '--no-pager']) as stream:
+            for line in stream:
+                if 'error' in line:
+                    break
+        stream.returncode, stream.stderr
+
+    L'objet ne peut être parcouru qu'une fois. Interrompre l'itération (break,
+    close(), sortie du bloc with) termine la commande si elle tourne encore:
+    stopped_early vaut alors True et returncode est celui du signal reçu.
+    """
+
+    def __init__(self, process, cmd, timeout: Optional[float] = None,
+                 stderr_tail: int = STREAM_STDERR_TAIL, chunks: bool = False,
+                 on_close: Optional[Callable[["CommandStream"], None]] = None):
+        """
+        Args:
+            process: Processus (subprocess.Popen ou BrokeredProcess) aux flux non lus
+            cmd: Commande, pour les messages et TimeoutExpired
+            timeout: Durée maximale de la commande en secondes (None pour aucune)
+            stderr_tail: Nombre de dernières lignes de stderr conservées
+            chunks: Si True, produire des blocs de texte décodé au lieu de lignes
+            on_close: Fonction appelée une fois la commande terminée et les flux fermés
+        """
+        self.process = process
+        self.cmd = cmd
+        self.timeout = timeout
+        self.chunks = chunks
+        self.returncode: Optional[int] = None
+        self.stdout_bytes = 0
+        self.stderr_bytes = 0
+        self.lines_read = 0
+        self.stopped_early = False
+        self._stderr_tail = deque(maxlen=max(0, stderr_tail))
+        self._on_close = on_close
+        self._started = False
+        self._closed = False
+
+    @property
+    def stderr(self) -> str:
+        """Dernières lignes de stderr reçues."""
+        return "\n".join(self._stderr_tail)
+
+    @property
+    def success(self) -> bool:
+        """True si la commande s'est terminée d'elle-même avec le code 0."""
+        return self.returncode == 0
+
+    def __enter__(self) -> "CommandStream":
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb) -> bool:
+        self.close()
+        return False
+
+    def __iter__(self) -> Iterator[str]:
+        if self._started:
+            raise RuntimeError("La sortie d'une commande ne peut être parcourue qu'une fois.")
+        self._started = True
+        return self._iterate()
+
+    def _iterate(self) -> Iterator[str]:
+        """Lit stdout et stderr avec select() et produit la sortie standard."""
+        process = self.process
+        stdout_fd = process.stdout.fileno()
+        stderr_fd = process.stderr.fileno()
+        stdout_splitter = LineSplitter(stream_encoding(process.stdout))
+        stdout_decoder = codecs.getincrementaldecoder(stream_encoding(process.stdout))(errors='replace')
+        stderr_splitter = LineSplitter(stream_encoding(process.stderr))
+        open_fds = [stdout_fd, stderr_fd]
+        start_time = time.monotonic()
+
+        try:
+            while open_fds:
+                if (self.timeout is not None and time.monotonic() - start_time > self.timeout
+                        and process.poll() is None):
+                    self._terminate()
+                    raise subprocess.TimeoutExpired(self.cmd, self.timeout)
+
+                try:
+                    ready, _, _ = select.select(open_fds, [], [], 0.1)
+                except (ValueError, OSError):
+                    # Descripteurs fermés (close() appelé pendant l'itération)
+                    break
+
+                # Processus terminé et flux vides: ne pas attendre l'EOF (un descendant
+                # détaché peut garder les tubes ouverts)
+                if not ready and process.poll() is not None:
+                    break
+
+                for fd in ready:
+                    try:
+                        data = os.read(fd, READ_CHUNK_SIZE)
+                    except OSError:
+                        data = b""
+                    if not data:
+                        open_fds.remove(fd)
+
+                    if fd == stderr_fd:
+                        self.stderr_bytes += len(data)
+                        self._stderr_tail.extend(stderr_splitter.feed(data) if data else stderr_splitter.close())
+                        continue
+
+                    self.stdout_bytes += len(data)
+                    if self.chunks:
+                        text = stdout_decoder.decode(data, final=not data)
+                        if text:
+                            yield text
+                    else:
+                        for line in (stdout_splitter.feed(data) if data else stdout_splitter.close()):
+                            self.lines_read += 1
+                            yield line
+
+            # Fins de lignes non terminées sur les flux restés ouverts
+            if stderr_fd in open_fds:
+                self._stderr_tail.extend(stderr_splitter.close())
+            if stdout_fd in open_fds:
+                if self.chunks:
+                    text = stdout_decoder.decode(b"", final=True)
+                    if text:
+                        yield text
+                else:
+                    for line in stdout_splitter.close():
+                        self.lines_read += 1
+                        yield line
+        finally:
+            self.close()
+
+    def _terminate(self) -> None:
+        """Termine la commande (SIGTERM, puis SIGKILL après un délai de grâce)."""
+        try:
+            self.process.terminate()
+            self.process.wait(timeout=STREAM_TERMINATE_GRACE)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        except (ProcessLookupError, OSError):
+            pass
+
+    def close(self) -> None:
+        """
+        Termine la commande si elle tourne encore, ferme ses flux et récupère
+        son code de retour. Sans effet si déjà appelée.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        if self.process.poll() is None:
+            # Consommateur arrêté avant la fin de la sortie
+            self.stopped_early = True
+            self._terminate()
+        try:
+            self.returncode = self.process.wait(timeout=STREAM_TERMINATE_GRACE)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.returncode = self.process.wait()
+        for stream in (self.process.stdout, self.process.stderr):
+            try:
+                stream.close()
+            except (OSError, AttributeError):
+                pass
+        if self._on_close is not None:
+            self._on_close(self)
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Trace des commandes externes exécutées par un plugin.
+
+Chaque appel à PluginsUtilsBase.run()/run_async() est enregistré (argv masqué,
+sudo, durée, code retour, volume de sortie). En fin de plugin, Main produit un
+résumé (commandes les plus lentes, temps passé dans les sous-processus par
+rapport au temps Python) transmis à l'interface avec le niveau "profile".
+"""
+
+import os
+import re
+import time
+import threading
+from typing import Any, Dict, List, Optional, Union
+
+# Nombre de commandes les plus lentes retenues dans le résumé
+DEFAULT_TOP_N = 10
+# Nombre maximal d'entrées conservées (les plus anciennes sont agrégées seulement)
+TRACE_MAX_ENTRIES = 5000
+
+# Arguments sensibles: --password X, pass=X... pour toutes les commandes
+_SECRET_OPTIONS = {"--password", "--passwd", "--pass", "-password", "--token", "--secret"}
+# Options courtes de mot de passe propres à certains programmes (-p X, -w X)
+_PROGRAM_SECRET_OPTIONS = {
+    "sshpass": {"-p"},
+    "useradd": {"-p"},
+    "usermod": {"-p"},
+    "ldapsearch": {"-w"},
+    "ldapadd": {"-w"},
+    "ldapmodify": {"-w"},
+    "ldapdelete": {"-w"},
+    "ldappasswd": {"-w", "-s"},
+    "smbpasswd": {"-w"},
+}
+# Programmes acceptant le mot de passe collé à l'option (-pSECRET)
+_ATTACHED_PASSWORD_PROGRAMS = {"mysql", "mysqldump", "mysqladmin", "mariadb", "mariadb-dump"}
+_SECRET_ASSIGNMENT = re.compile(r'((?:pass(?:word|wd)?|pwd|secret|token|key)\s*[=:]\s*)(\S+)', re.IGNORECASE)
+MASK = "********"
+
+
+def mask_argv(cmd: Union[str, List[str]]) -> str:
+    """
+    Construit une représentation de la commande sans secrets.
+
+    Args:
+        cmd: Commande (liste d'arguments ou chaîne)
+
+    Returns:
+        str: Commande masquée
+    """
+    if isinstance(cmd, (list, tuple)):
+        masked = []
+        hide_next = False
+        # Programme courant (le dernier vu: sudo useradd -p X -> useradd)
+        program = ""
+        for arg in cmd:
+            arg = str(arg)
+            if hide_next:
+                masked.append(MASK)
+                hide_next = False
+                continue
+            name = os.path.basename(arg)
+            if not masked or name in _PROGRAM_SECRET_OPTIONS or name in _ATTACHED_PASSWORD_PROGRAMS:
+                program = name
+            if arg.lower() in _SECRET_OPTIONS or arg in _PROGRAM_SECRET_OPTIONS.get(program, ()):
+                hide_next = True
+            elif program in _ATTACHED_PASSWORD_PROGRAMS and arg.startswith("-p") and len(arg) > 2:
+                masked.append("-p" + MASK)
+                continue
+            masked.append(_SECRET_ASSIGNMENT.sub(lambda m: m.group(1) + MASK, arg))
+        text = " ".join(masked)
+    else:
+        text = _SECRET_ASSIGNMENT.sub(lambda m: m.group(1) + MASK, str(cmd))
+
+    sudo_password = os.environ.get("SUDO_PASSWORD")
+    if sudo_password:
+        text = text.replace(sudo_password, MASK)
+    return text
+
+
+class CommandTrace:
+    """
+    Enregistrement, pour le processus courant, des commandes exécutées.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Réinitialise la trace (début d'exécution du plugin)."""
+        with self._lock:
+            self._started_at = time.monotonic()
+            self._entries: List[Dict[str, Any]] = []
+            self._intervals: List[List[float]] = []
+            self._count = 0
+            self._cached = 0
+            self._total_duration = 0.0
+            self._by_program: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, cmd: Union[str, List[str]], sudo: bool, started_at: float, ended_at: float,
+               return_code: Optional[int], stdout_bytes: int = 0, stderr_bytes: int = 0,
+               cached: bool = False, nested: bool = False) -> None:
+        """
+        Enregistre une commande terminée.
+
+        Args:
+            cmd: Commande exécutée (masquée à l'enregistrement)
+            sudo: True si exécutée avec élévation de privilèges
+            started_at: Début (time.monotonic())
+            ended_at: Fin (time.monotonic())
+            return_code: Code retour (None si exception/timeout)
+            stdout_bytes: Taille de la sortie standard
+            stderr_bytes: Taille de la sortie d'erreur
+            cached: True si le résultat provient du cache de commandes
+            nested: True pour une commande exécutée à l'intérieur d'une autre
+                    (lot run_batch): exclue du calcul du temps occupé
+        """
+        duration = max(0.0, ended_at - started_at)
+        if isinstance(cmd, (list, tuple)) and cmd:
+            program = os.path.basename(str(cmd[0]))
+        else:
+            program = os.path.basename(str(cmd).split()[0]) if str(cmd).strip() else "?"
+
+        with self._lock:
+            self._count += 1
+            if cached:
+                self._cached += 1
+                return
+            if not nested:
+                self._total_duration += duration
+                self._intervals.append([started_at, ended_at])
+
+            stats = self._by_program.setdefault(program, {"count": 0, "duration": 0.0})
+            stats["count"] += 1
+            stats["duration"] += duration
+
+            if len(self._entries) < TRACE_MAX_ENTRIES:
+                self._entries.append({
+                    "cmd": mask_argv(cmd),
+                    "sudo": sudo,
+                    "duration": duration,
+                    "rc": return_code,
+                    "stdout_bytes": stdout_bytes,
+                    "stderr_bytes": stderr_bytes,
+                })
+
+    def _busy_time(self) -> float:
+        """Temps pendant lequel au moins un sous-processus tournait (intervalles fusionnés)."""
+        busy = 0.0
+        current_start = current_end = None
+        for start, end in sorted(self._intervals):
+            if current_end is None or start > current_end:
+                if current_end is not None:
+                    busy += current_end - current_start
+                current_start, current_end = start, end
+            else:
+                current_end = max(current_end, end)
+        if current_end is not None:
+            busy += current_end - current_start
+        return busy
+
+    def summary(self, top_n: int = DEFAULT_TOP_N) -> Dict[str, Any]:
+        """
+        Construit le résumé de la trace.
+
+        Args:
+            top_n: Nombre de commandes les plus lentes à inclure
+
+        Returns:
+            Dict: commands, cached, wall_time, subprocess_time, busy_time,
+                  python_time, top (commandes les plus lentes), programs
+        """
+        with self._lock:
+            wall_time = time.monotonic() - self._started_at
+            busy_time = min(self._busy_time(), wall_time)
+            top = sorted(self._entries, key=lambda e: e["duration"], reverse=True)[:top_n]
+            programs = sorted(
+                ({"program": name, "count": stats["count"], "duration": round(stats["duration"], 3)}
+                 for name, stats in self._by_program.items()),
+                key=lambda p: p["duration"], reverse=True)[:top_n]
+            return {
+                "commands": self._count,
+                "cached": self._cached,
+                "wall_time": round(wall_time, 3),
+                "subprocess_time": round(self._total_duration, 3),
+                "busy_time": round(busy_time, 3),
+                "python_time": round(wall_time - busy_time, 3),
+                "top": [dict(entry, duration=round(entry["duration"], 3)) for entry in top],
+                "programs": programs,
+            }
+
+
+def format_summary(summary: Dict[str, Any], top_n: Optional[int] = None) -> List[str]:
+    """
+    Met en forme un résumé de trace en lignes de texte lisibles.
+    Utilisé par PluginLogger en mode texte et par l'interface (niveau "profile").
+
+    Args:
+        summary: Résumé produit par CommandTrace.summary()
+        top_n: Nombre maximal de commandes lentes affichées (toutes si None)
+
+    Returns:
+        List[str]: Lignes du résumé
+    """
+    lines = [
+        f"Profil des commandes: {summary.get('commands', 0)} commande(s) "
+        f"({summary.get('cached', 0)} depuis le cache), "
+        f"{summary.get('busy_time', 0):.2f}s en sous-processus / "
+        f"{summary.get('python_time', 0):.2f}s Python "
+        f"(durée totale {summary.get('wall_time', 0):.2f}s)"
+    ]
+    for entry in summary.get("top", [])[:top_n]:
+        sudo = " [sudo]" if entry.get("sudo") else ""
+        lines.append(f"  {entry.get('duration', 0):7.3f}s  rc={entry.get('rc')}{sudo}  {entry.get('cmd', '')}")
+    return lines
+
+
+# Trace unique par processus plugin
+COMMAND_TRACE = CommandTrace()
@@ -15,6 +15,7 @@ import shutil
 import io
 import stat
 import time
+from contextlib import contextmanager
 from pathlib import Path
 from typing import Union, Optional, List, Dict, Any, Tuple, Generator
 
@@ -57,7 +58,7 @@ class ConfigFileCommands(PluginsUtilsBase):
         # Vérifier les permissions de lecture/écriture sur le fichier existant
         return not (os.access(file_path, os.R_OK) and os.access(file_path, os.W_OK))
 
-    def _read_file_content(self, path: Union[str, Path]) -> Optional[str]:
+    def _read_file_content(self, path: Union[str, Path], log_levels: Optional[Dict[str, str]] = None) -> Optional[str]:
         """
         Lit le contenu d'un fichier, avec gestion sudo si nécessaire.
 
@@ -68,14 +69,14 @@ class ConfigFileCommands(PluginsUtilsBase):
             Optional[str]: Contenu du fichier ou None en cas d'erreur
         """
         file_path = Path(path)
-        self.log_debug(f"Lecture du fichier: {file_path}", log_levels=log_levels)
+        self.log_debug("Lecture du fichier: %s", file_path, log_levels=log_levels)
 
         # Essayer d'abord avec les droits standards
         try:
             if file_path.exists() and os.access(file_path, os.R_OK):
                 return file_path.read_text(encoding='utf-8')
         except (PermissionError, OSError) as e:
-            self.log_debug(f"Lecture standard échouée pour {file_path}: {e}", log_levels=log_levels)
+            self.log_debug("Lecture standard échouée pour %s: %s", file_path, e, log_levels=log_levels)
 
         # Si on arrive ici, il faut utiliser sudo
         self._sudo_mode = True
@@ -85,14 +86,14 @@ class ConfigFileCommands(PluginsUtilsBase):
 
         if not success_read:
             if "No such file" in stderr_read or "no such file" in stderr_read.lower():
-                self.log_debug(f"Fichier introuvable: {file_path}", log_levels=log_levels)
+                self.log_debug("Fichier introuvable: %s", file_path, log_levels=log_levels)
             else:
                 self.log_error(f"Impossible de lire le fichier {file_path}. Stderr: {stderr_read}", log_levels=log_levels)
             return None
 
         return content
 
-    def _get_file_stats(self, path: Union[str, Path]) -> Optional[Dict[str, int]]:
+    def _get_file_stats(self, path: Union[str, Path], log_levels: Optional[Dict[str, str]] = None) -> Optional[Dict[str, int]]:
         """
         Obtient les statistiques d'un fichier (uid, gid, mode), avec gestion sudo si nécessaire.
 
@@ -114,7 +115,7 @@ class ConfigFileCommands(PluginsUtilsBase):
                     'mode': stat.S_IMODE(file_stat.st_mode)
                 }
         except (PermissionError, OSError) as e:
-            self.log_debug(f"Impossible d'obtenir les stats standard pour {file_path}: {e}", log_levels=log_levels)
+            self.log_debug("Impossible d'obtenir les stats standard pour %s: %s", file_path, e, log_levels=log_levels)
 
         # Si on arrive ici, il faut utiliser sudo
         self._sudo_mode = True
@@ -135,7 +136,7 @@ class ConfigFileCommands(PluginsUtilsBase):
 
         return None
 
-    def _backup_file(self, path: Union[str, Path]) -> Optional[str]:
+    def _backup_file(self, path: Union[str, Path], log_levels: Optional[Dict[str, str]] = None) -> Optional[str]:
         """
         Crée une sauvegarde d'un fichier, avec gestion sudo si nécessaire.
 
@@ -155,10 +156,10 @@ class ConfigFileCommands(PluginsUtilsBase):
                                              check=False, no_output=True,
                                              error_as_warning=True, needs_sudo=True)
                 if not success_test:
-                    self.log_debug(f"Fichier {file_path} non trouvé, pas de sauvegarde nécessaire.", log_levels=log_levels)
+                    self.log_debug("Fichier %s non trouvé, pas de sauvegarde nécessaire.", file_path, log_levels=log_levels)
                     return None
             else:
-                self.log_debug(f"Fichier {file_path} non trouvé, pas de sauvegarde nécessaire.", log_levels=log_levels)
+                self.log_debug("Fichier %s non trouvé, pas de sauvegarde nécessaire.", file_path, log_levels=log_levels)
                 return None
 
         backup_path = file_path.with_suffix(f"{file_path.suffix}.bak_{int(time.time())}")
@@ -167,10 +168,10 @@ class ConfigFileCommands(PluginsUtilsBase):
         try:
             if not self._sudo_mode:
                 shutil.copy2(file_path, backup_path)
-                self.log_debug(f"Sauvegarde créée: {backup_path}", log_levels=log_levels)
+                self.log_debug("Sauvegarde créée: %s", backup_path, log_levels=log_levels)
                 return str(backup_path)
         except (PermissionError, OSError) as e:
-            self.log_debug(f"Sauvegarde standard échouée pour {file_path}: {e}", log_levels=log_levels)
+            self.log_debug("Sauvegarde standard échouée pour %s: %s", file_path, e, log_levels=log_levels)
             self._sudo_mode = True
 
         # Si on arrive ici, il faut utiliser sudo
@@ -181,10 +182,10 @@ class ConfigFileCommands(PluginsUtilsBase):
             self.log_warning(f"Échec de la création de la sauvegarde {backup_path}. Stderr: {stderr}", log_levels=log_levels)
             return None
 
-        self.log_debug(f"Sauvegarde créée avec sudo: {backup_path}", log_levels=log_levels)
+        self.log_debug("Sauvegarde créée avec sudo: %s", backup_path, log_levels=log_levels)
         return str(backup_path)
 
-    def _apply_file_permissions(self, path: Union[str, Path], stats: Dict[str, int]) -> bool:
+    def _apply_file_permissions(self, path: Union[str, Path], stats: Dict[str, int], log_levels: Optional[Dict[str, str]] = None) -> bool:
         """
         Applique les permissions et propriétaires à un fichier, avec gestion sudo si nécessaire.
 
@@ -204,7 +205,7 @@ class ConfigFileCommands(PluginsUtilsBase):
                 os.chown(file_path, stats['uid'], stats['gid'])
                 return True
         except (PermissionError, OSError) as e:
-            self.log_debug(f"Application des permissions standard échouée pour {file_path}: {e}", log_levels=log_levels)
+            self.log_debug("Application des permissions standard échouée pour %s: %s", file_path, e, log_levels=log_levels)
             self._sudo_mode = True
 
         # Si on arrive ici, il faut utiliser sudo
@@ -215,7 +216,7 @@ class ConfigFileCommands(PluginsUtilsBase):
 
         return success_chmod and success_chown
 
-    def _write_file_content(self, path: Union[str, Path], content: str, backup: bool = True) -> bool:
+    def _write_file_content(self, path: Union[str, Path], content: str, backup: bool = True, log_levels: Optional[Dict[str, str]] = None) -> bool:
         """
         Écrit du contenu dans un fichier, avec sauvegarde optionnelle et gestion sudo.
 
@@ -228,7 +229,7 @@ class ConfigFileCommands(PluginsUtilsBase):
             bool: True si l'écriture réussit, False sinon
         """
         file_path = Path(path)
-        self.log_debug(f"Écriture dans le fichier: {file_path}", log_levels=log_levels)
+        self.log_debug("Écriture dans le fichier: %s", file_path, log_levels=log_levels)
 
         # Vérifier si sudo est nécessaire
         self._sudo_mode = self._check_sudo_required(file_path)
@@ -255,9 +256,15 @@ class ConfigFileCommands(PluginsUtilsBase):
 
             # Écrire le contenu dans le fichier temporaire
             tmp_file_path.write_text(content, encoding='utf-8')
-            self.log_debug(f"Contenu écrit dans le fichier temporaire: {tmp_file_path}", log_levels=log_levels)
+            self.log_debug("Contenu écrit dans le fichier temporaire: %s", tmp_file_path, log_levels=log_levels)
 
-            # Déplacer le fichier temporaire vers la destination finale
+            # Remplacement atomique, propriétaire et permissions déjà appliqués
+            target_stats = original_stats or {'uid': os.getuid(), 'gid': os.getgid(), 'mode': 0o644}
+            if self._replace_file_atomically(tmp_file_path, file_path, target_stats, log_levels=log_levels):
+                self.log_info(f"Fichier {file_path} écrit/mis à jour avec succès.", log_levels=log_levels)
+                return True
+
+            # Sinon, copier le fichier temporaire vers la destination finale
             if self._sudo_mode:
                 # Utiliser une commande avec sudo
                 cmd_cp = ['cp', str(tmp_file_path), str(file_path)]
@@ -294,9 +301,52 @@ class ConfigFileCommands(PluginsUtilsBase):
                 except Exception as e_unlink:
                     self.log_warning(f"Impossible de supprimer le fichier temporaire {tmp_file_path}: {e_unlink}", log_levels=log_levels)
 
+    def _replace_file_atomically(self, source: Path, path: Union[str, Path], stats: Dict[str, int],
+                                 log_levels: Optional[Dict[str, str]] = None) -> bool:
+        """
+        Remplace un fichier par renommage d'une copie préparée dans le même répertoire:
+        aucun lecteur ne voit de fichier partiellement écrit ou aux permissions
+        provisoires. La cible d'un lien symbolique est remplacée, pas le lien.
+
+        Args:
+            source: Fichier contenant le nouveau contenu
+            path: Fichier à remplacer
+            stats: Propriétaire et permissions à appliquer (uid, gid, mode)
+
+        Returns:
+            bool: True si le fichier a été remplacé, False si la copie classique doit être utilisée
+        """
+        target = Path(os.path.realpath(path))
+        staged = target.parent / f".{target.name}.{os.getpid()}.tmp"
+
+        if self._sudo_mode:
+            # Une seule commande privilégiée: copie avec propriétaire et permissions, puis renommage
+            script = 'install -m "$1" -o "$2" -g "$3" -- "$4" "$5" && mv -f -- "$5" "$6" || { rm -f -- "$5"; exit 1; }'
+            success, _, stderr = self.run(['sh', '-c', script, 'sh', f"{stats['mode']:o}", str(stats['uid']), str(stats['gid']),
+                                           str(source), str(staged), str(target)],
+                                          check=False, needs_sudo=True, no_output=True, error_as_warning=True)
+            if not success:
+                self.log_debug("Remplacement atomique impossible pour %s: %s", target, stderr, log_levels=log_levels)
+            return success
+
+        try:
+            shutil.copyfile(source, staged)
+            os.chmod(staged, stats['mode'])
+            if (stats['uid'], stats['gid']) != (os.getuid(), os.getgid()):
+                os.chown(staged, stats['uid'], stats['gid'])
+            os.replace(staged, target)
+            return True
+        except OSError as e:
+            self.log_debug("Remplacement atomique impossible pour %s: %s", target, e, log_levels=log_levels)
+            try:
+                staged.unlink()
+            except OSError:
+                pass
+            return False
+
     # --- Méthodes INI ---
 
-    def _manual_ini_parse(self, content: str) -> Dict[str, Dict[str, str]]:
+    def _manual_ini_parse(self, content: str, log_levels: Optional[Dict[str, str]] = None) -> Dict[str, Dict[str, str]]:
         """
         Parse manuellement un fichier INI simple ligne par ligne.
 
@@ -359,7 +409,7 @@ class ConfigFileCommands(PluginsUtilsBase):
             Optional[Dict[str, Dict[str, str]]]: Structure INI parsée ou None en cas d'erreur
         """
         file_path = Path(path)
-        self.log_debug(f"Lecture du fichier INI: {file_path}", log_levels=log_levels)
+        self.log_debug("Lecture du fichier INI: %s", file_path, log_levels=log_levels)
 
         # Lire le contenu du fichier
         content = self._read_file_content(file_path)
@@ -428,7 +478,7 @@ class ConfigFileCommands(PluginsUtilsBase):
                 self.log_error(f"Le parsing manuel a également échoué: {manual_e}", exc_info=True, log_levels=log_levels)
                 return None  # Échec des deux méthodes
 
-        self.log_debug(f"Contenu INI final lu: {config_dict}", log_levels=log_levels)
+        self.log_debug("Contenu INI final lu: %s", config_dict, log_levels=log_levels)
         return config_dict if config_dict is not None else {}
 
     def get_ini_value(self, path: Union[str, Path], section: str, key: str, default: Optional[str] = None, log_levels: Optional[Dict[str, str]] = None) -> Optional[str]:
@@ -477,12 +527,9 @@ create_section: bool = True, backup: bool = True, log_levels: Optional[Dict[str,
         """
         file_path = Path(path)
         action = "Suppression de" if value is None else "Définition de"
-        self.log_debug(f"{action} la clé INI '{key}' dans la section '[{section}]' du fichier: {file_path}", log_levels=log_levels)
+        self.log_debug("%s la clé INI '%s' dans la section '[%s]' du fichier: %s", action, key, section, file_path, log_levels=log_levels)
         if value is not None:
-            self.log_debug(f"  Nouvelle valeur: '{value}'", log_levels=log_levels)
-
-        # Utiliser un ConfigParser pour préserver la structure et les commentaires
-        config = configparser.ConfigParser(interpolation=None)
+            self.log_debug("  Nouvelle valeur: '%s'", value, log_levels=log_levels)
 
         # Lire le contenu existant
         current_content = ""
@@ -491,6 +538,32 @@ create_section: bool = True, backup: bool = True, log_levels: Optional[Dict[str,
             if content_read:
                 current_content = content_read
 
+        try:
+            new_content = self._set_ini_value_in_content(current_content, section, key, value, create_section, log_levels=log_levels)
+            if new_content is None:
+                return False
+            if new_content == current_content:
+                self.log_debug("Fichier INI %s inchangé, aucune écriture.", file_path, log_levels=log_levels)
+                return True
+
+            # Écrire le fichier final
+            return self._write_file_content(file_path, new_content, backup=backup)
+
+        except Exception as e:
+            self.log_error(f"Erreur lors de la modification de la configuration INI: {e}", exc_info=True, log_levels=log_levels)
+            return False
+
+    def _set_ini_value_in_content(self, current_content: str, section: str, key: str, value: Optional[str],
+                                  create_section: bool = True, log_levels: Optional[Dict[str, str]] = None) -> Optional[str]:
+        """
+        Définit ou supprime une valeur INI dans un contenu en mémoire.
+
+        Returns:
+            Optional[str]: Nouveau contenu, ou None si la section n'existe pas et create_section=False
+        """
+        # Utiliser un ConfigParser pour préserver la structure et les commentaires
+        config = configparser.ConfigParser(interpolation=None)
+
         # Prétraitement pour ajouter [DEFAULT] si nécessaire
         original_needs_default = False
         processed_content = current_content
@@ -513,51 +586,44 @@ create_section: bool = True, backup: bool = True, log_levels: Optional[Dict[str,
                 processed_content = "[DEFAULT]\n" + current_content
                 original_needs_default = True
 
-        try:
-            # Lire le contenu existant
-            if processed_content:
-                config.read_string(processed_content)
-
-            # Vérifier/Créer la section
-            target_section = section if section else 'DEFAULT'
-            if not config.has_section(target_section) and target_section != 'DEFAULT':
-                if create_section:
-                    self.log_debug(f"Création de la section INI: [{target_section}]", log_levels=log_levels)
-                    config.add_section(target_section)
-                else:
-                    self.log_error(f"La section INI '[{target_section}]' n'existe pas et create_section=False.", log_levels=log_levels)
-                    return False
+        # Lire le contenu existant
+        if processed_content:
+            config.read_string(processed_content)
 
-            # Définir ou supprimer la valeur
-            if value is None:
-                if config.has_option(target_section, key):
-                    config.remove_option(target_section, key)
-                    self.log_debug(f"Clé '{key}' supprimée de la section '[{target_section}]'.", log_levels=log_levels)
-                else:
-                    self.log_debug(f"Clé '{key}' n'existait pas dans la section '[{target_section}]'.", log_levels=log_levels)
+        # Vérifier/Créer la section
+        target_section = section if section else 'DEFAULT'
+        if not config.has_section(target_section) and target_section != 'DEFAULT':
+            if create_section:
+                self.log_debug("Création de la section INI: [%s]", target_section, log_levels=log_levels)
+                config.add_section(target_section)
             else:
-                config.set(target_section, key, str(value))  # Assurer que la valeur est une chaîne
-                self.log_debug(f"Clé '{key}' définie à '{value}' dans la section '[{target_section}]'.", log_levels=log_levels)
-
-            # Écrire le contenu modifié dans une chaîne
-            string_io = io.StringIO()
-            config.write(string_io)
-            new_content = string_io.getvalue()
-
-            # Si l'original n'avait pas de section, et qu'on a écrit seulement dans [DEFAULT],
-            # on retire l'en-tête [DEFAULT] du contenu final.
-            if original_needs_default and not config.sections():
-                lines = new_content.splitlines()
-                if lines and lines[0].strip() == '[DEFAULT]':
-                    new_content = "\n".join(lines[1:])
-                    self.log_debug("En-tête [DEFAULT] retiré avant l'écriture car fichier original sans section.", log_levels=log_levels)
-
-            # Écrire le fichier final
-            return self._write_file_content(file_path, new_content, backup=backup)
+                self.log_error(f"La section INI '[{target_section}]' n'existe pas et create_section=False.", log_levels=log_levels)
+                return None
 
-        except Exception as e:
-            self.log_error(f"Erreur lors de la modification de la configuration INI: {e}", exc_info=True, log_levels=log_levels)
-            return False
+        # Définir ou supprimer la valeur
+        if value is None:
+            if config.has_option(target_section, key):
+                config.remove_option(target_section, key)
+                self.log_debug("Clé '%s' supprimée de la section '[%s]'.", key, target_section, log_levels=log_levels)
+            else:
+                self.log_debug("Clé '%s' n'existait pas dans la section '[%s]'.", key, target_section, log_levels=log_levels)
+        else:
+            config.set(target_section, key, str(value))  # Assurer que la valeur est une chaîne
+            self.log_debug("Clé '%s' définie à '%s' dans la section '[%s]'.", key, value, target_section, log_levels=log_levels)
+
+        # Écrire le contenu modifié dans une chaîne
+        string_io = io.StringIO()
+        config.write(string_io)
+        new_content = string_io.getvalue()
+
+        # Si l'original n'avait pas de section, et qu'on a écrit seulement dans [DEFAULT],
+        # on retire l'en-tête [DEFAULT] du contenu final.
+        if original_needs_default and not config.sections():
+            lines = new_content.splitlines()
+            if lines and lines[0].strip() == '[DEFAULT]':
+                new_content = "\n".join(lines[1:])
+                self.log_debug("En-tête [DEFAULT] retiré avant l'écriture car fichier original sans section.", log_levels=log_levels)
+        return new_content
 
     # --- Méthodes JSON ---
 
@@ -572,7 +638,7 @@ create_section: bool = True, backup: bool = True, log_levels: Optional[Dict[str,
             Optional[Any]: Contenu JSON parsé ou None en cas d'erreur
         """
         file_path = Path(path)
-        self.log_debug(f"Lecture du fichier JSON: {file_path}", log_levels=log_levels)
+        self.log_debug("Lecture du fichier JSON: %s", file_path, log_levels=log_levels)
 
         # Lire le contenu du fichier
         content = self._read_file_content(file_path)
@@ -604,7 +670,7 @@ create_section: bool = True, backup: bool = True, log_levels: Optional[Dict[str,
             bool: True si l'écriture réussit, False sinon
         """
         file_path = Path(path)
-        self.log_debug(f"Écriture des données JSON dans: {file_path}", log_levels=log_levels)
+        self.log_debug("Écriture des données JSON dans: %s", file_path, log_levels=log_levels)
 
         try:
             # Utiliser ensure_ascii=False pour un meilleur support UTF-8
@@ -627,7 +693,7 @@ create_section: bool = True, backup: bool = True, log_levels: Optional[Dict[str,
             Optional[List[str]]: Liste des lignes ou None en cas d'erreur
         """
         file_path = Path(path)
-        self.log_debug(f"Lecture des lignes du fichier: {file_path}", log_levels=log_levels)
+        self.log_debug("Lecture des lignes du fichier: %s", file_path, log_levels=log_levels)
 
         # Lire le contenu du fichier
         content = self._read_file_content(file_path)
@@ -653,7 +719,7 @@ create_section: bool = True, backup: bool = True, log_levels: Optional[Dict[str,
         if lines is None:
             return None
 
-        self.log_debug(f"Recherche du pattern '{pattern}' dans {path}", log_levels=log_levels)
+        self.log_debug("Recherche du pattern '%s' dans %s", pattern, path, log_levels=log_levels)
         found_lines = []
 
         try:
@@ -687,31 +753,15 @@ create_section: bool = True, backup: bool = True, log_levels: Optional[Dict[str,
             bool: True si le remplacement réussit, False sinon
         """
         file_path = Path(path)
-        self.log_debug(f"Remplacement des lignes correspondant à '{pattern}' dans {file_path}", log_levels=log_levels)
+        self.log_debug("Remplacement des lignes correspondant à '%s' dans %s", pattern, file_path, log_levels=log_levels)
 
         # Lire le contenu du fichier
         lines = self.read_file_lines(file_path)
         if lines is None:
             return False
 
-        new_lines = []
-        modified = False
-        replaced_count = 0
-
         try:
-            regex = re.compile(pattern)
-            # S'assurer que la nouvelle ligne a une fin de ligne
-            new_line_with_eol = new_line.rstrip('\n') + '\n'
-
-            for line in lines:
-                # Utiliser search pour trouver le pattern n'importe où dans la ligne
-                if regex.search(line) and (replace_all or replaced_count == 0):
-                    new_lines.append(new_line_with_eol)
-                    modified = True
-                    replaced_count += 1
-                    self.log_debug(f"  Ligne remplacée: {line.strip()} -> {new_line.strip()}", log_levels=log_levels)
-                else:
-                    new_lines.append(line)  # Garder la ligne originale avec sa fin de ligne
+            new_lines, modified = self._replace_in_lines(lines, pattern, new_line, replace_all, log_levels=log_levels)
 
             if not modified:
                 self.log_debug("Aucune ligne correspondante trouvée pour remplacement.", log_levels=log_levels)
@@ -741,29 +791,15 @@ create_section: bool = True, backup: bool = True, log_levels: Optional[Dict[str,
             bool: True si le commentage réussit, False sinon
         """
         file_path = Path(path)
-        self.log_debug(f"Commentage des lignes correspondant à '{pattern}' dans {file_path}", log_levels=log_levels)
+        self.log_debug("Commentage des lignes correspondant à '%s' dans %s", pattern, file_path, log_levels=log_levels)
 
         # Lire le contenu du fichier
         lines = self.read_file_lines(file_path)
         if lines is None:
             return False
 
-        new_lines = []
-        modified = False
-
         try:
-            regex = re.compile(pattern)
-            for line in lines:
-                line_strip = line.strip()
-                # Ne commenter que si elle correspond ET n'est pas déjà commentée (ou vide)
-                if line_strip and not line_strip.startswith(comment_char) and regex.search(line):
-                    # Préserver l'indentation originale
-                    indent = line[:len(line) - len(line.lstrip())]
-                    new_lines.append(f"{indent}{comment_char} {line_strip}\n")
-                    modified = True
-                    self.log_debug(f"  Ligne commentée: {line_strip}", log_levels=log_levels)
-                else:
-                    new_lines.append(line)  # Garder la ligne originale
+            new_lines, modified = self._comment_in_lines(lines, pattern, comment_char, log_levels=log_levels)
 
             if not modified:
                 self.log_debug("Aucune ligne à commenter trouvée.", log_levels=log_levels)
@@ -793,34 +829,15 @@ create_section: bool = True, backup: bool = True, log_levels: Optional[Dict[str,
             bool: True si le décommentage réussit, False sinon
         """
         file_path = Path(path)
-        self.log_debug(f"Décommentage des lignes correspondant à '{pattern}' dans {file_path}", log_levels=log_levels)
+        self.log_debug("Décommentage des lignes correspondant à '%s' dans %s", pattern, file_path, log_levels=log_levels)
 
         # Lire le contenu du fichier
         lines = self.read_file_lines(file_path)
         if lines is None:
             return False
 
-        new_lines = []
-        modified = False
-
         try:
-            regex = re.compile(pattern)
-            # Regex pour trouver le commentaire au début (avec ou sans espace après)
-            comment_regex = re.compile(r"^(\s*)" + re.escape(comment_char) + r"\s*(.*)")
-
-            for line in lines:
-                match_comment = comment_regex.match(line)
-                # Vérifier si la ligne est commentée ET si le contenu décommenté correspond au pattern
-                if match_comment:
-                    indent, uncommented_content = match_comment.groups()
-                    if regex.search(uncommented_content):  # Vérifier le pattern sur le contenu décommenté
-                        new_lines.append(f"{indent}{uncommented_content}\n")  # Restaurer indentation
-                        modified = True
-                        self.log_debug(f"  Ligne décommentée: {line.strip()}", log_levels=log_levels)
-                    else:
-                        new_lines.append(line)  # Ne correspond pas au pattern, garder commenté
-                else:
-                    new_lines.append(line)  # Pas commenté, garder tel quel
+            new_lines, modified = self._uncomment_in_lines(lines, pattern, comment_char, log_levels=log_levels)
 
             if not modified:
                 self.log_debug("Aucune ligne à décommenter trouvée.", log_levels=log_levels)
@@ -849,7 +866,7 @@ create_section: bool = True, backup: bool = True, log_levels: Optional[Dict[str,
             bool: True si l'ajout réussit, False sinon
         """
         file_path = Path(path)
-        self.log_debug(f"Ajout de la ligne à la fin de {file_path}: {line_to_append[:50]}...", log_levels=log_levels)
+        self.log_debug("Ajout de la ligne à la fin de %s: %s...", file_path, line_to_append[:50], log_levels=log_levels)
 
         # Préparer le contenu à ajouter
         content_to_append = line_to_append
@@ -896,7 +913,7 @@ create_section: bool = True, backup: bool = True, log_levels: Optional[Dict[str,
             bool: True si la ligne existe ou a été ajoutée avec succès
         """
         file_path = Path(path)
-        self.log_debug(f"Vérification/Ajout de la ligne dans {file_path}: {line_to_ensure[:50]}...", log_levels=log_levels)
+        self.log_debug("Vérification/Ajout de la ligne dans %s: %s...", file_path, line_to_ensure[:50], log_levels=log_levels)
 
         # Lire le contenu actuel
         current_content = ""
@@ -905,30 +922,104 @@ create_section: bool = True, backup: bool = True, log_levels: Optional[Dict[str,
             if content_read is not None:
                 current_content = content_read
 
-        # Vérifier l'existence
-        line_exists = False
+        # Vérifier l'existence et ajouter si nécessaire
         try:
-            check_pattern = pattern_to_check if pattern_to_check else r'^' + re.escape(line_to_ensure.strip()) + r'\s*$'
-            if re.search(check_pattern, current_content, re.MULTILINE):
-                line_exists = True
+            new_content, modified = self._ensure_line_in_content(current_content, line_to_ensure, pattern_to_check)
         except re.error as e:
             self.log_error(f"Erreur de regex dans le pattern '{pattern_to_check}': {e}", log_levels=log_levels)
             return False
 
-        # Ajouter si nécessaire
-        if line_exists:
+        if not modified:
             return True
-        else:
-            # Ajouter la ligne avec un saut de ligne avant si nécessaire
-            new_content = current_content
-            if current_content and not current_content.endswith('\n'):
-                new_content += '\n'
-            new_content += line_to_ensure.rstrip('\n') + '\n'
+        return self._write_file_content(file_path, new_content, backup=backup)
 
-            return self._write_file_content(file_path, new_content, backup=backup)
+    # --- Transformations en mémoire (partagées avec ConfigEditSession) ---
+
+    def _replace_in_lines(self, lines: List[str], pattern: str, new_line: str, replace_all: bool = False,
+                          log_levels: Optional[Dict[str, str]] = None) -> Tuple[List[str], bool]:
+        """Remplace les lignes correspondant à un motif. Retourne (lignes, modifié); lève re.error."""
+        new_lines = []
+        modified = False
+        replaced_count = 0
+        regex = re.compile(pattern)
+        # S'assurer que la nouvelle ligne a une fin de ligne
+        new_line_with_eol = new_line.rstrip('\n') + '\n'
+        debug_enabled = self.is_log_enabled("debug")
+
+        for line in lines:
+            # Utiliser search pour trouver le pattern n'importe où dans la ligne
+            if regex.search(line) and (replace_all or replaced_count == 0):
+                new_lines.append(new_line_with_eol)
+                modified = True
+                replaced_count += 1
+                if debug_enabled:
+                    self.log_debug("  Ligne remplacée: %s -> %s", line.strip(), new_line.strip(), log_levels=log_levels)
+            else:
+                new_lines.append(line)  # Garder la ligne originale avec sa fin de ligne
+        return new_lines, modified
+
+    def _comment_in_lines(self, lines: List[str], pattern: str, comment_char: str = '#',
+                          log_levels: Optional[Dict[str, str]] = None) -> Tuple[List[str], bool]:
+        """Commente les lignes correspondant à un motif. Retourne (lignes, modifié); lève re.error."""
+        new_lines = []
+        modified = False
+        regex = re.compile(pattern)
+        debug_enabled = self.is_log_enabled("debug")
+        for line in lines:
+            line_strip = line.strip()
+            # Ne commenter que si elle correspond ET n'est pas déjà commentée (ou vide)
+            if line_strip and not line_strip.startswith(comment_char) and regex.search(line):
+                # Préserver l'indentation originale
+                indent = line[:len(line) - len(line.lstrip())]
+                new_lines.append(f"{indent}{comment_char} {line_strip}\n")
+                modified = True
+                if debug_enabled:
+                    self.log_debug("  Ligne commentée: %s", line_strip, log_levels=log_levels)
+            else:
+                new_lines.append(line)  # Garder la ligne originale
+        return new_lines, modified
+
+    def _uncomment_in_lines(self, lines: List[str], pattern: str, comment_char: str = '#',
+                            log_levels: Optional[Dict[str, str]] = None) -> Tuple[List[str], bool]:
+        """Décommente les lignes correspondant à un motif. Retourne (lignes, modifié); lève re.error."""
+        new_lines = []
+        modified = False
+        regex = re.compile(pattern)
+        # Regex pour trouver le commentaire au début (avec ou sans espace après)
+        comment_regex = re.compile(r"^(\s*)" + re.escape(comment_char) + r"\s*(.*)")
+        debug_enabled = self.is_log_enabled("debug")
+
+        for line in lines:
+            match_comment = comment_regex.match(line)
+            # Vérifier si la ligne est commentée ET si le contenu décommenté correspond au pattern
+            if match_comment:
+                indent, uncommented_content = match_comment.groups()
+                if regex.search(uncommented_content):  # Vérifier le pattern sur le contenu décommenté
+                    new_lines.append(f"{indent}{uncommented_content}\n")  # Restaurer indentation
+                    modified = True
+                    if debug_enabled:
+                        self.log_debug("  Ligne décommentée: %s", line.strip(), log_levels=log_levels)
+                else:
+                    new_lines.append(line)  # Ne correspond pas au pattern, garder commenté
+            else:
+                new_lines.append(line)  # Pas commenté, garder tel quel
+        return new_lines, modified
+
+    @staticmethod
+    def _ensure_line_in_content(content: str, line_to_ensure: str, pattern_to_check: Optional[str] = None) -> Tuple[str, bool]:
+        """Ajoute une ligne si elle est absente. Retourne (contenu, modifié); lève re.error."""
+        check_pattern = pattern_to_check if pattern_to_check else r'^' + re.escape(line_to_ensure.strip()) + r'\s*$'
+        if re.search(check_pattern, content, re.MULTILINE):
+            return content, False
+        # Ajouter la ligne avec un saut de ligne avant si nécessaire
+        new_content = content
+        if content and not content.endswith('\n'):
+            new_content += '\n'
+        new_content += line_to_ensure.rstrip('\n') + '\n'
+        return new_content, True
 
     # --- Méthodes pour les fichiers de configuration à blocs (type Dovecot) ---
-    def _parse_block_config(self, content: str) -> dict:
+    def _parse_block_config(self, content: str, log_levels: Optional[Dict[str, str]] = None) -> dict:
         """
         Parse un fichier de configuration utilisant une structure en blocs avec accolades.
         Supporte les configurations comme Dovecot, Nginx, etc.
@@ -1047,7 +1138,7 @@ create_section: bool = True, backup: bool = True, log_levels: Optional[Dict[str,
                     # Bloc anonyme - créer un nom unique
                     anonymous_block_counter += 1
                     anonymous_key = f"_anonymous_block_{anonymous_block_counter}"
-                    self.log_debug(f"Bloc anonyme trouvé à la ligne {line_num}, utilisation de la clé {anonymous_key}", log_levels=log_levels)
+                    self.log_debug("Bloc anonyme trouvé à la ligne %s, utilisation de la clé %s", line_num, anonymous_key, log_levels=log_levels)
 
                     new_block = {}
                     current_context[anonymous_key] = new_block
@@ -1071,7 +1162,7 @@ create_section: bool = True, backup: bool = True, log_levels: Optional[Dict[str,
                     stack.pop()
                     current_context = stack[-1]
                 else:
-                    self.log_debug(f"Accolade fermante excessive à la ligne {line_num}, ignorée", log_levels=log_levels)
+                    self.log_debug("Accolade fermante excessive à la ligne %s, ignorée", line_num, log_levels=log_levels)
 
                 buffer = ""
 
@@ -1194,7 +1285,7 @@ create_section: bool = True, backup: bool = True, log_levels: Optional[Dict[str,
             Optional[Dict]: Structure de configuration parsée ou None en cas d'erreur
         """
         file_path = Path(path)
-        self.log_debug(f"Lecture du fichier de configuration à blocs: {file_path}", log_levels=log_levels)
+        self.log_debug("Lecture du fichier de configuration à blocs: %s", file_path, log_levels=log_levels)
 
         # Lire le contenu du fichier
         content = self._read_file_content(file_path)
@@ -1204,7 +1295,7 @@ create_section: bool = True, backup: bool = True, log_levels: Optional[Dict[str,
         try:
             # Parser le contenu
             config = self._parse_block_config(content)
-            print(config)
+            self.log_debug("Configuration à blocs lue: %s", config, log_levels=log_levels)
             return config
         except Exception as e:
             self.log_error(f"Erreur lors du parsing du fichier de configuration {file_path}: {e}", exc_info=True, log_levels=log_levels)
@@ -1223,7 +1314,7 @@ create_section: bool = True, backup: bool = True, log_levels: Optional[Dict[str,
             bool: True si l'écriture réussit, False sinon
         """
         file_path = Path(path)
-        self.log_debug(f"Écriture de la configuration en blocs dans: {file_path}", log_levels=log_levels)
+        self.log_debug("Écriture de la configuration en blocs dans: %s", file_path, log_levels=log_levels)
 
         try:
             # Formater la configuration
@@ -1253,6 +1344,14 @@ create_section: bool = True, backup: bool = True, log_levels: Optional[Dict[str,
             self.log_error(f"Impossible de lire le fichier de configuration pour mise à jour: {path}", log_levels=log_levels)
             return False
 
+        self._set_block_value(config, key_path, value)
+
+        # Écrire la configuration mise à jour
+        return self.write_block_config_file(path, config, backup=backup)
+
+    @staticmethod
+    def _set_block_value(config: dict, key_path: str, value: Any) -> None:
+        """Définit une valeur dans une configuration à blocs parsée ('section/sous-section/clé')."""
         # Parcourir le chemin pour trouver et mettre à jour la valeur
         keys = key_path.split('/')
         current = config
@@ -1273,5 +1372,153 @@ create_section: bool = True, backup: bool = True, log_levels: Optional[Dict[str,
         last_key = keys[-1]
         current[last_key] = value
 
-        # Écrire la configuration mise à jour
-        return self.write_block_config_file(path, config, backup=backup)
\ No newline at end of file
+    # --- Session d'édition ---
+
+    @contextmanager
+    def edit_session(self, path: Union[str, Path], backup: bool = True,
+                     log_levels: Optional[Dict[str, str]] = None) -> Generator['ConfigEditSession', None, None]:
+        """
+        Ouvre une session d'édition d'un fichier: le fichier est lu une fois, les
+        modifications (lignes, INI, blocs) sont appliquées en mémoire, puis écrites
+        à la sortie du bloc en une seule fois (une sauvegarde, un remplacement
+        atomique). Rien n'est écrit si le contenu final est identique à l'original,
+        ni si le bloc se termine par une exception.
+
+        Exemple:
+            with cfc.edit_session("/etc/ssh/sshd_config") as session:
+                session.replace_line(r"^#?PermitRootLogin", "PermitRootLogin no")
+                session.ensure_line_exists("UseDNS no")
+            if not session.success: ...
+
+        Args:
+            path: Chemin du fichier (créé à l'écriture s'il n'existe pas)
+            backup: Si True, crée une sauvegarde du fichier original avant écriture
+
+        Yields:
+            ConfigEditSession: Session d'édition (success indique le résultat de l'écriture)
+        """
+        session = ConfigEditSession(self, path, log_levels=log_levels)
+        yield session
+        session.commit(backup=backup)
+
+
+class ConfigEditSession:
+    """
+    Modifications en mémoire d'un fichier, écrites en une fois par commit()
+    (voir ConfigFileCommands.edit_session). Les méthodes reprennent celles de
+    ConfigFileCommands, sans le chemin ni la sauvegarde.
+    """
+
+    def __init__(self, cfc: ConfigFileCommands, path: Union[str, Path], log_levels: Optional[Dict[str, str]] = None):
+        self.cfc = cfc
+        self.path = Path(path)
+        self.log_levels = log_levels
+        content = cfc._read_file_content(self.path, log_levels=log_levels) if self.path.exists() else ""
+        # Fichier existant mais illisible: aucune écriture possible
+        self.readable = content is not None
+        self.original = content or ""
+        self.content = self.original
+        self.success = self.readable
+        self.committed = False
+
+    @property
+    def changed(self) -> bool:
+        """True si le contenu diffère de celui du fichier."""
+        return self.content != self.original
+
+    def _edit_lines(self, transform, description: str) -> bool:
+        if not self.readable:
+            return False
+        try:
+            new_lines, modified = transform(self.content.splitlines(keepends=True))
+        except re.error as e:
+            self.cfc.log_error(f"Erreur de regex ({description}): {e}", log_levels=self.log_levels)
+            return False
+        if modified:
+            self.content = "".join(new_lines)
+        return True
+
+    def replace_line(self, pattern: str, new_line: str, replace_all: bool = False) -> bool:
+        """Remplace la première ou toutes les lignes correspondant à un motif regex."""
+        return self._edit_lines(lambda lines: self.cfc._replace_in_lines(lines, pattern, new_line, replace_all, log_levels=self.log_levels),
+                                f"remplacement de '{pattern}'")
+
+    def comment_line(self, pattern: str, comment_char: str = '#') -> bool:
+        """Commente les lignes correspondant à un motif regex."""
+        return self._edit_lines(lambda lines: self.cfc._comment_in_lines(lines, pattern, comment_char, log_levels=self.log_levels),
+                                f"commentage de '{pattern}'")
+
+    def uncomment_line(self, pattern: str, comment_char: str = '#') -> bool:
+        """Décommente les lignes correspondant à un motif regex."""
+        return self._edit_lines(lambda lines: self.cfc._uncomment_in_lines(lines, pattern, comment_char, log_levels=self.log_levels),
+                                f"décommentage de '{pattern}'")
+
+    def append_line(self, line_to_append: str, ensure_newline: bool = True) -> bool:
+        """Ajoute une ligne à la fin du fichier."""
+        if not self.readable:
+            return False
+        if ensure_newline and not line_to_append.endswith('\n'):
+            line_to_append += '\n'
+        self.content += line_to_append
+        return True
+
+    def ensure_line_exists(self, line_to_ensure: str, pattern_to_check: Optional[str] = None) -> bool:
+        """S'assure qu'une ligne existe dans le fichier, l'ajoute sinon."""
+        if not self.readable:
+            return False
+        try:
+            self.content, _ = self.cfc._ensure_line_in_content(self.content, line_to_ensure, pattern_to_check)
+        except re.error as e:
+            self.cfc.log_error(f"Erreur de regex dans le pattern '{pattern_to_check}': {e}", log_levels=self.log_levels)
+            return False
+        return True
+
+    def set_ini_value(self, section: str, key: str, value: Optional[str], create_section: bool = True) -> bool:
+        """Définit ou supprime une valeur INI."""
+        if not self.readable:
+            return False
+        try:
+            new_content = self.cfc._set_ini_value_in_content(self.content, section, key, value, create_section,
+                                                              log_levels=self.log_levels)
+        except Exception as e:
+            self.cfc.log_error(f"Erreur lors de la modification de la configuration INI: {e}", log_levels=self.log_levels)
+            return False
+        if new_content is None:
+            return False
+        self.content = new_content
+        return True
+
+    def update_block_config(self, key_path: str, value: Any) -> bool:
+        """Met à jour une valeur d'une configuration à blocs ('section/sous-section/clé')."""
+        if not self.readable:
+            return False
+        try:
+            config = self.cfc._parse_block_config(self.content, log_levels=self.log_levels)
+            self.cfc._set_block_value(config, key_path, value)
+            self.content = self.cfc._format_block_config(config)
+        except Exception as e:
+            self.cfc.log_error(f"Erreur lors de la mise à jour de la configuration à blocs {self.path}: {e}", log_levels=self.log_levels)
+            return False
+        return True
+
+    def commit(self, backup: bool = True) -> bool:
+        """
+        Écrit le contenu modifié (une sauvegarde, un remplacement atomique).
+        Sans modification, rien n'est écrit.
+
+        Returns:
+            bool: True si le fichier est à jour
+        """
+        if not self.readable:
+            self.cfc.log_error(f"Fichier {self.path} illisible, modifications abandonnées.", log_levels=self.log_levels)
+            self.success = False
+            return False
+        if not self.changed:
+            self.cfc.log_debug("Fichier %s inchangé, aucune écriture.", self.path, log_levels=self.log_levels)
+            self.success = True
+            return True
+        self.success = self.cfc._write_file_content(self.path, self.content, backup=backup, log_levels=self.log_levels)
+        if self.success:
+            self.original = self.content
+            self.committed = True
+        return self.success
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Lecture directe de la base debconf.
+
+DpkgCommands.get_debconf_value() et get_debconf_selections_for_package()
+lisent /var/cache/debconf/config.dat (paragraphes au format RFC 822: Name,
+Template, Value, Owners, Flags) au lieu de lancer debconf-show,
+debconf-communicate ou grep. Le fichier est analysé une fois en un index
+question -> valeur, propriétaires et modèle, reconstruit quand sa date de
+modification ou sa taille change. templates.dat n'est lu qu'à la demande,
+pour le type des questions et la valeur par défaut des questions sans valeur
+(comme le fait debconf lui-même).
+
+Les commandes debconf restent utilisées si config.dat est illisible.
+"""
+
+import os
+import threading
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+DEBCONF_CONFIG = "/var/cache/debconf/config.dat"
+DEBCONF_TEMPLATES = "/var/cache/debconf/templates.dat"
+
+
+class DebconfQuestion(NamedTuple):
+    """Question de la base debconf."""
+    name: str
+    template: str
+    value: Optional[str]      # None si aucune valeur enregistrée
+    owners: Tuple[str, ...]
+    flags: Tuple[str, ...]
+
+
+def _unescape(value: str) -> str:
+    """Décode l'échappement des valeurs de debconf (\\n et \\\\)."""
+    if "\\" not in value:
+        return value
+    out = []
+    i = 0
+    while i < len(value):
+        char = value[i]
+        if char == "\\" and i + 1 < len(value):
+            following = value[i + 1]
+            out.append("\n" if following == "n" else following)
+            i += 2
+            continue
+        out.append(char)
+        i += 1
+    return "".join(out)
+
+
+def iter_stanzas(text: str, fields: Tuple[str, ...]) -> Iterator[Dict[str, str]]:
+    """
+    Parcourt les paragraphes d'un fichier RFC 822 en ne conservant que certains champs.
+
+    Args:
+        text: Contenu du fichier
+        fields: Champs à extraire (les lignes de continuation sont ignorées)
+
+    Yields:
+        Dict[str, str]: Champ -> valeur brute, pour chaque paragraphe non vide
+    """
+    wanted = set(fields)
+    stanza: Dict[str, str] = {}
+    for line in text.split("\n") + [""]:
+        if not line:
+            if stanza:
+                yield stanza
+                stanza = {}
+            continue
+        if line[0] in " \t":
+            continue
+        field, sep, value = line.partition(":")
+        if sep and field in wanted:
+            stanza[field] = value.strip()
+
+
+def _file_signature(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+    except OSError:
+        return None
+
+
+class DebconfDatabase:
+    """
+    Index de config.dat (et, à la demande, de templates.dat), partagé par toutes
+    les instances d'utilitaires du processus.
+    """
+
+    def __init__(self, config_path: str = DEBCONF_CONFIG, templates_path: str = DEBCONF_TEMPLATES):
+        self.config_path = config_path
+        self.templates_path = templates_path
+        self._lock = threading.Lock()
+        self._config_signature = None
+        self._questions: Dict[str, DebconfQuestion] = {}
+        self._by_owner: Dict[str, List[str]] = {}
+        self._available = False
+        self._templates_signature = None
+        self._templates: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+
+    def _refresh_config(self) -> bool:
+        """Relit config.dat s'il a changé (appelé sous verrou)."""
+        signature = _file_signature(self.config_path)
+        if signature == self._config_signature and signature is not None:
+            return self._available
+        self._config_signature = signature
+        try:
+            with open(self.config_path, encoding="utf-8", errors="replace") as f:
+                text = f.read()
+        except OSError:
+            self._questions, self._by_owner, self._available = {}, {}, False
+            return False
+
+        questions: Dict[str, DebconfQuestion] = {}
+        by_owner: Dict[str, List[str]] = {}
+        for stanza in iter_stanzas(text, ("Name", "Template", "Value", "Owners", "Flags")):
+            name = stanza.get("Name")
+            if not name:
+                continue
+            owners = tuple(o.strip() for o in stanza.get("Owners", "").split(",") if o.strip())
+            value = stanza.get("Value")
+            questions[name] = DebconfQuestion(
+                name=name,
+                template=stanza.get("Template", name),
+                value=_unescape(value) if value is not None else None,
+                owners=owners,
+                flags=tuple(f.strip() for f in stanza.get("Flags", "").split(",") if f.strip()),
+            )
+            for owner in owners:
+                by_owner.setdefault(owner, []).append(name)
+        self._questions, self._by_owner, self._available = questions, by_owner, True
+        return True
+
+    def _refresh_templates(self) -> None:
+        """Relit templates.dat s'il a changé (appelé sous verrou)."""
+        signature = _file_signature(self.templates_path)
+        if signature == self._templates_signature:
+            return
+        self._templates_signature = signature
+        templates: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+        try:
+            with open(self.templates_path, encoding="utf-8", errors="replace") as f:
+                text = f.read()
+        except OSError:
+            self._templates = templates
+            return
+        for stanza in iter_stanzas(text, ("Name", "Type", "Default")):
+            if stanza.get("Name"):
+                default = stanza.get("Default")
+                templates[stanza["Name"]] = (stanza.get("Type"), _unescape(default) if default is not None else None)
+        self._templates = templates
+
+    def available(self) -> bool:
+        """True si config.dat est lisible (sinon, les appelants utilisent les commandes debconf)."""
+        with self._lock:
+            return self._refresh_config()
+
+    def get(self, question: str) -> Optional[DebconfQuestion]:
+        """Retourne une question de config.dat, ou None si elle n'existe pas."""
+        with self._lock:
+            if not self._refresh_config():
+                return None
+            return self._questions.get(question)
+
+    def _resolve(self, question: DebconfQuestion) -> Tuple[Optional[str], Optional[str]]:
+        """(valeur, type) d'une question, avec la valeur par défaut du modèle (sous verrou)."""
+        self._refresh_templates()
+        q_type, default = self._templates.get(question.template, (None, None))
+        return (question.value if question.value is not None else default), q_type
+
+    def value(self, question: str) -> Optional[str]:
+        """
+        Valeur d'une question, comme la renverrait debconf (valeur par défaut du
+        modèle si aucune valeur n'est enregistrée).
+
+        Returns:
+            Optional[str]: Valeur, ou None si la question n'existe pas
+        """
+        with self._lock:
+            if not self._refresh_config():
+                return None
+            entry = self._questions.get(question)
+            if entry is None:
+                return None
+            if entry.value is not None:
+                return entry.value
+            return self._resolve(entry)[0]
+
+    def value_and_type(self, question: str) -> Tuple[Optional[str], Optional[str]]:
+        """(valeur, type) d'une question, (None, None) si elle n'existe pas."""
+        with self._lock:
+            if not self._refresh_config():
+                return None, None
+            entry = self._questions.get(question)
+            if entry is None:
+                return None, None
+            return self._resolve(entry)
+
+    def package_selections(self, package_name: str) -> Dict[Tuple[str, str], str]:
+        """
+        Questions appartenant à un paquet, comme les liste debconf-show.
+
+        Returns:
+            Dict[Tuple[str, str], str]: (question, type) -> valeur ('' si aucune)
+        """
+        with self._lock:
+            if not self._refresh_config():
+                return {}
+            selections: Dict[Tuple[str, str], str] = {}
+            for name in self._by_owner.get(package_name, []):
+                value, q_type = self._resolve(self._questions[name])
+                selections[(name, q_type or "string")] = value if value is not None else ""
+            return selections
+
+    def invalidate(self) -> None:
+        """Force la relecture de la base au prochain accès."""
+        with self._lock:
+            self._config_signature = None
+            self._templates_signature = None
+
+
+# Index unique par processus plugin
+DEBCONF_DB = DebconfDatabase()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Comparaison de versions Debian sans processus externe.
+
+Implémente l'ordre de dpkg (--compare-versions): époque, partie amont et
+révision Debian, comparées par alternance de segments non numériques (où '~'
+précède même la fin de chaîne, et les lettres précèdent les autres
+caractères) et de segments numériques (comparés comme des entiers).
+
+Chaque version est convertie une fois en clé de tri (version_key, mémorisée),
+ce qui permet de trier ou filtrer des milliers de versions d'un coup
+(sort_versions, filter_versions) pour les rapports de parc ou le choix d'une
+version candidate.
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple, TypeVar
+
+K = TypeVar("K")
+
+# Nombre de clés de versions mémorisées
+VERSION_KEY_CACHE_SIZE = 16384
+
+# Relations acceptées: syntaxe de dpkg --compare-versions et des dépendances Debian
+_RELATIONS = {
+    "lt": lambda c: c < 0, "<<": lambda c: c < 0, "<": lambda c: c < 0,
+    "le": lambda c: c <= 0, "<=": lambda c: c <= 0,
+    "eq": lambda c: c == 0, "=": lambda c: c == 0,
+    "ne": lambda c: c != 0,
+    "ge": lambda c: c >= 0, ">=": lambda c: c >= 0,
+    "gt": lambda c: c > 0, ">>": lambda c: c > 0, ">": lambda c: c > 0,
+}
+
+# Caractères autorisés par dpkg: la partie amont commence par un chiffre
+_UPSTREAM = re.compile(r"^[0-9][A-Za-z0-9.+~:-]*$")
+_REVISION = re.compile(r"^[A-Za-z0-9.+~]+$")
+
+# Segment vide de longueur nulle: la fin d'une chaîne se compare comme ce segment
+_END = ((0,), 0)
+
+
+def _char_order(char: str) -> int:
+    """Poids d'un caractère non numérique: '~' < fin < lettres < autres caractères."""
+    if char == "~":
+        return -1
+    if char.isascii() and char.isalpha():
+        return ord(char)
+    return ord(char) + 256
+
+
+def _part_key(part: str) -> Tuple:
+    """
+    Clé d'une partie amont ou révision: suite de paires (segment non numérique,
+    valeur numérique), terminée de sorte que la fin de chaîne se compare comme
+    une paire vide (comportement de verrevcmp dans dpkg).
+    """
+    pairs = []
+    i, length = 0, len(part)
+    while i < length:
+        start = i
+        while i < length and not "0" <= part[i] <= "9":
+            i += 1
+        # Le 0 final fait de la fin du segment le plus petit poids hors '~'
+        letters = tuple(_char_order(c) for c in part[start:i]) + (0,)
+        start = i
+        while i < length and "0" <= part[i] <= "9":
+            i += 1
+        pairs.append((letters, int(part[start:i]) if i > start else 0))
+    # Une paire vide ne peut apparaître qu'en tête ("0", "00"...): la retirer
+    while pairs and pairs[-1] == _END:
+        pairs.pop()
+    # Deux paires de fin: si une paire vide de tête coïncide avec la première,
+    # la seconde se compare à la paire suivante de l'autre version
+    return tuple(pairs) + (_END, _END)
+
+
+def parse_version(version: str) -> Tuple[int, str, str]:
+    """
+    Découpe une version Debian en (époque, amont, révision).
+
+    Args:
+        version: Version ('1:2.3-4ubuntu1', '2.3', ...)
+
+    Returns:
+        Tuple[int, str, str]: Époque (0 par défaut), partie amont, révision ('' si absente)
+
+    Raises:
+        ValueError: Version vide, époque non numérique, révision vide ('1.0-'),
+                    partie amont ne commençant pas par un chiffre ('a', '~')
+                    ou caractère interdit (mêmes règles que dpkg)
+    """
+    text = str(version).strip()
+    if not text:
+        raise ValueError("Version vide")
+    epoch = 0
+    if ":" in text:
+        epoch_text, text = text.split(":", 1)
+        if not epoch_text.isascii() or not epoch_text.isdigit():
+            raise ValueError(f"Époque invalide dans la version '{version}'")
+        epoch = int(epoch_text)
+    upstream, separator, revision = text.rpartition("-")
+    if not separator:
+        upstream, revision = text, ""
+    elif not revision:
+        raise ValueError(f"Révision vide dans la version '{version}'")
+    elif not _REVISION.match(revision):
+        raise ValueError(f"Caractère invalide dans la révision de la version '{version}'")
+    if not upstream:
+        raise ValueError(f"Partie amont vide dans la version '{version}'")
+    if not _UPSTREAM.match(upstream):
+        raise ValueError(f"La partie amont de la version '{version}' doit commencer par un chiffre "
+                         f"et ne contenir que des lettres, chiffres et . + ~ - :")
+    return epoch, upstream, revision
+
+
+@lru_cache(maxsize=VERSION_KEY_CACHE_SIZE)
+def version_key(version: str) -> Tuple:
+    """
+    Clé de tri d'une version Debian (utilisable avec sorted(key=...)).
+
+    Raises:
+        ValueError: Version invalide
+    """
+    epoch, upstream, revision = parse_version(version)
+    return (epoch, _part_key(upstream), _part_key(revision))
+
+
+def compare_versions(version_a: str, version_b: str) -> int:
+    """
+    Compare deux versions Debian.
+
+    Returns:
+        int: -1, 0 ou 1 selon que version_a est inférieure, égale ou supérieure à version_b
+    """
+    key_a, key_b = version_key(version_a), version_key(version_b)
+    return (key_a > key_b) - (key_a < key_b)
+
+
+def version_satisfies(version: str, relation: str, reference: str) -> bool:
+    """
+    Équivalent de `dpkg --compare-versions version relation reference`.
+
+    Args:
+        version: Version testée
+        relation: lt, le, eq, ne, ge, gt (ou <<, <=, =, >=, >>)
+        reference: Version de référence
+
+    Returns:
+        bool: True si la relation est vérifiée
+
+    Raises:
+        ValueError: Relation inconnue ou version invalide
+    """
+    test = _RELATIONS.get(relation)
+    if test is None:
+        raise ValueError(f"Relation de version inconnue: '{relation}'")
+    return test(compare_versions(version, reference))
+
+
+def sort_versions(versions: Iterable[str], reverse: bool = False) -> List[str]:
+    """Trie des versions Debian (ordre croissant par défaut)."""
+    return sorted(versions, key=version_key, reverse=reverse)
+
+
+def max_version(versions: Iterable[str]) -> Optional[str]:
+    """Retourne la version la plus récente, ou None si la liste est vide."""
+    return max(versions, key=version_key, default=None)
+
+
+def filter_versions(versions: Mapping[K, Optional[str]], relation: str, reference: str) -> Dict[K, str]:
+    """
+    Sélectionne les entrées dont la version vérifie une relation, par exemple
+    les hôtes ou paquets sous une version donnée: filter_versions(par_hote, 'lt', '2.4-1').
+
+    Les entrées sans version (None, chaîne vide) sont ignorées.
+
+    Args:
+        versions: Clé (hôte, paquet...) -> version
+        relation: lt, le, eq, ne, ge, gt (ou <<, <=, =, >=, >>)
+        reference: Version de référence
+
+    Returns:
+        Dict: Entrées retenues, clé -> version
+    """
+    test = _RELATIONS.get(relation)
+    if test is None:
+        raise ValueError(f"Relation de version inconnue: '{relation}'")
+    reference_key = version_key(reference)
+    selected = {}
+    for key, version in versions.items():
+        if not version:
+            continue
+        candidate_key = version_key(version)
+        if test((candidate_key > reference_key) - (candidate_key < reference_key)):
+            selected[key] = version
+    return selected
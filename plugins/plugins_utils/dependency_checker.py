@@ -6,6 +6,7 @@ Vérifie la présence de commandes, paquets, modules Python, fichiers, etc.
 """
 
 from plugins_utils.plugins_utils_base import PluginsUtilsBase
+from plugins_utils.debian_version import version_satisfies
 import os
 import importlib.util
 from pathlib import Path
@@ -44,10 +45,9 @@ class DependencyChecker(PluginsUtilsBase):
             bool: True si la commande est trouvée, False sinon.
         """
         self.log_debug(f"Vérification de la présence de la commande: {command_name}", log_levels=log_levels)
-        # Utiliser 'which' ou 'command -v' via self.run
-        success, stdout, _ = self.run(['which', command_name], check=False, no_output=True, error_as_warning=True)
-        if success and stdout.strip():
-            self.log_info(f"Commande '{command_name}' trouvée: {stdout.strip()}", log_levels=log_levels)
+        path = self.which(command_name)
+        if path:
+            self.log_info(f"Commande '{command_name}' trouvée: {path}", log_levels=log_levels)
             return True
         else:
             self.log_warning(f"Commande '{command_name}' non trouvée dans le PATH.", log_levels=log_levels)
@@ -81,11 +81,13 @@ class DependencyChecker(PluginsUtilsBase):
                  self.log_warning(f"Paquet '{package_name}' installé mais impossible de récupérer sa version.", log_levels=log_levels)
                  # Considérer comme échec si une version minimale est requise
                  return False
-            # Comparer les versions (nécessite une logique de comparaison robuste)
-            # Utiliser dpkg --compare-versions via self.run
-            cmd_compare = ['dpkg', '--compare-versions', current_version, 'ge', min_version] # ge = greater or equal
-            success_cmp, _, _ = self.run(cmd_compare, check=False, no_output=True, error_as_warning=True)
-            if not success_cmp:
+            # Comparer les versions selon l'ordre de dpkg (ge = greater or equal)
+            try:
+                satisfied = version_satisfies(current_version, 'ge', min_version)
+            except ValueError as e:
+                self.log_warning(f"Comparaison de version impossible pour '{package_name}': {e}", log_levels=log_levels)
+                satisfied = False
+            if not satisfied:
                  self.log_warning(f"Paquet '{package_name}' installé (version {current_version}) mais ne satisfait pas la version minimale requise ({min_version}).", log_levels=log_levels)
                  return False
             self.log_info(f"Paquet '{package_name}' (version {current_version}) satisfait la version minimale ({min_version}).", log_levels=log_levels)
@@ -80,10 +80,10 @@ class DovecotCommands(ConfigFileCommands):
 
         # Utiliser le cache sauf si force_reload est True
         if not force_reload and str(config_path) in self.loaded_configs:
-            self.log_debug(f"Utilisation de la configuration en cache pour {config_path}", log_levels=log_levels)
+            self.log_debug("Utilisation de la configuration en cache pour %s", config_path, log_levels=log_levels)
             return self.loaded_configs[str(config_path)]
 
-        self.log_debug(f"Lecture de la configuration Dovecot: {config_path}", log_levels=log_levels)
+        self.log_debug("Lecture de la configuration Dovecot: %s", config_path, log_levels=log_levels)
 
         # Utiliser _read_file_content de ConfigFileCommands
         content = self._read_file_content(config_path)
@@ -346,7 +346,7 @@ class DovecotCommands(ConfigFileCommands):
             bool: True si l'écriture réussit, False sinon
         """
         config_path = self.get_config_path(config_type)
-        self.log_debug(f"Écriture de la configuration Dovecot: {config_path}", log_levels=log_levels)
+        self.log_debug("Écriture de la configuration Dovecot: %s", config_path, log_levels=log_levels)
 
         # Générer la représentation texte de la configuration
         config_content = self.generate_config_string(config)
@@ -498,7 +498,7 @@ class DovecotCommands(ConfigFileCommands):
             config_path = str(self.get_config_path(config_type))
             if config_path in self.loaded_configs:
                 del self.loaded_configs[config_path]
-                self.log_debug(f"Cache vidé pour {config_path}", log_levels=log_levels)
+                self.log_debug("Cache vidé pour %s", config_path, log_levels=log_levels)
 
     def get_global_setting(self, setting_name: str, default: Any = None, log_levels: Optional[Dict[str, str]] = None) -> Any:
         """
@@ -620,7 +620,7 @@ class DovecotCommands(ConfigFileCommands):
         """
         plugins = self.get_mail_plugins()
         if plugin_name in plugins:
-            self.log_debug(f"Le plugin {plugin_name} est déjà activé", log_levels=log_levels)
+            self.log_debug("Le plugin %s est déjà activé", plugin_name, log_levels=log_levels)
             return True
 
         plugins.append(plugin_name)
@@ -639,7 +639,7 @@ class DovecotCommands(ConfigFileCommands):
         """
         plugins = self.get_mail_plugins()
         if plugin_name not in plugins:
-            self.log_debug(f"Le plugin {plugin_name} n'est pas activé", log_levels=log_levels)
+            self.log_debug("Le plugin %s n'est pas activé", plugin_name, log_levels=log_levels)
             return True
 
         plugins.remove(plugin_name)
@@ -1054,7 +1054,7 @@ backup: bool = True, log_levels: Optional[Dict[str, str]] = None) -> bool:
         else:
             acl_path = Path(acl_path)
 
-        self.log_debug(f"Lecture du fichier ACL: {acl_path}", log_levels=log_levels)
+        self.log_debug("Lecture du fichier ACL: %s", acl_path, log_levels=log_levels)
 
         # Lire le contenu du fichier
         content = self._read_file_content(acl_path)
@@ -1109,7 +1109,7 @@ backup: bool = True, log_levels: Optional[Dict[str, str]] = None) -> bool:
         else:
             acl_path = Path(acl_path)
 
-        self.log_debug(f"Écriture du fichier ACL: {acl_path}", log_levels=log_levels)
+        self.log_debug("Écriture du fichier ACL: %s", acl_path, log_levels=log_levels)
 
         # Formater le contenu
         lines = []
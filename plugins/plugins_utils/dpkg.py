@@ -8,6 +8,7 @@ Permet de gérer les sélections de paquets, les préréponses debconf et les op
 
 # Import de la classe de base et des types
 from plugins_utils.plugins_utils_base import PluginsUtilsBase
+from plugins_utils.debconf_db import DEBCONF_DB
 import os
 import re
 import tempfile
@@ -60,7 +61,7 @@ class DpkgCommands(PluginsUtilsBase):
         if status_lower not in valid_statuses:
              self.log_warning(f"Statut de sélection dpkg invalide '{status}' pour {package}. Utilisation de 'install'.", log_levels=log_levels)
              status_lower = "install"
-        self.log_debug(f"Ajout/Mise à jour sélection dpkg: {package} -> {status_lower}", log_levels=log_levels)
+        self.log_debug("Ajout/Mise à jour sélection dpkg: %s -> %s", package, status_lower, log_levels=log_levels)
         self._package_selections[package] = status_lower
 
     def add_package_selections(self, selections: str, log_levels: Optional[Dict[str, str]] = None):
@@ -131,7 +132,7 @@ class DpkgCommands(PluginsUtilsBase):
 
         # Construire la chaîne pour stdin
         selections_str = "\n".join(f"{pkg}\t{status}" for pkg, status in self._package_selections.items()) + "\n"
-        self.log_debug(f"Contenu envoyé à dpkg --set-selections:\n{selections_str}", log_levels=log_levels)
+        self.log_debug("Contenu envoyé à dpkg --set-selections:\n%s", selections_str, log_levels=log_levels)
 
         # Appeler dpkg --set-selections via stdin
         cmd = ['dpkg', '--set-selections']
@@ -152,7 +153,7 @@ class DpkgCommands(PluginsUtilsBase):
 
     # --- Méthodes Debconf ---
 
-    def _ensure_debconf_commands(self) -> Tuple[bool, List[str]]:
+    def _ensure_debconf_commands(self, log_levels: Optional[Dict[str, str]] = None) -> Tuple[bool, List[str]]:
         """
         Vérifie quelles commandes debconf sont disponibles.
         Ne tente pas d'installer debconf-utils.
@@ -166,7 +167,7 @@ class DpkgCommands(PluginsUtilsBase):
         
         # Vérifier les commandes disponibles
         for cmd in ['debconf', 'debconf-communicate', 'debconf-show']:
-            success, _, _ = self.run(['which', cmd], check=False, no_output=True, error_as_warning=True)
+            success = self.which(cmd) is not None
             if success:
                 available_commands.append(cmd)
         
@@ -174,7 +175,7 @@ class DpkgCommands(PluginsUtilsBase):
             self.log_error("Aucune commande debconf n'est disponible. Les opérations debconf échoueront.", log_levels=log_levels)
             return False, []
         
-        self.log_debug(f"Commandes debconf disponibles: {', '.join(available_commands)}", log_levels=log_levels)
+        self.log_debug("Commandes debconf disponibles: %s", ', '.join(available_commands), log_levels=log_levels)
         return True, available_commands
 
     def add_debconf_selection(self, package: str, question: str, q_type: str, value: str, log_levels: Optional[Dict[str, str]] = None):
@@ -194,7 +195,7 @@ class DpkgCommands(PluginsUtilsBase):
         type_clean = q_type.strip()
         val_clean = value.strip() # Ne pas convertir en booléen ici, garder la chaîne
 
-        self.log_debug(f"Ajout/Mise à jour debconf: {pkg_clean} {quest_clean} {type_clean} '{val_clean}'", log_levels=log_levels)
+        self.log_debug("Ajout/Mise à jour debconf: %s %s %s '%s'", pkg_clean, quest_clean, type_clean, val_clean, log_levels=log_levels)
         self._debconf_selections[(pkg_clean, quest_clean)] = (type_clean, val_clean)
 
     def add_debconf_selections(self, selections: str, log_levels: Optional[Dict[str, str]] = None):
@@ -239,10 +240,34 @@ class DpkgCommands(PluginsUtilsBase):
         self.log_info("Effacement des pré-réponses debconf en attente.", log_levels=log_levels)
         self._debconf_selections = {}
 
+    def get_debconf_changes(self) -> Dict[Tuple[str, str], Tuple[Optional[str], str]]:
+        """
+        Compare les pré-réponses debconf en attente aux valeurs actuelles de la base.
+
+        Une pré-réponse est inchangée si la question existe déjà avec la même valeur,
+        est marquée comme vue et appartient au paquet: debconf-set-selections ne
+        modifierait rien. Les mots de passe (absents de config.dat) sont toujours
+        considérés comme modifiés, de même que tout si la base est illisible.
+
+        Returns:
+            Dict: (paquet, question) -> (valeur actuelle ou None, nouvelle valeur)
+        """
+        database_ok = DEBCONF_DB.available()
+        changes: Dict[Tuple[str, str], Tuple[Optional[str], str]] = {}
+        for (pkg, quest), (q_type, value) in self._debconf_selections.items():
+            current = DEBCONF_DB.get(quest) if database_ok else None
+            if (current is not None and q_type != "password" and current.value == value
+                    and "seen" in current.flags and pkg in current.owners):
+                continue
+            changes[(pkg, quest)] = (current.value if current is not None else None, value)
+        return changes
+
     def apply_debconf_selections(self, task_id: Optional[str] = None, log_levels: Optional[Dict[str, str]] = None) -> bool:
         """
-        Applique toutes les pré-réponses debconf en attente en utilisant des méthodes alternatives
-        qui ne dépendent pas de debconf-utils.
+        Applique les pré-réponses debconf en attente qui modifient la base, en un seul
+        appel à debconf-set-selections (méthodes alternatives qui ne dépendent pas de
+        debconf-utils en cas d'échec). Les pré-réponses déjà en place sont ignorées:
+        sans modification, aucune commande n'est lancée.
         La liste interne est vidée après une application réussie.
 
         Args:
@@ -255,13 +280,25 @@ class DpkgCommands(PluginsUtilsBase):
             self.log_warning("Aucune pré-réponse debconf en attente à appliquer.", log_levels=log_levels)
             return True
 
-        count = len(self._debconf_selections)
-        self.log_info(f"Application de {count} pré-réponses debconf...", log_levels=log_levels)
+        changes = self.get_debconf_changes()
+        unchanged = len(self._debconf_selections) - len(changes)
+        if not changes:
+            self.log_info(f"{unchanged} pré-réponse(s) debconf déjà en place, rien à appliquer.", log_levels=log_levels)
+            self.clear_debconf_selections()
+            return True
+        selections = {key: self._debconf_selections[key] for key in changes}
+        for (pkg, quest), (current, value) in changes.items():
+            if selections[(pkg, quest)][0] == "password":
+                current, value = None, "***"
+            self.log_info(f"debconf {pkg} {quest}: {current!r} -> {value!r}", log_levels=log_levels)
+
+        count = len(selections)
+        self.log_info(f"Application de {count} pré-réponses debconf ({unchanged} déjà en place)...", log_levels=log_levels)
         current_task_id = task_id or f"debconf_set_selections_{int(time.time())}"
         self.start_task(count, description="Application des pré-réponses debconf", task_id=current_task_id)
 
         # Vérifier si debconf est disponible (outil de base)
-        has_debconf, _ = self._ensure_debconf_commands()
+        has_debconf, _ = self._ensure_debconf_commands(log_levels)
         
         if not has_debconf:
             self.log_error("Les commandes debconf de base ne sont pas disponibles. Impossible d'appliquer les sélections debconf.", log_levels=log_levels)
@@ -272,7 +309,7 @@ class DpkgCommands(PluginsUtilsBase):
         with tempfile.NamedTemporaryFile(mode='w+', delete=False) as temp_file:
             try:
                 # Écrire les sélections dans le fichier temporaire
-                for (pkg, quest), (q_type, value) in self._debconf_selections.items():
+                for (pkg, quest), (q_type, value) in selections.items():
                     temp_file.write(f"{pkg} {quest} {q_type} {value}\n")
                 temp_file.flush()
                 
@@ -282,7 +319,7 @@ class DpkgCommands(PluginsUtilsBase):
                 completed = 0
                 
                 # Vérifier si debconf-set-selections est disponible
-                has_set_selections, _, _ = self.run(['which', 'debconf-set-selections'], check=False, no_output=True, error_as_warning=True)
+                has_set_selections = self.which('debconf-set-selections') is not None
                 
                 if has_set_selections:
                     # Méthode 1: Essayer d'utiliser debconf-set-selections directement
@@ -309,9 +346,9 @@ class DpkgCommands(PluginsUtilsBase):
                     success = True
                     completed = 0
                     
-                    for (pkg, quest), (q_type, value) in self._debconf_selections.items():
+                    for (pkg, quest), (q_type, value) in selections.items():
                         # Vérifier si debconf-communicate est disponible
-                        has_communicate, _, _ = self.run(['which', 'debconf-communicate'], check=False, no_output=True, error_as_warning=True)
+                        has_communicate = self.which('debconf-communicate') is not None
                         
                         if has_communicate:
                             # Construire la commande debconf-communicate
@@ -337,12 +374,12 @@ class DpkgCommands(PluginsUtilsBase):
                             self.log_warning(f"Échec pour {pkg}/{quest}: {entry_stderr}", log_levels=log_levels)
                             
                             # Méthode 3: Essayer avec debconf/db_set directement si disponible
-                            self.log_debug(f"Tentative alternative pour {pkg}/{quest}...", log_levels=log_levels)
+                            self.log_debug("Tentative alternative pour %s/%s...", pkg, quest, log_levels=log_levels)
                             alt_cmd = f"DEBIAN_FRONTEND=noninteractive debconf-db-set DB_PATH=/var/cache/debconf/config.dat {pkg} {quest} {value}"
                             alt_success, alt_stdout, alt_stderr = self.run(alt_cmd, shell=True, check=False, needs_sudo=True)
                             
                             if alt_success:
-                                self.log_debug(f"Méthode alternative réussie pour {pkg}/{quest}", log_levels=log_levels)
+                                self.log_debug("Méthode alternative réussie pour %s/%s", pkg, quest, log_levels=log_levels)
                                 success = True  # Rétablir le succès pour cette entrée
                 
                 self.update_task(count)  # S'assurer que la tâche est complète
@@ -379,13 +416,19 @@ class DpkgCommands(PluginsUtilsBase):
             Dictionnaire où la clé est un tuple (question, type) et la valeur est la sélection actuelle.
             Retourne None en cas d'erreur, ou un dictionnaire vide si aucune sélection trouvée.
         """
-        self.log_debug(f"Récupération des sélections debconf pour le paquet: {package_name}", log_levels=log_levels)
-        
+        self.log_debug("Récupération des sélections debconf pour le paquet: %s", package_name, log_levels=log_levels)
+
+        # Lecture directe de config.dat (types réels issus de templates.dat)
+        if DEBCONF_DB.available():
+            selections = DEBCONF_DB.package_selections(package_name)
+            self.log_debug("%s sélection(s) debconf trouvée(s) pour '%s' (base debconf).", len(selections), package_name, log_levels=log_levels)
+            return selections
+
         # Créer un dictionnaire pour stocker les résultats
         selections: Dict[Tuple[str, str], str] = {}
         
         # Vérifier si debconf-show est disponible (fait partie du paquet debconf de base)
-        has_debconf_show, _, _ = self.run(['which', 'debconf-show'], check=False, no_output=True, error_as_warning=True)
+        has_debconf_show = self.which('debconf-show') is not None
         
         if not has_debconf_show:
             # Si debconf-show n'est pas disponible, essayer de lire directement les fichiers de config
@@ -397,7 +440,7 @@ class DpkgCommands(PluginsUtilsBase):
             
             if not success:
                 if self.last_run_return_code == 1:  # grep n'a rien trouvé
-                    self.log_debug(f"Aucune configuration debconf trouvée pour le paquet '{package_name}'.", log_levels=log_levels)
+                    self.log_debug("Aucune configuration debconf trouvée pour le paquet '%s'.", package_name, log_levels=log_levels)
                     return selections  # Retourner un dict vide
                 else:
                     self.log_error(f"Erreur lors de la lecture des fichiers debconf: {stderr}", log_levels=log_levels)
@@ -436,7 +479,7 @@ class DpkgCommands(PluginsUtilsBase):
             if not success:
                 # Vérifier si c'est parce que le paquet n'a pas de config debconf
                 if "does not exist" in stderr.lower() or "no such package" in stderr.lower():
-                    self.log_debug(f"Aucune configuration debconf trouvée pour le paquet '{package_name}'.", log_levels=log_levels)
+                    self.log_debug("Aucune configuration debconf trouvée pour le paquet '%s'.", package_name, log_levels=log_levels)
                     return selections  # Retourner un dict vide
                 else:
                     # Autre erreur
@@ -467,9 +510,9 @@ class DpkgCommands(PluginsUtilsBase):
                     selections[(question, q_type)] = value
         
         count = len(selections)
-        self.log_debug(f"{count} sélection(s) debconf trouvée(s) pour '{package_name}'.", log_levels=log_levels)
+        self.log_debug("%s sélection(s) debconf trouvée(s) pour '%s'.", count, package_name, log_levels=log_levels)
         if count > 0:
-            self.log_debug(f"Sélections pour {package_name}: {selections}", log_levels=log_levels)
+            self.log_debug("Sélections pour %s: %s", package_name, selections, log_levels=log_levels)
         return selections
 
     def get_debconf_value(self, package_name: str, question_name: str, log_levels: Optional[Dict[str, str]] = None) -> Optional[str]:
@@ -484,8 +527,18 @@ class DpkgCommands(PluginsUtilsBase):
         Returns:
             La valeur de la sélection sous forme de chaîne, ou None si non trouvée ou en cas d'erreur.
         """
-        self.log_debug(f"Recherche de la valeur debconf pour: {package_name} -> {question_name}", log_levels=log_levels)
-        
+        self.log_debug("Recherche de la valeur debconf pour: %s -> %s", package_name, question_name, log_levels=log_levels)
+
+        # Lecture directe de config.dat: les commandes ci-dessous liraient la même base
+        if DEBCONF_DB.available():
+            for name in (question_name, f"{package_name}/{question_name}"):
+                value = DEBCONF_DB.value(name)
+                if value is not None:
+                    self.log_debug("Valeur trouvée pour '%s' (%s): '%s' (base debconf)", question_name, package_name, value, log_levels=log_levels)
+                    return value
+            self.log_debug("Aucune valeur debconf trouvée pour la question '%s' du paquet '%s'.", question_name, package_name, log_levels=log_levels)
+            return None
+
         # Récupérer toutes les sélections pour le paquet
         package_selections = self.get_debconf_selections_for_package(package_name)
         
@@ -496,7 +549,7 @@ class DpkgCommands(PluginsUtilsBase):
         # Chercher la question dans les sélections récupérées
         for (question, q_type), value in package_selections.items():
             if question == question_name:
-                self.log_debug(f"Valeur trouvée pour '{question_name}' ({package_name}): '{value}' (type: {q_type})", log_levels=log_levels)
+                self.log_debug("Valeur trouvée pour '%s' (%s): '%s' (type: %s)", question_name, package_name, value, q_type, log_levels=log_levels)
                 return value
         
         # Si on ne trouve pas dans les sélections, essayer avec debconf-communicate
@@ -512,7 +565,7 @@ class DpkgCommands(PluginsUtilsBase):
                     # Analyser la sortie (typiquement "0 value")
                     parts = stdout.strip().split(' ', 1)
                     if len(parts) == 2 and parts[0] == '0':
-                        self.log_debug(f"Valeur trouvée via debconf-communicate: '{parts[1]}'", log_levels=log_levels)
+                        self.log_debug("Valeur trouvée via debconf-communicate: '%s'", parts[1], log_levels=log_levels)
                         return parts[1]
             except Exception as e:
                 self.log_warning(f"Erreur lors de l'utilisation de debconf-communicate: {e}", log_levels=log_levels)
@@ -527,10 +580,10 @@ class DpkgCommands(PluginsUtilsBase):
                 for line in stdout.splitlines():
                     if line.startswith('Value:'):
                         value = line.split(':', 1)[1].strip()
-                        self.log_debug(f"Valeur trouvée via lecture directe des fichiers: '{value}'", log_levels=log_levels)
+                        self.log_debug("Valeur trouvée via lecture directe des fichiers: '%s'", value, log_levels=log_levels)
                         return value
         except Exception as e:
             self.log_warning(f"Erreur lors de la lecture directe des fichiers debconf: {e}", log_levels=log_levels)
         
-        self.log_debug(f"Aucune valeur debconf trouvée pour la question '{question_name}' du paquet '{package_name}'.", log_levels=log_levels)
+        self.log_debug("Aucune valeur debconf trouvée pour la question '%s' du paquet '%s'.", question_name, package_name, log_levels=log_levels)
         return None
\ No newline at end of file
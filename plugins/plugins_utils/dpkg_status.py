@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Index en mémoire de la base d'état dpkg.
+
+Les vérifications de paquets (AptCommands.is_installed/get_version,
+DependencyChecker.check_package) lisent /var/lib/dpkg/status une seule fois
+au lieu de lancer un dpkg-query par paquet. Le fichier est analysé en une
+table nom -> (état, version, architecture), complétée par le journal
+/var/lib/dpkg/updates/ (transactions dpkg pas encore fusionnées dans status).
+L'index est reconstruit dès que la date de modification ou la taille de ces
+fichiers change; status-old n'est lu que si status est illisible.
+"""
+
+import os
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+DPKG_ADMIN_DIR = "/var/lib/dpkg"
+# Caractères faisant de l'argument de dpkg-query un motif (non géré par l'index)
+_PATTERN_CHARS = set("*?[]")
+
+
+class PackageRecord(NamedTuple):
+    """Entrée de la base dpkg pour une instance de paquet."""
+    status: str        # Troisième mot du champ Status (installed, config-files, not-installed...)
+    version: Optional[str]
+    arch: Optional[str]
+
+    @property
+    def installed(self) -> bool:
+        return self.status == "installed"
+
+
+def parse_status(text: str, records: Optional[Dict[Tuple[str, Optional[str]], PackageRecord]] = None
+                 ) -> Dict[Tuple[str, Optional[str]], PackageRecord]:
+    """
+    Analyse un fichier au format de /var/lib/dpkg/status.
+
+    Args:
+        text: Contenu du fichier
+        records: Table à compléter (les entrées lues remplacent les existantes)
+
+    Returns:
+        Dict: (nom, architecture) -> PackageRecord
+    """
+    if records is None:
+        records = {}
+    name = status = version = arch = None
+    # Une ligne vide supplémentaire termine le dernier paragraphe
+    for line in text.split("\n") + [""]:
+        if not line:
+            if name is not None:
+                records[(name, arch)] = PackageRecord(status or "not-installed", version, arch)
+            name = status = version = arch = None
+            continue
+        if line[0] in " \t":
+            # Ligne de continuation (Description, Conffiles...)
+            continue
+        field, _, value = line.partition(":")
+        if field == "Package":
+            name = value.strip()
+        elif field == "Status":
+            words = value.split()
+            status = words[2] if len(words) >= 3 else None
+        elif field == "Version":
+            version = value.strip() or None
+        elif field == "Architecture":
+            arch = value.strip() or None
+    return records
+
+
+class DpkgStatusIndex:
+    """
+    Table des paquets connus de dpkg, partagée par toutes les instances
+    d'utilitaires du processus et reconstruite quand la base change.
+    """
+
+    def __init__(self, admin_dir: str = DPKG_ADMIN_DIR):
+        self.admin_dir = admin_dir
+        self._lock = threading.Lock()
+        self._signature: Optional[Tuple] = None
+        self._by_name: Dict[str, List[PackageRecord]] = {}
+        self._by_qualified: Dict[str, PackageRecord] = {}
+        self._available = False
+        self.loads = 0
+
+    def _update_files(self) -> List[str]:
+        """Fichiers du journal updates/ (noms numériques), dans l'ordre d'application."""
+        updates_dir = os.path.join(self.admin_dir, "updates")
+        try:
+            names = [n for n in os.listdir(updates_dir) if n.isdigit()]
+        except OSError:
+            return []
+        return [os.path.join(updates_dir, n) for n in sorted(names, key=int)]
+
+    def _current_signature(self) -> Tuple:
+        """Date de modification et taille de status et des fichiers du journal."""
+        signature = []
+        for path in [os.path.join(self.admin_dir, "status")] + self._update_files():
+            try:
+                st = os.stat(path)
+                signature.append((path, st.st_mtime_ns, st.st_size))
+            except OSError:
+                signature.append((path, None, None))
+        return tuple(signature)
+
+    def _load(self) -> bool:
+        """Relit la base dpkg. Retourne False si aucun fichier d'état n'est lisible."""
+        records: Dict[Tuple[str, Optional[str]], PackageRecord] = {}
+        loaded = False
+        for filename in ("status", "status-old"):
+            try:
+                with open(os.path.join(self.admin_dir, filename), encoding="utf-8", errors="replace") as f:
+                    parse_status(f.read(), records)
+                loaded = True
+                break
+            except OSError:
+                continue
+        if not loaded:
+            return False
+        for path in self._update_files():
+            try:
+                with open(path, encoding="utf-8", errors="replace") as f:
+                    parse_status(f.read(), records)
+            except OSError:
+                continue
+
+        by_name: Dict[str, List[PackageRecord]] = {}
+        by_qualified: Dict[str, PackageRecord] = {}
+        for (name, arch), record in records.items():
+            by_name.setdefault(name, []).append(record)
+            if arch:
+                by_qualified[f"{name}:{arch}"] = record
+        self._by_name = by_name
+        self._by_qualified = by_qualified
+        self.loads += 1
+        return True
+
+    def _refresh(self) -> bool:
+        """Reconstruit l'index si la base a changé (appelé sous verrou)."""
+        signature = self._current_signature()
+        if signature != self._signature:
+            self._available = self._load()
+            self._signature = signature
+        return self._available
+
+    def available(self) -> bool:
+        """True si la base dpkg est lisible (sinon, les appelants utilisent dpkg-query)."""
+        with self._lock:
+            return self._refresh()
+
+    @staticmethod
+    def supports(package_name: str) -> bool:
+        """True si le nom peut être résolu par l'index (pas de motif glob)."""
+        return bool(package_name) and not _PATTERN_CHARS.intersection(package_name)
+
+    def get(self, package_name: str) -> Optional[PackageRecord]:
+        """
+        Retourne l'entrée d'un paquet ('nom' ou 'nom:arch').
+
+        Pour un paquet présent en plusieurs architectures (multiarch), l'instance
+        installée est préférée.
+
+        Args:
+            package_name: Nom du paquet
+
+        Returns:
+            Optional[PackageRecord]: Entrée, ou None si dpkg ne connaît pas le paquet
+        """
+        with self._lock:
+            if not self._refresh():
+                return None
+            return self._lookup(package_name)
+
+    def get_many(self, package_names: Iterable[str]) -> Dict[str, Optional[PackageRecord]]:
+        """
+        Retourne les entrées de plusieurs paquets avec une seule vérification de la base.
+
+        Args:
+            package_names: Noms des paquets
+
+        Returns:
+            Dict[str, Optional[PackageRecord]]: Nom -> entrée (None si inconnu)
+        """
+        with self._lock:
+            if not self._refresh():
+                return {name: None for name in package_names}
+            return {name: self._lookup(name) for name in package_names}
+
+    def _lookup(self, package_name: str) -> Optional[PackageRecord]:
+        record = self._by_qualified.get(package_name)
+        if record is not None:
+            return record
+        instances = self._by_name.get(package_name)
+        if not instances:
+            return None
+        for instance in instances:
+            if instance.installed:
+                return instance
+        return instances[0]
+
+    def invalidate(self) -> None:
+        """Force la relecture de la base au prochain accès."""
+        with self._lock:
+            self._signature = None
+
+
+# Index unique par processus plugin
+DPKG_STATUS = DpkgStatusIndex()
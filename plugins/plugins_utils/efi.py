@@ -38,10 +38,10 @@ class EfiCommands(PluginsUtilsBase):
         }
         missing = []
         for cmd, attr_name in cmds_to_check.items():
-            success, path, _ = self.run(['which', cmd], check=False, no_output=True, error_as_warning=True)
-            if success and path.strip():
-                setattr(self, attr_name, path.strip())
-                self.log_debug(f"Commande '{cmd}' trouvée: {path.strip()}", log_levels=log_levels)
+            path = self.which(cmd)
+            if path:
+                setattr(self, attr_name, path)
+                self.log_debug(f"Commande '{cmd}' trouvée: {path}", log_levels=log_levels)
             else:
                 missing.append(cmd)
                 setattr(self, attr_name, None)
@@ -113,6 +113,7 @@ encodage: str = "utf-8", log_levels: Optional[Dict[str, str]] = None) -> bool:
         items_processed = 0
         errors_encountered = 0
         log_interval = 1000
+        debug_enabled = self.is_log_enabled("debug")
 
         try:
             for dirpath, dirnames, filenames in os.walk(str(dir_path), topdown=True, followlinks=follow_symlinks, onerror=self.log_warning):
@@ -130,12 +131,12 @@ encodage: str = "utf-8", log_levels: Optional[Dict[str, str]] = None) -> bool:
                         total_size += os.path.getsize(fp)
                     except OSError as e:
                          if e.errno != 2: # Ignorer FileNotFoundError (peut arriver si fichier supprimé pendant scan)
-                              self.log_warning(f"Erreur d'accès au fichier {fp} pendant calcul taille: {e}", log_levels=log_levels)
+                              self.log_warning("Erreur d'accès au fichier %s pendant calcul taille: %s", fp, e, log_levels=log_levels)
                               errors_encountered += 1
                          continue # Ignorer les fichiers inaccessibles/disparus
 
-                    if items_processed % log_interval == 0:
-                         self.log_debug(f"  ... {items_processed} éléments scannés, taille actuelle: {total_size / (1024*1024):.2f} Mo", log_levels=log_levels)
+                    if debug_enabled and items_processed % log_interval == 0:
+                         self.log_debug("  ... %d éléments scannés, taille actuelle: %.2f Mo", items_processed, total_size / (1024*1024), log_levels=log_levels)
 
                 # Si on ne suit pas les liens, exclure les répertoires qui sont des liens
                 if not follow_symlinks:
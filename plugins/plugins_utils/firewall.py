@@ -27,9 +27,9 @@ class FirewallCommands(PluginsUtilsBase):
     def _check_commands(self):
         """Vérifie si la commande ufw est disponible et stocke son chemin."""
         cmd = 'ufw'
-        success, path, _ = self.run(['which', cmd], check=False, no_output=True, error_as_warning=True)
-        if success and path.strip():
-            self._ufw_cmd_path = path.strip()
+        path = self.which(cmd)
+        if path:
+            self._ufw_cmd_path = path
             self.log_debug(f"Commande '{cmd}' trouvée: {self._ufw_cmd_path}", log_levels=log_levels)
         else:
             self.log_error(f"Commande '{cmd}' non trouvée. Ce module ne fonctionnera pas. "
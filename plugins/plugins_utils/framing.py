@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Protocole de sortie tramé (optionnel) entre les plugins et les exécuteurs.
+
+Chaque enregistrement est précédé d'un en-tête binaire fixe:
+    MAGIC (3 octets) | type (1 octet) | longueur du contenu (4 octets, big-endian)
+Le contenu d'un enregistrement de log est l'objet JSON complet, décodé une
+seule fois côté exécuteur puis transmis tel quel jusqu'à LoggerUtils.
+
+Le protocole n'est utilisé que si l'exécuteur le demande via la variable
+d'environnement PCUTILS_FRAMING; sinon la sortie JSONL texte reste la norme.
+Toute donnée hors trame (print, sortie de commande...) reste lisible comme
+des lignes de texte par le décodeur.
+
+Ces constantes sont aussi utilisées par le décodeur de l'interface
+(ui/utils/framing.py): ce module ne doit dépendre que de la bibliothèque standard.
+"""
+
+import os
+import json
+import struct
+from typing import Any, Dict
+
+# Variable d'environnement utilisée par l'exécuteur pour demander le tramage
+FRAMING_ENV_VAR = "PCUTILS_FRAMING"
+FRAMING_BINARY = "binary"
+FRAMING_VERSION = 1
+
+# En-tête de trame
+FRAME_MAGIC = b"\x1ePF"
+FRAME_HEADER = struct.Struct(">3sBI")
+FRAME_MAX_SIZE = 16 * 1024 * 1024
+
+# Types d'enregistrement
+FRAME_TYPE_HELLO = 0x00
+FRAME_TYPE_LOG = 0x01
+FRAME_TYPE_TEXT = 0x02
+
+
+def framing_requested() -> bool:
+    """
+    Indique si l'exécuteur a demandé la sortie tramée.
+
+    Returns:
+        bool: True si PCUTILS_FRAMING vaut 'binary'
+    """
+    return os.environ.get(FRAMING_ENV_VAR, "").lower() == FRAMING_BINARY
+
+
+def encode_frame(frame_type: int, payload: bytes) -> bytes:
+    """
+    Construit une trame complète (en-tête + contenu).
+
+    Args:
+        frame_type: Type d'enregistrement (FRAME_TYPE_*)
+        payload: Contenu brut de la trame
+
+    Returns:
+        bytes: Trame prête à être écrite sur stdout
+    """
+    if len(payload) > FRAME_MAX_SIZE:
+        raise ValueError(f"Trame trop grande: {len(payload)} octets")
+    return FRAME_HEADER.pack(FRAME_MAGIC, frame_type, len(payload)) + payload
+
+
+def encode_log_record(record: Dict[str, Any]) -> bytes:
+    """
+    Encode un enregistrement de log (dictionnaire) dans une trame LOG.
+
+    Args:
+        record: Entrée de log (level, message, plugin_name, ...)
+
+    Returns:
+        bytes: Trame encodée
+    """
+    payload = json.dumps(record, ensure_ascii=False).encode('utf-8')
+    return encode_frame(FRAME_TYPE_LOG, payload)
+
+
+def encode_hello() -> bytes:
+    """
+    Encode la trame d'ouverture confirmant l'activation du protocole.
+
+    Returns:
+        bytes: Trame HELLO
+    """
+    payload = json.dumps({"protocol": "pcutils-frames", "version": FRAMING_VERSION}).encode('utf-8')
+    return encode_frame(FRAME_TYPE_HELLO, payload)
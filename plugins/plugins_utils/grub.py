@@ -51,7 +51,7 @@ class GrubCommands(PluginsUtilsBase):
         cmds = ['grub-install', 'update-grub', 'grub-mkconfig', 'blkid']
         missing = []
         for cmd in cmds:
-            success, _, _ = self.run(['which', cmd], check=False, no_output=True, error_as_warning=True)
+            success = self.which(cmd) is not None
             if not success:
                 missing.append(cmd)
         if missing:
@@ -77,8 +77,8 @@ class GrubCommands(PluginsUtilsBase):
         cmd_update: Optional[List[str]] = None
 
         # Détecter la commande à utiliser
-        update_grub_exists, _, _ = self.run(['which', 'update-grub'], check=False, no_output=True, error_as_warning=True)
-        grub_mkconfig_exists, _, _ = self.run(['which', 'grub-mkconfig'], check=False, no_output=True, error_as_warning=True)
+        update_grub_exists = self.which('update-grub') is not None
+        grub_mkconfig_exists = self.which('grub-mkconfig') is not None
 
         if update_grub_exists:
              cmd_update = ['update-grub']
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Faits d'hôte partagés par les plugins d'une séquence.
+
+Chaque plugin reconstruisait les mêmes informations (SMS choisie dans debconf,
+configuration LRPGN, version du système, paquets clés, imprimantes,
+utilisateurs) pour décider s'il doit s'exécuter. Un fait est désormais calculé
+une seule fois par hôte et par exécution:
+
+- l'interface injecte dans la configuration de chaque plugin la clé host_facts
+  (identifiant d'exécution et, en SSH, les faits déjà connus pour l'hôte);
+- HOST_FACTS.get(nom, runner) retourne le fait connu, sinon le calcule et
+  l'enregistre dans un fichier d'état sur l'hôte, où les plugins suivants le
+  retrouvent; en SSH, l'interface rapatrie ce fichier après chaque plugin.
+
+Chaque fait mémorise la signature (date de modification, taille) des fichiers
+dont il dépend: un fait dont une source a changé depuis (paquet installé,
+debconf modifié, conf.ini réécrit) est recalculé au lieu d'être servi périmé.
+Un fait peut aussi dépendre de familles du cache des commandes: une commande
+modifiante de l'une d'elles (lpadmin pour les imprimantes) l'oublie.
+
+Le dernier plugin de l'exécution sur l'hôte supprime le fichier d'état.
+"""
+
+import os
+import json
+import fcntl
+import glob
+import time
+import socket
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from plugins_utils.command_cache import FAMILY_PRINTERS
+
+# Répertoire des fichiers d'état (persistant entre les processus plugins d'une séquence)
+FACTS_DIR = "/var/tmp"
+FACTS_FILE_PREFIX = "pcutils_facts_"
+# Les fichiers d'exécutions plus anciennes sont supprimés
+FACTS_FILE_MAX_AGE = 24 * 3600
+
+# Clé de configuration injectée par l'interface
+CONFIG_KEY = "host_facts"
+
+# Noms des faits standards
+FACT_OS_RELEASE = "os_release"
+FACT_HOSTNAME = "hostname"
+FACT_PACKAGES = "packages"
+FACT_PRINTERS = "printers"
+FACT_USERS = "users"
+
+# Paquets dont la version installée fait partie des faits (nom -> version ou None)
+KEY_PACKAGES = ("gend-base-config-debconf", "lara-program", "eset-agent", "eset-endpoint-antivirus",
+                "dovecot-gend", "detox", "cups")
+
+
+class FactSpec(NamedTuple):
+    """Méthode de calcul d'un fait, fichiers et familles de commandes dont il dépend."""
+    gather: Callable[[Any], Any]
+    sources: Tuple[str, ...]
+    families: Tuple[str, ...]
+
+
+# Faits connus: nom -> FactSpec (complété par register_fact)
+FACT_SPECS: Dict[str, FactSpec] = {}
+
+
+def register_fact(name: str, gather: Callable[[Any], Any], sources: Tuple[str, ...] = (),
+                  families: Tuple[str, ...] = ()) -> None:
+    """
+    Déclare un fait d'hôte.
+
+    Args:
+        name: Nom du fait
+        gather: Fonction de calcul, appelée avec une instance de PluginsUtilsBase;
+                sa valeur doit être sérialisable en JSON
+        sources: Fichiers dont le fait dépend (recalcul si l'un d'eux change)
+        families: Familles du cache des commandes (FAMILY_*) dont une commande
+                  modifiante rend le fait périmé
+    """
+    FACT_SPECS[name] = FactSpec(gather, tuple(sources), tuple(families))
+
+
+def _source_signatures(sources: Tuple[str, ...]) -> Dict[str, Optional[List[int]]]:
+    signatures: Dict[str, Optional[List[int]]] = {}
+    for path in sources:
+        try:
+            st = os.stat(path)
+            signatures[path] = [st.st_mtime_ns, st.st_size]
+        except OSError:
+            signatures[path] = None
+    return signatures
+
+
+class HostFacts:
+    """
+    Faits de l'hôte local pour l'exécution en cours.
+    Sans identifiant d'exécution (plugin lancé seul), les faits ne sont
+    conservés que pour la durée du processus.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.configure(None)
+
+    def configure(self, settings: Optional[Dict[str, Any]]) -> None:
+        """
+        Active le partage des faits à partir de la configuration du plugin.
+
+        Args:
+            settings: Valeur de la clé host_facts ({id, facts, last}), ou None
+        """
+        settings = settings if isinstance(settings, dict) else {}
+        run_id = str(settings.get("id") or "")
+        self.run_id = run_id if run_id.isalnum() else ""
+        # Dernier plugin de l'exécution sur l'hôte: supprimer le fichier d'état en fin de plugin
+        self.discard_at_end = bool(self.run_id and settings.get("last"))
+        injected = settings.get("facts")
+        self._facts: Dict[str, Dict[str, Any]] = {
+            name: entry for name, entry in (injected.items() if isinstance(injected, dict) else [])
+            if isinstance(entry, dict) and "value" in entry
+        }
+        if self.run_id:
+            self._prune_stale_files()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.run_id)
+
+    @property
+    def state_path(self) -> str:
+        return os.path.join(FACTS_DIR, f"{FACTS_FILE_PREFIX}{self.run_id}.json")
+
+    def _prune_stale_files(self) -> None:
+        """Supprime les fichiers de faits d'exécutions anciennes."""
+        limit = time.time() - FACTS_FILE_MAX_AGE
+        for path in glob.glob(os.path.join(FACTS_DIR, f"{FACTS_FILE_PREFIX}*.json")):
+            try:
+                if os.stat(path).st_mtime < limit:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    @contextmanager
+    def _locked_state(self, create: bool = True) -> Iterator[Dict[str, Any]]:
+        """
+        Ouvre le fichier d'état sous verrou exclusif et le réécrit en sortie s'il
+        a été modifié. Le fichier est créé en 0600 (si create); un lien
+        symbolique ou un fichier d'un autre propriétaire est refusé.
+        """
+        flags = os.O_RDWR | os.O_NOFOLLOW | (os.O_CREAT if create else 0)
+        fd = os.open(self.state_path, flags, 0o600)
+        with os.fdopen(fd, "r+", encoding="utf-8") as f:
+            if os.fstat(f.fileno()).st_uid not in (os.geteuid(), 0):
+                raise PermissionError(f"Fichier de faits d'un autre utilisateur: {self.state_path}")
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            content = f.read()
+            try:
+                state = json.loads(content) if content.strip() else {}
+            except ValueError:
+                state = {}
+            if not isinstance(state, dict):
+                state = {}
+            before = json.dumps(state, sort_keys=True)
+            yield state
+            after = json.dumps(state, sort_keys=True)
+            if after != before or not content.strip():
+                f.seek(0)
+                f.truncate()
+                f.write(after)
+
+    @staticmethod
+    def _is_current(entry: Optional[Dict[str, Any]], spec: FactSpec) -> bool:
+        """True si aucune source du fait n'a changé depuis son calcul."""
+        if not isinstance(entry, dict) or "value" not in entry:
+            return False
+        return entry.get("sources", {}) == _source_signatures(spec.sources)
+
+    def get(self, name: str, runner) -> Any:
+        """
+        Retourne un fait, calculé au plus une fois par hôte et par exécution.
+
+        Args:
+            name: Nom du fait (voir FACT_SPECS)
+            runner: Instance de PluginsUtilsBase utilisée pour le calcul
+
+        Returns:
+            Any: Valeur du fait
+        """
+        spec = FACT_SPECS[name]
+        with self._lock:
+            entry = self._facts.get(name)
+            if self._is_current(entry, spec):
+                return entry["value"]
+
+            if self.enabled:
+                entry = self._shared(name, runner)
+                if self._is_current(entry, spec):
+                    self._facts[name] = entry
+                    return entry["value"]
+
+            entry = self._gather(name, spec, runner)
+            self._facts[name] = entry
+            if self.enabled:
+                self._shared(name, runner, entry)
+            return entry["value"]
+
+    def _shared(self, name: str, runner, entry: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Lit un fait dans le fichier d'état, ou l'y enregistre si entry est fourni (sous verrou)."""
+        try:
+            with self._locked_state(create=entry is not None) as state:
+                if entry is None:
+                    return state.get(name)
+                state[name] = entry
+        except FileNotFoundError:
+            # Aucun fait encore enregistré pour cette exécution
+            pass
+        except OSError as e:
+            runner.log_debug(f"Faits d'hôte non partagés: {e}")
+        return None
+
+    @staticmethod
+    def _gather(name: str, spec: FactSpec, runner) -> Dict[str, Any]:
+        # Signatures relevées avant le calcul: une modification concurrente force un recalcul
+        sources = _source_signatures(spec.sources)
+        runner.log_debug(f"Calcul du fait d'hôte {name}")
+        return {"value": spec.gather(runner), "sources": sources, "at": time.time()}
+
+    def value(self, name: str, default: Any = None) -> Any:
+        """Valeur d'un fait déjà connu (injecté ou calculé), sans calcul ni vérification des sources."""
+        with self._lock:
+            entry = self._facts.get(name)
+            return entry["value"] if entry else default
+
+    def forget(self, names: Optional[List[str]] = None) -> None:
+        """
+        Oublie des faits (tous si None), localement et dans le fichier d'état.
+        Le fichier garde une marque pour chaque fait oublié: l'interface cesse
+        alors de l'injecter aux plugins suivants (exécution SSH).
+        """
+        with self._lock:
+            forgotten = set(self._facts) if names is None else set(names)
+            for name in forgotten:
+                self._facts.pop(name, None)
+            if not self.enabled:
+                return
+            try:
+                with self._locked_state() as state:
+                    if names is None:
+                        forgotten.update(state)
+                    for name in forgotten:
+                        state[name] = {"forgotten": time.time()}
+            except OSError:
+                pass
+
+    def invalidate_families(self, families: Iterable[str]) -> None:
+        """
+        Oublie les faits qui dépendent de familles du cache des commandes
+        (appelée après une commande modifiante).
+
+        Args:
+            families: Familles invalidées (FAMILY_*)
+        """
+        families = set(families)
+        names = [name for name, spec in FACT_SPECS.items() if families.intersection(spec.families)]
+        if names:
+            self.forget(names)
+
+    def discard(self) -> None:
+        """Supprime le fichier d'état (fin de l'exécution sur l'hôte)."""
+        if not self.enabled:
+            return
+        try:
+            os.remove(self.state_path)
+        except OSError:
+            pass
+
+
+def _gather_os_release(runner) -> Dict[str, str]:
+    release: Dict[str, str] = {}
+    try:
+        with open("/etc/os-release", encoding="utf-8") as f:
+            for line in f:
+                key, sep, value = line.strip().partition("=")
+                if sep and key and not key.startswith("#"):
+                    release[key] = value.strip().strip('"\'')
+    except OSError:
+        pass
+    return release
+
+
+def _gather_hostname(runner) -> str:
+    return socket.gethostname()
+
+
+def _gather_packages(runner) -> Dict[str, Optional[str]]:
+    from plugins_utils.apt import AptCommands
+    return AptCommands(runner.logger, runner.target_ip).get_installed_versions(list(KEY_PACKAGES))
+
+
+def _gather_printers(runner) -> List[str]:
+    from plugins_utils.printers import PrinterCommands
+    try:
+        return PrinterCommands(runner.logger, runner.target_ip).list_printers()
+    except FileNotFoundError:
+        # CUPS absent: aucune imprimante
+        return []
+
+
+def _gather_users(runner) -> List[str]:
+    import pwd
+    # Comptes utilisateurs (hors comptes système et nobody)
+    return sorted(entry.pw_name for entry in pwd.getpwall() if 1000 <= entry.pw_uid < 65534)
+
+
+register_fact(FACT_OS_RELEASE, _gather_os_release, ("/etc/os-release",))
+register_fact(FACT_HOSTNAME, _gather_hostname, ("/etc/hostname",))
+register_fact(FACT_PACKAGES, _gather_packages, ("/var/lib/dpkg/status",))
+# printers.conf est réécrit par cupsd de façon asynchrone: se fier aux commandes lpadmin & co
+register_fact(FACT_PRINTERS, _gather_printers, families=(FAMILY_PRINTERS,))
+register_fact(FACT_USERS, _gather_users, ("/etc/passwd",))
+
+
+# Faits uniques par processus plugin (configurés par Main)
+HOST_FACTS = HostFacts()
@@ -11,7 +11,6 @@ from plugins_utils.plugins_utils_base import PluginsUtilsBase
 import os
 import re
 import tempfile
-import shutil
 import shlex # Pour échapper les arguments
 from pathlib import Path
 from typing import Union, Optional, List, Dict, Any, Tuple, Generator
@@ -31,12 +30,10 @@ class LdapCommands(PluginsUtilsBase):
     def __init__(self, logger=None, target_ip=None):
         """Initialise le gestionnaire LDAP."""
         super().__init__(logger, target_ip)
-        # Vérifier la présence des commandes nécessaires
-        self._cmd_paths: Dict[str, Optional[str]] = {}
 
-    def _get_cmd_path(self, tool_name: str) -> Optional[str]:
+    def _get_cmd_path(self, tool_name: str, log_levels: Optional[Dict[str, str]] = None) -> Optional[str]:
         """Récupère le chemin d'une commande LDAP, loggue une erreur si absente."""
-        path = shutil.which(tool_name)
+        path = self.which(tool_name)
         if not path:
              self.log_error(f"Commande '{tool_name}' non trouvée ou non initialisée.", log_levels=log_levels)
         return path
@@ -213,7 +213,7 @@ pattern: str = "*.log*", log_levels: Optional[Dict[str, str]] = None) -> List[st
         if not self._archive_manager:
             self.log_error("Le module ArchiveCommands n'est pas disponible pour créer l'archive.", log_levels=log_levels)
             # Fallback possible avec tar directement?
-            if 'tar' not in self._cmd_paths:
+            if not self.which('tar'):
                  self.log_error("Commande 'tar' non trouvée, impossible d'archiver.", log_levels=log_levels)
                  return False
             # Utiliser tar directement si ArchiveCommands n'est pas là
@@ -385,11 +385,12 @@ dry_run: bool = True, log_levels: Optional[Dict[str, str]] = None) -> bool:
 
     def journald_vacuum_time(self, time_spec: str, log_levels: Optional[Dict[str, str]] = None) -> bool:
         """Supprime les entrées journald plus anciennes qu'une date/durée."""
-        if not self._cmd_paths.get('journalctl'):
+        journalctl = self.which('journalctl')
+        if not journalctl:
             self.log_error("Commande 'journalctl' non trouvée.", log_levels=log_levels)
             return False
         self.log_info(f"Suppression des entrées journald antérieures à '{time_spec}' (journalctl --vacuum-time)", log_levels=log_levels)
-        cmd = [self._cmd_paths['journalctl'], f"--vacuum-time={time_spec}"]
+        cmd = [journalctl, f"--vacuum-time={time_spec}"]
         success, stdout, stderr = self.run(cmd, check=False, needs_sudo=True)
         if stdout: self.log_info(f"Sortie journalctl vacuum-time:\n{stdout}", log_levels=log_levels)
         if success:
@@ -485,21 +486,22 @@ max_lines: int = 100, log_levels: Optional[Dict[str, str]] = None) -> List[str]:
         error_lines = []
 
         if is_journald:
-            if not self._cmd_paths.get('journalctl'):
+            journalctl = self.which('journalctl')
+            if not journalctl:
                  self.log_error("Commande 'journalctl' non trouvée.", log_levels=log_levels)
                  return []
-            cmd = [self._cmd_paths['journalctl'], '--no-pager', '-p', 'err..alert']
+            cmd = [journalctl, '--no-pager', '-p', 'err..alert']
             if time_since:
                  cmd.extend(['--since', time_since])
-            success, stdout, stderr = self.run(cmd, check=False, no_output=True, needs_sudo=True)
-            if success:
-                for line in stdout.splitlines():
+            # Lecture au fil de l'eau: journalctl est interrompu dès max_lines atteint
+            with self.run_stream(cmd, needs_sudo=True, stderr_tail=20) as stream:
+                for line in stream:
                     if any(pattern.search(line) for pattern in compiled_patterns):
                         error_lines.append(line)
                         if len(error_lines) >= max_lines:
                             break
-            else:
-                self.log_error(f"Erreur lors de la lecture du journald: {stderr}", log_levels=log_levels)
+            if not stream.success and not stream.stopped_early:
+                self.log_error(f"Erreur lors de la lecture du journald: {stream.stderr}", log_levels=log_levels)
         else:
             log_path = Path(target)
             if not log_path.is_file():
@@ -62,7 +62,7 @@ class LvmCommands(PluginsUtilsBase):
         ]
         missing = []
         for cmd in cmds:
-            success, _, _ = self.run(['which', cmd], check=False, no_output=True, error_as_warning=True)
+            success = self.which(cmd) is not None
             if not success:
                 missing.append(cmd)
         if missing:
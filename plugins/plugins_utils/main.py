@@ -3,6 +3,11 @@ import sys
 import json
 import traceback
 from plugins_utils import plugin_logger
+from plugins_utils import framing
+from plugins_utils.command_trace import COMMAND_TRACE
+from plugins_utils.apt_transaction import APT_TRANSACTION, CONFIG_KEY as APT_TRANSACTION_KEY
+from plugins_utils.apt_archives import CONFIG_KEY as APT_ARCHIVES_KEY
+from plugins_utils.host_facts import HOST_FACTS, CONFIG_KEY as HOST_FACTS_KEY
 
 
 
@@ -41,15 +46,63 @@ class Main:
         self.logger.ssh_mode = config.get('ssh_mode', False)
         self.logger.text_mode=config.get("text_mode", False)
         self.logger.init_logs()
+        # Passer à la sortie tramée si l'exécuteur la demande (sinon JSONL)
+        if framing.framing_requested() and not self.logger.text_mode:
+            self.logger.enable_framing()
         icon = config.get('icon', '')
         name = config.get('name', '')
         self.logger.start(f"Lancement du plugin {name}")
-        returnValue=self.plugin.run(config,self.logger,self.target_ip)
+        COMMAND_TRACE.reset()
+        # Transaction apt partagée avec les autres plugins de la séquence sur cet hôte
+        APT_TRANSACTION.configure(config['config'].get(APT_TRANSACTION_KEY), requester=config.get('plugin_name', ''))
+        # Faits d'hôte partagés avec les autres plugins de l'exécution
+        HOST_FACTS.configure(config['config'].get(HOST_FACTS_KEY))
+        if config['config'].get(APT_ARCHIVES_KEY):
+            self.seed_apt_archives(config['config'][APT_ARCHIVES_KEY])
+        try:
+            returnValue=self.plugin.run(config,self.logger,self.target_ip)
+        finally:
+            # Même si le plugin lève une exception, le dernier plugin de l'hôte
+            # doit appliquer les installations différées et supprimer le fichier d'état
+            if APT_TRANSACTION.flush_at_end:
+                self.flush_apt_transaction()
+            # Dernier plugin de l'exécution sur l'hôte: les faits partagés ne servent plus
+            if HOST_FACTS.discard_at_end:
+                HOST_FACTS.discard()
+            # Résumé du temps passé dans les commandes externes, affiché par l'interface
+            # (surtout utile quand le plugin a échoué)
+            summary=COMMAND_TRACE.summary()
+            if summary["commands"]:
+                self.logger.profile(summary)
+                self.logger.flush()
         self.logger.end(f"Fin d'exécution du plugin {name}")
         self.logger.shutdown()
 
         return returnValue
 
+    def seed_apt_archives(self, source_dir):
+        """Ajoute au cache apt les paquets déposés par le contrôleur (exécution SSH)."""
+        try:
+            from plugins_utils.plugins_utils_base import PluginsUtilsBase
+            from plugins_utils.apt_archives import seed_apt_archives
+            seed_apt_archives(PluginsUtilsBase(self.logger, self.target_ip), source_dir)
+        except Exception as e:
+            self.logger.warning(f"Amorçage du cache apt impossible: {e}")
+            self.logger.debug(traceback.format_exc())
+
+    def flush_apt_transaction(self):
+        """Dernier plugin de la séquence sur l'hôte: appliquer les installations différées restantes."""
+        try:
+            if APT_TRANSACTION.has_pending():
+                from plugins_utils.apt import AptCommands
+                self.logger.info("Application des installations apt différées de la séquence")
+                AptCommands(self.logger, self.target_ip).apply_transaction(include_declared=False)
+        except Exception as e:
+            self.logger.error(f"Erreur lors de l'application de la transaction apt: {e}")
+            self.logger.debug(traceback.format_exc())
+        finally:
+            APT_TRANSACTION.discard()
+
     def argparse(self):
         try:
             parser = argparse.ArgumentParser()
@@ -7,9 +7,40 @@ Module utilitaire pour les fonctions métier
 from plugins_utils.plugins_utils_base import PluginsUtilsBase
 from plugins_utils.dpkg import DpkgCommands
 from plugins_utils.config_files import ConfigFileCommands
+from plugins_utils.debconf_db import DEBCONF_CONFIG
+from plugins_utils.host_facts import (HOST_FACTS, register_fact, FACT_OS_RELEASE, FACT_HOSTNAME, FACT_PACKAGES,
+                                      FACT_PRINTERS, FACT_USERS)
 import traceback
 LRPGN_CONFIG_FILE = "/usr/lib/lrpgn/travail/configuration/conf.ini"
 
+# Faits d'hôte métier (calculés une fois par hôte et par exécution)
+FACT_SMS = "sms"
+FACT_LRPGN = "lrpgn"
+
+
+def _gather_sms(runner):
+    """Liste des SMS choisies dans debconf (gendebconf/srfic)."""
+    current_sms = DpkgCommands(runner.logger, runner.target_ip).get_debconf_value("gend-base-config-debconf", "gendebconf/srfic")
+    if current_sms is None:
+        return []
+    return current_sms.split(';')
+
+
+def _gather_lrpgn(runner):
+    """Dossiers de configuration et de procédures de LRPGN (conf.ini)."""
+    cfc = ConfigFileCommands(runner.logger, runner.target_ip)
+    lrpgn = {}
+    for fact_key, ini_key in (("configuration", "dossier.configuration"), ("procedures", "dossier.procedures")):
+        try:
+            lrpgn[fact_key] = cfc.get_ini_value(LRPGN_CONFIG_FILE, "DEFAULT", ini_key)
+        except Exception:
+            lrpgn[fact_key] = ""
+    return lrpgn
+
+
+register_fact(FACT_SMS, _gather_sms, (DEBCONF_CONFIG,))
+register_fact(FACT_LRPGN, _gather_lrpgn, (LRPGN_CONFIG_FILE,))
+
 
 class MetierCommands(PluginsUtilsBase):
     """
@@ -19,8 +50,6 @@ class MetierCommands(PluginsUtilsBase):
 
     def __init__(self, logger=None, target_ip=None, config={}):
         super().__init__(logger, target_ip)
-        self.dpkg = DpkgCommands(logger,target_ip)
-        self.cfc = ConfigFileCommands(logger,target_ip)
         self.config = config
         self.is_ssh = config.get('ssh_mode', False)
         self.ssh_sms = config.get("ssh_sms", "ggd027sf012027")
@@ -35,13 +64,13 @@ class MetierCommands(PluginsUtilsBase):
 
     def get_lrpgn_config_line(self):
         try:
-            return self.cfc.get_ini_value(LRPGN_CONFIG_FILE,"DEFAULT", "dossier.configuration")
+            return HOST_FACTS.get(FACT_LRPGN, self).get("configuration")
         except Exception as e:
             return ""
 
     def get_lrpgn_procedures_line(self):
         try:
-            return self.cfc.get_ini_value(LRPGN_CONFIG_FILE,"DEFAULT", "dossier.procedures")
+            return HOST_FACTS.get(FACT_LRPGN, self).get("procedures")
         except Exception as e:
             return ""
 
@@ -71,11 +100,35 @@ class MetierCommands(PluginsUtilsBase):
 
     def get_sms(self):
         try:
-            current_sms=self.dpkg.get_debconf_value("gend-base-config-debconf","gendebconf/srfic")
-            if current_sms is None:
-                return []
-            current_sms_tbl=current_sms.split(';')
-            return current_sms_tbl
+            return list(HOST_FACTS.get(FACT_SMS, self))
         except Exception as e:
             self.logger.debug(traceback.format_exc())
-            return []
\ No newline at end of file
+            return []
+
+    def _get_fact(self, name, default):
+        """Fait d'hôte partagé (calculé une fois par hôte et par exécution), ou default en cas d'erreur."""
+        try:
+            return HOST_FACTS.get(name, self)
+        except Exception as e:
+            self.logger.debug(traceback.format_exc())
+            return default
+
+    def get_os_release(self):
+        """Champs de /etc/os-release (ID, VERSION_ID, ...)."""
+        return dict(self._get_fact(FACT_OS_RELEASE, {}))
+
+    def get_hostname(self):
+        """Nom d'hôte de la machine."""
+        return self._get_fact(FACT_HOSTNAME, "")
+
+    def get_key_packages(self):
+        """Versions installées des paquets clés (nom -> version, None si absent)."""
+        return dict(self._get_fact(FACT_PACKAGES, {}))
+
+    def get_printers(self):
+        """Imprimantes CUPS configurées."""
+        return list(self._get_fact(FACT_PRINTERS, []))
+
+    def get_users(self):
+        """Comptes utilisateurs (hors comptes système)."""
+        return list(self._get_fact(FACT_USERS, []))
\ No newline at end of file
@@ -20,7 +20,10 @@ import shlex
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, Any, Optional, Union, List, Tuple, Deque
-from collections import deque
+from collections import deque, OrderedDict
+
+from plugins_utils.framing import encode_log_record, encode_hello
+from plugins_utils.command_trace import format_summary
 
 # Logger interne pour les problèmes du PluginLogger lui-même
 internal_logger = logging.getLogger(__name__)
@@ -31,6 +34,10 @@ formatter = logging.Formatter('%(levelname)s:%(name)s:%(message)s')
 handler.setFormatter(formatter)
 internal_logger.addHandler(handler)
 
+# Taille maximale d'un fichier log JSONL avant passage à un nouveau fichier
+LOG_MAX_BYTES_ENV_VAR = "PCUTILS_LOG_MAX_BYTES"
+DEFAULT_LOG_MAX_BYTES = 64 * 1024 * 1024
+
 # Couleurs ANSI pour le mode texte
 ANSI_COLORS = {
     "reset": "\033[0m",
@@ -135,6 +142,7 @@ class PluginLogger:
         self.ssh_mode = ssh_mode
         self.bar_width = max(5, bar_width)
         self.text_mode = text_mode # Initialiser avant la détection debugger
+        self.framing = False  # Sortie tramée binaire (négociée par Main)
 
         # Auto-détection du mode debugger
         if debugger_mode is None:
@@ -178,13 +186,20 @@ class PluginLogger:
 
         # Fichiers de logs
         self.log_file: Optional[str] = None
+        self._log_file_base: Optional[str] = None
+        self._log_file_part = 0
+        try:
+            self._log_max_bytes = int(os.environ.get(LOG_MAX_BYTES_ENV_VAR, DEFAULT_LOG_MAX_BYTES))
+        except ValueError:
+            self._log_max_bytes = DEFAULT_LOG_MAX_BYTES
         self.init_logs()
 
         # Verrou pour la synchronisation des écritures (surtout stdout/stderr)
         self._write_lock = threading.RLock()
 
         # Anti-duplication (pour logs texte classiques)
-        self._seen_messages: Dict[tuple, tuple] = {}
+        # Ordonné par dernière occurrence: l'entrée la plus ancienne est en tête
+        self._seen_messages: "OrderedDict[tuple, tuple]" = OrderedDict()
         self._seen_messages_maxlen = 50
 
         # Throttling pour la progression
@@ -269,11 +284,11 @@ class PluginLogger:
                 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
                 log_filename = f"plugin_{self.plugin_name}_{self.instance_id}_{timestamp}.jsonl"
                 self.log_file = str(log_dir_path / log_filename)
+                self._log_file_base = self.log_file[:-len(".jsonl")]
+                self._log_file_part = 0
 
                 # Émettre le chemin en mode SSH pour récupération
-                if self.ssh_mode:
-                    log_path_msg = {"level": "info", "message": f"LOG_FILE:{self.log_file}"}
-                    print(json.dumps(log_path_msg), flush=True)
+                self._announce_log_file()
                 internal_logger.info(f"Fichier log configuré: {self.log_file}")
 
             except Exception as e:
@@ -283,6 +298,25 @@ class PluginLogger:
             internal_logger.error("Impossible de déterminer un répertoire de logs valide")
             self.log_file = None
 
+    def _roll_log_file(self):
+        """
+        Passe au fichier log suivant quand le fichier courant dépasse la taille maximale.
+        Les fichiers pleins sont ensuite compressés par la rotation côté interface.
+        """
+        if not self._log_file_base:
+            return
+        self._log_file_part += 1
+        self.log_file = f"{self._log_file_base}_part{self._log_file_part}.jsonl"
+        # Chaque partie est annoncée comme le premier fichier, pour être récupérée aussi
+        self._announce_log_file()
+        internal_logger.info(f"Nouveau fichier log (taille max atteinte): {self.log_file}")
+
+    def _announce_log_file(self):
+        """Émet le chemin du fichier log courant (LOG_FILE:) en mode SSH."""
+        if self.ssh_mode:
+            log_path_msg = {"level": "info", "message": f"LOG_FILE:{self.log_file}"}
+            print(json.dumps(log_path_msg), flush=True)
+
     def _get_next_message_id_and_time(self) -> Tuple[int, float]:
         """Obtient un ID unique et le timestamp précis pour un message."""
         with self._message_counter_lock:
@@ -347,6 +381,7 @@ class PluginLogger:
         # Les messages sont déjà triés par ID chronologique
         log_lines_to_write = []
         console_outputs = []
+        framed_outputs = []
 
         for level, message, target_ip, _, msg_id, _ in messages:
             # Préparer l'entrée pour le fichier log JSONL
@@ -402,7 +437,10 @@ class PluginLogger:
                 # Supprimer les champs None pour réduire la taille
                 log_entry_stdout = {k: v for k, v in log_entry_stdout.items() if v is not None}
                 try:
-                    console_outputs.append(json.dumps(log_entry_stdout, ensure_ascii=False))
+                    if self.framing:
+                        framed_outputs.append(encode_log_record(log_entry_stdout))
+                    else:
+                        console_outputs.append(json.dumps(log_entry_stdout, ensure_ascii=False))
                 except Exception as json_err:
                      internal_logger.warning(f"Erreur JSON sérialisation stdout: {json_err} - Data: {log_entry_stdout}")
 
@@ -414,6 +452,9 @@ class PluginLogger:
                     with open(self.log_file, 'a', encoding='utf-8') as f:
                         for line in log_lines_to_write:
                             f.write(line + '\n')
+                        log_size = f.tell()
+                    if self._log_max_bytes > 0 and log_size >= self._log_max_bytes:
+                        self._roll_log_file()
                 except Exception as e:
                     internal_logger.error(f"Erreur écriture log {self.log_file}: {e}", exc_info=True)
 
@@ -426,6 +467,37 @@ class PluginLogger:
                 except Exception as e:
                     internal_logger.error(f"Erreur écriture stdout: {e}", exc_info=True)
 
+            # Écrire les trames binaires (après vidage du tampon texte pour garder l'ordre)
+            if framed_outputs:
+                try:
+                    sys.stdout.flush()
+                    sys.stdout.buffer.write(b"".join(framed_outputs))
+                    sys.stdout.buffer.flush()
+                except Exception as e:
+                    internal_logger.error(f"Erreur écriture trames stdout: {e}", exc_info=True)
+
+    def enable_framing(self) -> bool:
+        """
+        Active la sortie tramée binaire à la place du JSONL sur stdout.
+        Sans effet en mode texte ou si stdout n'expose pas de tampon binaire.
+
+        Returns:
+            bool: True si le tramage est actif
+        """
+        if self.text_mode or not hasattr(sys.stdout, 'buffer'):
+            return False
+
+        with self._write_lock:
+            try:
+                sys.stdout.flush()
+                sys.stdout.buffer.write(encode_hello())
+                sys.stdout.buffer.flush()
+            except Exception as e:
+                internal_logger.warning(f"Impossible d'activer le tramage: {e}")
+                return False
+            self.framing = True
+        return True
+
     def _emit_log(self, level: str, message: Any, target_ip: Optional[str] = None, force_flush: bool = False):
         """
         Met un message dans la file d'attente pour traitement chronologique ou le traite immédiatement en mode débogueur.
@@ -457,6 +529,7 @@ class PluginLogger:
             if now - last_seen_time < 1.0 and count >= 3:
                  # Mettre à jour le compteur mais ne pas émettre
                  self._seen_messages[message_key] = (now, count + 1)
+                 self._seen_messages.move_to_end(message_key)
                  # Logguer occasionnellement un résumé
                  if count % 20 == 0: # Logguer toutes les 20 répétitions ignorées
                      summary_msg = f"Message répété {count+1} fois: {message}"
@@ -466,13 +539,10 @@ class PluginLogger:
 
             # Mettre à jour le cache de messages vus
             self._seen_messages[message_key] = (now, count + 1)
-            # Limiter la taille du cache
+            self._seen_messages.move_to_end(message_key)
+            # Limiter la taille du cache (éviction de la plus ancienne occurrence, O(1))
             if len(self._seen_messages) > self._seen_messages_maxlen:
-                try:
-                    oldest_key = min(self._seen_messages, key=lambda k: self._seen_messages[k][0])
-                    del self._seen_messages[oldest_key]
-                except ValueError: # Peut arriver si le dict est vide, très rare
-                    pass
+                self._seen_messages.popitem(last=False)
 
         # Mettre en file d'attente : (level, message, target_ip, force_flush, message_id, timestamp)
         self._message_queue.put((level, message, target_ip, force_flush, msg_id, timestamp))
@@ -480,82 +550,141 @@ class PluginLogger:
     # --- Méthodes publiques de logging ---
     # Elles appellent toutes _emit_log
 
-    def info(self, message: str, target_ip: Optional[str] = None, force_flush: bool = False, log_levels: Optional[Dict[str, str]] = None):
+    def is_enabled(self, level: str) -> bool:
+        """
+        Indique si un niveau de log produit une sortie (test peu coûteux).
+        Permet d'éviter de construire des messages coûteux qui seraient ignorés.
+
+        Args:
+            level: Niveau du message (debug, info, ...)
+
+        Returns:
+            bool: True si les messages de ce niveau sont émis
+        """
+        if level.lower() == "debug":
+            return self.debug_mode
+        return True
+
+    @staticmethod
+    def _render_message(message: Any, args: tuple) -> Any:
+        """
+        Construit le message final à partir d'un message paresseux.
+
+        Args:
+            message: Chaîne (éventuellement avec %s) ou callable retournant le message
+            args: Arguments de formatage %
+
+        Returns:
+            Any: Message formaté (str, ou dict inchangé pour la progression)
+        """
+        if callable(message):
+            message = message()
+        if args:
+            try:
+                return message % args
+            except (TypeError, ValueError):
+                return " ".join([str(message)] + [str(arg) for arg in args])
+        return message
+
+    def info(self, message: Any, *args: Any, target_ip: Optional[str] = None, force_flush: bool = False, log_levels: Optional[Dict[str, str]] = None):
         """
         Enregistre un message d'information.
 
         Args:
-            message: Le message à enregistrer
+            message: Le message à enregistrer (chaîne avec %s ou callable évalué à la demande)
+            *args: Arguments de formatage %, appliqués seulement si le message est émis
             target_ip: Adresse IP cible optionnelle (pour SSH)
             force_flush: Force l'écriture immédiate (bypasse la file d'attente)
         """
-        self._emit_log("info", message, target_ip, force_flush)
+        self._emit_log("info", self._render_message(message, args), target_ip, force_flush)
 
-    def warning(self, message: str, target_ip: Optional[str] = None, force_flush: bool = False, log_levels: Optional[Dict[str, str]] = None):
+    def warning(self, message: Any, *args: Any, target_ip: Optional[str] = None, force_flush: bool = False, log_levels: Optional[Dict[str, str]] = None):
         """
         Enregistre un message d'avertissement.
 
         Args:
-            message: Le message à enregistrer
+            message: Le message à enregistrer (chaîne avec %s ou callable évalué à la demande)
+            *args: Arguments de formatage %, appliqués seulement si le message est émis
             target_ip: Adresse IP cible optionnelle (pour SSH)
             force_flush: Force l'écriture immédiate (bypasse la file d'attente)
         """
-        self._emit_log("warning", message, target_ip, force_flush)
+        self._emit_log("warning", self._render_message(message, args), target_ip, force_flush)
 
-    def error(self, message: str, target_ip: Optional[str] = None, force_flush: bool = False, log_levels: Optional[Dict[str, str]] = None):
+    def error(self, message: Any, *args: Any, target_ip: Optional[str] = None, force_flush: bool = False, log_levels: Optional[Dict[str, str]] = None):
         """
         Enregistre un message d'erreur.
 
         Args:
-            message: Le message à enregistrer
+            message: Le message à enregistrer (chaîne avec %s ou callable évalué à la demande)
+            *args: Arguments de formatage %, appliqués seulement si le message est émis
             target_ip: Adresse IP cible optionnelle (pour SSH)
             force_flush: Force l'écriture immédiate (par défaut True pour les erreurs)
         """
-        self._emit_log("error", message, target_ip, force_flush)
+        self._emit_log("error", self._render_message(message, args), target_ip, force_flush)
 
-    def success(self, message: str, target_ip: Optional[str] = None, force_flush: bool = False, log_levels: Optional[Dict[str, str]] = None):
+    def success(self, message: Any, *args: Any, target_ip: Optional[str] = None, force_flush: bool = False, log_levels: Optional[Dict[str, str]] = None):
         """
         Enregistre un message de succès.
 
         Args:
-            message: Le message à enregistrer
+            message: Le message à enregistrer (chaîne avec %s ou callable évalué à la demande)
+            *args: Arguments de formatage %, appliqués seulement si le message est émis
             target_ip: Adresse IP cible optionnelle (pour SSH)
             force_flush: Force l'écriture immédiate (par défaut True pour les succès)
         """
-        self._emit_log("success", message, target_ip, force_flush)
+        self._emit_log("success", self._render_message(message, args), target_ip, force_flush)
 
-    def debug(self, message: str, target_ip: Optional[str] = None, log_levels: Optional[Dict[str, str]] = None):
+    def debug(self, message: Any, *args: Any, target_ip: Optional[str] = None, log_levels: Optional[Dict[str, str]] = None):
         """
         Enregistre un message de débogage (uniquement si debug_mode=True).
 
         Args:
-            message: Le message à enregistrer
+            message: Le message à enregistrer (chaîne avec %s ou callable évalué à la demande)
+            *args: Arguments de formatage %, appliqués seulement si le message est émis
             target_ip: Adresse IP cible optionnelle (pour SSH)
         """
         if self.debug_mode:
-            self._emit_log("debug", message, target_ip)
+            self._emit_log("debug", self._render_message(message, args), target_ip)
 
-    def start(self, message: str, target_ip: Optional[str] = None, force_flush: bool = False, log_levels: Optional[Dict[str, str]] = None):
+    def start(self, message: Any, *args: Any, target_ip: Optional[str] = None, force_flush: bool = False, log_levels: Optional[Dict[str, str]] = None):
         """
         Enregistre un message de début d'opération.
 
         Args:
-            message: Le message à enregistrer
+            message: Le message à enregistrer (chaîne avec %s ou callable évalué à la demande)
+            *args: Arguments de formatage %, appliqués seulement si le message est émis
             target_ip: Adresse IP cible optionnelle (pour SSH)
             force_flush: Force l'écriture immédiate (par défaut True pour début d'opération)
         """
-        self._emit_log("start", message, target_ip, force_flush)
+        self._emit_log("start", self._render_message(message, args), target_ip, force_flush)
 
-    def end(self, message: str, target_ip: Optional[str] = None, force_flush: bool = False, log_levels: Optional[Dict[str, str]] = None):
+    def end(self, message: Any, *args: Any, target_ip: Optional[str] = None, force_flush: bool = False, log_levels: Optional[Dict[str, str]] = None):
         """
         Enregistre un message de fin d'opération.
 
         Args:
-            message: Le message à enregistrer
+            message: Le message à enregistrer (chaîne avec %s ou callable évalué à la demande)
+            *args: Arguments de formatage %, appliqués seulement si le message est émis
             target_ip: Adresse IP cible optionnelle (pour SSH)
             force_flush: Force l'écriture immédiate (par défaut True pour fin d'opération)
         """
-        self._emit_log("end", message, target_ip, force_flush)
+        self._emit_log("end", self._render_message(message, args), target_ip, force_flush)
+
+    def profile(self, summary: Dict[str, Any], target_ip: Optional[str] = None, log_levels: Optional[Dict[str, str]] = None):
+        """
+        Émet le résumé du profil des commandes externes (voir command_trace).
+        En JSONL, le résumé est transmis tel quel (niveau "profile") pour être
+        mis en forme par l'interface; en mode texte, il est affiché ligne par ligne.
+
+        Args:
+            summary: Résumé produit par CommandTrace.summary()
+            target_ip: Adresse IP cible optionnelle (pour SSH)
+        """
+        if self.text_mode:
+            for line in format_summary(summary):
+                self._emit_log("info", line, target_ip)
+            return
+        self._emit_log("profile", summary, target_ip)
 
     # --- Gestion Progression Numérique (pour JSONL) ---
 
@@ -17,23 +17,55 @@ import queue  # Pour le traitement par lots des sorties
 import select # Pour la lecture non-bloquante des flux
 import sys
 import asyncio
+import json
 from typing import Union, Optional, List, Tuple, Dict, Any, Set
 
 from plugins_utils.plugin_logger import PluginLogger, is_debugger_active
+from plugins_utils.privileged_broker import get_privileged_broker
+from plugins_utils.command_batch import BATCH_HELPER_PATH
+from plugins_utils.command_cache import (ALL_FAMILIES, COMMAND_CACHE, FAMILY_DPKG, families_invalidated_by,
+                                         make_cache_key)
+from plugins_utils.command_trace import COMMAND_TRACE
+from plugins_utils.command_paths import EXECUTABLE_PATHS
+from plugins_utils.dpkg_status import DPKG_STATUS
+from plugins_utils.debconf_db import DEBCONF_DB
+from plugins_utils.host_facts import HOST_FACTS
+from plugins_utils.command_stream import (CommandStream, LineSplitter, READ_CHUNK_SIZE, STREAM_STDERR_TAIL,
+                                          feed_stdin, stream_encoding)
 
 DEFAULT_COMMAND_TIMEOUT = 300  # 5 minutes par défaut
+ASYNC_STREAM_LIMIT = 1024 * 1024  # Longueur max d'une ligne lue par run_async
+
+# Patterns courants de progression pour les commandes système.
+# Un pourcentage "45%" couvre les formes apt/dpkg ("45% [###]"), les barres
+# ("[====> ] 45%") et les clés ("progress: 45%"); il est prioritaire sur un
+# ratio numérique "5/20", recherché seulement si aucun pourcentage n'est trouvé.
+PROGRESS_PERCENT_PATTERN = re.compile(r'(\d+)%')
+PROGRESS_RATIO_PATTERN = re.compile(r'(\d+)/(\d+)')
+PROGRESS_PATTERNS = [PROGRESS_PERCENT_PATTERN, PROGRESS_RATIO_PATTERN]
+
+def match_progress(line: str) -> Optional[int]:
+    """
+    Extrait un pourcentage de progression d'une ligne de sortie.
+    Les lignes sans '%' ni '/' (la grande majorité) sont écartées sans regex.
+
+    Args:
+        line: Ligne de sortie
+
+    Returns:
+        Optional[int]: Pourcentage (non borné) ou None
+    """
+    if '%' in line:
+        match = PROGRESS_PERCENT_PATTERN.search(line)
+        if match:
+            return int(match.group(1))
+    if '/' in line:
+        match = PROGRESS_RATIO_PATTERN.search(line)
+        if match:
+            total = int(match.group(2))
+            return int((int(match.group(1)) / total) * 100) if total > 0 else 0
+    return None
 
-# Patterns courants de progression pour les commandes système
-PROGRESS_PATTERNS = [
-    # apt/dpkg: "10%" ou "10% [###...]"
-    re.compile(r'(\d+)%(?:\s+\[([#=> -]+)\])?'),
-    # progression numérique: "5/20"
-    re.compile(r'(\d+)/(\d+)'),
-    # clés de progression courantes
-    re.compile(r'(?:progress|progression|completed|terminé|avancement|étape)\s*[:=]\s*(\d+)(?:[.,](\d+))?%', re.IGNORECASE),
-    # barres avec pourcentage
-    re.compile(r'\[([#=\-_>]+\s*)\]\s*(\d+)%')
-]
 
 class PluginsUtilsBase:
     """
@@ -107,34 +139,55 @@ class PluginsUtilsBase:
 
     # --- Méthodes de Logging (Déléguées au logger) ---
 
-    def log_info(self, msg: str, log_levels: Optional[Dict[str, str]] = None):
-        """Enregistre un message d'information."""
-        self.logger.info(msg, target_ip=self.target_ip)
+    def is_log_enabled(self, level: str) -> bool:
+        """
+        Indique si un niveau de log produit une sortie.
+        À utiliser pour garder la construction de messages coûteux hors des boucles.
+        (Nommée is_log_enabled pour ne pas masquer ServiceCommands.is_enabled.)
+
+        Args:
+            level: Niveau du message (debug, info, ...)
 
-    def log_warning(self, msg: str, log_levels: Optional[Dict[str, str]] = None):
-        """Enregistre un message d'avertissement."""
-        self.logger.warning(msg, target_ip=self.target_ip)
+        Returns:
+            bool: True si les messages de ce niveau sont émis
+        """
+        is_enabled = getattr(self.logger, 'is_enabled', None)
+        return is_enabled(level) if is_enabled else True
 
-    def log_error(self, msg: str, exc_info: bool = False, log_levels: Optional[Dict[str, str]] = None):
+    def log_info(self, msg: Any, *args: Any, log_levels: Optional[Dict[str, str]] = None):
+        """Enregistre un message d'information (formatage % paresseux via *args)."""
+        self.logger.info(msg, *args, target_ip=self.target_ip)
+
+    def log_warning(self, msg: Any, *args: Any, log_levels: Optional[Dict[str, str]] = None):
+        """Enregistre un message d'avertissement (formatage % paresseux via *args)."""
+        self.logger.warning(msg, *args, target_ip=self.target_ip)
+
+    def log_error(self, msg: Any, *args: Any, exc_info: bool = False, log_levels: Optional[Dict[str, str]] = None):
         """
         Enregistre un message d'erreur.
 
         Args:
-            msg: Le message d'erreur.
+            msg: Le message d'erreur (chaîne avec %s ou callable).
+            *args: Arguments de formatage %, appliqués à l'émission.
             exc_info: Si True, ajoute le traceback de l'exception actuelle.
         """
-        self.logger.error(msg, target_ip=self.target_ip)
+        self.logger.error(msg, *args, target_ip=self.target_ip)
         if exc_info:
             # Utiliser traceback.format_exc() pour obtenir le traceback formaté
             self.logger.error(f"Traceback:\n{traceback.format_exc()}", target_ip=self.target_ip)
 
-    def log_debug(self, msg: str, log_levels: Optional[Dict[str, str]] = None):
-        """Enregistre un message de débogage."""
-        self.logger.debug(msg, target_ip=self.target_ip)
+    def log_debug(self, msg: Any, *args: Any, log_levels: Optional[Dict[str, str]] = None):
+        """
+        Enregistre un message de débogage.
+        Le message n'est formaté (ou le callable appelé) que si le niveau debug est actif.
+        """
+        if not self.is_log_enabled("debug"):
+            return
+        self.logger.debug(msg, *args, target_ip=self.target_ip)
 
-    def log_success(self, msg: str, log_levels: Optional[Dict[str, str]] = None):
-        """Enregistre un message de succès."""
-        self.logger.success(msg, target_ip=self.target_ip)
+    def log_success(self, msg: Any, *args: Any, log_levels: Optional[Dict[str, str]] = None):
+        """Enregistre un message de succès (formatage % paresseux via *args)."""
+        self.logger.success(msg, *args, target_ip=self.target_ip)
 
     # --- Méthodes de Gestion de Progression ---
 
@@ -237,7 +290,365 @@ class PluginsUtilsBase:
 
     # --- Méthodes d'Exécution de Commandes Optimisées ---
 
+    def which(self, command: str, log_levels: Optional[Dict[str, str]] = None) -> Optional[str]:
+        """
+        Retourne le chemin complet d'un exécutable, via le cache partagé par
+        tous les utilitaires du processus (sans lancer de sous-processus).
+
+        Args:
+            command: Nom de la commande
+            log_levels: Niveaux de log personnalisés
+
+        Returns:
+            Optional[str]: Chemin de l'exécutable ou None s'il est introuvable
+        """
+        path = EXECUTABLE_PATHS.which(command)
+        self.log_debug(f"Résolution de '{command}': {path or 'introuvable'}", log_levels=log_levels)
+        return path
+
+    def _prepare_command(self, cmd: Union[str, List[str]], shell: bool,
+                         env: Optional[Dict[str, str]], needs_sudo: Optional[bool],
+                         log_levels: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """
+        Prépare une commande pour exécution: découpage, décision sudo, préfixe sudo
+        ou courtier privilégié. Partagé par run() et run_async().
+
+        Returns:
+            Dict: cmd_list, cmd_to_run, shell, effective_env, use_sudo, sudo_password, broker
+
+        Raises:
+            ValueError, TypeError: Commande invalide.
+            FileNotFoundError: sudo nécessaire mais introuvable.
+        """
+        # 1. Préparation de la commande
+        if isinstance(cmd, str) and not shell:
+            try:
+                cmd_list = shlex.split(cmd)
+            except ValueError as e:
+                self.log_error(f"Erreur lors du découpage de la commande: '{cmd}'. Erreur: {e}", log_levels=log_levels)
+                # Flush des logs avant de lever l'exception
+                if hasattr(self.logger, 'flush'):
+                    self.logger.flush()
+                raise ValueError(f"Commande invalide: {cmd}") from e
+        elif isinstance(cmd, list):
+            cmd_list = cmd
+        elif isinstance(cmd, str) and shell:
+            cmd_list = cmd  # Le shell interprétera la chaîne
+        else:
+            self.log_error(f"Type de commande invalide: {type(cmd)}", log_levels=log_levels)
+            # Flush des logs avant de lever l'exception
+            if hasattr(self.logger, 'flush'):
+                self.logger.flush()
+            raise TypeError("La commande doit être une chaîne ou une liste d'arguments.")
+
+        # 2. Détermination de l'utilisation de sudo
+        use_sudo = False
+        if needs_sudo is True:
+            if self._is_root:
+                self.log_debug("needs_sudo=True mais déjà root, sudo non utilisé.", log_levels=log_levels)
+            else:
+                use_sudo = True
+        elif needs_sudo is None and not self._is_root:
+            # Détection automatique: si pas root, on utilise sudo
+            use_sudo = True
+
+        sudo_password = None
+        # Courtier privilégié: authentifié une seule fois pour la session du plugin
+        broker = get_privileged_broker() if use_sudo else None
+        if broker is not None:
+            cmd_to_run = cmd_list
+            effective_env = env
+        elif use_sudo:
+            # Vérifier si sudo est disponible
+            if not EXECUTABLE_PATHS.which('sudo'):
+                self.log_error("Commande 'sudo' non trouvée. Impossible d'exécuter avec des privilèges élevés.", log_levels=log_levels)
+                # Flush des logs avant de lever l'exception
+                if hasattr(self.logger, 'flush'):
+                    self.logger.flush()
+                raise FileNotFoundError("sudo n'est pas installé ou pas dans le PATH")
+
+            # Préparer la commande sudo
+            # Utiliser -S pour lire le mot de passe depuis stdin si besoin
+            # Utiliser -E pour préserver l'environnement si env n'est pas fourni
+            sudo_prefix = ["sudo", "-S"]
+            effective_env = env  # Par défaut, utiliser l'env fourni
+            if env is None:
+                sudo_prefix.append("-E")
+                effective_env = os.environ.copy()  # Hériter et potentiellement modifier
+
+            # Récupérer le mot de passe sudo depuis l'environnement
+            sudo_password = os.environ.get("SUDO_PASSWORD")
+
+            if isinstance(cmd_list, list):
+                cmd_to_run = sudo_prefix + cmd_list
+            else:  # shell=True
+                # Construire la commande shell avec sudo
+                # shlex.quote est essentiel pour la sécurité
+                quoted_cmd = shlex.quote(cmd_list)
+                cmd_to_run = f"{' '.join(sudo_prefix)} sh -c {quoted_cmd}"
+                shell = True  # Assurer que shell est True pour Popen
+                self.log_warning("Utilisation combinée de sudo et shell=True. Vérifier la commande.", log_levels=log_levels)
+
+        else:
+            cmd_to_run = cmd_list
+            effective_env = env  # Utiliser l'env fourni ou None (héritage par Popen)
+
+        return {
+            "cmd_list": cmd_list,
+            "cmd_to_run": cmd_to_run,
+            "shell": shell,
+            "effective_env": effective_env,
+            "use_sudo": use_sudo,
+            "sudo_password": sudo_password,
+            "broker": broker,
+        }
+
     def run(self,
+            cmd: Union[str, List[str]],
+            input_data: Optional[str] = None,
+            no_output: bool = False,
+            print_command: bool = False,
+            real_time_output: bool = True,  # Activé par défaut pour plus de réactivité
+            error_as_warning: bool = False,
+            timeout: Optional[int] = DEFAULT_COMMAND_TIMEOUT,
+            check: bool = False,  # Par défaut False pour retourner succès/échec
+            shell: bool = False,
+            cwd: Optional[str] = None,
+            env: Optional[Dict[str, str]] = None,
+            needs_sudo: Optional[bool] = None,
+            show_progress: bool = True,
+            log_levels: Optional[Dict[str, str]] = None,
+            cache: Optional[str] = None,
+            invalidates: Optional[Union[str, List[str]]] = None) -> Tuple[bool, str, str]:
+        """
+        Exécute une commande système, en utilisant sudo si nécessaire et non déjà root.
+        Version optimisée pour le traitement en temps réel des sorties et la détection
+        des barres de progression dans les outils comme apt, dpkg, etc.
+
+        Args:
+            cmd: Commande à exécuter (chaîne ou liste d'arguments).
+                Si chaîne et shell=False, elle sera découpée avec shlex.
+            input_data: Données à envoyer sur stdin (optionnel).
+            no_output: Si True, ne journalise pas stdout/stderr.
+            print_command: Si True, journalise la commande avant exécution.
+            real_time_output: Si True, affiche la sortie en temps réel avec traitement par lots.
+            error_as_warning: Si True, traite les erreurs (stderr) comme des avertissements.
+            timeout: Timeout en secondes pour la commande (None pour aucun timeout).
+            check: Si True, lève une exception CalledProcessError en cas d'échec.
+                Si False (par défaut), retourne le succès basé sur le code de retour.
+            shell: Si True, exécute la commande via le shell système (attention sécurité).
+            cwd: Répertoire de travail pour la commande (optionnel).
+            env: Variables d'environnement pour la commande (optionnel). Si None,
+                l'environnement actuel est hérité. Si fourni, il remplace l'env.
+            needs_sudo: Forcer l'utilisation de sudo (True), forcer la non-utilisation (False),
+                        ou laisser la détection automatique (None, défaut).
+            show_progress: Si True, détecte et affiche les barres de progression.
+            cache: Famille de cache (ex: "dpkg", "users") si la commande est en lecture
+                seule: son résultat est alors mémorisé pour la durée du processus.
+            invalidates: Familles de cache à invalider après la commande, en plus de
+                celles déduites automatiquement de la commande (apt install, useradd...).
+
+        Returns:
+            Tuple (success: bool, stdout: str, stderr: str).
+            'success' est True si le code de retour est 0.
+
+        Raises:
+            subprocess.CalledProcessError: Si la commande échoue et check=True.
+            subprocess.TimeoutExpired: Si le timeout est dépassé.
+            FileNotFoundError: Si la commande ou sudo n'est pas trouvée.
+            PermissionError: Si sudo est nécessaire mais échoue (ex: mauvais mdp).
+        """
+        started_at = time.monotonic()
+        cache_key = None
+        if cache:
+            cache_key = make_cache_key(cmd, shell, cwd, env, needs_sudo)
+            cached = self._get_cached_result(cache, cache_key, cmd, needs_sudo, started_at, log_levels)
+            if cached is not None:
+                if check and not cached[0]:
+                    raise subprocess.CalledProcessError(1, cmd, output=cached[1], stderr=cached[2])
+                return cached
+
+        result = None
+        try:
+            result = self._run_uncached(cmd, input_data, no_output, print_command, real_time_output,
+                                        error_as_warning, timeout, check, shell, cwd, env, needs_sudo,
+                                        show_progress, log_levels=log_levels)
+            if cache:
+                COMMAND_CACHE.put(cache, cache_key, result)
+            return result
+        finally:
+            self._trace_command(cmd, needs_sudo, started_at, result)
+            if not cache:
+                # Même en cas d'échec, une commande modifiante a pu changer l'état
+                self._invalidate_after(cmd, shell, invalidates)
+
+    def run_stream(self,
+                   cmd: Union[str, List[str]],
+                   input_data: Optional[str] = None,
+                   print_command: bool = False,
+                   timeout: Optional[int] = DEFAULT_COMMAND_TIMEOUT,
+                   shell: bool = False,
+                   cwd: Optional[str] = None,
+                   env: Optional[Dict[str, str]] = None,
+                   needs_sudo: Optional[bool] = None,
+                   stderr_tail: int = STREAM_STDERR_TAIL,
+                   chunks: bool = False,
+                   log_levels: Optional[Dict[str, str]] = None,
+                   invalidates: Optional[Union[str, List[str]]] = None) -> CommandStream:
+        """
+        Exécute une commande et retourne sa sortie standard à consommer au fil de l'eau,
+        sans la conserver en mémoire (journalctl, find, dumps volumineux...).
+
+        Les lignes ne sont pas journalisées. Arrêter l'itération avant la fin termine
+        la commande. Le code de retour (stream.returncode) et les dernières lignes de
+        stderr (stream.stderr) sont disponibles une fois le flux fermé.
+
+        Args:
+            cmd: Commande à exécuter (chaîne ou liste d'arguments).
+            input_data: Données à envoyer sur stdin (optionnel).
+            print_command: Si True, journalise la commande avant exécution.
+            timeout: Durée maximale en secondes (None pour aucun timeout).
+            shell: Si True, exécute la commande via le shell système.
+            cwd: Répertoire de travail pour la commande (optionnel).
+            env: Variables d'environnement pour la commande (optionnel).
+            needs_sudo: Même règle que run().
+            stderr_tail: Nombre de dernières lignes de stderr conservées.
+            chunks: Si True, produire des blocs de texte décodé plutôt que des lignes.
+            invalidates: Familles de cache à invalider après la commande.
+
+        Returns:
+            CommandStream: Itérable des lignes (ou blocs) de stdout, à utiliser
+            de préférence comme gestionnaire de contexte.
+
+        Raises:
+            subprocess.TimeoutExpired: Pendant l'itération, si le timeout est dépassé.
+            FileNotFoundError: Si la commande ou sudo n'est pas trouvée.
+        """
+        started_at = time.monotonic()
+        prepared = self._prepare_command(cmd, shell, env, needs_sudo, log_levels=log_levels)
+        cmd_to_run = prepared["cmd_to_run"]
+        broker = prepared["broker"]
+        sudo_password = prepared["sudo_password"]
+
+        cmd_str_for_log = ' '.join(cmd_to_run) if isinstance(cmd_to_run, list) else cmd_to_run
+        if broker is not None:
+            cmd_str_for_log = f"[sudo] {cmd_str_for_log}"
+        if print_command:
+            logged_cmd = cmd_str_for_log.replace(sudo_password, '********') if sudo_password else cmd_str_for_log
+            self.log_info(f"Exécution (flux): {logged_cmd}", log_levels=log_levels)
+
+        try:
+            if broker is not None:
+                process = broker.spawn(cmd_to_run, shell=prepared["shell"], cwd=cwd,
+                                       env=prepared["effective_env"], input_data=input_data)
+            else:
+                stdin_data = ""
+                if prepared["use_sudo"] and sudo_password:
+                    stdin_data += sudo_password + "\n"
+                if input_data:
+                    stdin_data += input_data
+                # Flux binaires: CommandStream décode lui-même les blocs lus
+                process = subprocess.Popen(
+                    cmd_to_run,
+                    stdin=subprocess.PIPE if stdin_data else subprocess.DEVNULL,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    shell=prepared["shell"],
+                    cwd=cwd,
+                    env=prepared["effective_env"],
+                )
+                if stdin_data:
+                    # Écriture en parallèle de la lecture: la commande peut remplir
+                    # stdout avant d'avoir consommé toute son entrée
+                    feed_stdin(process, stdin_data.encode(stream_encoding(process.stdin)),
+                               on_error=lambda e: self.log_warning(f"Impossible d'écrire dans stdin: {e}",
+                                                                   log_levels=log_levels))
+        except FileNotFoundError as e:
+            self.log_error(f"Erreur: Commande ou dépendance introuvable: {e.filename}", log_levels=log_levels)
+            COMMAND_TRACE.record(cmd, prepared["use_sudo"], started_at, time.monotonic(), None)
+            raise
+
+        command_id = hash(str(cmd_to_run) + str(time.time()))
+        with self._command_lock:
+            self._running_commands[command_id] = cmd_str_for_log
+
+        def on_close(stream: CommandStream) -> None:
+            with self._command_lock:
+                self._running_commands.pop(command_id, None)
+            COMMAND_TRACE.record(cmd, prepared["use_sudo"], started_at, time.monotonic(),
+                                 stream.returncode, stream.stdout_bytes, stream.stderr_bytes)
+            self._invalidate_after(cmd, shell, invalidates)
+            if prepared["use_sudo"] and stream.returncode != 0 and any(
+                    err_msg in stream.stderr.lower() for err_msg in
+                    ["incorrect password attempt", "sudo: a password is required"]):
+                self.log_error("Échec de l'authentification sudo.", log_levels=log_levels)
+
+        return CommandStream(process, cmd_to_run, timeout=timeout, stderr_tail=stderr_tail,
+                             chunks=chunks, on_close=on_close)
+
+    def _get_cached_result(self, cache: str, cache_key: Tuple, cmd: Union[str, List[str]],
+                           needs_sudo: Optional[bool], started_at: float,
+                           log_levels: Optional[Dict[str, str]] = None) -> Optional[Tuple[bool, str, str]]:
+        """Retourne le résultat mémorisé d'une commande pure (et le trace), ou None."""
+        cached = COMMAND_CACHE.get(cache, cache_key)
+        if cached is not None:
+            self.log_debug("Résultat en cache (%s): %s", cache, cmd, log_levels=log_levels)
+            COMMAND_TRACE.record(cmd, self._uses_sudo(needs_sudo), started_at, time.monotonic(),
+                                 0 if cached[0] else None, cached=True)
+        return cached
+
+    def _uses_sudo(self, needs_sudo: Optional[bool]) -> bool:
+        """Indique si une commande sera exécutée avec élévation (même règle que _prepare_command)."""
+        return not self._is_root and needs_sudo is not False
+
+    def _trace_command(self, cmd: Union[str, List[str]], needs_sudo: Optional[bool],
+                       started_at: float, result: Optional[Tuple[bool, str, str]]) -> None:
+        """Enregistre une commande terminée dans la trace du processus."""
+        if result is None:
+            # Exception (timeout, commande introuvable...): pas de sortie exploitable
+            COMMAND_TRACE.record(cmd, self._uses_sudo(needs_sudo), started_at, time.monotonic(), None)
+            return
+        success, stdout, stderr = result
+        COMMAND_TRACE.record(cmd, self._uses_sudo(needs_sudo), started_at, time.monotonic(),
+                             0 if success else 1, len(stdout.encode('utf-8', errors='replace')),
+                             len(stderr.encode('utf-8', errors='replace')))
+
+    def _invalidate_after(self, cmd: Union[str, List[str]], shell: bool,
+                          invalidates: Optional[Union[str, List[str]]] = None) -> None:
+        """
+        Invalide les familles de cache touchées par une commande modifiante.
+
+        Args:
+            cmd: Commande exécutée
+            shell: True si la commande a été interprétée par le shell
+            invalidates: Familles supplémentaires déclarées par l'appelant
+        """
+        families = families_invalidated_by(cmd, shell)
+        if invalidates:
+            families.update([invalidates] if isinstance(invalidates, str) else invalidates)
+        if families:
+            COMMAND_CACHE.invalidate(families)
+            HOST_FACTS.invalidate_families(families)
+            if FAMILY_DPKG in families:
+                # Des paquets ont pu apporter des exécutables jusque-là absents
+                EXECUTABLE_PATHS.forget_missing()
+                DPKG_STATUS.invalidate()
+                DEBCONF_DB.invalidate()
+
+    def invalidate_command_cache(self, families: Optional[Union[str, List[str]]] = None) -> None:
+        """
+        Invalide manuellement le cache des commandes en lecture seule, par exemple
+        après une modification faite hors de run() (script externe, fichier édité).
+
+        Args:
+            families: Famille(s) à invalider (None pour tout le cache)
+        """
+        if isinstance(families, str):
+            families = [families]
+        COMMAND_CACHE.invalidate(families)
+        HOST_FACTS.invalidate_families(ALL_FAMILIES if families is None else families)
+
+    def _run_uncached(self,
                 cmd: Union[str, List[str]],
                 input_data: Optional[str] = None,
                 no_output: bool = False,
@@ -252,38 +663,7 @@ class PluginsUtilsBase:
                 needs_sudo: Optional[bool] = None,
 show_progress: bool = True, log_levels: Optional[Dict[str, str]] = None) -> Tuple[bool, str, str]:
             """
-            Exécute une commande système, en utilisant sudo si nécessaire et non déjà root.
-            Version optimisée pour le traitement en temps réel des sorties et la détection
-            des barres de progression dans les outils comme apt, dpkg, etc.
-
-            Args:
-                cmd: Commande à exécuter (chaîne ou liste d'arguments).
-                    Si chaîne et shell=False, elle sera découpée avec shlex.
-                input_data: Données à envoyer sur stdin (optionnel).
-                no_output: Si True, ne journalise pas stdout/stderr.
-                print_command: Si True, journalise la commande avant exécution.
-                real_time_output: Si True, affiche la sortie en temps réel avec traitement par lots.
-                error_as_warning: Si True, traite les erreurs (stderr) comme des avertissements.
-                timeout: Timeout en secondes pour la commande (None pour aucun timeout).
-                check: Si True, lève une exception CalledProcessError en cas d'échec.
-                    Si False (par défaut), retourne le succès basé sur le code de retour.
-                shell: Si True, exécute la commande via le shell système (attention sécurité).
-                cwd: Répertoire de travail pour la commande (optionnel).
-                env: Variables d'environnement pour la commande (optionnel). Si None,
-                    l'environnement actuel est hérité. Si fourni, il remplace l'env.
-                needs_sudo: Forcer l'utilisation de sudo (True), forcer la non-utilisation (False),
-                            ou laisser la détection automatique (None, défaut).
-                show_progress: Si True, détecte et affiche les barres de progression.
-
-            Returns:
-                Tuple (success: bool, stdout: str, stderr: str).
-                'success' est True si le code de retour est 0.
-
-            Raises:
-                subprocess.CalledProcessError: Si la commande échoue et check=True.
-                subprocess.TimeoutExpired: Si le timeout est dépassé.
-                FileNotFoundError: Si la commande ou sudo n'est pas trouvée.
-                PermissionError: Si sudo est nécessaire mais échoue (ex: mauvais mdp).
+            Exécute une commande sans passer par le cache (voir run()).
             """
             # En mode débogueur, simplifier l'exécution
             if self.debugger_mode:
@@ -294,76 +674,20 @@ show_progress: bool = True, log_levels: Optional[Dict[str, str]] = None) -> Tupl
                 # Simplifier la lecture des sorties pour éviter les blocages
                 real_time_output = False
 
-            # 1. Préparation de la commande
-            if isinstance(cmd, str) and not shell:
-                try:
-                    cmd_list = shlex.split(cmd)
-                except ValueError as e:
-                    self.log_error(f"Erreur lors du découpage de la commande: '{cmd}'. Erreur: {e}", log_levels=log_levels)
-                    # Flush des logs avant de lever l'exception
-                    if hasattr(self.logger, 'flush'):
-                        self.logger.flush()
-                    raise ValueError(f"Commande invalide: {cmd}") from e
-            elif isinstance(cmd, list):
-                cmd_list = cmd
-            elif isinstance(cmd, str) and shell:
-                cmd_list = cmd  # Le shell interprétera la chaîne
-            else:
-                self.log_error(f"Type de commande invalide: {type(cmd)}", log_levels=log_levels)
-                # Flush des logs avant de lever l'exception
-                if hasattr(self.logger, 'flush'):
-                    self.logger.flush()
-                raise TypeError("La commande doit être une chaîne ou une liste d'arguments.")
-
-            # 2. Détermination de l'utilisation de sudo
-            use_sudo = False
-            if needs_sudo is True:
-                if self._is_root:
-                    self.log_debug("needs_sudo=True mais déjà root, sudo non utilisé.", log_levels=log_levels)
-                else:
-                    use_sudo = True
-            elif needs_sudo is None and not self._is_root:
-                # Détection automatique: si pas root, on utilise sudo
-                use_sudo = True
-
-            sudo_password = None
-            if use_sudo:
-                # Vérifier si sudo est disponible
-                if subprocess.run(['which', 'sudo'], capture_output=True, text=True).returncode != 0:
-                    self.log_error("Commande 'sudo' non trouvée. Impossible d'exécuter avec des privilèges élevés.", log_levels=log_levels)
-                    # Flush des logs avant de lever l'exception
-                    if hasattr(self.logger, 'flush'):
-                        self.logger.flush()
-                    raise FileNotFoundError("sudo n'est pas installé ou pas dans le PATH")
-
-                # Préparer la commande sudo
-                # Utiliser -S pour lire le mot de passe depuis stdin si besoin
-                # Utiliser -E pour préserver l'environnement si env n'est pas fourni
-                sudo_prefix = ["sudo", "-S"]
-                effective_env = env  # Par défaut, utiliser l'env fourni
-                if env is None:
-                    sudo_prefix.append("-E")
-                    effective_env = os.environ.copy()  # Hériter et potentiellement modifier
-
-                # Récupérer le mot de passe sudo depuis l'environnement
-                sudo_password = os.environ.get("SUDO_PASSWORD")
-
-                if isinstance(cmd_list, list):
-                    cmd_to_run = sudo_prefix + cmd_list
-                else:  # shell=True
-                    # Construire la commande shell avec sudo
-                    # shlex.quote est essentiel pour la sécurité
-                    quoted_cmd = shlex.quote(cmd_list)
-                    cmd_to_run = f"{' '.join(sudo_prefix)} sh -c {quoted_cmd}"
-                    shell = True  # Assurer que shell est True pour Popen
-                    self.log_warning("Utilisation combinée de sudo et shell=True. Vérifier la commande.", log_levels=log_levels)
-
-            else:
-                cmd_to_run = cmd_list
-                effective_env = env  # Utiliser l'env fourni ou None (héritage par Popen)
+            # 1-2. Préparation de la commande et détermination de l'utilisation de sudo
+            prepared = self._prepare_command(cmd, shell, env, needs_sudo, log_levels=log_levels)
+            cmd_list = prepared["cmd_list"]
+            cmd_to_run = prepared["cmd_to_run"]
+            shell = prepared["shell"]
+            effective_env = prepared["effective_env"]
+            use_sudo = prepared["use_sudo"]
+            sudo_password = prepared["sudo_password"]
+            broker = prepared["broker"]
 
             # 3. Logging de la commande (masquer le mot de passe)
             cmd_str_for_log = ' '.join(cmd_to_run) if isinstance(cmd_to_run, list) else cmd_to_run
+            if broker is not None:
+                cmd_str_for_log = f"[sudo] {cmd_str_for_log}"
             if print_command:
                 logged_cmd = cmd_str_for_log
                 if sudo_password:
@@ -375,28 +699,33 @@ show_progress: bool = True, log_levels: Optional[Dict[str, str]] = None) -> Tupl
             with self._command_lock:
                 self._running_commands[command_id] = cmd_str_for_log
 
-            # 4. Exécution avec subprocess.Popen
+            # 4. Exécution avec subprocess.Popen (ou via le courtier privilégié)
             stdout_data = []
             stderr_data = []
             process = None
             start_time = time.monotonic()
 
             try:
-                process = subprocess.Popen(
-                    cmd_to_run,
-                    stdin=subprocess.PIPE,  # Toujours créer stdin pour passer le mot de passe sudo
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    text=True,  # Important pour l'encodage
-                    shell=shell,
-                    cwd=cwd,
-                    env=effective_env,  # Utiliser l'environnement effectif
-                    bufsize=1,  # Lecture ligne par ligne
-                    universal_newlines=True  # Compatibilité Windows/Unix pour les fins de ligne
-                )
+                if broker is not None:
+                    # Même interface que Popen; l'input est transmis avec la requête
+                    process = broker.spawn(cmd_to_run, shell=shell, cwd=cwd,
+                                           env=effective_env, input_data=input_data)
+                else:
+                    process = subprocess.Popen(
+                        cmd_to_run,
+                        stdin=subprocess.PIPE,  # Toujours créer stdin pour passer le mot de passe sudo
+                        stdout=subprocess.PIPE,
+                        stderr=subprocess.PIPE,
+                        text=True,  # Important pour l'encodage
+                        shell=shell,
+                        cwd=cwd,
+                        env=effective_env,  # Utiliser l'environnement effectif
+                        bufsize=1,  # Lecture ligne par ligne
+                        universal_newlines=True  # Compatibilité Windows/Unix pour les fins de ligne
+                    )
 
                 # 5. Gestion de l'input (y compris le mot de passe sudo)
-                if (use_sudo and sudo_password) or input_data:
+                if broker is None and ((use_sudo and sudo_password) or input_data):
                     input_full = ""
                     if use_sudo and sudo_password:
                         input_full += sudo_password + "\n"  # Ajouter le mot de passe sudo
@@ -451,6 +780,9 @@ show_progress: bool = True, log_levels: Optional[Dict[str, str]] = None) -> Tupl
                     # Utiliser communicate pour les cas où real_time_output n'est pas souhaité
                     # ou en mode débogueur pour éviter les blocages
                     try:
+                        # stdin a déjà été écrit et fermé à l'étape 5: communicate() ne doit plus y toucher
+                        if process.stdin is not None and process.stdin.closed:
+                            process.stdin = None
                         stdout_res, stderr_res = process.communicate(timeout=timeout)
                         if stdout_res: stdout_data = stdout_res.splitlines()
                         if stderr_res: stderr_data = stderr_res.splitlines()
@@ -611,6 +943,12 @@ show_progress: bool = True, log_levels: Optional[Dict[str, str]] = None) -> Tupl
         Lit et traite la sortie d'un processus en temps réel avec traitement par lots.
         Toutes les lignes sont traitées de manière égale, dans l'ordre chronologique.
 
+        Les flux sont lus par blocs (os.read) dès que select() les signale prêts,
+        puis découpés en lignes. Les lignes à journaliser sont accumulées dans un
+        lot unique (stdout et stderr entrelacés dans l'ordre de lecture) transmis
+        au logger d'un seul tenant, suivi d'un seul flush: à chaque tour de boucle
+        en mode application, toutes les self._throttle_time secondes sinon.
+
         Args:
             process: Le processus subprocess.Popen
             timeout: Timeout en secondes (None pour aucun)
@@ -627,19 +965,19 @@ show_progress: bool = True, log_levels: Optional[Dict[str, str]] = None) -> Tupl
         all_stdout_lines = []
         all_stderr_lines = []
 
-        # Buffers pour le traitement par lots (pour éviter l'intercalage des sorties)
-        stdout_batch = []
-        stderr_batch = []
+        # Lot ordonné de lignes à journaliser: (is_stderr, ligne)
+        pending_lines: List[Tuple[bool, str]] = []
 
-        # Identifiants des descripteurs de fichiers
-        stdout_fd = process.stdout.fileno()
-        stderr_fd = process.stderr.fileno()
+        # Descripteur -> (is_stderr, découpeur de lignes, sortie complète)
+        streams = {
+            process.stdout.fileno(): (False, LineSplitter(stream_encoding(process.stdout)), all_stdout_lines),
+            process.stderr.fileno(): (True, LineSplitter(stream_encoding(process.stderr)), all_stderr_lines),
+        }
+        open_fds = list(streams)
 
-        # Variables pour la détection de progression
-        progress_percentage = 0
-        total_items = None  # Pour apt-get update/install
-        processed_items = 0
-        last_percentage_update = 0
+        # État de la détection de progression (compteurs apt)
+        progress_state = self._new_progress_state()
+        track_progress = show_progress and bool(task_id)
 
         # Timestamp de démarrage pour le timeout
         start_time = time.monotonic()
@@ -649,16 +987,18 @@ show_progress: bool = True, log_levels: Optional[Dict[str, str]] = None) -> Tupl
         select_timeout = 0.1  # 100ms
 
         # Détecter si nous sommes dans l'application principale vs. ligne de commande
-        # En mode application ou debugger, on traite différemment pour assurer l'ordre
+        # En mode application, le lot est transmis à chaque tour pour un affichage immédiat
         is_app_mode = 'TEXTUAL_APP' in os.environ or hasattr(sys, '_called_from_textual')
-        is_debug_mode = self.debugger_mode
-        enforce_sequential = is_app_mode or is_debug_mode
+        batch_interval = 0.0 if is_app_mode else self._throttle_time
 
-        # Boucle principale de lecture
-        while process.poll() is None:
-            # Vérifier le timeout global
+        while open_fds:
+            # Vérifier le timeout global, que le processus soit terminé ou non:
+            # un descendant détaché qui écrit encore dans les tubes ne doit pas
+            # prolonger la lecture au-delà de l'échéance
             current_time = time.monotonic()
             if timeout is not None and current_time - start_time > timeout:
+                if process.poll() is not None:
+                    break
                 try:
                     process.kill()
                 except:
@@ -667,185 +1007,68 @@ show_progress: bool = True, log_levels: Optional[Dict[str, str]] = None) -> Tupl
 
             # Utiliser select pour attendre des données sur les flux sans bloquer
             try:
-                ready, _, _ = select.select([stdout_fd, stderr_fd], [], [], select_timeout)
+                ready, _, _ = select.select(open_fds, [], [], select_timeout)
             except (ValueError, OSError):
                 # Descripteurs de fichiers invalides ou fermés
                 break
 
-            # En mode application/debug, on traite les sorties séquentiellement et immédiatement
-            # pour éviter les problèmes d'ordre
-            if enforce_sequential:
-                # Traiter immédiatement chaque ligne disponible
-                if stdout_fd in ready:
-                    try:
-                        line = process.stdout.readline()
-                        if line:
-                            line = line.rstrip()
-                            all_stdout_lines.append(line)
-
-                            # Traiter immédiatement sans batching
-                            if log_output:
-                                self.log_info(line, log_levels=log_levels)
-                                if hasattr(self.logger, 'flush'):
-                                    self.logger.flush()
-
-                            # Détecter progression si nécessaire
-                            if show_progress and (is_apt or self._detect_progress_in_line(line, task_id)):
-                                # Pour apt, mettre à jour le compteur d'items
-                                if is_apt:
-                                    if total_items is None and "Get:" in line:
-                                        match = self._apt_update_total_pattern.search(line)
-                                        if match:
-                                            total_items = int(match.group(1)) * 2
-
-                                    if "Get:" in line or "Setting up " in line:
-                                        processed_items += 1
-                                        if total_items:
-                                            progress_percentage = min(int((processed_items / total_items) * 100), 100)
-                                            if progress_percentage - last_percentage_update >= 2:
-                                                last_percentage_update = progress_percentage
-                                                self._update_command_progress(task_id, progress_percentage)
-                    except (IOError, OSError) as e:
-                        self.log_debug(f"Erreur lors de la lecture de stdout: {e}", log_levels=log_levels)
-                        break
-
-                if stderr_fd in ready:
-                    try:
-                        line = process.stderr.readline()
-                        if line:
-                            line = line.rstrip()
-                            all_stderr_lines.append(line)
-
-                            # Traiter immédiatement sans batching
-                            if log_output:
-                                log_func = self.log_warning if error_as_warning else self.log_error
-                                log_func(line)
-                                if hasattr(self.logger, 'flush'):
-                                    self.logger.flush()
-                    except (IOError, OSError) as e:
-                        self.log_debug(f"Erreur lors de la lecture de stderr: {e}", log_levels=log_levels)
-                        break
-            else:
-                # Mode standard: Traitement par lots basé sur le temps écoulé
-                batch_timeout = (current_time - last_batch_time) >= self._throttle_time
-
-                # Si le timeout de traitement par lots est atteint, traiter les lots actuels
-                if batch_timeout and (stdout_batch or stderr_batch):
-                    with self._output_lock:
-                        # Traiter d'abord toutes les lignes stdout
-                        if stdout_batch:
-                            self._process_output_batch(stdout_batch, False, log_output, error_as_warning)
-                            stdout_batch = []
-
-                        # Puis traiter toutes les lignes stderr
-                        if stderr_batch:
-                            self._process_output_batch(stderr_batch, True, log_output, error_as_warning)
-                            stderr_batch = []
-
-                    # Réinitialiser le timestamp du dernier traitement par lots
-                    last_batch_time = current_time
-
-                # Lire stdout si prêt
-                if stdout_fd in ready:
-                    try:
-                        line = process.stdout.readline()
-                        if line:
-                            line = line.rstrip()
-                            all_stdout_lines.append(line)
-
-                            # Ajouter au batch pour traitement groupé
-                            stdout_batch.append(line)
-
-                            # Détecter les patterns de progression dans stdout si show_progress
-                            if show_progress:
-                                if is_apt:
-                                    # Détecter le nombre total d'éléments pour apt-get update
-                                    if total_items is None and "Get:" in line:
-                                        match = self._apt_update_total_pattern.search(line)
-                                        if match:
-                                            # Estimer à partir du premier numéro trouvé
-                                            total_items = int(match.group(1)) * 2  # Estimation approximative
-                                            self.log_debug(f"Nombre total d'éléments apt estimé: {total_items}", log_levels=log_levels)
-
-                                    # Compter les éléments traités (Get:X ou Setting up pkg)
-                                    if "Get:" in line or "Setting up " in line:
-                                        processed_items += 1
-                                        # Calculer le pourcentage si on a une estimation du total
-                                        if total_items:
-                                            progress_percentage = min(int((processed_items / total_items) * 100), 100)
-                                            # Éviter les mises à jour trop fréquentes
-                                            if progress_percentage - last_percentage_update >= 2:  # Minimum 2% de différence
-                                                last_percentage_update = progress_percentage
-                                                # Mettre à jour la barre avec throttling
-                                                self._update_command_progress(task_id, progress_percentage)
-
-                                # Détecter les patterns génériques
-                                self._detect_progress_in_line(line, task_id)
-                    except (IOError, OSError) as e:
-                        self.log_debug(f"Erreur lors de la lecture de stdout: {e}", log_levels=log_levels)
-                        break
-
-                # Lire stderr si prêt
-                if stderr_fd in ready:
-                    try:
-                        line = process.stderr.readline()
-                        if line:
-                            line = line.rstrip()
-                            all_stderr_lines.append(line)
-
-                            # Ajouter au batch pour traitement groupé
-                            stderr_batch.append(line)
-                    except (IOError, OSError) as e:
-                        self.log_debug(f"Erreur lors de la lecture de stderr: {e}", log_levels=log_levels)
-                        break
-
-            # Si aucun flux prêt, petite pause pour éviter de monopoliser le CPU
-            if not ready:
-                time.sleep(0.01)
-
-        # Lire le reste de stdout
-        remaining_stdout = self._read_remaining_stream(process.stdout)
-        all_stdout_lines.extend(remaining_stdout)
-        if log_output and remaining_stdout:
-            if enforce_sequential:
-                # Traiter immédiatement ligne par ligne
-                for line in remaining_stdout:
-                    self.log_info(line, log_levels=log_levels)
-                    if hasattr(self.logger, 'flush'):
-                        self.logger.flush()
-            else:
-                # Traiter par lot
-                self._process_output_batch(remaining_stdout, False, log_output, error_as_warning)
-
-        # Lire le reste de stderr
-        remaining_stderr = self._read_remaining_stream(process.stderr)
-        all_stderr_lines.extend(remaining_stderr)
-        if log_output and remaining_stderr:
-            if enforce_sequential:
-                # Traiter immédiatement ligne par ligne
-                log_func = self.log_warning if error_as_warning else self.log_error
-                for line in remaining_stderr:
-                    log_func(line)
-                    if hasattr(self.logger, 'flush'):
-                        self.logger.flush()
-            else:
-                # Traiter par lot
-                self._process_output_batch(remaining_stderr, True, log_output, error_as_warning)
+            # Processus terminé et flux vides: ne pas attendre l'EOF (un descendant
+            # détaché peut garder les tubes ouverts)
+            if not ready and process.poll() is not None:
+                break
 
-        # Traiter les buffers restants en mode normal
-        if not enforce_sequential:
-            with self._output_lock:
-                if stdout_batch:
-                    self._process_output_batch(stdout_batch, False, log_output, error_as_warning)
-                if stderr_batch:
-                    self._process_output_batch(stderr_batch, True, log_output, error_as_warning)
+            for fd in ready:
+                is_stderr, splitter, collected = streams[fd]
+                try:
+                    data = os.read(fd, READ_CHUNK_SIZE)
+                except OSError as e:
+                    self.log_debug(f"Erreur lors de la lecture de {'stderr' if is_stderr else 'stdout'}: {e}")
+                    data = b""
+                if data:
+                    lines = splitter.feed(data)
+                else:
+                    # EOF sur ce flux
+                    open_fds.remove(fd)
+                    lines = splitter.close()
+                if not lines:
+                    continue
+
+                collected.extend(lines)
+                if log_output:
+                    pending_lines.extend((is_stderr, line) for line in lines)
+                # Détecter les patterns de progression dans stdout si show_progress
+                if track_progress and not is_stderr:
+                    for line in lines:
+                        self._track_progress_line(line, task_id, is_apt, progress_state)
+
+            if pending_lines and (current_time - last_batch_time >= batch_interval or not open_fds):
+                self._process_output_lines(pending_lines, error_as_warning)
+                pending_lines = []
+                last_batch_time = current_time
+
+        # Fins de lignes non terminées sur les flux encore ouverts
+        for fd in open_fds:
+            is_stderr, splitter, collected = streams[fd]
+            lines = splitter.close()
+            collected.extend(lines)
+            if log_output:
+                pending_lines.extend((is_stderr, line) for line in lines)
+
+        if pending_lines:
+            self._process_output_lines(pending_lines, error_as_warning)
 
         # Flush final pour s'assurer que tout est affiché
         if hasattr(self.logger, 'flush'):
             self.logger.flush()
 
         # Récupérer le code de retour et construire les sorties complètes
-        return_code = process.poll()
+        # (les flux peuvent atteindre EOF juste avant la sortie effective du processus)
+        remaining = None if timeout is None else max(0.1, timeout - (time.monotonic() - start_time))
+        try:
+            return_code = process.wait(timeout=remaining)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            raise subprocess.TimeoutExpired(process.args, timeout, None, None)
         success = return_code == 0
 
         stdout_output = "\n".join(all_stdout_lines)
@@ -853,59 +1076,63 @@ show_progress: bool = True, log_levels: Optional[Dict[str, str]] = None) -> Tupl
 
         return success, stdout_output, stderr_output
 
-    def _read_remaining_stream(self, stream):
+    @staticmethod
+    def _new_progress_state() -> Dict[str, Any]:
+        """Crée l'état de suivi de progression d'une commande (compteurs apt)."""
+        return {"total_items": None, "processed_items": 0, "last_percentage": 0}
+
+    def _track_progress_line(self, line: str, task_id: str, is_apt: bool, state: Dict[str, Any]) -> None:
         """
-        Lit les données restantes d'un flux jusqu'à EOF.
+        Met à jour la progression d'une commande à partir d'une ligne de stdout.
+        Partagé par la lecture synchrone (run) et asynchrone (run_async).
 
         Args:
-            stream: Le flux à lire (process.stdout ou process.stderr)
-
-        Returns:
-            List[str]: Liste des lignes lues, sans les retours à la ligne
+            line: Ligne de sortie
+            task_id: Identifiant de la barre de progression
+            is_apt: Si True, compter les lignes Get:/Setting up d'apt
+            state: État créé par _new_progress_state()
         """
-        remaining_lines = []
-        while True:
-            try:
-                line = stream.readline()
-                if not line:
-                    break
-                line = line.rstrip()
-                if line:  # Ignorer les lignes vides
-                    remaining_lines.append(line)
-            except (IOError, OSError):
-                break
-        return remaining_lines
+        if is_apt:
+            # Détecter le nombre total d'éléments pour apt-get update
+            if state["total_items"] is None and "Get:" in line:
+                match = self._apt_update_total_pattern.search(line)
+                if match:
+                    # Estimer à partir du premier numéro trouvé
+                    state["total_items"] = int(match.group(1)) * 2  # Estimation approximative
+
+            # Compter les éléments traités (Get:X ou Setting up pkg)
+            if "Get:" in line or "Setting up " in line:
+                state["processed_items"] += 1
+                if state["total_items"]:
+                    percentage = min(int((state["processed_items"] / state["total_items"]) * 100), 100)
+                    # Éviter les mises à jour trop fréquentes (minimum 2% de différence)
+                    if percentage - state["last_percentage"] >= 2:
+                        state["last_percentage"] = percentage
+                        self._update_command_progress(task_id, percentage)
+
+        # Détecter les patterns génériques
+        self._detect_progress_in_line(line, task_id)
 
-    def _process_output_batch(self, lines, is_stderr, log_output, error_as_warning):
+    def _process_output_lines(self, lines: List[Tuple[bool, str]], error_as_warning: bool) -> None:
         """
-        Traite un lot de lignes de sortie de manière égale, en une seule fois.
+        Journalise un lot ordonné de lignes stdout/stderr puis vide le logger une seule fois.
 
         Args:
-            lines: Liste de lignes à traiter
-            is_stderr: Si True, les lignes viennent de stderr
-            log_output: Si True, journaliser les lignes
+            lines: Lignes à journaliser, dans l'ordre de lecture: (is_stderr, ligne)
             error_as_warning: Si True, traiter stderr comme des warnings
         """
-        if not log_output or not lines:
-            return  # Ne pas traiter si log_output est False ou pas de lignes
-
-        # Filtrer les lignes vides
-        lines_to_log = [line for line in lines if line.strip()]
-        if not lines_to_log:
-            return
-
+        stderr_log = self.log_warning if error_as_warning else self.log_error
         # Pour éviter que les logs "manuel" s'intercalent avec ces logs
-        if is_stderr:
-            # Utiliser warning ou error selon la configuration
-            log_func = self.logger.warning if error_as_warning else self.logger.error
-            for line in lines_to_log:
-                log_func(line)
-        else:
-            # Journaliser stdout comme info
-            for line in lines_to_log:
-                self.logger.info(line)
-
-    # Dans plugins_utils_base.py -> class PluginsUtilsBase
+        with self._output_lock:
+            for is_stderr, line in lines:
+                if not line.strip():
+                    continue
+                if is_stderr:
+                    stderr_log(line)
+                else:
+                    self.log_info(line)
+        if hasattr(self.logger, 'flush'):
+            self.logger.flush()
 
     def _detect_progress_in_line(self, line, task_id):
         """
@@ -921,53 +1148,11 @@ show_progress: bool = True, log_levels: Optional[Dict[str, str]] = None) -> Tupl
         if not task_id or not self.use_visual_bars: # Ne pas détecter si pas de task_id ou barres désactivées
              return False
 
-        for pattern in PROGRESS_PATTERNS:
-            match = pattern.search(line)
-            if match:
-                # Extraire le pourcentage ou calculer à partir des groupes capturés
-                groups = match.groups()
-                try:
-                    if len(groups) == 1 and groups[0] is not None:
-                        # Format simple: 45% (capturé comme groupe 1)
-                        percentage = int(groups[0])
-                        self._update_command_progress(task_id, percentage)
-                        return True
-                    elif len(groups) >= 2:
-                        # Vérifier si les groupes sont None avant d'appeler strip()
-                        group1 = groups[0]
-                        group2 = groups[1]
-
-                        # Format: 5/20
-                        if group1 is not None and group1.strip().isdigit() and \
-                           group2 is not None and group2.strip().isdigit():
-                            current = int(group1.strip())
-                            total = int(group2.strip())
-                            percentage = int((current / total) * 100) if total > 0 else 0
-                            self._update_command_progress(task_id, percentage)
-                            return True
-
-                        # Format: [=====>   ] 45%
-                        # Le groupe 1 peut être la barre, le groupe 2 le pourcentage
-                        elif group2 is not None and group2.strip().isdigit():
-                            percentage = int(group2.strip())
-                            self._update_command_progress(task_id, percentage)
-                            return True
-
-                        # Format: Cas avec groupe optionnel pour décimales
-                        # (?:progress|...)[:=]\s*(\d+)(?:[.,](\d+))?%
-                        # Ici, group1 est la partie entière, group2 est la partie décimale (optionnelle)
-                        elif group1 is not None and group1.strip().isdigit():
-                            percentage = int(group1.strip())
-                            # Ignorer group2 (décimale) pour la barre de progression
-                            self._update_command_progress(task_id, percentage)
-                            return True
-
-                except (ValueError, IndexError, TypeError) as e:
-                     # Logguer discrètement l'erreur de parsing de progression
-                     self.log_debug(f"Erreur parsing progression ligne '{line}': {e}", log_levels=log_levels)
-                     pass # Continuer avec le pattern suivant
-
-        return False
+        percentage = match_progress(line)
+        if percentage is None:
+            return False
+        self._update_command_progress(task_id, percentage)
+        return True
 
 
     def _update_command_progress(self, task_id, percentage):
@@ -1009,93 +1194,390 @@ show_progress: bool = True, log_levels: Optional[Dict[str, str]] = None) -> Tupl
                         cwd: Optional[str] = None,
                         env: Optional[Dict[str, str]] = None,
                         needs_sudo: Optional[bool] = None,
-                        show_progress: bool = True) -> Tuple[bool, str, str]:
+                        show_progress: bool = True,
+                        log_levels: Optional[Dict[str, str]] = None,
+                        cache: Optional[str] = None,
+                        invalidates: Optional[Union[str, List[str]]] = None) -> Tuple[bool, str, str]:
         """
         Version asynchrone de run() pour être utilisée dans des contextes asyncio.
-        Exécute une commande de manière non-bloquante, en permettant à l'interface de rester réactive.
+        Basée sur asyncio.create_subprocess_exec: aucune commande ne mobilise de thread,
+        ce qui permet de lancer des centaines de sondes en parallèle (asyncio.gather).
+        La préparation (sudo, courtier privilégié) et la détection de progression
+        sont partagées avec run().
 
         Args:
-            [Mêmes arguments que run()]
+            [Mêmes arguments que run(), y compris cache et invalidates]
 
         Returns:
             Tuple (success: bool, stdout: str, stderr: str).
+
+        Raises:
+            subprocess.CalledProcessError: Si la commande échoue et check=True.
+            subprocess.TimeoutExpired: Si le timeout est dépassé.
+            FileNotFoundError: Si la commande ou sudo n'est pas trouvée.
+            PermissionError: Si l'authentification sudo échoue et check=True.
         """
-        # En mode débogueur, simplifier l'exécution pour éviter les blocages
-        if self.debugger_mode:
-            # Utiliser un timeout plus court en mode débogueur
-            if timeout is None or timeout > 30:
-                timeout = 30
-
-            # Exécuter de manière synchrone mais dans une tâche asyncio
-            return await asyncio.to_thread(
-                self.run,
-                cmd, input_data, no_output, print_command, False,  # real_time_output=False
-                error_as_warning, timeout, check, shell, cwd, env, needs_sudo, show_progress
-            )
+        started_at = time.monotonic()
+        cache_key = None
+        if cache:
+            cache_key = make_cache_key(cmd, shell, cwd, env, needs_sudo)
+            cached = self._get_cached_result(cache, cache_key, cmd, needs_sudo, started_at, log_levels)
+            if cached is not None:
+                if check and not cached[0]:
+                    raise subprocess.CalledProcessError(1, cmd, output=cached[1], stderr=cached[2])
+                return cached
+
+        result = None
+        try:
+            result = await self._run_async_uncached(cmd, input_data, no_output, print_command,
+                                                    error_as_warning, timeout, check, shell, cwd, env,
+                                                    needs_sudo, show_progress, log_levels=log_levels)
+            if cache:
+                COMMAND_CACHE.put(cache, cache_key, result)
+            return result
+        finally:
+            self._trace_command(cmd, needs_sudo, started_at, result)
+            if not cache:
+                self._invalidate_after(cmd, shell, invalidates)
+
+    async def _run_async_uncached(self,
+                        cmd: Union[str, List[str]],
+                        input_data: Optional[str] = None,
+                        no_output: bool = False,
+                        print_command: bool = False,
+                        error_as_warning: bool = False,
+                        timeout: Optional[int] = DEFAULT_COMMAND_TIMEOUT,
+                        check: bool = False,
+                        shell: bool = False,
+                        cwd: Optional[str] = None,
+                        env: Optional[Dict[str, str]] = None,
+                        needs_sudo: Optional[bool] = None,
+                        show_progress: bool = True,
+                        log_levels: Optional[Dict[str, str]] = None) -> Tuple[bool, str, str]:
+        """
+        Exécute une commande de manière asynchrone sans passer par le cache (voir run_async()).
+        """
+        # En mode débogueur, utiliser un timeout plus court pour éviter les blocages
+        if self.debugger_mode and (timeout is None or timeout > 30):
+            timeout = 30
+
+        # Le premier appel privilégié démarre le courtier (authentification sudo,
+        # jusqu'à BROKER_START_TIMEOUT): préparer hors de la boucle asyncio
+        prepared = await asyncio.get_running_loop().run_in_executor(
+            None, lambda: self._prepare_command(cmd, shell, env, needs_sudo, log_levels=log_levels))
+        cmd_list = prepared["cmd_list"]
+        cmd_to_run = prepared["cmd_to_run"]
+        use_sudo = prepared["use_sudo"]
+        sudo_password = prepared["sudo_password"]
+        broker = prepared["broker"]
+
+        cmd_str_for_log = ' '.join(cmd_to_run) if isinstance(cmd_to_run, list) else cmd_to_run
+        if broker is not None:
+            cmd_str_for_log = f"[sudo] {cmd_str_for_log}"
+        if print_command:
+            self.log_info(f"Exécution: {cmd_str_for_log}", log_levels=log_levels)
+
+        command_id = hash(str(cmd_to_run) + str(time.time()))
+        with self._command_lock:
+            self._running_commands[command_id] = cmd_str_for_log
+            self._async_commands.add(command_id)
 
-        # Créer un événement pour signaler quand la commande est terminée
-        done_event = asyncio.Event()
+        # Barre de progression pour apt/dpkg, comme dans run()
+        cmd_name = cmd_list[0].lower() if isinstance(cmd_list, list) and cmd_list else ""
+        is_apt = any(apt_cmd in cmd_name for apt_cmd in ["apt", "apt-get", "dpkg"])
+        cmd_task_id = f"cmd_{command_id}"
+        progress_bar_created = False
+        if is_apt and self.use_visual_bars and show_progress and not no_output:
+            apt_cmd_desc = f"Commande: {cmd_name}"
+            if isinstance(cmd_list, list) and len(cmd_list) > 1:
+                apt_cmd_desc += f" {cmd_list[1]}"
+            self.logger.create_bar(cmd_task_id, 100, pre_text=apt_cmd_desc, bar_width=30)
+            progress_bar_created = True
+        progress_state = self._new_progress_state()
+
+        stdout_lines: List[str] = []
+        stderr_lines: List[str] = []
+        log_stderr_func = self.log_warning if error_as_warning else self.log_error
+
+        async def read_stream(reader: asyncio.StreamReader, is_stderr: bool) -> None:
+            lines = stderr_lines if is_stderr else stdout_lines
+            while True:
+                raw = await reader.readline()
+                if not raw:
+                    break
+                line = raw.decode('utf-8', errors='replace').rstrip()
+                lines.append(line)
+                if not line:
+                    continue
+                if not no_output:
+                    if is_stderr:
+                        log_stderr_func(line, log_levels=log_levels)
+                    else:
+                        self.log_info(line, log_levels=log_levels)
+                if not is_stderr and show_progress:
+                    self._track_progress_line(line, cmd_task_id, is_apt, progress_state)
 
-        # Résultat de l'exécution
-        result = {"success": False, "stdout": "", "stderr": ""}
+        process = None
+        try:
+            process, stdout_reader, stderr_reader = await self._spawn_async(prepared, cwd, input_data)
+
+            # Envoi de l'input (mot de passe sudo puis données), sauf via le courtier
+            if broker is None and process.stdin is not None:
+                input_full = ""
+                if use_sudo and sudo_password:
+                    input_full += sudo_password + "\n"
+                if input_data:
+                    input_full += input_data
+                try:
+                    if input_full:
+                        process.stdin.write(input_full.encode('utf-8'))
+                        await process.stdin.drain()
+                except (BrokenPipeError, ConnectionResetError) as e:
+                    self.log_warning(f"Impossible d'écrire dans stdin: {e}", log_levels=log_levels)
+                finally:
+                    process.stdin.close()
+
+            tasks = [
+                asyncio.ensure_future(read_stream(stdout_reader, False)),
+                asyncio.ensure_future(read_stream(stderr_reader, True)),
+                asyncio.ensure_future(self._wait_async(process)),
+            ]
+            try:
+                done, pending = await asyncio.wait(tasks, timeout=timeout)
+            finally:
+                # Annulation de la tâche appelante ou timeout: arrêter les lectures
+                for task in tasks:
+                    if not task.done():
+                        task.cancel()
+            if pending:
+                self.log_error(f"Timeout ({timeout}s) dépassé pour la commande: {cmd_str_for_log}", log_levels=log_levels)
+                raise subprocess.TimeoutExpired(cmd_to_run, timeout,
+                                                "\n".join(stdout_lines), "\n".join(stderr_lines))
+            for task in done:
+                task.result()  # Propager une éventuelle erreur de lecture
+
+            return_code = process.returncode
+            stdout = "\n".join(stdout_lines)
+            stderr = "\n".join(stderr_lines)
+            success = (return_code == 0)
+
+            # Gérer le cas spécifique de sudo échouant à cause du mot de passe
+            if use_sudo and broker is None and return_code != 0 and any(
+                    err_msg in stderr.lower() for err_msg in ["incorrect password attempt",
+                                                              "sudo: a password is required"]):
+                err_msg = "Échec de l'authentification sudo."
+                self.log_error(err_msg, log_levels=log_levels)
+                if check:
+                    raise PermissionError(err_msg)
+                return False, stdout, stderr
+
+            if check and not success:
+                self.log_error(f"Erreur lors de l'exécution de: {cmd_str_for_log}", log_levels=log_levels)
+                self.log_error(f"Commande échouée avec code {return_code}.\nStderr: {stderr}\nStdout: {stdout}", log_levels=log_levels)
+                raise subprocess.CalledProcessError(return_code, cmd_to_run, output=stdout, stderr=stderr)
+
+            return success, stdout, stderr
+
+        except FileNotFoundError as e:
+            self.log_error(f"Erreur: Commande ou dépendance introuvable: {e.filename}", log_levels=log_levels)
+            raise
 
-        # ID unique pour cette commande
-        command_id = hash(str(cmd) + str(time.time()))
+        finally:
+            if progress_bar_created:
+                succeeded = process is not None and process.returncode == 0
+                self.logger.update_bar(cmd_task_id, 100, color="green" if succeeded else "red")
+                self.logger.delete_bar(cmd_task_id)
 
-        # Tracer la commande pour le débogage
-        with self._command_lock:
-            self._running_commands[command_id] = str(cmd)
-            self._async_commands.add(command_id)
+            # Commande interrompue (timeout, annulation de la tâche): tuer le processus
+            if process is not None and process.returncode is None:
+                try:
+                    process.kill()
+                except (ProcessLookupError, OSError):
+                    pass
 
-        # Fonction qui sera exécutée dans un thread à part
-        def thread_run(log_levels: Optional[Dict[str, str]] = None):
-            try:
-                # Exécuter la commande de manière synchrone
-                success, stdout, stderr = self.run(
-                    cmd, input_data, no_output, print_command, True,
-                    error_as_warning, timeout, check, shell, cwd, env, needs_sudo, show_progress
-                )
+            with self._command_lock:
+                self._running_commands.pop(command_id, None)
+                self._async_commands.discard(command_id)
 
-                # Stocker le résultat
-                result["success"] = success
-                result["stdout"] = stdout
-                result["stderr"] = stderr
-            except Exception as e:
-                # Enregistrer l'erreur
-                self.log_error(f"Erreur dans l'exécution asynchrone: {e}", exc_info=True, log_levels=log_levels)
-                result["stderr"] = str(e)
-            finally:
-                # Signaler que l'exécution est terminée
-                asyncio.run_coroutine_threadsafe(done_event.set(), asyncio.get_event_loop())
+            if hasattr(self.logger, 'flush'):
+                self.logger.flush()
 
-                # Nettoyer
-                with self._command_lock:
-                    if command_id in self._running_commands:
-                        del self._running_commands[command_id]
-                    if command_id in self._async_commands:
-                        self._async_commands.remove(command_id)
+    async def _spawn_async(self, prepared: Dict[str, Any], cwd: Optional[str],
+                           input_data: Optional[str]):
+        """
+        Lance une commande préparée par _prepare_command() sans thread dédié.
 
-        # Démarrer l'exécution dans un thread séparé
-        thread = threading.Thread(target=thread_run, daemon=True)
-        thread.start()
+        Returns:
+            Tuple (process, stdout_reader, stderr_reader)
+        """
+        broker = prepared["broker"]
+        if broker is not None:
+            # Le courtier expose des tubes locaux: les brancher sur la boucle asyncio
+            process = await broker.spawn_async(prepared["cmd_to_run"], shell=prepared["shell"], cwd=cwd,
+                                               env=prepared["effective_env"], input_data=input_data)
+            loop = asyncio.get_running_loop()
+            readers = []
+            for pipe in (process.stdout, process.stderr):
+                reader = asyncio.StreamReader(limit=ASYNC_STREAM_LIMIT)
+                await loop.connect_read_pipe(lambda r=reader: asyncio.StreamReaderProtocol(r), pipe)
+                readers.append(reader)
+            return process, readers[0], readers[1]
+
+        needs_stdin = bool(input_data) or (prepared["use_sudo"] and prepared["sudo_password"])
+        stdin = asyncio.subprocess.PIPE if needs_stdin else asyncio.subprocess.DEVNULL
+        if prepared["shell"]:
+            process = await asyncio.create_subprocess_shell(
+                prepared["cmd_to_run"], stdin=stdin,
+                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+                cwd=cwd, env=prepared["effective_env"], limit=ASYNC_STREAM_LIMIT)
+        else:
+            process = await asyncio.create_subprocess_exec(
+                *prepared["cmd_to_run"], stdin=stdin,
+                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+                cwd=cwd, env=prepared["effective_env"], limit=ASYNC_STREAM_LIMIT)
+        return process, process.stdout, process.stderr
+
+    @staticmethod
+    async def _wait_async(process) -> int:
+        """Attend la fin d'un processus asyncio ou d'un processus du courtier."""
+        # Processus du courtier: le message de fin résout une future de la boucle
+        return await (process.wait() if isinstance(process, asyncio.subprocess.Process)
+                      else process.wait_async())
+
+    def run_batch(self,
+                  commands: List[Union[str, List[str]]],
+                  needs_sudo: Optional[bool] = None,
+                  stop_on_error: bool = True,
+                  max_workers: int = 1,
+                  timeout: Optional[int] = DEFAULT_COMMAND_TIMEOUT,
+                  cwd: Optional[str] = None,
+                  env: Optional[Dict[str, str]] = None,
+                  print_command: bool = False,
+                  no_output: bool = False,
+                  error_as_warning: bool = False,
+                  log_levels: Optional[Dict[str, str]] = None) -> Tuple[bool, List[Dict[str, Any]]]:
+        """
+        Exécute une liste de commandes dans un unique processus auxiliaire.
 
+        L'élévation de privilèges (sudo ou courtier) n'est appliquée qu'une fois
+        pour tout le lot, au lancement de l'exécuteur.
+
+        Args:
+            commands: Commandes à exécuter (listes d'arguments, ou chaînes découpées avec shlex).
+            needs_sudo: Même signification que pour run().
+            stop_on_error: Si True, n'exécute plus de commande après le premier échec.
+            max_workers: Nombre maximal de commandes exécutées simultanément (1 = séquentiel).
+            timeout: Timeout en secondes pour chaque commande (None pour aucun timeout).
+            cwd: Répertoire de travail des commandes.
+            env: Environnement des commandes (défaut: environnement hérité).
+            print_command: Si True, journalise chaque commande avec son résultat.
+            no_output: Si True, ne journalise pas les sorties des commandes en échec.
+            error_as_warning: Si True, journalise les échecs comme des avertissements.
+
+        Returns:
+            Tuple (success: bool, results: List[Dict]).
+            'success' est True si toutes les commandes ont été exécutées avec le code 0.
+            Chaque résultat contient: cmd, rc, stdout, stderr, duration, error, skipped.
+            Les commandes non exécutées (après un échec) ont rc=None et skipped=True.
+        """
+        argv_list: List[List[str]] = []
+        for cmd in commands:
+            if isinstance(cmd, str):
+                try:
+                    argv_list.append(shlex.split(cmd))
+                except ValueError as e:
+                    self.log_error(f"Erreur lors du découpage de la commande: '{cmd}'. Erreur: {e}", log_levels=log_levels)
+                    raise ValueError(f"Commande invalide: {cmd}") from e
+            else:
+                argv_list.append(list(cmd))
+
+        results: List[Dict[str, Any]] = [
+            {"cmd": argv, "rc": None, "stdout": "", "stderr": "", "duration": 0.0,
+             "error": None, "skipped": True}
+            for argv in argv_list
+        ]
+        if not argv_list:
+            return True, results
+
+        spec = {
+            "commands": argv_list,
+            "stop_on_error": stop_on_error,
+            "max_workers": max_workers,
+            "timeout": timeout,
+            "cwd": cwd,
+            "env": env,
+        }
+
+        # Timeout global de l'exécuteur: pire cas où les vagues de commandes atteignent leur timeout
+        batch_timeout = None
+        if timeout is not None:
+            waves = -(-len(argv_list) // max(1, max_workers))
+            batch_timeout = timeout * waves + 10
+
+        self.log_debug("Lot de %d commande(s) (concurrence: %d)", len(argv_list), max_workers, log_levels=log_levels)
+
+        helper_stdout = ""
+        helper_stderr = ""
         try:
-            # Attendre que l'exécution soit terminée, avec possibilité d'annulation
-            await done_event.wait()
-            return result["success"], result["stdout"], result["stderr"]
-        except asyncio.CancelledError:
-            # Si la tâche asyncio est annulée, tenter d'annuler la commande
-            self.log_warning(f"Annulation de la commande asynchrone: {cmd}", log_levels=log_levels)
-            # L'annulation propre n'est pas possible directement
-            # Le mieux est de marquer la commande comme ne devant plus être traitée
-            with self._command_lock:
-                if command_id in self._running_commands:
-                    del self._running_commands[command_id]
-                if command_id in self._async_commands:
-                    self._async_commands.remove(command_id)
+            _, helper_stdout, helper_stderr = self.run(
+                [sys.executable, BATCH_HELPER_PATH],
+                input_data=json.dumps(spec, ensure_ascii=False) + "\n",
+                no_output=True,
+                real_time_output=False,
+                timeout=batch_timeout,
+                needs_sudo=needs_sudo,
+                show_progress=False,
+                log_levels=log_levels,
+            )
+        except subprocess.TimeoutExpired:
+            self.log_error(f"Timeout dépassé pour le lot de {len(argv_list)} commande(s)", log_levels=log_levels)
 
-            # Relever l'exception pour propager l'annulation
-            raise
+        for line in helper_stdout.splitlines():
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            index = entry.get("index", -1)
+            if 0 <= index < len(results):
+                results[index].update(entry, skipped=False)
+                results[index].pop("index", None)
+            elif entry.get("error"):
+                self.log_error(f"Exécuteur de lot: {entry['error']}", log_levels=log_levels)
+
+        if all(result["skipped"] for result in results) and helper_stderr.strip():
+            self.log_error(f"Échec du lancement du lot: {helper_stderr.strip()}", log_levels=log_levels)
+
+        log_failure = self.log_warning if error_as_warning else self.log_error
+        for result in results:
+            cmd_str = ' '.join(result["cmd"])
+            if result["skipped"]:
+                self.log_debug("Non exécutée: %s", cmd_str, log_levels=log_levels)
+                continue
+            if print_command:
+                self.log_info(f"Exécution: {cmd_str} (code {result['rc']}, {result['duration']:.2f}s)", log_levels=log_levels)
+            if result["rc"] != 0:
+                log_failure(f"Échec (code {result['rc']}): {cmd_str}", log_levels=log_levels)
+                details = result["error"] or result["stderr"].strip()
+                if details and not no_output:
+                    log_failure(details, log_levels=log_levels)
+
+        success = all(result["rc"] == 0 for result in results)
+
+        # Les commandes du lot ont pu modifier l'état (paquets, comptes, imprimantes...)
+        # et sont tracées individuellement (le lanceur l'est déjà par run())
+        sudo = self._uses_sudo(needs_sudo)
+        for result in results:
+            if not result["skipped"]:
+                self._invalidate_after(result["cmd"], False)
+                ended_at = time.monotonic()
+                COMMAND_TRACE.record(result["cmd"], sudo, ended_at - (result["duration"] or 0.0), ended_at,
+                                     result["rc"], len(result["stdout"] or ""), len(result["stderr"] or ""),
+                                     nested=True)
+
+        if hasattr(self.logger, 'flush'):
+            self.logger.flush()
+
+        return success, results
 
     def get_running_commands(self, log_levels: Optional[Dict[str, str]] = None) -> List[str]:
         """
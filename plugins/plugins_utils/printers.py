@@ -6,6 +6,7 @@ Permet d'ajouter, supprimer et configurer des imprimantes dans un système Linux
 """
 
 from plugins_utils.plugins_utils_base import PluginsUtilsBase # Hériter de la nouvelle base
+from plugins_utils.command_cache import FAMILY_PRINTERS
 import os
 import re
 import time
@@ -29,7 +30,7 @@ class PrinterCommands(PluginsUtilsBase):
         """
         self.log_debug("Listage des imprimantes configurées (lpstat -p)", log_levels=log_levels)
         # Utiliser check=False car lpstat peut retourner 1 si aucune imprimante n'est trouvée
-        success, stdout, stderr = self.run(['lpstat', '-p'], check=False, no_output=True, error_as_warning=True, needs_sudo=False)
+        success, stdout, stderr = self.run(['lpstat', '-p'], check=False, no_output=True, error_as_warning=True, needs_sudo=False, cache=FAMILY_PRINTERS)
 
         printers = []
         if success or "no printers found" in stderr.lower(): # Gérer le cas où aucune imprimante n'est une "erreur" pour lpstat
@@ -59,7 +60,7 @@ class PrinterCommands(PluginsUtilsBase):
         self.log_debug(f"Récupération des détails pour {'toutes les imprimantes' if printer_name is None else printer_name} (lpstat -t)", log_levels=log_levels)
         # lpstat -t donne toutes les infos, y compris URI et statut
         # check=False car peut retourner 1 si aucune imprimante
-        success, stdout, stderr = self.run(['lpstat', '-t'], check=False, no_output=True, error_as_warning=True, needs_sudo=False)
+        success, stdout, stderr = self.run(['lpstat', '-t'], check=False, no_output=True, error_as_warning=True, needs_sudo=False, cache=FAMILY_PRINTERS)
 
         details = {}
         if not success and "no printers found" not in stderr.lower():
@@ -359,7 +360,7 @@ enabled: bool = True, log_levels: Optional[Dict[str, str]] = None) -> bool:
     def get_default_printer(self, log_levels: Optional[Dict[str, str]] = None) -> Optional[str]:
         """Obtient le nom de l'imprimante par défaut."""
         self.log_debug("Recherche de l'imprimante par défaut (lpstat -d)", log_levels=log_levels)
-        success, stdout, stderr = self.run(['lpstat', '-d'], check=False, no_output=True, error_as_warning=False, needs_sudo=False)
+        success, stdout, stderr = self.run(['lpstat', '-d'], check=False, no_output=True, error_as_warning=False, needs_sudo=False, cache=FAMILY_PRINTERS)
 
         if not success or "no system default destination" in stdout.lower() or "aucun système destinataire par défaut" in stdout.lower():
             self.log_info("Aucune imprimante par défaut configurée.", log_levels=log_levels)
@@ -0,0 +1,672 @@
+#!/usr/bin/env python3
+"""
+Courtier d'exécution privilégiée pour les plugins.
+
+Au lieu de lancer `sudo -S -E <cmd>` (et de s'authentifier auprès de PAM) pour
+chaque commande, un unique processus courtier est démarré via sudo au premier
+besoin. Il reste actif pendant toute la session du plugin et exécute les
+commandes privilégiées qui lui sont transmises sur son entrée standard.
+
+Protocole (une ligne JSON par message, sur les tubes stdin/stdout du courtier,
+donc accessible uniquement au processus plugin qui l'a lancé):
+    client -> courtier: {"op": "run", "id", "cmd", "shell", "cwd", "env", "input"}
+                        {"op": "signal", "id", "signal"}
+                        {"op": "shutdown"}
+    courtier -> client: {"op": "ready"}
+                        {"op": "started", "id", "pid"} ou {"op": "error", "id", "error", "errno"}
+                        {"op": "out", "id", "stream": "stdout"|"stderr", "data"}
+                        {"op": "exit", "id", "rc"}
+
+Côté client, chaque commande est exposée par un objet BrokeredProcess qui imite
+subprocess.Popen (stdout/stderr lisibles et sélectionnables, poll, wait,
+communicate, kill), ce qui permet à PluginsUtilsBase.run() de l'utiliser sans
+modifier sa logique de lecture des sorties. spawn_async() et wait_async() en
+sont les équivalents asyncio: l'accusé de lancement et le message de fin
+résolvent des futures de la boucle, sans thread bloqué en attente.
+
+Ce module n'importe que la bibliothèque standard: il est aussi exécuté tel quel
+(en root) comme script serveur.
+"""
+
+import os
+import sys
+import json
+import asyncio
+import atexit
+import signal
+import codecs
+import select
+import threading
+import subprocess
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+# Variable d'environnement permettant de désactiver le courtier ("0", "false", "no")
+BROKER_ENV_VAR = "PCUTILS_SUDO_BROKER"
+BROKER_START_TIMEOUT = 15.0
+BROKER_SPAWN_TIMEOUT = 10.0
+READ_CHUNK_SIZE = 65536
+
+
+# ----------------------------------------------------------------------
+# Côté serveur (exécuté en root)
+# ----------------------------------------------------------------------
+
+def _serve() -> int:
+    """Boucle principale du courtier: lit les requêtes et exécute les commandes."""
+    out_lock = threading.Lock()
+    processes: Dict[int, subprocess.Popen] = {}
+    processes_lock = threading.Lock()
+    stdout = sys.stdout
+
+    def send(message: Dict[str, Any]) -> None:
+        line = json.dumps(message, ensure_ascii=False) + "\n"
+        with out_lock:
+            try:
+                stdout.write(line)
+                stdout.flush()
+            except (BrokenPipeError, OSError):
+                pass
+
+    def pump(request_id: int, stream_name: str, pipe) -> None:
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        fd = pipe.fileno()
+        while True:
+            chunk = os.read(fd, READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            data = decoder.decode(chunk)
+            if data:
+                send({"op": "out", "id": request_id, "stream": stream_name, "data": data})
+        data = decoder.decode(b"", final=True)
+        if data:
+            send({"op": "out", "id": request_id, "stream": stream_name, "data": data})
+        pipe.close()
+
+    def execute(request: Dict[str, Any]) -> None:
+        request_id = request.get("id")
+        input_data = request.get("input")
+        try:
+            process = subprocess.Popen(
+                request["cmd"],
+                shell=bool(request.get("shell")),
+                cwd=request.get("cwd"),
+                env=request.get("env"),
+                stdin=subprocess.PIPE if input_data else subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+            )
+        except OSError as e:
+            send({"op": "error", "id": request_id, "error": e.strerror or str(e), "errno": e.errno,
+                  "filename": getattr(e, 'filename', None)})
+            return
+        except Exception as e:
+            send({"op": "error", "id": request_id, "error": str(e), "errno": None})
+            return
+
+        with processes_lock:
+            processes[request_id] = process
+        send({"op": "started", "id": request_id, "pid": process.pid})
+
+        pumps = [
+            threading.Thread(target=pump, args=(request_id, "stdout", process.stdout), daemon=True),
+            threading.Thread(target=pump, args=(request_id, "stderr", process.stderr), daemon=True),
+        ]
+        for thread in pumps:
+            thread.start()
+
+        if input_data:
+            try:
+                process.stdin.write(input_data.encode('utf-8'))
+            except (BrokenPipeError, OSError):
+                pass
+            finally:
+                try:
+                    process.stdin.close()
+                except OSError:
+                    pass
+
+        return_code = process.wait()
+        for thread in pumps:
+            thread.join()
+        with processes_lock:
+            processes.pop(request_id, None)
+        send({"op": "exit", "id": request_id, "rc": return_code})
+
+    send({"op": "ready", "pid": os.getpid()})
+
+    while True:
+        line = sys.stdin.readline()
+        if not line:
+            break
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError:
+            # Ligne non JSON (ex: mot de passe non consommé par sudo): ignorée
+            continue
+        if not isinstance(request, dict):
+            continue
+
+        op = request.get("op")
+        if op == "run":
+            threading.Thread(target=execute, args=(request,), daemon=True).start()
+        elif op == "signal":
+            with processes_lock:
+                process = processes.get(request.get("id"))
+            if process is not None:
+                try:
+                    process.send_signal(int(request.get("signal", signal.SIGTERM)))
+                except (OSError, ValueError):
+                    pass
+        elif op == "shutdown":
+            break
+
+    # Client parti ou arrêt demandé: ne pas laisser de commandes orphelines
+    with processes_lock:
+        remaining = list(processes.values())
+    for process in remaining:
+        try:
+            process.kill()
+        except OSError:
+            pass
+    return 0
+
+
+# ----------------------------------------------------------------------
+# Côté client (processus plugin)
+# ----------------------------------------------------------------------
+
+def _resolve_future(future: "asyncio.Future") -> None:
+    """Résout une future asyncio (appelée dans sa boucle via call_soon_threadsafe)."""
+    if not future.done():
+        future.set_result(None)
+
+
+class _OutputPump:
+    """
+    Réécrit les sorties reçues du courtier dans les tubes locaux des commandes.
+
+    Les tubes locaux sont non bloquants: l'écriture est tentée directement par
+    le thread lecteur du courtier, et seules les données qu'un consommateur lent
+    n'a pas encore lues sont confiées à un unique thread d'écriture partagé par
+    toutes les commandes. Une commande lente ne retient donc ni la réception des
+    autres, ni un thread à elle seule.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: Dict[int, bytearray] = {}            # tube -> données en attente
+        self._closing: Dict['BrokeredProcess', int] = {}    # commande -> code retour à publier
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        os.set_blocking(self._wake_w, False)
+        self._thread: Optional[threading.Thread] = None
+
+    def write(self, fd: int, data: bytes) -> None:
+        """Écrit des données dans un tube local, ou les met en attente s'il est plein."""
+        with self._lock:
+            buffer = self._pending.get(fd)
+            if buffer is not None:
+                buffer.extend(data)
+                return
+            try:
+                written = os.write(fd, data)
+            except BlockingIOError:
+                written = 0
+            except OSError:
+                # Lecteur fermé: les données sont simplement abandonnées
+                return
+            if written < len(data):
+                self._pending[fd] = bytearray(data[written:])
+                self._wake()
+
+    def finish(self, process: 'BrokeredProcess', return_code: int) -> None:
+        """Publie le code retour d'une commande une fois ses tubes vidés."""
+        with self._lock:
+            if process in self._closing or process._finished.is_set():
+                return
+            self._closing[process] = return_code
+            completed = self._pop_completed()
+        for done, code in completed:
+            done._complete(code)
+
+    def _pop_completed(self) -> List[Tuple['BrokeredProcess', int]]:
+        """Commandes terminées dont les tubes n'ont plus de données en attente (sous verrou)."""
+        completed = [(process, code) for process, code in self._closing.items()
+                     if process._stdout_w not in self._pending and process._stderr_w not in self._pending]
+        for process, _ in completed:
+            del self._closing[process]
+        return completed
+
+    def _wake(self) -> None:
+        """Démarre ou réveille le thread d'écriture (sous verrou)."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        try:
+            os.write(self._wake_w, b"\0")
+        except BlockingIOError:
+            pass
+
+    def _run(self) -> None:
+        """Vide les tubes en attente dès qu'ils sont accessibles en écriture."""
+        while True:
+            poller = select.poll()
+            poller.register(self._wake_r, select.POLLIN)
+            with self._lock:
+                for fd in self._pending:
+                    poller.register(fd, select.POLLOUT)
+            events = poller.poll()
+            try:
+                while os.read(self._wake_r, 4096):
+                    pass
+            except BlockingIOError:
+                pass
+
+            with self._lock:
+                for fd, _ in events:
+                    buffer = self._pending.get(fd)
+                    if buffer is None:
+                        continue
+                    try:
+                        del buffer[:os.write(fd, buffer[:READ_CHUNK_SIZE])]
+                    except BlockingIOError:
+                        continue
+                    except OSError:
+                        buffer.clear()
+                    if not buffer:
+                        del self._pending[fd]
+                completed = self._pop_completed()
+            for process, code in completed:
+                process._complete(code)
+
+
+class BrokeredProcess:
+    """
+    Commande exécutée par le courtier, avec une interface compatible subprocess.Popen.
+    """
+
+    def __init__(self, broker: 'PrivilegedBroker', request_id: int, args: Union[str, List[str]]):
+        self._broker = broker
+        self._request_id = request_id
+        self.args = args
+        self.pid: Optional[int] = None
+        self.returncode: Optional[int] = None
+        self.stdin = None
+
+        # Tubes locaux: les sorties reçues du courtier y sont réécrites, ce qui
+        # rend stdout/stderr utilisables avec select() comme pour un vrai Popen
+        stdout_r, self._stdout_w = os.pipe()
+        stderr_r, self._stderr_w = os.pipe()
+        os.set_blocking(self._stdout_w, False)
+        os.set_blocking(self._stderr_w, False)
+        self.stdout = os.fdopen(stdout_r, 'r', encoding='utf-8', errors='replace')
+        self.stderr = os.fdopen(stderr_r, 'r', encoding='utf-8', errors='replace')
+
+        self._started = threading.Event()
+        self._finished = threading.Event()
+        self._spawn_error: Optional[Dict[str, Any]] = None
+        self._communicate_threads: Optional[List[threading.Thread]] = None
+        self._communicate_results: Dict[str, str] = {}
+        # Futures asyncio en attente d'un événement: (événement, boucle, future)
+        self._loop_waiters: List[Tuple[threading.Event, asyncio.AbstractEventLoop, "asyncio.Future"]] = []
+        self._waiters_lock = threading.Lock()
+
+    # --- Réception (appelée par le thread lecteur du courtier) ---
+
+    def _dispatch(self, message: Dict[str, Any]) -> None:
+        op = message.get("op")
+        if op == "out":
+            fd = {"stdout": self._stdout_w, "stderr": self._stderr_w}.get(message.get("stream"))
+            if fd is not None:
+                self._broker._pump.write(fd, message.get("data", "").encode('utf-8'))
+        elif op == "started":
+            self.pid = message.get("pid")
+            self._set_event(self._started)
+        elif op == "error":
+            self._spawn_error = message
+            self._set_event(self._started)
+            self._broker._pump.finish(self, 127)
+        elif op == "exit":
+            self._broker._pump.finish(self, message.get("rc", -1))
+
+    def _complete(self, return_code: int) -> None:
+        """Ferme les tubes locaux et publie le code retour (sorties entièrement transmises)."""
+        for fd in (self._stdout_w, self._stderr_w):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        self.returncode = return_code
+        self._set_event(self._finished)
+        self._broker._forget(self._request_id)
+
+    def _set_event(self, event: threading.Event) -> None:
+        """Signale un événement et résout les futures asyncio qui l'attendent."""
+        event.set()
+        with self._waiters_lock:
+            ready = [(loop, future) for waited, loop, future in self._loop_waiters if waited is event]
+            self._loop_waiters = [waiter for waiter in self._loop_waiters if waiter[0] is not event]
+        for loop, future in ready:
+            try:
+                loop.call_soon_threadsafe(_resolve_future, future)
+            except RuntimeError:
+                # Boucle déjà fermée
+                pass
+
+    def _loop_future(self, event: threading.Event) -> "asyncio.Future":
+        """Future de la boucle courante, résolue quand l'événement est signalé."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._waiters_lock:
+            if not event.is_set():
+                self._loop_waiters.append((event, loop, future))
+                return future
+        future.set_result(None)
+        return future
+
+    def _wait_started(self, timeout: float) -> None:
+        """Attend la confirmation du lancement et lève l'erreur équivalente à Popen."""
+        if not self._started.wait(timeout):
+            raise OSError("Le courtier privilégié ne répond pas")
+        self._raise_spawn_error()
+
+    async def _wait_started_async(self, timeout: float) -> None:
+        """Équivalent asyncio de _wait_started()."""
+        try:
+            await asyncio.wait_for(self._loop_future(self._started), timeout)
+        except asyncio.TimeoutError:
+            raise OSError("Le courtier privilégié ne répond pas") from None
+        self._raise_spawn_error()
+
+    def _raise_spawn_error(self) -> None:
+        """Lève l'erreur équivalente à Popen si le courtier n'a pas pu lancer la commande."""
+        if self._spawn_error:
+            errno_value = self._spawn_error.get("errno")
+            message = self._spawn_error.get("error", "")
+            filename = self._spawn_error.get("filename")
+            if errno_value == 2:
+                raise FileNotFoundError(errno_value, message, filename)
+            if errno_value == 13:
+                raise PermissionError(errno_value, message, filename)
+            raise OSError(errno_value, message)
+
+    # --- Interface compatible Popen ---
+
+    def poll(self) -> Optional[int]:
+        return self.returncode
+
+    def wait(self, timeout: Optional[float] = None) -> int:
+        if not self._finished.wait(timeout):
+            raise subprocess.TimeoutExpired(self.args, timeout)
+        return self.returncode
+
+    async def wait_async(self) -> int:
+        """Équivalent asyncio de wait(): attend le message de fin du courtier sur la boucle."""
+        await self._loop_future(self._finished)
+        return self.returncode
+
+    def communicate(self, input: Optional[str] = None, timeout: Optional[float] = None):
+        if self._communicate_threads is None:
+            def read_all(name, stream):
+                try:
+                    self._communicate_results[name] = stream.read()
+                except (OSError, ValueError):
+                    self._communicate_results[name] = ""
+            self._communicate_threads = [
+                threading.Thread(target=read_all, args=("stdout", self.stdout), daemon=True),
+                threading.Thread(target=read_all, args=("stderr", self.stderr), daemon=True),
+            ]
+            for thread in self._communicate_threads:
+                thread.start()
+
+        for thread in self._communicate_threads:
+            thread.join(timeout)
+            if thread.is_alive():
+                raise subprocess.TimeoutExpired(self.args, timeout)
+        self.wait(timeout)
+        return self._communicate_results.get("stdout", ""), self._communicate_results.get("stderr", "")
+
+    def send_signal(self, sig: int) -> None:
+        if self.returncode is None:
+            self._broker._send({"op": "signal", "id": self._request_id, "signal": int(sig)})
+
+    def terminate(self) -> None:
+        self.send_signal(signal.SIGTERM)
+
+    def kill(self) -> None:
+        self.send_signal(signal.SIGKILL)
+
+
+class PrivilegedBroker:
+    """
+    Client du courtier: démarre le serveur via sudo (une seule authentification)
+    et lui délègue les commandes privilégiées.
+    """
+
+    def __init__(self, sudo_password: Optional[str] = None):
+        self._sudo_password = sudo_password
+        self._process: Optional[subprocess.Popen] = None
+        self._send_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._pending: Dict[int, BrokeredProcess] = {}
+        self._next_id = 0
+        self._ready = threading.Event()
+        self._alive = False
+        self._pump = _OutputPump()
+
+    @property
+    def alive(self) -> bool:
+        """Indique si le courtier est démarré et joignable."""
+        return self._alive and self._process is not None and self._process.poll() is None
+
+    def start(self) -> bool:
+        """
+        Lance le courtier via sudo et attend qu'il soit prêt.
+
+        Returns:
+            bool: True si le courtier est opérationnel
+        """
+        cmd = ["sudo", "-S", "-E", "-p", "", sys.executable, os.path.abspath(__file__), "--serve"]
+        try:
+            self._process = subprocess.Popen(
+                cmd,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+                encoding='utf-8',
+                errors='replace',
+                bufsize=1,
+            )
+        except OSError:
+            self._process = None
+            return False
+
+        if self._sudo_password:
+            try:
+                self._process.stdin.write(self._sudo_password + "\n")
+                self._process.stdin.flush()
+            except (BrokenPipeError, OSError):
+                pass
+
+        threading.Thread(target=self._reader_loop, daemon=True).start()
+        if not self._ready.wait(BROKER_START_TIMEOUT) or self._process.poll() is not None:
+            self.close()
+            return False
+        self._alive = True
+        return True
+
+    def spawn(self, cmd: Union[str, List[str]], shell: bool = False, cwd: Optional[str] = None,
+              env: Optional[Dict[str, str]] = None, input_data: Optional[str] = None) -> BrokeredProcess:
+        """
+        Exécute une commande via le courtier.
+
+        Args:
+            cmd: Commande (liste d'arguments, ou chaîne si shell=True)
+            shell: Interpréter la commande via le shell
+            cwd: Répertoire de travail
+            env: Environnement complet (défaut: environnement courant du plugin)
+            input_data: Données envoyées sur stdin de la commande
+
+        Returns:
+            BrokeredProcess: Processus compatible Popen
+
+        Raises:
+            FileNotFoundError, PermissionError, OSError: Si le lancement échoue
+        """
+        process = self._submit(cmd, shell, cwd, env, input_data)
+        try:
+            process._wait_started(BROKER_SPAWN_TIMEOUT)
+        except OSError:
+            self._forget(process._request_id)
+            raise
+        return process
+
+    async def spawn_async(self, cmd: Union[str, List[str]], shell: bool = False, cwd: Optional[str] = None,
+                          env: Optional[Dict[str, str]] = None, input_data: Optional[str] = None) -> BrokeredProcess:
+        """
+        Équivalent asyncio de spawn(): l'accusé de lancement est attendu sur la
+        boucle au lieu de bloquer le thread appelant.
+
+        Raises:
+            FileNotFoundError, PermissionError, OSError: Si le lancement échoue
+        """
+        process = self._submit(cmd, shell, cwd, env, input_data)
+        try:
+            await process._wait_started_async(BROKER_SPAWN_TIMEOUT)
+        except OSError:
+            self._forget(process._request_id)
+            raise
+        return process
+
+    def _submit(self, cmd: Union[str, List[str]], shell: bool, cwd: Optional[str],
+                env: Optional[Dict[str, str]], input_data: Optional[str]) -> BrokeredProcess:
+        """Enregistre une commande et transmet la requête au courtier."""
+        with self._state_lock:
+            self._next_id += 1
+            request_id = self._next_id
+            process = BrokeredProcess(self, request_id, cmd)
+            self._pending[request_id] = process
+
+        try:
+            self._send({
+                "op": "run",
+                "id": request_id,
+                "cmd": cmd,
+                "shell": shell,
+                "cwd": cwd,
+                "env": dict(os.environ) if env is None else env,
+                "input": input_data,
+            })
+        except OSError:
+            self._forget(request_id)
+            raise
+        return process
+
+    def close(self) -> None:
+        """Arrête le courtier (les commandes encore en cours sont tuées)."""
+        self._alive = False
+        if self._process is None:
+            return
+        try:
+            self._send({"op": "shutdown"})
+            self._process.stdin.close()
+        except (OSError, ValueError):
+            pass
+        try:
+            self._process.wait(timeout=2.0)
+        except subprocess.TimeoutExpired:
+            try:
+                self._process.kill()
+            except OSError:
+                pass
+
+    def _send(self, message: Dict[str, Any]) -> None:
+        if self._process is None:
+            raise OSError("Courtier privilégié non démarré")
+        line = json.dumps(message, ensure_ascii=False) + "\n"
+        with self._send_lock:
+            try:
+                self._process.stdin.write(line)
+                self._process.stdin.flush()
+            except (BrokenPipeError, ValueError) as e:
+                self._alive = False
+                raise OSError(f"Courtier privilégié indisponible: {e}") from e
+
+    def _forget(self, request_id: int) -> None:
+        with self._state_lock:
+            self._pending.pop(request_id, None)
+
+    def _reader_loop(self) -> None:
+        """Reçoit les messages du courtier et les distribue aux commandes."""
+        for line in self._process.stdout:
+            try:
+                message = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if not isinstance(message, dict):
+                continue
+            if message.get("op") == "ready":
+                self._ready.set()
+                continue
+            with self._state_lock:
+                process = self._pending.get(message.get("id"))
+            if process is not None:
+                process._dispatch(message)
+
+        # Courtier terminé: débloquer les commandes en attente
+        self._alive = False
+        with self._state_lock:
+            orphans = list(self._pending.values())
+        for process in orphans:
+            process._dispatch({"op": "exit", "rc": -1})
+
+
+_broker: Optional[PrivilegedBroker] = None
+_broker_failed = False
+_broker_lock = threading.Lock()
+
+
+def broker_enabled() -> bool:
+    """
+    Indique si l'utilisation du courtier est autorisée (PCUTILS_SUDO_BROKER).
+
+    Returns:
+        bool: False si la variable vaut 0/false/no
+    """
+    return os.environ.get(BROKER_ENV_VAR, "1").lower() not in ("0", "false", "no")
+
+
+def get_privileged_broker() -> Optional[PrivilegedBroker]:
+    """
+    Retourne le courtier de la session, en le démarrant au premier appel.
+
+    Un échec de démarrage (sudo absent, mot de passe refusé, politique sudo
+    interdisant -E...) n'est tenté qu'une fois: l'appelant revient alors à
+    l'exécution sudo classique.
+
+    Returns:
+        Optional[PrivilegedBroker]: Courtier opérationnel, ou None
+    """
+    global _broker, _broker_failed
+    if not broker_enabled():
+        return None
+    with _broker_lock:
+        if _broker is not None and _broker.alive:
+            return _broker
+        if _broker_failed:
+            return None
+        broker = PrivilegedBroker(os.environ.get("SUDO_PASSWORD"))
+        if not broker.start():
+            _broker_failed = True
+            return None
+        _broker = broker
+        atexit.register(broker.close)
+        return _broker
+
+
+if __name__ == "__main__":
+    if "--serve" in sys.argv[1:]:
+        sys.exit(_serve())
+    print("Usage: privileged_broker.py --serve", file=sys.stderr)
+    sys.exit(2)
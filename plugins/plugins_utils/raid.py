@@ -32,20 +32,18 @@ class RaidCommands(PluginsUtilsBase):
         super().__init__(logger, target_ip)
         self._mdadm_path = self._find_mdadm()
 
-    def _find_mdadm(self) -> Optional[str]:
+    def _find_mdadm(self, log_levels: Optional[Dict[str, str]] = None) -> Optional[str]:
         """Trouve le chemin de l'exécutable mdadm."""
-        # Vérifier les emplacements courants
+        # Résolution via le cache partagé des exécutables
+        path_which = self.which('mdadm')
+        if path_which:
+            self.log_debug(f"Exécutable mdadm trouvé via which: {path_which}", log_levels=log_levels)
+            return path_which
+        # Sinon vérifier les emplacements courants (sbin parfois absent du PATH)
         for path in ['/sbin/mdadm', '/usr/sbin/mdadm', '/bin/mdadm', '/usr/bin/mdadm']:
-            success, _, _ = self.run(['test', '-x', path], check=False, no_output=True, error_as_warning=True)
-            if success:
+            if os.path.isfile(path) and os.access(path, os.X_OK):
                 self.log_debug(f"Exécutable mdadm trouvé: {path}", log_levels=log_levels)
                 return path
-        # Si non trouvé, essayer 'which'
-        success_which, path_which, _ = self.run(['which', 'mdadm'], check=False, no_output=True, error_as_warning=True)
-        if success_which and path_which.strip():
-            path_str = path_which.strip()
-            self.log_debug(f"Exécutable mdadm trouvé via which: {path_str}", log_levels=log_levels)
-            return path_str
 
         self.log_error("Exécutable 'mdadm' introuvable. Les opérations RAID échoueront. Installer le paquet 'mdadm'.", log_levels=log_levels)
         return None
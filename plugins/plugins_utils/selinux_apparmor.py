@@ -36,7 +36,7 @@ class MandatoryAccessControl(PluginsUtilsBase):
         found_selinux = False
         found_apparmor = False
         for cmd in cmds:
-            success, _, _ = self.run(['which', cmd], check=False, no_output=True, error_as_warning=True)
+            success = self.which(cmd) is not None
             if success:
                 if cmd.startswith('se') or cmd == 'restorecon':
                     found_selinux = True
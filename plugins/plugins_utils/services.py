@@ -9,6 +9,8 @@ et vérifier l'état des services du système.
 
 # Import de la classe de base et des types
 from plugins_utils.plugins_utils_base import PluginsUtilsBase
+from plugins_utils.command_cache import FAMILY_SERVICES
+import os
 import json # Pour parser la sortie de systemctl show
 import time # Pour les délais potentiels
 from typing import Union, Optional, List, Dict, Any, Tuple
@@ -30,20 +32,18 @@ class ServiceCommands(PluginsUtilsBase):
         super().__init__(logger, target_ip)
         self._systemctl_path = self._find_systemctl()
 
-    def _find_systemctl(self) -> Optional[str]:
+    def _find_systemctl(self, log_levels: Optional[Dict[str, str]] = None) -> Optional[str]:
         """Trouve le chemin de l'exécutable systemctl."""
-        # Vérifier les emplacements courants
+        # Résolution via le cache partagé des exécutables
+        path_which = self.which('systemctl')
+        if path_which:
+             self.log_debug(f"Exécutable systemctl trouvé via which: {path_which}", log_levels=log_levels)
+             return path_which
+        # Sinon vérifier les emplacements courants (sbin parfois absent du PATH)
         for path in ['/bin/systemctl', '/usr/bin/systemctl', '/sbin/systemctl', '/usr/sbin/systemctl']:
-            success, _, _ = self.run(['test', '-x', path], check=False, no_output=True, error_as_warning=True)
-            if success:
+            if os.path.isfile(path) and os.access(path, os.X_OK):
                 self.log_debug(f"Exécutable systemctl trouvé: {path}", log_levels=log_levels)
                 return path
-        # Si non trouvé, essayer 'which'
-        success_which, path_which, _ = self.run(['which', 'systemctl'], check=False, no_output=True, error_as_warning=True)
-        if success_which and path_which.strip():
-             path_str = path_which.strip()
-             self.log_debug(f"Exécutable systemctl trouvé via which: {path_str}", log_levels=log_levels)
-             return path_str
 
         # Retourner 'systemctl' quand même, peut être dans le PATH mais non trouvé par les vérifications
         return 'systemctl'
@@ -251,7 +251,7 @@ class ServiceCommands(PluginsUtilsBase):
             bool: True si le service est actif (code retour 0).
         """
         # --quiet supprime la sortie texte, on se base sur le code retour
-        success, _, _ = self._run_systemctl(['is-active', '--quiet', service_name], check=False, no_output=True)
+        success, _, _ = self._run_systemctl(['is-active', '--quiet', service_name], check=False, no_output=True, cache=FAMILY_SERVICES)
         is_act = success # Le code de retour 0 indique 'active'
         self.log_debug(f"Service {service_name} est actif: {is_act}", log_levels=log_levels)
         return is_act
@@ -269,7 +269,7 @@ class ServiceCommands(PluginsUtilsBase):
         """
         # --quiet supprime la sortie texte ('enabled', 'disabled', etc.)
         # Le code retour 0 signifie 'enabled', 1 signifie autre chose ('disabled', 'static', 'masked', etc.)
-        success, _, stderr = self._run_systemctl(['is-enabled', '--quiet', service_name], check=False, no_output=True, error_as_warning=True)
+        success, _, stderr = self._run_systemctl(['is-enabled', '--quiet', service_name], check=False, no_output=True, error_as_warning=True, cache=FAMILY_SERVICES)
         is_enb = success # Le code de retour 0 indique 'enabled'
         self.log_debug(f"Service {service_name} est activé au démarrage: {is_enb}", log_levels=log_levels)
         # Logguer l'erreur si ce n'est pas juste "disabled" ou "static"
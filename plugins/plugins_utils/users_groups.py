@@ -8,6 +8,7 @@ Inclut le cryptage interne des mots de passe via le module 'crypt'.
 """
 
 from plugins_utils.plugins_utils_base import PluginsUtilsBase
+from plugins_utils.command_cache import FAMILY_USERS
 import os
 import re
 import crypt # Pour le cryptage des mots de passe
@@ -65,7 +66,7 @@ class UserGroupCommands(PluginsUtilsBase):
     def user_exists(self, username: str, log_levels: Optional[Dict[str, str]] = None) -> bool:
         """Vérifie si un utilisateur local existe."""
         self.log_debug(f"Vérification de l'existence de l'utilisateur: {username}", log_levels=log_levels)
-        success, _, _ = self.run(['getent', 'passwd', username], check=False, no_output=True)
+        success, _, _ = self.run(['getent', 'passwd', username], check=False, no_output=True, cache=FAMILY_USERS)
         exists = success
         self.log_debug(f"Utilisateur '{username}' existe: {exists}", log_levels=log_levels)
         return exists
@@ -73,7 +74,7 @@ class UserGroupCommands(PluginsUtilsBase):
     def group_exists(self, groupname: str, log_levels: Optional[Dict[str, str]] = None) -> bool:
         """Vérifie si un groupe local existe."""
         self.log_debug(f"Vérification de l'existence du groupe: {groupname}", log_levels=log_levels)
-        success, _, _ = self.run(['getent', 'group', groupname], check=False, no_output=True)
+        success, _, _ = self.run(['getent', 'group', groupname], check=False, no_output=True, cache=FAMILY_USERS)
         exists = success
         self.log_debug(f"Groupe '{groupname}' existe: {exists}", log_levels=log_levels)
         return exists
@@ -385,7 +386,7 @@ class UserGroupCommands(PluginsUtilsBase):
     def get_user_info(self, username: str, log_levels: Optional[Dict[str, str]] = None) -> Optional[Dict[str, Any]]:
         """Récupère les informations d'un utilisateur via getent."""
         self.log_debug(f"Récupération des informations pour l'utilisateur: {username}", log_levels=log_levels)
-        success, stdout, _ = self.run(['getent', 'passwd', username], check=False, no_output=True)
+        success, stdout, _ = self.run(['getent', 'passwd', username], check=False, no_output=True, cache=FAMILY_USERS)
         if not success:
             self.log_debug(f"Utilisateur '{username}' non trouvé par getent.", log_levels=log_levels)
             return None
@@ -405,7 +406,7 @@ class UserGroupCommands(PluginsUtilsBase):
     def get_group_info(self, groupname: str, log_levels: Optional[Dict[str, str]] = None) -> Optional[Dict[str, Any]]:
         """Récupère les informations d'un groupe via getent."""
         self.log_debug(f"Récupération des informations pour le groupe: {groupname}", log_levels=log_levels)
-        success, stdout, _ = self.run(['getent', 'group', groupname], check=False, no_output=True)
+        success, stdout, _ = self.run(['getent', 'group', groupname], check=False, no_output=True, cache=FAMILY_USERS)
         if not success:
             self.log_debug(f"Groupe '{groupname}' non trouvé par getent.", log_levels=log_levels)
             return None
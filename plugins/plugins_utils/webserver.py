@@ -43,9 +43,9 @@ class WebServerCommands(PluginsUtilsBase):
         """Vérifie si les commandes serveur web sont disponibles."""
         # Apache: chercher apache2ctl, apachectl, httpd
         for cmd_name in ['apache2ctl', 'apachectl', 'httpd']:
-            success, path, _ = self.run(['which', cmd_name], check=False, no_output=True, error_as_warning=True)
-            if success:
-                self._apache_cmd = path.strip()
+            path = self.which(cmd_name)
+            if path:
+                self._apache_cmd = path
                 # Déterminer le nom du service associé
                 if 'apache2ctl' in self._apache_cmd:
                     self._apache_service_name = 'apache2'
@@ -60,16 +60,16 @@ class WebServerCommands(PluginsUtilsBase):
             self.log_debug("Aucune commande Apache (apache2ctl, apachectl, httpd) trouvée.", log_levels=log_levels)
 
         # Nginx
-        success_nginx, path_nginx, _ = self.run(['which', 'nginx'], check=False, no_output=True, error_as_warning=True)
-        if success_nginx:
-            self._nginx_cmd = path_nginx.strip()
+        path_nginx = self.which('nginx')
+        if path_nginx:
+            self._nginx_cmd = path_nginx
             self.log_debug(f"Commande Nginx trouvée: {self._nginx_cmd}", log_levels=log_levels)
         else:
              self.log_debug("Commande Nginx non trouvée.", log_levels=log_levels)
 
         # Outils Apache Debian/Ubuntu
         for cmd_name in ['a2ensite', 'a2dissite', 'a2enmod', 'a2dismod']:
-             success, _, _ = self.run(['which', cmd_name], check=False, no_output=True, error_as_warning=True)
+             success = self.which(cmd_name) is not None
              if not success:
                   self.log_debug(f"Commande Apache '{cmd_name}' non trouvée (peut être normal sur non-Debian).", log_levels=log_levels)
 
@@ -136,13 +136,11 @@ class WebServerCommands(PluginsUtilsBase):
 
     def _run_apache_tool(self, tool: str, target: str, action_verb: str) -> bool:
         """Exécute un outil Apache comme a2ensite, a2dissite, etc."""
-        cmd_path = None
         # Trouver le chemin de l'outil
-        success_which, path, _ = self.run(['which', tool], check=False, no_output=True, error_as_warning=True)
-        if not success:
+        cmd_path = self.which(tool)
+        if not cmd_path:
              self.log_error(f"Commande Apache '{tool}' non trouvée.", log_levels=log_levels)
              return False
-        cmd_path = path.strip()
 
         self.log_info(f"{action_verb.capitalize()} Apache '{target}' via {tool}", log_levels=log_levels)
         cmd = [cmd_path, '-q', target] # -q pour quiet
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Les modules plugins_utils s'importent comme sur les hôtes (plugins/ dans le chemin)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "plugins"))
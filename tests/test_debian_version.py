@@ -0,0 +1,77 @@
+import shutil
+import subprocess
+
+import pytest
+
+from plugins_utils.debian_version import (compare_versions, filter_versions, max_version,
+                                          parse_version, sort_versions, version_satisfies)
+
+# (version_a, relation, version_b) vérifiées aussi avec dpkg --compare-versions
+ORDERED = [
+    # '~' précède tout, y compris la fin de chaîne
+    ("1.0~rc1", "lt", "1.0"),
+    ("1.0~~", "lt", "1.0~"),
+    ("1.0~~a", "lt", "1.0~"),
+    ("1.0~", "lt", "1.0"),
+    ("1.0-1~bpo1", "lt", "1.0-1"),
+    # Époques
+    ("1:0.1", "gt", "2.0"),
+    ("0:1.0", "eq", "1.0"),
+    ("2:1.0", "gt", "1:9.9"),
+    # Révision absente, équivalente à "0"
+    ("1.0", "eq", "1.0-0"),
+    ("1.0", "lt", "1.0-1"),
+    ("1.0-1", "lt", "1.0-1.1"),
+    # Lettres avant les autres caractères, fin de chaîne avant les lettres
+    ("1.0", "lt", "1.0a"),
+    ("1.0a", "lt", "1.0+"),
+    ("1.0a", "lt", "1.0.1"),
+    ("1.0+b1", "gt", "1.0"),
+    # Segments numériques comparés comme des entiers
+    ("1.2.10", "gt", "1.2.9"),
+    ("1.002", "eq", "1.2"),
+    ("1.0-2ubuntu1", "gt", "1.0-2"),
+    ("2.36.1-8+deb11u1", "lt", "2.36.1-8+deb11u2"),
+]
+
+
+@pytest.mark.parametrize("version_a, relation, version_b", ORDERED)
+def test_version_order(version_a, relation, version_b):
+    assert version_satisfies(version_a, relation, version_b)
+    expected = {"lt": -1, "eq": 0, "gt": 1}[relation]
+    assert compare_versions(version_a, version_b) == expected
+    assert compare_versions(version_b, version_a) == -expected
+
+
+@pytest.mark.skipif(shutil.which("dpkg") is None, reason="dpkg absent")
+@pytest.mark.parametrize("version_a, relation, version_b", ORDERED)
+def test_version_order_matches_dpkg(version_a, relation, version_b):
+    assert subprocess.run(["dpkg", "--compare-versions", version_a, relation, version_b]).returncode == 0
+
+
+def test_parse_version():
+    assert parse_version("1:2.3-4ubuntu1") == (1, "2.3", "4ubuntu1")
+    assert parse_version("2.3") == (0, "2.3", "")
+    assert parse_version("1.0-2-3") == (0, "1.0-2", "3")
+    assert parse_version("1:2:3") == (1, "2:3", "")
+
+
+@pytest.mark.parametrize("version", ["", " ", "1.0-", "a", "~", "~1", "-1", "x:1.0", ":1.0", "1.0 1", "1.0-a_b"])
+def test_invalid_versions(version):
+    with pytest.raises(ValueError):
+        parse_version(version)
+
+
+def test_unknown_relation():
+    with pytest.raises(ValueError):
+        version_satisfies("1.0", "lte", "1.0")
+
+
+def test_batch_helpers():
+    versions = ["1.0", "1.0~rc1", "1:0.1", "1.0-1", "0.9"]
+    assert sort_versions(versions) == ["0.9", "1.0~rc1", "1.0", "1.0-1", "1:0.1"]
+    assert sort_versions(versions, reverse=True)[0] == "1:0.1"
+    assert max_version(versions) == "1:0.1"
+    assert max_version([]) is None
+    by_host = {"a": "2.4-1", "b": "2.3-9", "c": None, "d": "2.4~rc1-1"}
+    assert filter_versions(by_host, "lt", "2.4-1") == {"b": "2.3-9", "d": "2.4~rc1-1"}
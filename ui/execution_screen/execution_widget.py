@@ -24,9 +24,14 @@ from .local_executor import LocalExecutor
 from .ssh_executor import SSHExecutor
 from .logger_utils import LoggerUtils
 from ..utils.messaging import Message, MessageType
-from ..choice_screen.plugin_utils import get_plugin_folder_name
+from ..choice_screen.plugin_utils import get_plugin_folder_name, get_plugins_directory, load_plugin_info
 from ..utils.logging import get_logger
 from ..ssh_manager.ip_utils import get_target_ips
+from ..utils.journal import get_journal
+from ..utils.log_archive import rotate_logs
+from ..utils.apt_plan import (CONFIG_KEY as APT_PLAN_KEY, LOCAL_HOST, PluginAptNeeds,
+                              declared_packages, plan_apt_transactions)
+from ..utils.facts_cache import FACTS_CACHE, CONFIG_KEY as HOST_FACTS_KEY
 
 logger = get_logger('execution_widget')
 
@@ -212,10 +217,18 @@ class ExecutionWidget(Container):
         Cette méthode est le cœur du processus d'exécution, gérant l'ordre,
         les erreurs et la mise à jour de l'interface.
         """
+        journal = get_journal()
+        run_status = "error"
+        run_id = None
         try:
             await LoggerUtils.start_logs_timer(self)
             # Préparer l'exécution
             filtered_plugins, filtered_configs, ordered_plugins = self._prepare_plugins_execution()
+            run_id = journal.start_run(sequence=self.sequence_name, total_plugins=len(ordered_plugins))
+            # Installations apt regroupées par hôte pour toute la séquence
+            self._plan_apt_transactions(run_id, filtered_configs, ordered_plugins)
+            # Faits d'hôte calculés une fois par hôte pour toute la séquence
+            self._share_host_facts(run_id, filtered_configs, ordered_plugins)
 
             # Vérification de la préparation
             if not ordered_plugins:
@@ -244,6 +257,16 @@ class ExecutionWidget(Container):
                 self.set_current_plugin(plugin_name)
                 self.update_global_progress(executed / total_plugins * 100)
 
+                # Les exécutions SSH sont journalisées par hôte dans SSHExecutor
+                plugin_run_id = None
+                if not config.get('remote_execution', False):
+                    plugin_run_id = journal.start_plugin(
+                        plugin_name,
+                        host=getattr(plugin_widget, 'target_ip', None),
+                        instance_id=config.get('instance_id', plugin_id)
+                    )
+                result = None
+
                 try:
                     # Initialiser la progression
                     plugin_widget.update_progress(0.0, "En cours")
@@ -261,6 +284,7 @@ class ExecutionWidget(Container):
                 except Exception as e:
                     logger.error(f"Erreur lors de l'exécution de {plugin_id}: {e}")
                     logger.error(traceback.format_exc())
+                    result = (False, str(e))
 
                     # Mise à jour du statut du plugin en cas d'erreur
                     plugin_widget.set_status("error")
@@ -271,18 +295,31 @@ class ExecutionWidget(Container):
                     if not self.continue_on_error:
                         logger.warning(f"Arrêt de l'exécution après erreur sur {plugin_id}")
                         break
+                finally:
+                    if plugin_run_id and result is not None:
+                        success, output = result if isinstance(result, tuple) else (bool(result), None)
+                        journal.end_plugin(plugin_run_id, success, output)
 
                 executed += 1
                 self.update_global_progress(executed / total_plugins * 100)
 
             # Afficher un message de fin d'exécution
             self._display_execution_summary(executed, total_plugins)
+            run_status = "done" if executed == total_plugins else "stopped"
 
         except Exception as e:
             logger.error(f"Erreur globale lors de l'exécution: {e}")
             logger.error(traceback.format_exc())
             await LoggerUtils.add_log(self, f"Erreur lors de l'exécution: {e}", level="error")
         finally:
+            journal.end_run(status=run_status)
+            self._clear_apt_transactions()
+            if run_id:
+                FACTS_CACHE.clear(run_id)
+
+            # Archiver en arrière-plan les fichiers de logs refroidis
+            asyncio.get_running_loop().run_in_executor(None, rotate_logs)
+
             # Arrêter le timer d'affichage des logs
             await LoggerUtils.stop_logs_timer()
 
@@ -329,6 +366,95 @@ class ExecutionWidget(Container):
         logger.debug(f"Préparation terminée: {len(ordered_plugins)} plugins à exécuter")
         return filtered_plugins, filtered_configs, ordered_plugins
 
+    def _plan_apt_transactions(self, run_id: str, configs: Dict[str, Any], ordered_plugins: List[str]) -> None:
+        """
+        Injecte dans la configuration de chaque plugin le plan de la transaction apt
+        de son hôte (union des paquets apt_packages déclarés dans la séquence).
+
+        Args:
+            run_id: Identifiant de l'exécution
+            configs: Configurations des plugins à exécuter
+            ordered_plugins: Ordre d'exécution
+        """
+        try:
+            needs = []
+            for plugin_id in ordered_plugins:
+                config = configs[plugin_id]
+                plugin_name = self._get_plugin_name(plugin_id, config)
+                remote, hosts, is_python = self._plugin_targets(plugin_id, config)
+                needs.append(PluginAptNeeds(plugin_id, hosts, declared_packages(load_plugin_info(plugin_name, {})),
+                                            remote, is_python))
+
+            for plugin_id, plan in plan_apt_transactions(run_id, needs).items():
+                config = configs[plugin_id]
+                target = config['config'] if isinstance(config.get('config'), dict) else config
+                target[APT_PLAN_KEY] = plan
+        except Exception as e:
+            # Sans plan, chaque plugin installe ses paquets lui-même
+            logger.error(f"Erreur lors de la planification des transactions apt: {e}")
+            logger.debug(traceback.format_exc())
+
+    def _plugin_targets(self, plugin_id: str, config: Dict[str, Any]) -> Tuple[bool, List[str], bool]:
+        """
+        Hôtes visés par un plugin et type du plugin.
+
+        Returns:
+            Tuple: (exécution distante, hôtes ([LOCAL_HOST] en local), plugin Python)
+        """
+        plugin_name = self._get_plugin_name(plugin_id, config)
+        plugin_dir = os.path.join(get_plugins_directory(), get_plugin_folder_name(plugin_name))
+        remote = config.get('remote_execution', False)
+        hosts = get_target_ips(self._extract_plugin_config(config)) if remote else [LOCAL_HOST]
+        is_python = (os.path.exists(os.path.join(plugin_dir, 'exec.py'))
+                     and not os.path.exists(os.path.join(plugin_dir, 'main.sh')))
+        return remote, hosts, is_python
+
+    def _share_host_facts(self, run_id: str, configs: Dict[str, Any], ordered_plugins: List[str]) -> None:
+        """
+        Injecte dans la configuration de chaque plugin l'identifiant d'exécution
+        sous lequel les faits d'hôte sont partagés (clé host_facts). Le dernier
+        plugin Python de chaque hôte est désigné pour supprimer le fichier d'état.
+
+        Args:
+            run_id: Identifiant de l'exécution
+            configs: Configurations des plugins à exécuter
+            ordered_plugins: Ordre d'exécution
+        """
+        targets = {}
+        last_on_host: Dict[str, str] = {}
+        for plugin_id in ordered_plugins:
+            try:
+                targets[plugin_id] = self._plugin_targets(plugin_id, configs[plugin_id])
+            except Exception as e:
+                logger.debug(f"Hôtes de {plugin_id} indéterminés pour les faits d'hôte: {e}")
+                continue
+            _, hosts, is_python = targets[plugin_id]
+            if is_python:
+                for host in hosts:
+                    last_on_host[host] = plugin_id
+
+        for plugin_id, config in configs.items():
+            settings: Dict[str, Any] = {'id': run_id}
+            if plugin_id in targets:
+                remote, hosts, _ = targets[plugin_id]
+                last_hosts = [host for host in hosts if last_on_host.get(host) == plugin_id]
+                if remote:
+                    # Restreint à chaque hôte par SSHExecutor (FACTS_CACHE.host_settings)
+                    settings['last_hosts'] = last_hosts
+                else:
+                    settings['last'] = bool(last_hosts)
+            target = config['config'] if isinstance(config.get('config'), dict) else config
+            target[HOST_FACTS_KEY] = settings
+
+    def _clear_apt_transactions(self) -> None:
+        """Retire les plans apt et les faits d'hôte des configurations (non conservés avec la configuration)."""
+        for config in self.plugins_config.values():
+            if isinstance(config, dict):
+                for key in (APT_PLAN_KEY, HOST_FACTS_KEY):
+                    config.pop(key, None)
+                    if isinstance(config.get('config'), dict):
+                        config['config'].pop(key, None)
+
     def _initialize_execution_ui(self) -> None:
         """Initialise l'interface pour l'exécution."""
         # S'assurer que les logs sont visibles
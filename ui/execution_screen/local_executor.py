@@ -35,6 +35,9 @@ try:
     from ..choice_screen.plugin_utils import get_plugin_folder_name
     from .logger_utils import LoggerUtils
     from .file_content_handler import FileContentHandler
+    from ..utils.framing import FrameDecoder, FRAMING_ENV_VAR, FRAMING_BINARY, RECORD_LOG
+    from ..utils.process_tree import terminate_process_trees, terminate_process_tree_async
+    from ..utils.messaging import classify_line
     INTERNAL_MODULES_AVAILABLE = True
 except ImportError:
     INTERNAL_MODULES_AVAILABLE = False
@@ -50,6 +53,10 @@ else:
     handler.setFormatter(formatter)
     logger.addHandler(handler)
 
+# Durée maximale d'exécution d'un plugin (secondes), surchargeable par la clé
+# 'timeout' de son settings.yml (0 ou null: pas de limite)
+DEFAULT_PLUGIN_TIMEOUT = 6000
+
 
 class LocalExecutor:
     """
@@ -207,6 +214,7 @@ class LocalExecutor:
 
             # Charger les paramètres du plugin depuis settings.yml
             plugin_settings = self._load_plugin_settings(plugin_dir)
+            plugin_timeout = self._get_plugin_timeout(plugin_settings, folder_name)
 
             # Traiter le contenu des fichiers de configuration
             plugin_config_with_files = await self._process_file_content(plugin_settings, config, plugin_dir)
@@ -222,12 +230,20 @@ class LocalExecutor:
             target_ip = getattr(plugin_widget, 'target_ip', None) if plugin_widget else None
             self.log_message(f"Début de l'exécution du plugin {folder_name}", "start", target_ip)
 
-            # Créer le processus
+            # Demander la sortie tramée aux plugins Python (repli JSONL sinon)
+            process_env = os.environ.copy()
+            if not is_bash_plugin and INTERNAL_MODULES_AVAILABLE:
+                process_env[FRAMING_ENV_VAR] = FRAMING_BINARY
+
+            # Créer le processus dans sa propre session: son PID est l'identifiant
+            # du groupe de tous ses descendants (sudo, apt, dpkg...)
             process = await asyncio.create_subprocess_exec(
                 *cmd,
                 stdout=asyncio.subprocess.PIPE,
                 stderr=asyncio.subprocess.PIPE,
-                cwd=plugin_dir
+                cwd=plugin_dir,
+                env=process_env,
+                start_new_session=True
             )
 
             # Enregistrer le processus pour la gestion des erreurs
@@ -238,19 +254,19 @@ class LocalExecutor:
                     'process': process
                 }
 
-            # Lire les sorties du processus de manière asynchrone
-            stdout_lines, stderr_lines = await self._read_process_output(
-                process, plugin_widget, folder_name, target_ip
-            )
+            # Lire les sorties puis attendre la fin du processus, sous le même timeout
+            async def read_and_wait():
+                lines = await self._read_process_output(process, plugin_widget, folder_name, target_ip)
+                return lines, await process.wait()
 
-            # Attendre la fin du processus
             try:
-                exit_code = await asyncio.wait_for(process.wait(), timeout=6000)
+                (stdout_lines, stderr_lines), exit_code = await asyncio.wait_for(
+                    read_and_wait(), timeout=plugin_timeout)
             except asyncio.TimeoutError:
-                # Tuer le processus si timeout
-                logger.error(f"Timeout atteint pour {folder_name}, terminaison forcée")
-                self.log_message(f"Timeout d'exécution pour {folder_name}", "error", target_ip)
-                process.kill()
+                # Arrêter toute l'arborescence du plugin (sudo, apt, dpkg...)
+                logger.error(f"Timeout de {plugin_timeout}s atteint pour {folder_name}, terminaison forcée")
+                self.log_message(f"Timeout d'exécution pour {folder_name} ({plugin_timeout}s)", "error", target_ip)
+                await self._terminate_process(process)
                 return False, "Timeout d'exécution"
 
             # Supprimer le processus de la liste des processus en cours
@@ -292,10 +308,10 @@ class LocalExecutor:
                 target_ip
             )
 
-            # Tuer le processus si toujours en cours
+            # Tuer le processus et ses descendants si toujours en cours
             if process and process.returncode is None:
                 try:
-                    process.kill()
+                    await self._terminate_process(process)
                     logger.info(f"Processus {process.pid} tué suite à une erreur")
                 except Exception:
                     pass
@@ -308,6 +324,47 @@ class LocalExecutor:
 
             return False, error_msg
 
+    async def _terminate_process(self, process) -> None:
+        """
+        Arrête un processus de plugin et toute son arborescence, puis le réclame.
+
+        Args:
+            process: Processus asyncio lancé avec start_new_session=True
+        """
+        try:
+            if INTERNAL_MODULES_AVAILABLE:
+                await terminate_process_tree_async(process.pid)
+            elif process.returncode is None:
+                process.kill()
+            await asyncio.wait_for(process.wait(), timeout=5)
+        except (ProcessLookupError, asyncio.TimeoutError):
+            pass
+        finally:
+            with self._lock:
+                self._running_processes.pop(process.pid, None)
+
+    def _get_plugin_timeout(self, plugin_settings: Dict, folder_name: str) -> Optional[float]:
+        """
+        Détermine la durée maximale d'exécution d'un plugin.
+
+        Args:
+            plugin_settings: Paramètres du plugin (settings.yml)
+            folder_name: Nom du dossier du plugin (pour les messages)
+
+        Returns:
+            Optional[float]: Timeout en secondes, None pour aucune limite
+        """
+        if 'timeout' not in plugin_settings:
+            return DEFAULT_PLUGIN_TIMEOUT
+        value = plugin_settings.get('timeout')
+        try:
+            timeout = float(value) if value is not None else 0
+        except (TypeError, ValueError):
+            logger.warning(f"Timeout invalide dans settings.yml de {folder_name}: {value!r}, "
+                           f"utilisation de {DEFAULT_PLUGIN_TIMEOUT}s")
+            return DEFAULT_PLUGIN_TIMEOUT
+        return timeout if timeout > 0 else None
+
     def _determine_base_dir(self) -> str:
         """
         Détermine le répertoire de base de l'application.
@@ -535,7 +592,66 @@ class LocalExecutor:
         # Déterminer si nous sommes dans un contexte d'application ou de debugging
         enforce_sequential = self.debugger_mode
 
-        # Fonction pour lire un flux de manière asynchrone
+        async def dispatch_entry(log_entry, is_stderr=False):
+            """Transmet une entrée de log déjà décodée à LoggerUtils."""
+            if hasattr(LoggerUtils, 'process_output_line') and self.app:
+                await LoggerUtils.process_output_line(
+                    self.app,
+                    log_entry,  # Objet déjà décodé, pas de re-sérialisation
+                    plugin_widget,
+                    target_ip=target_ip
+                )
+
+                # En mode application ou debug, forcer un flush après chaque message
+                if enforce_sequential and hasattr(LoggerUtils, 'flush_pending_messages'):
+                    await LoggerUtils.flush_pending_messages(self.app)
+            else:
+                # Fallback: utiliser log_message
+                level = log_entry.get('level', 'info' if not is_stderr else 'error').lower()
+                self.log_message(log_entry.get('message', ''), level, target_ip)
+
+        # Traitement d'une ligne de texte (protocole JSONL ou sortie brute)
+        async def handle_text_line(line_decoded, lines, is_stderr=False):
+            # Stocker la ligne
+            lines.append(line_decoded)
+
+            # Traiter JSON si possible
+            try:
+                if line_decoded.startswith('{') and line_decoded.endswith('}'):
+                    # Tenter de parser comme JSON
+                    log_entry = json.loads(line_decoded)
+                    if not isinstance(log_entry, dict):
+                        raise json.JSONDecodeError("Objet JSON attendu", line_decoded, 0)
+                    log_entry.setdefault('level', 'info' if not is_stderr else 'error')
+                    await dispatch_entry(log_entry, is_stderr)
+                else:
+                    # Texte brut
+                    if is_stderr:
+                        level = "error"
+                    elif INTERNAL_MODULES_AVAILABLE:
+                        # Niveau déterminé une seule fois, transmis tel quel à LoggerUtils
+                        level = classify_line(line_decoded).name.lower()
+                    else:
+                        level = "info"
+
+                    await dispatch_entry({
+                        "timestamp": datetime.now().isoformat(),
+                        "level": level,
+                        "message": line_decoded,
+                        "plugin_name": plugin_name
+                    }, is_stderr)
+            except json.JSONDecodeError:
+                # Ce n'est pas du JSON valide, traiter comme du texte
+                if is_stderr:
+                    self.log_message(line_decoded, "error", target_ip)
+                else:
+                    self.log_message(line_decoded, "info", target_ip)
+            except Exception as e:
+                logger.error(f"Erreur traitement ligne: {e}")
+                # Assurer que la ligne est loggée malgré l'erreur
+                self.log_message(line_decoded, "error" if is_stderr else "info", target_ip)
+
+        # Fonction pour lire un flux ligne par ligne (JSONL) de manière asynchrone
         async def read_stream(stream, is_stderr=False):
             lines = []
 
@@ -549,83 +665,7 @@ class LocalExecutor:
                     if not line_decoded:
                         continue
 
-                    # Stocker la ligne
-                    lines.append(line_decoded)
-
-                    # Traiter JSON si possible
-                    try:
-                        if line_decoded.startswith('{') and line_decoded.endswith('}'):
-                            # Tenter de parser comme JSON
-                            log_entry = json.loads(line_decoded)
-
-                            # Déterminer le niveau de log
-                            level = log_entry.get('level', 'info' if not is_stderr else 'error').lower()
-                            message = log_entry.get('message', line_decoded)
-
-                            # Traiter via LoggerUtils si disponible
-                            if hasattr(LoggerUtils, 'process_output_line') and self.app:
-                                await LoggerUtils.process_output_line(
-                                    self.app,
-                                    line_decoded,  # Garder le JSON intact
-                                    plugin_widget,
-                                    target_ip=target_ip
-                                )
-
-                                # En mode application ou debug, forcer un flush après chaque message
-                                if enforce_sequential and hasattr(LoggerUtils, 'flush_pending_messages'):
-                                    await LoggerUtils.flush_pending_messages(self.app)
-                            else:
-                                # Fallback: utiliser log_message
-                                self.log_message(message, level, target_ip)
-                        else:
-                            # Texte brut
-                            if is_stderr:
-                                level = "error"
-                            else:
-                                # Détecter le niveau basé sur des mots-clés
-                                line_lower = line_decoded.lower()
-                                if any(err in line_lower for err in ['error', 'erreur', 'failed', 'échec']):
-                                    level = "error"
-                                elif any(warn in line_lower for warn in ['warning', 'attention']):
-                                    level = "warning"
-                                elif any(succ in line_lower for succ in ['success', 'succès', 'terminé']):
-                                    level = "success"
-                                else:
-                                    level = "info"
-
-                            # Traiter via LoggerUtils si disponible
-                            if hasattr(LoggerUtils, 'process_output_line') and self.app:
-                                # Créer un JSON pour le traitement uniforme
-                                json_wrapper = json.dumps({
-                                    "timestamp": datetime.now().isoformat(),
-                                    "level": level,
-                                    "message": line_decoded,
-                                    "plugin_name": plugin_name
-                                })
-
-                                await LoggerUtils.process_output_line(
-                                    self.app,
-                                    json_wrapper,
-                                    plugin_widget,
-                                    target_ip=target_ip
-                                )
-
-                                # En mode application ou debug, forcer un flush après chaque message
-                                if enforce_sequential and hasattr(LoggerUtils, 'flush_pending_messages'):
-                                    await LoggerUtils.flush_pending_messages(self.app)
-                            else:
-                                # Fallback: utiliser log_message
-                                self.log_message(line_decoded, level, target_ip)
-                    except json.JSONDecodeError:
-                        # Ce n'est pas du JSON valide, traiter comme du texte
-                        if is_stderr:
-                            self.log_message(line_decoded, "error", target_ip)
-                        else:
-                            self.log_message(line_decoded, "info", target_ip)
-                    except Exception as e:
-                        logger.error(f"Erreur traitement ligne: {e}")
-                        # Assurer que la ligne est loggée malgré l'erreur
-                        self.log_message(line_decoded, "error" if is_stderr else "info", target_ip)
+                    await handle_text_line(line_decoded, lines, is_stderr)
 
                 except asyncio.CancelledError:
                     raise
@@ -635,10 +675,46 @@ class LocalExecutor:
 
             return lines
 
+        # Fonction pour lire un flux tramé (trames binaires + lignes de texte de repli)
+        async def read_framed_stream(stream):
+            lines = []
+            decoder = FrameDecoder()
+
+            while True:
+                try:
+                    chunk = await stream.read(65536)
+                    records = decoder.feed(chunk) if chunk else decoder.close()
+
+                    for kind, payload in records:
+                        if kind == RECORD_LOG:
+                            # Enregistrement décodé une seule fois, transmis tel quel
+                            message = payload.get('message', '')
+                            lines.append(message if isinstance(message, str) else json.dumps(message))
+                            try:
+                                await dispatch_entry(payload)
+                            except Exception as e:
+                                logger.error(f"Erreur traitement trame: {e}")
+                        else:
+                            await handle_text_line(payload, lines)
+
+                    if not chunk:
+                        break
+
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Erreur lecture flux tramé: {e}")
+                    break
+
+            return lines
+
+        framing_enabled = INTERNAL_MODULES_AVAILABLE
+        read_stdout = read_framed_stream(process.stdout) if framing_enabled else read_stream(process.stdout, False)
+
         # Lire les deux flux en parallèle en mode normal
         if not enforce_sequential:
             try:
-                stdout_task = asyncio.create_task(read_stream(process.stdout, False))
+                stdout_task = asyncio.create_task(read_stdout)
                 stderr_task = asyncio.create_task(read_stream(process.stderr, True))
 
                 stdout_lines, stderr_lines = await asyncio.gather(stdout_task, stderr_task)
@@ -652,7 +728,7 @@ class LocalExecutor:
         else:
             # En mode application ou debug, lire séquentiellement pour garantir l'ordre exact des messages
             # Lire d'abord tout stdout
-            stdout_lines = await read_stream(process.stdout, False)
+            stdout_lines = await read_stdout
 
             # Puis lire tout stderr
             stderr_lines = await read_stream(process.stderr, True)
@@ -690,16 +766,24 @@ class LocalExecutor:
         Utile avant la fermeture de l'application.
         """
         with self._lock:
-            running_count = len(self._running_processes)
-            if running_count > 0:
-                logger.warning(f"Arrêt forcé de {running_count} processus")
-                for pid, info in list(self._running_processes.items()):
-                    try:
-                        process = info['process']
-                        if process and process.returncode is None:
-                            process.kill()
-                            logger.info(f"Processus {pid} ({info['plugin']}) tué")
-                    except Exception as e:
-                        logger.error(f"Erreur lors de la terminaison du processus {pid}: {e}")
-
-                self._running_processes.clear()
\ No newline at end of file
+            running = list(self._running_processes.items())
+        alive = [(pid, info) for pid, info in running
+                 if info['process'] and info['process'].returncode is None]
+        if alive:
+            logger.warning(f"Arrêt forcé de {len(alive)} processus")
+        try:
+            if INTERNAL_MODULES_AVAILABLE:
+                # Même mécanisme que le timeout (groupe et descendants), avec un seul
+                # délai de grâce pour tous les plugins: SIGTERM à tous, puis SIGKILL
+                terminate_process_trees([pid for pid, _ in alive])
+            else:
+                for _, info in alive:
+                    info['process'].kill()
+            for pid, info in alive:
+                logger.info(f"Processus {pid} ({info['plugin']}) et ses descendants tués")
+        except Exception as e:
+            logger.error(f"Erreur lors de la terminaison des processus: {e}")
+        finally:
+            with self._lock:
+                for pid, _ in running:
+                    self._running_processes.pop(pid, None)
\ No newline at end of file
@@ -56,10 +56,10 @@ except ImportError:
 
 # Imports internes - avec gestion d'erreur pour permettre l'usage autonome
 try:
-    from ..utils.messaging import Message, MessageType, MessageFormatter
+    from ..utils.messaging import Message, MessageType, MessageFormatter, classify_line
 except ImportError:
     try:
-        from utils.messaging import Message, MessageType, MessageFormatter
+        from utils.messaging import Message, MessageType, MessageFormatter, classify_line
     except ImportError:
         # Classes de fallback si les modules ne sont pas disponibles
         logger.warning("Import des modules de messaging échoué, utilisation de classes de secours")
@@ -105,6 +105,25 @@ except ImportError:
             def format_for_log_file(message):
                 return f"{message.content}"
 
+        def classify_line(text, include_debug=False):
+            """Version simplifiée: pas de classification par mots-clés"""
+            return MessageType.INFO
+
+# Mise en forme du profil des commandes, partagée avec les plugins (mode texte)
+try:
+    from plugins.plugins_utils.command_trace import format_summary as format_command_profile
+except ImportError:
+    format_command_profile = None
+
+# Journal d'exécution persistant (optionnel)
+try:
+    from ..utils.journal import get_journal
+except ImportError:
+    try:
+        from utils.journal import get_journal
+    except ImportError:
+        get_journal = None
+
 # Détection du mode débogueur
 def is_debugger_active() -> bool:
     """Détecte si un débogueur est actif - version robuste."""
@@ -142,8 +161,22 @@ class LoggerUtils:
     l'interface Textual ou en mode terminal.
     """
 
-    # Files d'attente et de déduplication
-    _pending_messages: Deque[Message] = deque(maxlen=500)
+    # Files d'attente par source (plugin, instance, ip) et de déduplication
+    # Chaque source dispose d'une file unique dans l'ordre d'arrivée, bornée
+    # séparément pour les messages prioritaires (error/success/end) et normaux:
+    # un message n'évince que le plus ancien message de même nature de sa source.
+    # Les files sont drainées en round-robin pour qu'un hôte bavard
+    # ne puisse pas évincer les messages des autres.
+    _source_queues: Dict[Tuple[Any, Any, Any], Deque[Message]] = {}
+    _priority_counts: Dict[Tuple[Any, Any, Any], int] = {}
+    _source_order: Deque[Tuple[Any, Any, Any]] = deque()
+    _dropped_counts: Dict[Tuple[Any, Any, Any], int] = {}
+    _reported_drops: Dict[Tuple[Any, Any, Any], int] = {}
+    _queue_lock = threading.RLock()
+    _per_source_maxlen = 200
+    _priority_maxlen = 500
+    _backpressure_threshold = 0.8  # Fraction de remplissage déclenchant l'attente du lecteur
+    _backpressure_timeout = 2.0  # Attente maximale (s) d'un lecteur avant de risquer une perte
     _message_cache: Dict[str, Tuple[float, int]] = {}
     _seen_messages_maxlen = 200
 
@@ -167,6 +200,196 @@ class LoggerUtils:
             cls._message_counter += 1
             return cls._message_counter
 
+    # --- Files d'attente par source ---
+
+    @staticmethod
+    def _is_priority_message(message: Message) -> bool:
+        """Indique si un message est prioritaire (borné à part, jamais évincé par les messages normaux)."""
+        return getattr(message, 'type', None) in (MessageType.ERROR, MessageType.SUCCESS, MessageType.END)
+
+    @staticmethod
+    def _get_source_key(message: Message, plugin_widget=None) -> Tuple[Any, Any, Any]:
+        """
+        Calcule la clé de file d'attente d'un message.
+
+        Args:
+            message: Le message à classer
+            plugin_widget: Le widget du plugin émetteur (utilisé si le message n'a pas de source)
+
+        Returns:
+            Tuple: (source, instance_id, target_ip)
+        """
+        source = getattr(message, 'source', None)
+        instance_id = getattr(message, 'instance_id', None)
+        if source is None and plugin_widget is not None:
+            source = getattr(plugin_widget, 'plugin_name', None)
+            instance_id = getattr(plugin_widget, 'instance_id', None)
+        return (source, instance_id, getattr(message, 'target_ip', None))
+
+    @classmethod
+    def _get_source_queue(cls, key: Tuple[Any, Any, Any]) -> Deque[Message]:
+        """Retourne (en la créant si besoin) la file d'une source."""
+        queue = cls._source_queues.get(key)
+        if queue is None:
+            queue = deque()
+            cls._source_queues[key] = queue
+            cls._priority_counts[key] = 0
+            cls._source_order.append(key)
+        return queue
+
+    @classmethod
+    def _enqueue_message(cls, message: Message, plugin_widget=None) -> None:
+        """
+        Ajoute un message dans la file de sa source.
+        Si la source a atteint la limite des messages de même nature (prioritaires
+        ou normaux), le plus ancien d'entre eux est supprimé et comptabilisé dans
+        les pertes de la source. L'ordre des messages restants est préservé.
+
+        Args:
+            message: Le message à mettre en file d'attente
+            plugin_widget: Le widget du plugin émetteur (optionnel)
+        """
+        key = cls._get_source_key(message, plugin_widget)
+        priority = cls._is_priority_message(message)
+        with cls._queue_lock:
+            queue = cls._get_source_queue(key)
+            priority_count = cls._priority_counts[key]
+            if priority:
+                full = priority_count >= cls._priority_maxlen
+            else:
+                full = len(queue) - priority_count >= cls._per_source_maxlen
+
+            if full:
+                # Évincer le plus ancien message de même nature de la source, jamais celui des autres
+                for index, queued in enumerate(queue):
+                    if cls._is_priority_message(queued) == priority:
+                        del queue[index]
+                        break
+                cls._dropped_counts[key] = cls._dropped_counts.get(key, 0) + 1
+            elif priority:
+                cls._priority_counts[key] = priority_count + 1
+            queue.append(message)
+
+    @classmethod
+    def _source_fill_ratio(cls, key: Tuple[Any, Any, Any]) -> float:
+        """Retourne le taux de remplissage en messages normaux de la file d'une source."""
+        with cls._queue_lock:
+            queue = cls._source_queues.get(key)
+            if not queue:
+                return 0.0
+            return (len(queue) - cls._priority_counts[key]) / float(cls._per_source_maxlen)
+
+    @classmethod
+    async def _wait_for_capacity(cls, key: Tuple[Any, Any, Any]) -> None:
+        """
+        Applique une contre-pression au lecteur d'une source dont la file est presque pleine.
+        Tant que le flush périodique tourne, le lecteur attend qu'il libère de la place
+        (ce qui ralentit la lecture du pipe et donc le plugin) au lieu de perdre des lignes.
+
+        Args:
+            key: La clé de la source
+        """
+        if not cls._logs_timer_running:
+            return
+        deadline = time.monotonic() + cls._backpressure_timeout
+        while (cls._source_fill_ratio(key) >= cls._backpressure_threshold
+               and cls._logs_timer_running
+               and time.monotonic() < deadline):
+            await asyncio.sleep(cls._batch_time / 2)
+
+    @classmethod
+    def _drain_messages(cls, max_messages: int) -> List[Message]:
+        """
+        Extrait jusqu'à max_messages messages des files, de façon équitable:
+        les files sont drainées en round-robin (un message par source et par tour),
+        dans l'ordre d'arrivée des messages de chaque source.
+
+        Args:
+            max_messages: Nombre maximal de messages à extraire
+
+        Returns:
+            List[Message]: Messages extraits
+        """
+        drained: List[Message] = []
+        with cls._queue_lock:
+            active = True
+            while active and len(drained) < max_messages:
+                active = False
+                for key in list(cls._source_order):
+                    if len(drained) >= max_messages:
+                        break
+                    queue = cls._source_queues[key]
+                    if queue:
+                        message = queue.popleft()
+                        if cls._is_priority_message(message):
+                            cls._priority_counts[key] -= 1
+                        drained.append(message)
+                        active = True
+
+            # Faire tourner l'ordre pour que le prochain flush commence par une autre source
+            if cls._source_order:
+                cls._source_order.rotate(-1)
+
+            # Oublier les sources vides sans pertes à signaler
+            for key in list(cls._source_order):
+                if (not cls._source_queues[key]
+                        and cls._dropped_counts.get(key, 0) == cls._reported_drops.get(key, 0)):
+                    cls._source_order.remove(key)
+                    del cls._source_queues[key]
+                    del cls._priority_counts[key]
+        return drained
+
+    @classmethod
+    def _collect_drop_notices(cls) -> List[Message]:
+        """
+        Construit les avertissements des messages perdus depuis le dernier affichage.
+
+        Returns:
+            List[Message]: Un message d'avertissement par source ayant perdu des lignes
+        """
+        notices: List[Message] = []
+        with cls._queue_lock:
+            for key, total in cls._dropped_counts.items():
+                new_drops = total - cls._reported_drops.get(key, 0)
+                if new_drops <= 0:
+                    continue
+                cls._reported_drops[key] = total
+                source, instance_id, target_ip = key
+                origin = source or "sortie brute"
+                if instance_id is not None:
+                    origin = f"{origin} #{instance_id}"
+                if target_ip:
+                    origin = f"{origin} ({target_ip})"
+                notices.append(Message(
+                    type=MessageType.WARNING,
+                    content=f"{new_drops} message(s) perdu(s) pour {origin} (total: {total})",
+                    source=source,
+                    instance_id=instance_id,
+                    target_ip=target_ip
+                ))
+        return notices
+
+    @classmethod
+    def _clear_queues(cls) -> None:
+        """Vide toutes les files d'attente et les compteurs de pertes."""
+        with cls._queue_lock:
+            cls._source_queues.clear()
+            cls._priority_counts.clear()
+            cls._source_order.clear()
+            cls._dropped_counts.clear()
+            cls._reported_drops.clear()
+
+    @classmethod
+    def get_dropped_counts(cls) -> Dict[Tuple[Any, Any, Any], int]:
+        """
+        Retourne le nombre total de messages perdus par source.
+
+        Returns:
+            Dict: {(source, instance_id, target_ip): nombre de messages perdus}
+        """
+        with cls._queue_lock:
+            return dict(cls._dropped_counts)
+
     @staticmethod
     async def _periodic_logs_display(app):
         """
@@ -188,7 +411,7 @@ class LoggerUtils:
             while LoggerUtils._logs_timer_running:
                 try:
                     current_time = time.monotonic()
-                    queue_size = len(LoggerUtils._pending_messages)
+                    queue_size = LoggerUtils.get_pending_message_count()
 
                     # Calculer si un flush est nécessaire
                     should_flush = queue_size >= LoggerUtils._batch_size
@@ -204,7 +427,7 @@ class LoggerUtils:
                             # Éviter les boucles d'erreurs rapides
                             await asyncio.sleep(0.1)
                             # Réinitialiser en cas d'erreur
-                            LoggerUtils._pending_messages.clear()
+                            LoggerUtils._clear_queues()
                             last_flush_time = time.monotonic()
 
                     # Pause courte pour libérer la boucle asyncio
@@ -477,14 +700,15 @@ class LoggerUtils:
         return None
 
     @classmethod
-    async def process_output_line(cls, app, line: str, plugin_widget=None,
+    async def process_output_line(cls, app, line: Union[str, Dict[str, Any]], plugin_widget=None,
                                  target_ip: Optional[str] = None):
         """
         Traite une ligne de sortie (stdout/stderr) et l'affiche dans l'interface.
 
         Args:
             app: L'application Textual
-            line: La ligne à traiter (texte brut ou JSON)
+            line: La ligne à traiter (texte brut ou JSON), ou une entrée de log
+                  déjà décodée (dict) pour éviter un nouveau parsing
             plugin_widget: Le widget du plugin (optionnel, peut être détecté)
             target_ip: L'adresse IP cible (optionnel)
         """
@@ -505,10 +729,11 @@ class LoggerUtils:
         # Essayer de parser comme JSON
         message_obj: Optional[Message] = None
         try:
-            if isinstance(line, str) and line.strip().startswith('{') and line.strip().endswith('}'):
-                # Tenter de parser comme JSON
+            is_entry = isinstance(line, dict)
+            if is_entry or (isinstance(line, str) and line.strip().startswith('{') and line.strip().endswith('}')):
+                # Tenter de parser comme JSON (sauf si l'entrée est déjà décodée)
                 try:
-                    log_entry = json.loads(line)
+                    log_entry = line if is_entry else json.loads(line)
 
                     # Construire un objet Message à partir du JSON
                     level = log_entry.get("level", "info").lower()
@@ -533,6 +758,10 @@ class LoggerUtils:
                         message_type = MessageType.START
                     elif level == "end":
                         message_type = MessageType.END
+                    elif level == "profile":
+                        # Résumé du profil des commandes externes du plugin
+                        message_type = MessageType.INFO
+                        message_content = cls._format_profile_summary(message_content)
                     else:
                         message_type = MessageType.INFO
 
@@ -554,38 +783,34 @@ class LoggerUtils:
                     elif message_type == MessageType.PROGRESS_TEXT:
                         message_obj.data = message_content.get("data", {}) if isinstance(message_content, dict) else {}
 
-                except (json.JSONDecodeError, KeyError, ValueError, TypeError) as e:
+                except (json.JSONDecodeError, KeyError, ValueError, TypeError, AttributeError) as e:
                     # En cas d'erreur de parsing JSON, traiter comme du texte brut
                     message_obj = Message(
                         type=MessageType.INFO,
-                        content=line,
+                        content=str(line),
                         target_ip=target_ip
                     )
             else:
                 # Si ce n'est pas un JSON valide, traiter comme du texte brut
+                # (type détecté par mots-clés, avec le classificateur partagé)
                 message_obj = Message(
-                    type=MessageType.INFO,
+                    type=classify_line(line),
                     content=line,
                     target_ip=target_ip
                 )
-
-                # Détecter le type de message par des mots-clés
-                line_lower = line.lower()
-                if any(err in line_lower for err in ['error', 'erreur', 'failed', 'échec', 'traceback', 'exception']):
-                    message_obj.type = MessageType.ERROR
-                elif any(warn in line_lower for warn in ['warning', 'attention', 'avertissement']):
-                    message_obj.type = MessageType.WARNING
-                elif any(succ in line_lower for succ in ['success', 'succès', 'terminé', 'réussi']):
-                    message_obj.type = MessageType.SUCCESS
         except Exception as e:
             # En cas d'erreur, créer un message d'erreur
-            logger.error(f"Erreur traitement ligne: {e} - ligne: {line[:100]}", exc_info=True)
+            logger.error(f"Erreur traitement ligne: {e} - ligne: {str(line)[:100]}", exc_info=True)
             message_obj = Message(
                 type=MessageType.ERROR,
                 content=f"Erreur de traitement: {str(e)}",
                 target_ip=target_ip
             )
 
+        # Persister les messages (hors progression) dans le journal d'exécution
+        if message_obj and message_obj.type not in [MessageType.PROGRESS, MessageType.PROGRESS_TEXT]:
+            cls._journal_message(message_obj, plugin_widget)
+
         # Traitement des messages de progression
         if message_obj and message_obj.type in [MessageType.PROGRESS, MessageType.PROGRESS_TEXT]:
             # Mettre à jour la barre de progression si possible
@@ -597,8 +822,7 @@ class LoggerUtils:
 
             # Ajouter à la file d'attente pour les barres en mode différé
             if needs_queue:
-                queue = cls._pending_messages
-                queue.append(message_obj)
+                cls._enqueue_message(message_obj, plugin_widget)
 
             # Ne pas afficher les mises à jour de barres dans les logs textuels
             return
@@ -607,11 +831,49 @@ class LoggerUtils:
         if message_obj:
             # Soit ajouter à la file d'attente, soit afficher immédiatement
             if needs_queue:
-                queue = cls._pending_messages
-                queue.append(message_obj)
+                # Contre-pression: ralentir ce lecteur plutôt que perdre ses lignes
+                await cls._wait_for_capacity(cls._get_source_key(message_obj, plugin_widget))
+                cls._enqueue_message(message_obj, plugin_widget)
             else:
                 await cls.display_message(app, message_obj)
 
+    @staticmethod
+    def _format_profile_summary(summary: Any, top_n: int = 5) -> str:
+        """
+        Met en forme le résumé du profil des commandes externes d'un plugin
+        (niveau "profile", produit par plugins_utils.command_trace).
+
+        Args:
+            summary: Résumé (dictionnaire) émis par le plugin
+            top_n: Nombre de commandes les plus lentes à afficher
+
+        Returns:
+            str: Texte du résumé
+        """
+        if not isinstance(summary, dict) or format_command_profile is None:
+            return str(summary)
+        return "\n".join(format_command_profile(summary, top_n))
+
+    @classmethod
+    def _journal_message(cls, message_obj: Message, plugin_widget=None) -> None:
+        """
+        Transmet un message au journal d'exécution (écriture différée, non bloquante).
+
+        Args:
+            message_obj: Le message à enregistrer
+            plugin_widget: Le widget du plugin émetteur (optionnel)
+        """
+        if get_journal is None:
+            return
+        try:
+            source, instance_id, target_ip = cls._get_source_key(message_obj, plugin_widget)
+            msg_type = message_obj.type
+            level = msg_type.name.lower() if hasattr(msg_type, 'name') else str(msg_type)
+            get_journal().record(level, message_obj.content, plugin=source,
+                                 instance_id=instance_id, host=target_ip)
+        except Exception as e:
+            logger.debug(f"Erreur journalisation message: {e}")
+
     @classmethod
     async def display_message(cls, app, message_obj: Message):
         """
@@ -651,8 +913,7 @@ class LoggerUtils:
             except Exception as e:
                 # Si on ne trouve pas le widget, mettre en file d'attente
                 logger.debug(f"Widget logs non trouvé: {e}")
-                queue = cls._pending_messages
-                queue.append(message_obj)
+                cls._enqueue_message(message_obj)
                 return
 
             # Mettre à jour le contenu des logs
@@ -674,8 +935,7 @@ class LoggerUtils:
             except Exception as e:
                 logger.error(f"Erreur mise à jour widget logs: {e}", exc_info=True)
                 # En cas d'erreur, mettre en file d'attente
-                queue = cls._pending_messages
-                queue.append(message_obj)
+                cls._enqueue_message(message_obj)
 
         except Exception as e:
             logger.error(f"Erreur dans display_message: {e}", exc_info=True)
@@ -701,16 +961,19 @@ class LoggerUtils:
                 return
 
             # Collecter les messages à traiter
-            messages_to_process = []
             max_messages = 100  # Limite de sécurité pour éviter les surcharges d'UI
 
-            # Ensuite les messages normaux
+            # Round-robin entre les sources, dans l'ordre d'arrivée de chacune (la priorité
+            # ne protège les messages que de l'éviction quand une file est pleine)
             try:
-                while cls._pending_messages and len(messages_to_process) < max_messages:
-                    messages_to_process.append(cls._pending_messages.popleft())
+                messages_to_process = cls._drain_messages(max_messages)
             except Exception as e:
-                logger.error(f"Erreur extraction queue normale: {e}")
-                cls._pending_messages.clear()  # Vider en cas d'erreur
+                logger.error(f"Erreur extraction des files: {e}")
+                messages_to_process = []
+                cls._clear_queues()  # Vider en cas d'erreur
+
+            # Signaler explicitement les pertes par source
+            messages_to_process.extend(cls._collect_drop_notices())
 
             if not messages_to_process:
                 return
@@ -763,7 +1026,7 @@ class LoggerUtils:
         except Exception as e:
             logger.error(f"Erreur critique dans flush_pending_messages: {e}", exc_info=True)
             # Réinitialiser les files d'attente en cas d'erreur majeure
-            cls._pending_messages.clear()
+            cls._clear_queues()
         try:
             logs = app.query_one("#logs-text", Static)
             if logs:
@@ -862,7 +1125,7 @@ class LoggerUtils:
                 content=message,
                 target_ip=target_ip
             )
-
+            cls._journal_message(message_obj)
 
             # Vérifier si nous sommes sur l'écran d'exécution
             try:
@@ -876,8 +1139,7 @@ class LoggerUtils:
             if on_execution_screen:
                 await cls.display_message(app, message_obj)
             else:
-                queue = cls._pending_messages
-                queue.append(message_obj)
+                cls._enqueue_message(message_obj)
 
         except Exception as e:
             logger.error(f"Erreur add_log: {e}", exc_info=True)
@@ -892,7 +1154,7 @@ class LoggerUtils:
         """
         try:
             # Vider les files d'attente
-            cls._pending_messages.clear()
+            cls._clear_queues()
             cls._message_cache.clear()
 
             # Vider le widget de logs
@@ -1004,7 +1266,7 @@ class LoggerUtils:
             except Exception as e:
                 logger.error(f"Erreur pendant force_flush: {e}")
                 # Réinitialiser en cas d'erreur
-                cls._pending_messages.clear()
+                cls._clear_queues()
 
     @classmethod
     def log_to_console(cls, message: str, level: str = "info"):
@@ -1040,4 +1302,5 @@ class LoggerUtils:
         Returns:
             int: Nombre total de messages en attente
         """
-        return len(cls._pending_messages)
\ No newline at end of file
+        with cls._queue_lock:
+            return sum(len(queue) for queue in cls._source_queues.values())
\ No newline at end of file
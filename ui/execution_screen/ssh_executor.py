@@ -20,6 +20,11 @@ from .root_credentials_manager import RootCredentialsManager
 from .file_content_handler import FileContentHandler
 from ..ssh_manager.ssh_config_loader import SSHConfigLoader
 from ..ssh_manager.ip_utils import get_target_ips
+from ..utils.apt_plan import host_transaction
+from ..utils.deb_cache import DEB_CACHE, CONFIG_KEY as APT_ARCHIVES_KEY, uses_deb_cache, wanted_packages
+from ..utils.facts_cache import FACTS_CACHE, CONFIG_KEY as HOST_FACTS_KEY
+from ..utils.journal import get_journal
+from ..utils.messaging import classify_line
 
 import paramiko
 
@@ -76,6 +81,7 @@ class SSHExecutor:
         self.sftp = None
         self.app = None
         self.plugin_widget = None
+        self._journal_plugin_run_id = None  # Exécution en cours dans le journal
         self.root_credentials_manager = RootCredentialsManager.get_instance()
 
     def _get_excluded_files(self, plugin_settings: Dict) -> List[str]:
@@ -241,6 +247,24 @@ class SSHExecutor:
             logger.error(f"Erreur lors de la gestion du fichier de configuration {filename}: {e}")
             return False
 
+    def _record_phase(self, name: str, started_at: float, host: str) -> float:
+        """
+        Enregistre la durée d'une phase d'exécution SSH dans le journal.
+
+        Args:
+            name: Nom de la phase (connexion, transfert, execution)
+            started_at: Début de la phase (time.time())
+            host: Hôte concerné
+
+        Returns:
+            float: Instant de fin, à utiliser comme début de la phase suivante
+        """
+        now = time.time()
+        get_journal().record_phase(name, started_at, now - started_at,
+                                   plugin_run_id=self._journal_plugin_run_id,
+                                   host=host)
+        return now
+
     async def _execute_on_single_host(self, host: str, ssh_config: Dict) -> Tuple[bool, str]:
         """Exécute le plugin sur un hôte spécifique"""
         try:
@@ -260,12 +284,14 @@ class SSHExecutor:
             loop = asyncio.get_event_loop()
 
             # Se connecter à l'hôte (opération bloquante exécutée dans un thread)
+            phase_start = time.time()
             ssh = paramiko.SSHClient()
             ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
             await loop.run_in_executor(
                 None,
                 lambda: ssh.connect(host, port=port, username=user, password=password)
             )
+            phase_start = self._record_phase("connexion", phase_start, host)
 
             try:
                 # Créer le répertoire temporaire sur la machine distante (opération bloquante)
@@ -342,12 +368,38 @@ class SSHExecutor:
 
                 file_content = FileContentHandler.process_file_content(plugin_settings, self.plugin_config, plugin_dir)
                 # Intégrer le contenu des fichiers dans la configuration
-                plugin_config_with_files = self.plugin_config.copy()
+                # Plan de transaction apt restreint à cet hôte
+                plugin_config_with_files = host_transaction(self.plugin_config.copy(), host)
+                # Faits de l'hôte déjà calculés par les plugins précédents
+                facts_settings = plugin_config_with_files.get(HOST_FACTS_KEY) or {}
+                facts_run_id = facts_settings.get('id')
+                if facts_run_id:
+                    plugin_config_with_files[HOST_FACTS_KEY] = FACTS_CACHE.host_settings(
+                        facts_run_id, host, last=host in facts_settings.get('last_hosts', ()))
 
                 for param_name, content in file_content.items():
                     plugin_config_with_files[param_name] = content
                     logger.info(f"Contenu du fichier intégré dans la configuration sous {param_name}")
 
+                # Paquets .deb déjà téléchargés par d'autres hôtes
+                archives_before = None
+                if uses_deb_cache(plugin_settings):
+                    # Seuls les .deb que l'hôte téléchargerait pour ce plugin sont envoyés
+                    wanted = await loop.run_in_executor(
+                        None,
+                        lambda: DEB_CACHE.resolve_on_host(
+                            ssh,
+                            wanted_packages(plugin_settings, plugin_config_with_files),
+                            upgrade=plugin_settings.get('apt_cache') is True)
+                    )
+                    archives_before, seed_dir = await loop.run_in_executor(
+                        None,
+                        lambda: DEB_CACHE.seed_host(sftp, temp_dir, wanted)
+                    )
+                    if seed_dir:
+                        plugin_config_with_files[APT_ARCHIVES_KEY] = seed_dir
+                    phase_start = self._record_phase("cache_apt", phase_start, host)
+
                 # Créer le fichier de configuration localement
                 local_plugin_config = f"/tmp/{TEMP_FILE_PREFIX}plugin_config_{int(time.time())}.json"
                 try:
@@ -406,6 +458,7 @@ class SSHExecutor:
                     lambda: ssh.exec_command(f"chmod +x {remote_wrapper}")
                 )
 
+                phase_start = self._record_phase("transfert", phase_start, host)
                 cmd = f"python3 {remote_wrapper} {remote_wrapper_config}"
                 stdin, stdout, stderr = await loop.run_in_executor(
                     None,
@@ -459,10 +512,10 @@ class SSHExecutor:
                                             try:
                                                 # Extraire le message interne
                                                 inner_message = json.loads(log_entry['message'])
-                                                # Si c'est un message JSON valide, le traiter récursivement avec le même target_ip
+                                                # Si c'est un message JSON valide, le transmettre déjà décodé avec le même target_ip
                                                 await LoggerUtils.process_output_line(
                                                     app,
-                                                    log_entry['message'],  # Utiliser le JSON interne
+                                                    inner_message if isinstance(inner_message, dict) else log_entry['message'],
                                                     pw,
                                                     target_ip=target_ip
                                                 )
@@ -485,7 +538,7 @@ class SSHExecutor:
                                     if app and hasattr(LoggerUtils, 'process_output_line'):
                                         await LoggerUtils.process_output_line(
                                             app,
-                                            json.dumps(log_entry) if log_entry.get('message') == "Exécution terminée avec succès" else line_text,  # Passer la ligne JSON complète
+                                            log_entry if isinstance(log_entry, dict) else line_text,  # Entrée déjà décodée
                                             pw,
                                             target_ip=target_ip
                                         )
@@ -500,18 +553,19 @@ class SSHExecutor:
                                     collected_output.append(line_text)
 
                                 if app and hasattr(LoggerUtils, 'process_output_line'):
-                                    # Créer un JSON pour les lignes non-JSON pour assurer un traitement uniforme
-                                    log_level = "error" if is_stderr else "info"
-                                    json_wrapper = json.dumps({
+                                    # Créer une entrée de log pour les lignes non-JSON pour assurer un traitement uniforme
+                                    # (niveau déterminé une seule fois, par le classificateur partagé)
+                                    log_level = "error" if is_stderr else classify_line(line_text).name.lower()
+                                    log_wrapper = {
                                         "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S.%f"),
                                         "level": log_level,
                                         "message": line_text,
                                         "plugin_name": self.plugin_name,
                                         "instance_id": self.instance_id
-                                    })
+                                    }
                                     await LoggerUtils.process_output_line(
                                         app,
-                                        json_wrapper,
+                                        log_wrapper,
                                         pw,
                                         target_ip=target_ip
                                     )
@@ -540,11 +594,29 @@ class SSHExecutor:
                     lambda: stderr.channel.recv_exit_status()
                 )
 
+                phase_start = self._record_phase("execution", phase_start, host)
+
+                # Faits calculés par le plugin, pour les plugins suivants sur cet hôte
+                if facts_run_id:
+                    await loop.run_in_executor(
+                        None,
+                        lambda: FACTS_CACHE.collect_from_host(sftp, facts_run_id, host)
+                    )
+
+                # Rapatrier les paquets téléchargés par l'hôte pour les hôtes suivants
+                if archives_before is not None:
+                    await loop.run_in_executor(
+                        None,
+                        lambda: DEB_CACHE.collect_from_host(sftp, archives_before)
+                    )
+                    self._record_phase("cache_apt", phase_start, host)
+
                 if exit_status != 0:
                     error_message = "\n".join(collected_errors) if collected_errors else "Erreur inconnue"
                     return False, f"Erreur lors de l'exécution: {error_message}"
 
-                output_text = "\n".join(collected_output)
+                # Les messages structurés (progression, profil) ne font pas partie de la sortie texte
+                output_text = "\n".join(m for m in collected_output if isinstance(m, str))
                 return True, output_text
 
 
@@ -615,6 +687,7 @@ class SSHExecutor:
 
             # Exécuter le plugin sur chaque machine
             results = []
+            journal = get_journal()
             for ip in target_ips:
                 # Créer une configuration SSH spécifique pour cette IP avec les bons identifiants
                 host_ssh_config = {
@@ -623,9 +696,14 @@ class SSHExecutor:
                     'port': ssh_port
                 }
 
+                self._journal_plugin_run_id = journal.start_plugin(
+                    self.plugin_name, host=ip, instance_id=self.instance_id
+                )
                 success, output = await self._execute_on_single_host(
                     ip, host_ssh_config
                 )
+                journal.end_plugin(self._journal_plugin_run_id, success, output)
+                self._journal_plugin_run_id = None
                 results.append((ip, success, output))
 
             # Consolider les résultats
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Planification des transactions apt d'une séquence.
+
+Chaque plugin peut déclarer dans son settings.yml les paquets dont il a besoin:
+
+    apt_packages:
+      - detox
+
+Avant l'exécution, l'union des paquets déclarés par les plugins qui visent un
+même hôte est calculée, puis transmise à chaque plugin dans sa configuration
+(clé apt_transaction). Côté hôte, plugins_utils.apt_transaction installe cette
+union en un seul apt-get au premier AptCommands.install() concerné; le dernier
+plugin Python de l'hôte applique les installations différées restantes.
+
+Un plugin exécuté en SSH partage la même configuration pour tous ses hôtes:
+son plan est indexé par hôte, et SSHExecutor n'envoie à chaque hôte que le
+sien (host_transaction).
+"""
+
+import logging
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+logger = logging.getLogger('pcUtils.apt_plan')
+
+# Clé de configuration partagée avec plugins_utils.apt_transaction
+CONFIG_KEY = 'apt_transaction'
+# Clé du settings.yml listant les paquets nécessaires au plugin
+SETTINGS_KEY = 'apt_packages'
+# Hôte des plugins exécutés localement
+LOCAL_HOST = 'local'
+
+
+class PluginAptNeeds(NamedTuple):
+    """Besoins apt d'un plugin de la séquence."""
+    plugin_id: str
+    hosts: List[str]        # [LOCAL_HOST] pour une exécution locale
+    packages: List[str]     # Paquets déclarés (apt_packages)
+    remote: bool
+    python: bool            # Seuls les plugins Python appliquent la transaction
+
+
+def declared_packages(settings: Optional[Dict[str, Any]]) -> List[str]:
+    """Retourne les paquets déclarés dans un settings.yml (liste ou chaîne séparée par des virgules)."""
+    value = (settings or {}).get(SETTINGS_KEY) or []
+    if isinstance(value, str):
+        value = value.split(',')
+    return [str(p).strip() for p in value if str(p).strip()]
+
+
+def plan_apt_transactions(run_id: str, needs: Iterable[PluginAptNeeds]) -> Dict[str, Dict[str, Any]]:
+    """
+    Calcule la valeur de la clé apt_transaction de chaque plugin.
+
+    Args:
+        run_id: Identifiant de l'exécution (isole les fichiers d'état sur les hôtes)
+        needs: Besoins des plugins, dans l'ordre d'exécution
+
+    Returns:
+        Dict[str, Dict]: plugin_id -> {id, packages, flush} pour un plugin local,
+                         {id, hosts: {hôte: {id, packages, flush}}} pour un plugin SSH
+    """
+    needs = list(needs)
+    packages_by_host: Dict[str, List[str]] = {}
+    last_plugin_by_host: Dict[str, str] = {}
+    for need in needs:
+        for host in need.hosts:
+            union = packages_by_host.setdefault(host, [])
+            union.extend(p for p in need.packages if p not in union)
+            if need.python:
+                last_plugin_by_host[host] = need.plugin_id
+
+    for host, packages in packages_by_host.items():
+        if packages:
+            logger.info(f"Transaction apt pour {host}: {len(packages)} paquet(s) ({', '.join(packages)})")
+
+    def host_entry(host: str, plugin_id: str) -> Dict[str, Any]:
+        return {
+            'id': run_id,
+            'packages': list(packages_by_host.get(host, [])),
+            'flush': last_plugin_by_host.get(host) == plugin_id,
+        }
+
+    plans: Dict[str, Dict[str, Any]] = {}
+    for need in needs:
+        if not need.python:
+            continue
+        if need.remote:
+            plans[need.plugin_id] = {
+                'id': run_id,
+                'hosts': {host: host_entry(host, need.plugin_id) for host in need.hosts},
+            }
+        else:
+            plans[need.plugin_id] = host_entry(LOCAL_HOST, need.plugin_id)
+    return plans
+
+
+def host_transaction(plugin_config: Dict[str, Any], host: str) -> Dict[str, Any]:
+    """
+    Restreint le plan apt d'une configuration de plugin SSH à un hôte.
+
+    Args:
+        plugin_config: Configuration envoyée au plugin
+        host: Hôte cible
+
+    Returns:
+        Dict: Copie de la configuration avec le plan de l'hôte seul (ou sans plan)
+    """
+    plan = plugin_config.get(CONFIG_KEY)
+    if not isinstance(plan, dict) or 'hosts' not in plan:
+        return plugin_config
+    narrowed = dict(plugin_config)
+    entry = plan['hosts'].get(host)
+    if entry:
+        narrowed[CONFIG_KEY] = entry
+    else:
+        narrowed.pop(CONFIG_KEY, None)
+    return narrowed
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache de paquets .deb du contrôleur pour les exécutions SSH.
+
+Les plugins exécutés en SSH qui installent des paquets (apt_packages ou
+apt_cache dans leur settings.yml) partagent les .deb téléchargés d'un hôte à
+l'autre:
+- avant l'exécution, l'hôte résout avec apt-get --print-uris les .deb qui lui
+  manquent pour les paquets du plugin (apt_packages, plan de la transaction
+  apt, liste apt_cache) ou pour ses mises à jour (apt_cache: true);
+  SSHExecutor dépose dans le répertoire temporaire du plugin ceux que le
+  cache contient, et le plugin les copie au démarrage (plugins_utils.apt_archives);
+- après l'exécution, les .deb apparus dans /var/cache/apt/archives sur l'hôte
+  sont rapatriés dans le cache.
+
+Le premier hôte télécharge depuis le miroir, les suivants trouvent un cache
+apt déjà rempli: seul le réseau local entre contrôleur et hôtes est sollicité.
+apt vérifie l'empreinte de chaque .deb d'après ses index: un fichier qui ne
+correspond pas (autre version, autre distribution) est simplement retéléchargé.
+"""
+
+import os
+import re
+import stat
+import shlex
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from .apt_plan import CONFIG_KEY as APT_TRANSACTION_KEY, declared_packages
+
+logger = logging.getLogger('pcUtils.deb_cache')
+
+# Même racine que le journal d'exécution (dossier du projet)
+DEFAULT_CACHE_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'cache', 'debs'))
+CACHE_DIR_ENV_VAR = 'PCUTILS_DEB_CACHE'
+# Taille maximale du cache (les .deb les moins récemment utilisés sont supprimés)
+CACHE_MAX_BYTES = 4 * 1024 ** 3
+
+REMOTE_ARCHIVES_DIR = '/var/cache/apt/archives'
+# Sous-répertoire du répertoire temporaire du plugin recevant les .deb
+REMOTE_SEED_SUBDIR = 'apt_archives'
+# Clé de configuration partagée avec plugins_utils.apt_archives
+CONFIG_KEY = 'apt_archives_dir'
+
+# Nom de fichier produit par apt: nom_version_arch.deb (':' de l'époque encodé en %3a)
+_DEB_NAME = re.compile(r'^[A-Za-z0-9][A-Za-z0-9.+~%_-]*\.deb$')
+# Nom de paquet Debian, éventuellement qualifié par une architecture
+_PACKAGE_NAME = re.compile(r'^[a-z0-9][a-z0-9+.-]*(:[a-z0-9-]+)?$')
+# Durée maximale de la résolution apt-get --print-uris sur l'hôte
+RESOLVE_TIMEOUT = 120
+
+
+def uses_deb_cache(plugin_settings: Optional[Dict[str, Any]]) -> bool:
+    """True si le plugin installe des paquets (apt_packages déclarés ou apt_cache)."""
+    settings = plugin_settings or {}
+    return bool(settings.get('apt_cache') or settings.get('apt_packages'))
+
+
+def wanted_packages(plugin_settings: Optional[Dict[str, Any]],
+                    plugin_config: Optional[Dict[str, Any]]) -> List[str]:
+    """
+    Paquets que le plugin va installer sur l'hôte: apt_packages et liste
+    apt_cache du settings.yml, plus le plan de la transaction apt de l'hôte.
+    """
+    settings = plugin_settings or {}
+    packages = declared_packages(settings)
+    apt_cache = settings.get('apt_cache')
+    if isinstance(apt_cache, (list, str)) and not isinstance(apt_cache, bool):
+        packages.extend(declared_packages({'apt_packages': apt_cache}))
+    transaction = (plugin_config or {}).get(APT_TRANSACTION_KEY) or {}
+    packages.extend(str(p) for p in transaction.get('packages') or [])
+    return sorted({p for p in packages if _PACKAGE_NAME.match(p)})
+
+
+def parse_print_uris(output: str) -> Dict[str, int]:
+    """Nom -> taille des .deb listés par apt-get --print-uris ('uri' nom taille empreinte)."""
+    archives: Dict[str, int] = {}
+    for line in output.splitlines():
+        parts = line.split()
+        if len(parts) >= 3 and parts[0].startswith("'") and _DEB_NAME.match(parts[1]) and parts[2].isdigit():
+            archives[parts[1]] = int(parts[2])
+    return archives
+
+
+class DebCache:
+    """Répertoire local de .deb partagé par les exécutions SSH."""
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: int = CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir or os.environ.get(CACHE_DIR_ENV_VAR, DEFAULT_CACHE_DIR)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def filenames(self) -> Set[str]:
+        """Noms des .deb présents dans le cache."""
+        try:
+            return {name for name in os.listdir(self.cache_dir) if _DEB_NAME.match(name)}
+        except OSError:
+            return set()
+
+    @staticmethod
+    def remote_archives(sftp) -> Dict[str, int]:
+        """Nom -> taille des .deb présents dans le cache apt de l'hôte."""
+        try:
+            return {attr.filename: attr.st_size for attr in sftp.listdir_attr(REMOTE_ARCHIVES_DIR)
+                    if _DEB_NAME.match(attr.filename) and stat.S_ISREG(attr.st_mode or 0)}
+        except (IOError, OSError):
+            return {}
+
+    @staticmethod
+    def resolve_on_host(ssh, packages: Iterable[str], upgrade: bool = False) -> Dict[str, int]:
+        """
+        Demande à l'hôte les .deb qu'il devrait télécharger (apt-get --print-uris).
+
+        Args:
+            ssh: Client SSH connecté à l'hôte
+            packages: Paquets à installer
+            upgrade: Inclure les mises à jour (dist-upgrade) si aucun paquet n'est donné
+
+        Returns:
+            Dict[str, int]: Nom -> taille des .deb attendus (vide en cas d'échec)
+        """
+        packages = list(packages)
+        if packages:
+            action = ['install'] + packages
+        elif upgrade:
+            action = ['dist-upgrade']
+        else:
+            return {}
+        # Pas de verrou: la résolution fonctionne sans privilèges et pendant un autre apt
+        cmd = ['apt-get', '--print-uris', '-qq', '-y', '-o', 'Debug::NoLocking=1'] + action
+        try:
+            _, stdout, _ = ssh.exec_command(f"LC_ALL=C {shlex.join(cmd)}", timeout=RESOLVE_TIMEOUT)
+            output = stdout.read().decode('utf-8', errors='replace')
+            if stdout.channel.recv_exit_status() != 0:
+                logger.info("Résolution apt-get --print-uris impossible, aucun .deb envoyé")
+                return {}
+        except Exception as e:
+            logger.warning(f"Résolution apt-get --print-uris impossible: {e}")
+            return {}
+        return parse_print_uris(output)
+
+    def seed_host(self, sftp, temp_dir: str, wanted: Dict[str, int]) -> Tuple[Dict[str, int], Optional[str]]:
+        """
+        Dépose sur l'hôte les .deb du cache dont il a besoin et absents de son cache apt.
+
+        Args:
+            sftp: Session SFTP ouverte sur l'hôte
+            temp_dir: Répertoire temporaire distant du plugin
+            wanted: Nom -> taille des .deb attendus par l'hôte (resolve_on_host)
+
+        Returns:
+            Tuple: (contenu du cache apt distant avant exécution,
+                    répertoire distant des .deb déposés ou None si aucun)
+        """
+        before = self.remote_archives(sftp)
+        missing = []
+        for name in sorted((self.filenames() & set(wanted)) - set(before)):
+            try:
+                # Même nom mais autre taille: autre archive (dépôt différent)
+                if os.path.getsize(os.path.join(self.cache_dir, name)) == wanted[name]:
+                    missing.append(name)
+            except OSError:
+                pass
+        if not missing:
+            return before, None
+
+        remote_dir = f"{temp_dir}/{REMOTE_SEED_SUBDIR}"
+        try:
+            sftp.mkdir(remote_dir)
+        except (IOError, OSError):
+            pass
+        pushed = 0
+        for name in missing:
+            local_path = os.path.join(self.cache_dir, name)
+            try:
+                sftp.put(local_path, f"{remote_dir}/{name}")
+                # Date de dernière utilisation pour l'éviction (mtime)
+                os.utime(local_path)
+                pushed += 1
+            except (IOError, OSError) as e:
+                logger.warning(f"Envoi de {name} impossible: {e}")
+        logger.info(f"{pushed} paquet(s) .deb envoyé(s) depuis le cache du contrôleur")
+        return before, remote_dir if pushed else None
+
+    def collect_from_host(self, sftp, before: Dict[str, int]) -> int:
+        """
+        Rapatrie dans le cache les .deb téléchargés par l'hôte pendant l'exécution.
+
+        Args:
+            sftp: Session SFTP ouverte sur l'hôte
+            before: Contenu du cache apt distant avant exécution (seed_host)
+
+        Returns:
+            int: Nombre de paquets ajoutés au cache
+        """
+        cached = self.filenames()
+        new = {name: size for name, size in self.remote_archives(sftp).items()
+               if name not in before and name not in cached}
+        if not new:
+            return 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+        added = 0
+        for name, size in sorted(new.items()):
+            local_path = os.path.join(self.cache_dir, name)
+            tmp_path = f"{local_path}.{threading.get_ident()}.part"
+            try:
+                sftp.get(f"{REMOTE_ARCHIVES_DIR}/{name}", tmp_path)
+                if os.path.getsize(tmp_path) != size:
+                    raise IOError("taille inattendue")
+                # Plusieurs hôtes peuvent rapatrier le même paquet: remplacement atomique
+                os.replace(tmp_path, local_path)
+                added += 1
+            except (IOError, OSError) as e:
+                logger.warning(f"Récupération de {name} impossible: {e}")
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+        if added:
+            logger.info(f"{added} paquet(s) .deb ajouté(s) au cache du contrôleur")
+            self.prune()
+        return added
+
+    def prune(self) -> None:
+        """Supprime les .deb les moins récemment utilisés au-delà de la taille maximale."""
+        with self._lock:
+            entries: List[Tuple[float, int, str]] = []
+            for name in self.filenames():
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+
+
+# Cache unique de l'interface
+DEB_CACHE = DebCache()
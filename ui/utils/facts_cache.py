@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Faits d'hôte de l'exécution en cours, côté interface.
+
+Avant l'exécution, chaque plugin reçoit dans sa configuration la clé
+host_facts avec l'identifiant d'exécution: sur l'hôte,
+plugins_utils.host_facts calcule chaque fait une seule fois et l'enregistre
+dans un fichier d'état partagé par les plugins suivants.
+
+En SSH, SSHExecutor rapatrie ce fichier après chaque plugin et injecte les
+faits connus dans la configuration du plugin suivant sur le même hôte: les
+faits restent disponibles même si les plugins ne s'exécutent pas sous le même
+compte (needs_sudo) et ne peuvent donc pas partager le fichier. Un fait oublié
+par un plugin (marque sans valeur dans le fichier) n'est plus injecté.
+
+Le dernier plugin Python de l'exécution sur chaque hôte reçoit last=True et
+supprime le fichier d'état en fin d'exécution.
+"""
+
+import json
+import logging
+import threading
+from typing import Any, Dict, Tuple
+
+logger = logging.getLogger('pcUtils.facts_cache')
+
+# Clé de configuration partagée avec plugins_utils.host_facts
+CONFIG_KEY = 'host_facts'
+# Fichier d'état sur l'hôte (même emplacement que plugins_utils.host_facts)
+REMOTE_FACTS_DIR = '/var/tmp'
+REMOTE_FACTS_FILE_PREFIX = 'pcutils_facts_'
+
+
+class FactsCache:
+    """Faits connus par hôte pour chaque exécution."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._facts: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+    def host_settings(self, run_id: str, host: str, last: bool = False) -> Dict[str, Any]:
+        """
+        Valeur de la clé host_facts pour un plugin visant un hôte.
+
+        Args:
+            run_id: Identifiant de l'exécution
+            host: Hôte
+            last: True pour le dernier plugin de l'exécution sur l'hôte
+
+        Returns:
+            Dict: {id, facts, last} avec les faits déjà connus pour l'hôte
+        """
+        with self._lock:
+            facts = dict(self._facts.get((run_id, host), {}))
+        return {'id': run_id, 'facts': facts, 'last': last}
+
+    def collect_from_host(self, sftp, run_id: str, host: str) -> int:
+        """
+        Rapatrie les faits enregistrés sur l'hôte pendant l'exécution d'un plugin.
+
+        Args:
+            sftp: Session SFTP ouverte sur l'hôte
+            run_id: Identifiant de l'exécution
+            host: Hôte
+
+        Returns:
+            int: Nombre de faits connus pour l'hôte
+        """
+        remote_path = f"{REMOTE_FACTS_DIR}/{REMOTE_FACTS_FILE_PREFIX}{run_id}.json"
+        try:
+            with sftp.open(remote_path, 'r') as f:
+                facts = json.loads(f.read())
+        except (IOError, OSError, ValueError) as e:
+            # Fichier absent (aucun fait calculé) ou illisible par le compte SSH
+            logger.debug(f"Faits de {host} non rapatriés: {e}")
+            facts = None
+        with self._lock:
+            known = self._facts.setdefault((run_id, host), {})
+            if isinstance(facts, dict):
+                for name, entry in facts.items():
+                    if isinstance(entry, dict) and 'value' in entry:
+                        known[name] = entry
+                    else:
+                        # Fait oublié par le plugin (commande modifiante)
+                        known.pop(name, None)
+            return len(known)
+
+    def clear(self, run_id: str) -> None:
+        """Oublie les faits d'une exécution terminée."""
+        with self._lock:
+            for key in [key for key in self._facts if key[0] == run_id]:
+                del self._facts[key]
+
+
+# Cache unique de l'interface
+FACTS_CACHE = FactsCache()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Décodage du protocole de sortie tramé des plugins.
+
+Format d'une trame: MAGIC (3 octets) | type (1 octet) | longueur (4 octets, big-endian) | contenu.
+Les octets hors trame (print, sortie brute, plugins bash) sont restitués sous
+forme de lignes de texte, ce qui garde le JSONL comme protocole de repli.
+
+Les constantes du protocole sont définies une seule fois, côté plugins,
+dans plugins/plugins_utils/framing.py.
+"""
+
+import json
+from typing import Any, List, Tuple
+
+from plugins.plugins_utils.framing import (  # noqa: F401 (réexportées pour les exécuteurs)
+    FRAMING_ENV_VAR, FRAMING_BINARY, FRAME_MAGIC, FRAME_HEADER, FRAME_MAX_SIZE,
+    FRAME_TYPE_HELLO, FRAME_TYPE_LOG, FRAME_TYPE_TEXT,
+)
+
+# Types d'éléments produits par le décodeur
+RECORD_LOG = "log"    # Dictionnaire déjà décodé
+RECORD_TEXT = "text"  # Ligne de texte brute (JSONL ou sortie libre)
+
+
+class FrameDecoder:
+    """
+    Décodeur incrémental d'un flux mêlant trames binaires et lignes de texte.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self.negotiated = False
+
+    def feed(self, data: bytes) -> List[Tuple[str, Any]]:
+        """
+        Ajoute des octets lus et retourne les éléments complets.
+
+        Args:
+            data: Octets lus sur le flux
+
+        Returns:
+            List[Tuple[str, Any]]: Liste de (RECORD_*, contenu)
+        """
+        self._buffer.extend(data)
+        records: List[Tuple[str, Any]] = []
+        buf = self._buffer
+
+        while buf:
+            magic_pos = buf.find(FRAME_MAGIC)
+
+            if magic_pos == 0:
+                if len(buf) < FRAME_HEADER.size:
+                    break
+                _, frame_type, length = FRAME_HEADER.unpack_from(buf)
+                if length > FRAME_MAX_SIZE:
+                    # En-tête incohérent: traiter le marqueur comme du texte
+                    records.extend(self._split_text(bytes(buf[:len(FRAME_MAGIC)])))
+                    del buf[:len(FRAME_MAGIC)]
+                    continue
+                end = FRAME_HEADER.size + length
+                if len(buf) < end:
+                    break
+                payload = bytes(buf[FRAME_HEADER.size:end])
+                del buf[:end]
+                records.extend(self._decode_payload(frame_type, payload))
+                continue
+
+            if magic_pos > 0:
+                # Texte avant la prochaine trame: le restituer en entier
+                records.extend(self._split_text(bytes(buf[:magic_pos])))
+                del buf[:magic_pos]
+                continue
+
+            # Aucun marqueur: ne rendre que les lignes complètes, en gardant
+            # une éventuelle amorce de marqueur en fin de tampon
+            last_newline = buf.rfind(b"\n")
+            if last_newline < 0:
+                break
+            records.extend(self._split_text(bytes(buf[:last_newline + 1])))
+            del buf[:last_newline + 1]
+
+        return records
+
+    def close(self) -> List[Tuple[str, Any]]:
+        """
+        Termine le décodage (fin de flux) et retourne le texte restant.
+
+        Returns:
+            List[Tuple[str, Any]]: Éléments restants
+        """
+        remaining = bytes(self._buffer)
+        self._buffer.clear()
+        return self._split_text(remaining)
+
+    def _decode_payload(self, frame_type: int, payload: bytes) -> List[Tuple[str, Any]]:
+        """Décode le contenu d'une trame selon son type."""
+        if frame_type == FRAME_TYPE_HELLO:
+            self.negotiated = True
+            return []
+        if frame_type == FRAME_TYPE_LOG:
+            try:
+                record = json.loads(payload.decode('utf-8', errors='replace'))
+                if isinstance(record, dict):
+                    return [(RECORD_LOG, record)]
+            except json.JSONDecodeError:
+                pass
+        return self._split_text(payload)
+
+    @staticmethod
+    def _split_text(data: bytes) -> List[Tuple[str, Any]]:
+        """Découpe des octets de texte en lignes non vides."""
+        text = data.decode('utf-8', errors='replace')
+        return [(RECORD_TEXT, line.strip()) for line in text.splitlines() if line.strip()]
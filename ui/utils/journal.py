@@ -0,0 +1,550 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Journal d'exécution persistant (SQLite).
+
+Toutes les exécutions (runs), les plugins lancés par hôte, les durées des
+phases et les messages de log sont conservés dans une base SQLite locale,
+indexée pour répondre rapidement aux questions du type
+« quels hôtes ont échoué sur add_printer la semaine dernière ».
+
+Les écritures passent par une file d'attente vidée par lots dans un thread
+dédié: l'interface ne fait jamais d'I/O SQLite elle-même.
+
+Utilisation en ligne de commande (depuis la racine du projet):
+    python3 -m ui.utils.journal runs
+    python3 -m ui.utils.journal failures --plugin add_printer --since 7d
+    python3 -m ui.utils.journal records --host 192.168.1.10 --level error --limit 50
+"""
+
+import os
+import sys
+import time
+import uuid
+import queue
+import sqlite3
+import logging
+import argparse
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger('pcUtils.journal')
+
+# Même racine que ui/utils/logging.py, sans importer ce module (il réinitialise debug.log)
+DEFAULT_JOURNAL_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'logs'))
+JOURNAL_ENV_VAR = 'PCUTILS_JOURNAL'
+JOURNAL_FILENAME = 'execution_journal.sqlite'
+
+# Paramètres du writer
+BATCH_MAX_OPS = 500
+BATCH_MAX_DELAY = 0.5
+QUEUE_MAXSIZE = 100000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id TEXT PRIMARY KEY,
+    started_at REAL NOT NULL,
+    ended_at REAL,
+    sequence TEXT,
+    total_plugins INTEGER,
+    status TEXT
+);
+CREATE TABLE IF NOT EXISTS plugin_runs (
+    id TEXT PRIMARY KEY,
+    run_id TEXT,
+    plugin TEXT NOT NULL,
+    instance_id TEXT,
+    host TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    ended_at REAL,
+    duration REAL,
+    success INTEGER,
+    output TEXT
+);
+CREATE TABLE IF NOT EXISTS phases (
+    id INTEGER PRIMARY KEY,
+    plugin_run_id TEXT,
+    run_id TEXT,
+    host TEXT,
+    name TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    duration REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS records (
+    id INTEGER PRIMARY KEY,
+    run_id TEXT,
+    ts REAL NOT NULL,
+    host TEXT,
+    plugin TEXT,
+    instance_id TEXT,
+    level TEXT NOT NULL,
+    message TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_runs_started ON runs(started_at);
+CREATE INDEX IF NOT EXISTS idx_plugin_runs_run ON plugin_runs(run_id);
+CREATE INDEX IF NOT EXISTS idx_plugin_runs_plugin ON plugin_runs(plugin, started_at);
+CREATE INDEX IF NOT EXISTS idx_plugin_runs_host ON plugin_runs(host, started_at);
+CREATE INDEX IF NOT EXISTS idx_plugin_runs_success ON plugin_runs(success, started_at);
+CREATE INDEX IF NOT EXISTS idx_phases_plugin_run ON phases(plugin_run_id);
+CREATE INDEX IF NOT EXISTS idx_records_run ON records(run_id, ts);
+CREATE INDEX IF NOT EXISTS idx_records_host ON records(host, ts);
+CREATE INDEX IF NOT EXISTS idx_records_plugin ON records(plugin, ts);
+CREATE INDEX IF NOT EXISTS idx_records_level ON records(level, ts);
+CREATE INDEX IF NOT EXISTS idx_records_ts ON records(ts);
+"""
+
+# Requêtes d'écriture (clé d'opération -> SQL)
+_WRITE_SQL = {
+    'run_start': "INSERT OR REPLACE INTO runs (id, started_at, sequence, total_plugins, status) VALUES (?, ?, ?, ?, 'running')",
+    'run_end': "UPDATE runs SET ended_at = ?, status = ? WHERE id = ?",
+    'plugin_start': "INSERT OR REPLACE INTO plugin_runs (id, run_id, plugin, instance_id, host, started_at) VALUES (?, ?, ?, ?, ?, ?)",
+    'plugin_end': "UPDATE plugin_runs SET ended_at = ?, duration = ? - started_at, success = ?, output = ? WHERE id = ?",
+    'phase': "INSERT INTO phases (plugin_run_id, run_id, host, name, started_at, duration) VALUES (?, ?, ?, ?, ?, ?)",
+    'record': "INSERT INTO records (run_id, ts, host, plugin, instance_id, level, message) VALUES (?, ?, ?, ?, ?, ?, ?)",
+}
+
+# Taille maximale conservée pour les sorties de plugins
+MAX_OUTPUT_LENGTH = 4000
+
+# Hôte enregistré pour les plugins et messages locaux (sans target_ip)
+LOCAL_HOST = 'local'
+
+
+def get_journal_path() -> str:
+    """
+    Retourne le chemin de la base du journal.
+
+    Returns:
+        str: Chemin défini par PCUTILS_JOURNAL ou logs/execution_journal.sqlite
+    """
+    return os.environ.get(JOURNAL_ENV_VAR) or os.path.join(DEFAULT_JOURNAL_DIR, JOURNAL_FILENAME)
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    """Ouvre la base et applique le schéma."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+class ExecutionJournal:
+    """
+    Journal d'exécution avec écritures groupées en arrière-plan.
+    Une instance partagée est obtenue via get_journal().
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Initialise le journal (le thread d'écriture démarre à la première écriture).
+
+        Args:
+            path: Chemin de la base SQLite (par défaut get_journal_path())
+        """
+        self.path = path or get_journal_path()
+        self.current_run_id: Optional[str] = None
+        self._queue: "queue.Queue[Optional[Tuple[str, tuple]]]" = queue.Queue(maxsize=QUEUE_MAXSIZE)
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+        self._dropped = 0
+        self.enabled = True
+
+    # --- API d'écriture (non bloquante) ---
+
+    def start_run(self, sequence: Optional[str] = None, total_plugins: int = 0) -> str:
+        """
+        Enregistre le début d'une exécution et la définit comme exécution courante.
+
+        Args:
+            sequence: Nom de la séquence éventuelle
+            total_plugins: Nombre de plugins prévus
+
+        Returns:
+            str: Identifiant de l'exécution
+        """
+        run_id = uuid.uuid4().hex
+        self.current_run_id = run_id
+        self._submit('run_start', (run_id, time.time(), sequence, total_plugins))
+        return run_id
+
+    def end_run(self, run_id: Optional[str] = None, status: str = "done") -> None:
+        """
+        Enregistre la fin d'une exécution.
+
+        Args:
+            run_id: Identifiant de l'exécution (courante par défaut)
+            status: Statut final (done, error, stopped...)
+        """
+        run_id = run_id or self.current_run_id
+        if not run_id:
+            return
+        self._submit('run_end', (time.time(), status, run_id))
+        if run_id == self.current_run_id:
+            self.current_run_id = None
+
+    def start_plugin(self, plugin: str, host: Optional[str] = None,
+                     instance_id: Any = None, run_id: Optional[str] = None) -> str:
+        """
+        Enregistre le lancement d'un plugin sur un hôte.
+
+        Args:
+            plugin: Nom du plugin
+            host: Hôte cible ('local' si None)
+            instance_id: Identifiant d'instance du plugin
+            run_id: Exécution parente (courante par défaut)
+
+        Returns:
+            str: Identifiant de l'exécution du plugin
+        """
+        plugin_run_id = uuid.uuid4().hex
+        self._submit('plugin_start', (plugin_run_id, run_id or self.current_run_id, plugin,
+                                      None if instance_id is None else str(instance_id),
+                                      host or LOCAL_HOST, time.time()))
+        return plugin_run_id
+
+    def end_plugin(self, plugin_run_id: str, success: bool, output: Optional[str] = None) -> None:
+        """
+        Enregistre la fin d'un plugin sur un hôte.
+
+        Args:
+            plugin_run_id: Identifiant retourné par start_plugin
+            success: Résultat du plugin
+            output: Sortie ou message d'erreur (tronqué)
+        """
+        now = time.time()
+        if output is not None:
+            output = str(output)[:MAX_OUTPUT_LENGTH]
+        self._submit('plugin_end', (now, now, 1 if success else 0, output, plugin_run_id))
+
+    def record_phase(self, name: str, started_at: float, duration: float,
+                     plugin_run_id: Optional[str] = None, host: Optional[str] = None,
+                     run_id: Optional[str] = None) -> None:
+        """
+        Enregistre la durée d'une phase (connexion, transfert, exécution...).
+
+        Args:
+            name: Nom de la phase
+            started_at: Début de la phase (time.time())
+            duration: Durée en secondes
+            plugin_run_id: Exécution de plugin associée
+            host: Hôte concerné
+            run_id: Exécution parente (courante par défaut)
+        """
+        self._submit('phase', (plugin_run_id, run_id or self.current_run_id, host, name, started_at, duration))
+
+    def record(self, level: str, message: Any, plugin: Optional[str] = None,
+               instance_id: Any = None, host: Optional[str] = None, ts: Optional[float] = None) -> None:
+        """
+        Enregistre un message de log.
+
+        Args:
+            level: Niveau du message
+            message: Contenu du message
+            plugin: Plugin émetteur
+            instance_id: Instance du plugin
+            host: Hôte concerné ('local' si None, comme start_plugin)
+            ts: Horodatage (maintenant par défaut)
+        """
+        self._submit('record', (self.current_run_id, ts or time.time(), host or LOCAL_HOST, plugin,
+                                None if instance_id is None else str(instance_id),
+                                str(level), message if isinstance(message, str) else str(message)))
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """
+        Attend que les écritures en attente soient appliquées.
+
+        Args:
+            timeout: Attente maximale en secondes
+        """
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+    def close(self) -> None:
+        """Vide la file et arrête le thread d'écriture."""
+        with self._thread_lock:
+            thread = self._thread
+            self._thread = None
+        if thread and thread.is_alive():
+            self._queue.put(None)
+            thread.join(timeout=5.0)
+
+    def _submit(self, op: str, params: tuple) -> None:
+        """Met une opération en file d'attente sans bloquer l'appelant."""
+        if not self.enabled:
+            return
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait((op, params))
+        except queue.Full:
+            self._dropped += 1
+            if self._dropped % 1000 == 1:
+                logger.warning(f"File du journal pleine, {self._dropped} écriture(s) perdue(s)")
+
+    def _ensure_writer(self) -> None:
+        """Démarre le thread d'écriture si nécessaire."""
+        if self._thread and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._writer_loop, name="journal-writer", daemon=True)
+            self._thread.start()
+
+    def _writer_loop(self) -> None:
+        """Boucle du thread d'écriture: regroupe les opérations en transactions."""
+        try:
+            conn = _connect(self.path)
+        except Exception as e:
+            logger.error(f"Impossible d'ouvrir le journal {self.path}: {e}")
+            self.enabled = False
+            return
+
+        running = True
+        while running:
+            batch: List[Tuple[str, tuple]] = []
+            try:
+                item = self._queue.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            if item is None:
+                self._queue.task_done()
+                running = False
+            else:
+                batch.append(item)
+                deadline = time.monotonic() + BATCH_MAX_DELAY
+                while len(batch) < BATCH_MAX_OPS and time.monotonic() < deadline:
+                    try:
+                        item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        self._queue.task_done()
+                        running = False
+                        break
+                    batch.append(item)
+
+            if batch:
+                self._write_batch(conn, batch)
+                for _ in batch:
+                    self._queue.task_done()
+
+        conn.close()
+
+    @staticmethod
+    def _write_batch(conn: sqlite3.Connection, batch: List[Tuple[str, tuple]]) -> None:
+        """Applique un lot d'opérations dans une seule transaction, en regroupant par requête."""
+        try:
+            with conn:
+                # Regrouper les opérations consécutives de même type pour executemany
+                current_op, params_list = None, []
+                for op, params in batch:
+                    if op != current_op and params_list:
+                        conn.executemany(_WRITE_SQL[current_op], params_list)
+                        params_list = []
+                    current_op = op
+                    params_list.append(params)
+                if params_list:
+                    conn.executemany(_WRITE_SQL[current_op], params_list)
+        except Exception as e:
+            logger.error(f"Erreur d'écriture dans le journal: {e}")
+
+
+_journal: Optional[ExecutionJournal] = None
+_journal_lock = threading.Lock()
+
+
+def get_journal() -> ExecutionJournal:
+    """
+    Retourne l'instance partagée du journal d'exécution.
+
+    Returns:
+        ExecutionJournal: Journal partagé
+    """
+    global _journal
+    if _journal is None:
+        with _journal_lock:
+            if _journal is None:
+                _journal = ExecutionJournal()
+    return _journal
+
+
+# --- Requêtes ---
+
+# Unités des durées relatives (30m, 12h, 7d)
+DURATION_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+
+def parse_duration(value: str) -> float:
+    """
+    Convertit une durée (30m, 12h, 7d, ou un nombre de secondes) en secondes.
+
+    Args:
+        value: Durée avec unité s/m/h/d/w, ou nombre de secondes
+
+    Returns:
+        float: Durée en secondes
+
+    Raises:
+        ValueError: Durée invalide ou négative
+    """
+    text = str(value).strip().lower()
+    factor = DURATION_UNITS.get(text[-1:], None)
+    number = text[:-1] if factor else text
+    try:
+        seconds = float(number) * (factor or 1)
+    except ValueError:
+        raise ValueError(f"Durée invalide: {value!r} (exemples: 90, 30m, 12h, 7d)") from None
+    if seconds < 0:
+        raise ValueError(f"Durée négative: {value!r}")
+    return seconds
+
+
+def parse_since(value: Optional[str]) -> Optional[float]:
+    """
+    Convertit une durée relative (30m, 12h, 7d) ou un timestamp en borne temporelle.
+
+    Args:
+        value: Durée relative ou timestamp epoch
+
+    Returns:
+        Optional[float]: Timestamp epoch minimal, ou None
+    """
+    if not value:
+        return None
+    if value[-1] in DURATION_UNITS:
+        return time.time() - parse_duration(value)
+    return float(value)
+
+
+def format_ts(ts: Optional[float]) -> str:
+    """Formate un timestamp epoch pour l'affichage."""
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ts)) if ts else "-"
+
+
+class JournalQuery:
+    """Requêtes en lecture seule sur le journal d'exécution."""
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Ouvre la base en lecture.
+
+        Args:
+            path: Chemin de la base (par défaut get_journal_path())
+        """
+        self.conn = _connect(path or get_journal_path())
+        self.conn.row_factory = sqlite3.Row
+
+    def runs(self, limit: int = 20) -> List[sqlite3.Row]:
+        """Dernières exécutions avec le nombre d'échecs par exécution."""
+        return self.conn.execute(
+            "SELECT r.id, r.started_at, r.ended_at, r.sequence, r.status, r.total_plugins, "
+            "(SELECT COUNT(*) FROM plugin_runs p WHERE p.run_id = r.id AND p.success = 0) AS failures "
+            "FROM runs r ORDER BY r.started_at DESC LIMIT ?", (limit,)).fetchall()
+
+    def failures(self, plugin: Optional[str] = None, host: Optional[str] = None,
+                 since: Optional[float] = None, limit: int = 100) -> List[sqlite3.Row]:
+        """Exécutions de plugins en échec, filtrées par plugin/hôte/période."""
+        sql = ("SELECT plugin, host, instance_id, run_id, started_at, duration, output "
+               "FROM plugin_runs WHERE success = 0")
+        params: List[Any] = []
+        if plugin:
+            sql += " AND plugin = ?"
+            params.append(plugin)
+        if host:
+            sql += " AND host = ?"
+            params.append(host)
+        if since:
+            sql += " AND started_at >= ?"
+            params.append(since)
+        sql += " ORDER BY started_at DESC LIMIT ?"
+        params.append(limit)
+        return self.conn.execute(sql, params).fetchall()
+
+    def records(self, run_id: Optional[str] = None, host: Optional[str] = None,
+                plugin: Optional[str] = None, level: Optional[str] = None,
+                since: Optional[float] = None, limit: int = 100) -> List[sqlite3.Row]:
+        """Messages de log filtrés, du plus récent au plus ancien."""
+        sql = "SELECT ts, run_id, host, plugin, instance_id, level, message FROM records WHERE 1 = 1"
+        params: List[Any] = []
+        for column, value in (('run_id', run_id), ('host', host), ('plugin', plugin), ('level', level)):
+            if value:
+                sql += f" AND {column} = ?"
+                params.append(value)
+        if since:
+            sql += " AND ts >= ?"
+            params.append(since)
+        sql += " ORDER BY ts DESC LIMIT ?"
+        params.append(limit)
+        return self.conn.execute(sql, params).fetchall()
+
+    def phases(self, plugin_run_id: Optional[str] = None, run_id: Optional[str] = None) -> List[sqlite3.Row]:
+        """Durées des phases d'une exécution de plugin ou d'un run."""
+        if plugin_run_id:
+            return self.conn.execute(
+                "SELECT host, name, started_at, duration FROM phases WHERE plugin_run_id = ? ORDER BY started_at",
+                (plugin_run_id,)).fetchall()
+        return self.conn.execute(
+            "SELECT host, name, started_at, duration FROM phases WHERE run_id = ? ORDER BY started_at",
+            (run_id,)).fetchall()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Point d'entrée de la consultation du journal en ligne de commande."""
+    parser = argparse.ArgumentParser(description="Consultation du journal d'exécution pcUtils")
+    parser.add_argument('--db', help="Chemin de la base (défaut: %s)" % get_journal_path())
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_runs = sub.add_parser('runs', help="Dernières exécutions")
+    p_runs.add_argument('--limit', type=int, default=20)
+
+    p_fail = sub.add_parser('failures', help="Plugins en échec par hôte")
+    p_fail.add_argument('--plugin')
+    p_fail.add_argument('--host')
+    p_fail.add_argument('--since', help="Période relative (30m, 12h, 7d) ou timestamp")
+    p_fail.add_argument('--limit', type=int, default=100)
+
+    p_rec = sub.add_parser('records', help="Messages de log")
+    p_rec.add_argument('--run')
+    p_rec.add_argument('--host')
+    p_rec.add_argument('--plugin')
+    p_rec.add_argument('--level')
+    p_rec.add_argument('--since')
+    p_rec.add_argument('--limit', type=int, default=100)
+
+    p_phase = sub.add_parser('phases', help="Durées des phases d'un run")
+    p_phase.add_argument('run')
+
+    args = parser.parse_args(argv)
+    query = JournalQuery(args.db)
+    start = time.perf_counter()
+
+    if args.command == 'runs':
+        rows = query.runs(args.limit)
+        for row in rows:
+            print(f"{row['id']}  {format_ts(row['started_at'])}  {row['status'] or '-':8}  "
+                  f"plugins={row['total_plugins']}  échecs={row['failures']}  {row['sequence'] or ''}")
+    elif args.command == 'failures':
+        rows = query.failures(args.plugin, args.host, parse_since(args.since), args.limit)
+        for row in rows:
+            output = (row['output'] or '').splitlines()[:1]
+            print(f"{format_ts(row['started_at'])}  {row['host']:15}  {row['plugin']}  "
+                  f"run={row['run_id']}  {output[0] if output else ''}")
+    elif args.command == 'records':
+        rows = query.records(args.run, args.host, args.plugin, args.level, parse_since(args.since), args.limit)
+        for row in rows:
+            print(f"{format_ts(row['ts'])}  {row['level']:8}  {row['host'] or '-':15}  "
+                  f"{row['plugin'] or '-'}  {row['message']}")
+    else:
+        rows = query.phases(run_id=args.run)
+        for row in rows:
+            print(f"{format_ts(row['started_at'])}  {row['host'] or '-':15}  {row['name']:12}  {row['duration']:.3f}s")
+
+    print(f"-- {len(rows)} ligne(s) en {(time.perf_counter() - start) * 1000:.1f} ms", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,474 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Archivage compressé et rotation des logs JSONL des plugins.
+
+Les fichiers plugin_*.jsonl produits par PluginLogger (logs/ du projet et
+/tmp/pcUtils/logs) sont regroupés, une fois refroidis, dans des segments
+compressés (gzip ou xz) accompagnés d'un petit index JSON:
+plage temporelle, hôtes, plugins, niveaux et nombre de lignes.
+
+Une recherche historique lit d'abord les index et ne décompresse que les
+segments susceptibles de contenir des entrées correspondantes.
+
+Utilisation en ligne de commande (depuis la racine du projet):
+    python3 -m ui.utils.log_archive rotate
+    python3 -m ui.utils.log_archive segments
+    python3 -m ui.utils.log_archive search --host 192.168.1.10 --level error --since 7d
+"""
+
+import os
+import sys
+import time
+import gzip
+import lzma
+import json
+import logging
+import argparse
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+from .journal import format_ts, parse_duration, parse_since
+
+logger = logging.getLogger('pcUtils.log_archive')
+
+# Même racine que ui/utils/logging.py, sans importer ce module (il réinitialise debug.log)
+PROJECT_LOGS_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'logs'))
+CONTROLLER_LOGS_DIR = '/tmp/pcUtils/logs'
+ARCHIVE_DIRNAME = 'archive'
+
+# Réglages surchargeables par variables d'environnement
+COMPRESSION_ENV_VAR = 'PCUTILS_LOG_COMPRESSION'
+MAX_AGE_ENV_VAR = 'PCUTILS_LOG_MAX_AGE'
+MAX_ACTIVE_SIZE_ENV_VAR = 'PCUTILS_LOG_MAX_ACTIVE_SIZE'
+
+DEFAULT_COMPRESSION = 'gz'
+DEFAULT_MAX_AGE = 24 * 3600                 # Fichiers plus vieux qu'un jour archivés
+DEFAULT_MAX_ACTIVE_SIZE = 200 * 1024 * 1024  # Au-delà, archiver les plus anciens
+SEGMENT_MAX_SIZE = 64 * 1024 * 1024          # Taille non compressée max d'un segment
+ACTIVE_GRACE_PERIOD = 120                   # Ne jamais toucher un fichier modifié récemment
+
+LOG_FILE_PREFIX = 'plugin_'
+LOG_FILE_SUFFIX = '.jsonl'
+SEGMENT_PREFIX = 'segment_'
+INDEX_SUFFIX = '.idx.json'
+
+_OPENERS = {
+    'gz': gzip.open,
+    'xz': lzma.open,
+}
+
+
+def _env_number(name: str, default: float) -> float:
+    """Lit une valeur numérique dans l'environnement avec repli."""
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def _parse_timestamp(value: Any) -> Optional[float]:
+    """Convertit le timestamp ISO d'une entrée JSONL en epoch."""
+    if not isinstance(value, str):
+        return None
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        return None
+
+
+class LogArchive:
+    """
+    Rotation des fichiers JSONL actifs vers des segments compressés indexés.
+    """
+
+    def __init__(self, log_dirs: Optional[List[str]] = None,
+                 archive_dir: Optional[str] = None,
+                 compression: Optional[str] = None):
+        """
+        Args:
+            log_dirs: Répertoires contenant les fichiers plugin_*.jsonl
+            archive_dir: Répertoire des segments (défaut: logs/archive du projet)
+            compression: 'gz' ou 'xz' (défaut: PCUTILS_LOG_COMPRESSION ou 'gz')
+        """
+        self.log_dirs = log_dirs or [PROJECT_LOGS_DIR, CONTROLLER_LOGS_DIR]
+        self.archive_dir = archive_dir or os.path.join(PROJECT_LOGS_DIR, ARCHIVE_DIRNAME)
+        compression = (compression or os.environ.get(COMPRESSION_ENV_VAR) or DEFAULT_COMPRESSION).lower()
+        if compression not in _OPENERS:
+            logger.warning(f"Compression inconnue '{compression}', utilisation de {DEFAULT_COMPRESSION}")
+            compression = DEFAULT_COMPRESSION
+        self.compression = compression
+
+    # ------------------------------------------------------------------
+    # Rotation
+    # ------------------------------------------------------------------
+
+    def active_files(self) -> List[str]:
+        """
+        Liste les fichiers JSONL non archivés, du plus ancien au plus récent.
+
+        Returns:
+            List[str]: Chemins des fichiers actifs
+        """
+        files = []
+        for log_dir in self.log_dirs:
+            try:
+                entries = os.scandir(log_dir)
+            except OSError:
+                continue
+            with entries:
+                for entry in entries:
+                    if (entry.is_file() and entry.name.startswith(LOG_FILE_PREFIX)
+                            and entry.name.endswith(LOG_FILE_SUFFIX)):
+                        files.append((entry.stat().st_mtime, entry.path))
+        files.sort()
+        return [path for _, path in files]
+
+    def select_for_rotation(self, max_age: Optional[float] = None,
+                            max_active_size: Optional[float] = None) -> List[str]:
+        """
+        Choisit les fichiers à archiver: trop vieux, ou les plus anciens tant
+        que la taille totale des fichiers actifs dépasse le seuil.
+
+        Args:
+            max_age: Âge maximal en secondes d'un fichier actif
+            max_active_size: Taille totale maximale en octets des fichiers actifs
+
+        Returns:
+            List[str]: Fichiers à archiver, du plus ancien au plus récent
+        """
+        if max_age is None:
+            max_age = _env_number(MAX_AGE_ENV_VAR, DEFAULT_MAX_AGE)
+        if max_active_size is None:
+            max_active_size = _env_number(MAX_ACTIVE_SIZE_ENV_VAR, DEFAULT_MAX_ACTIVE_SIZE)
+
+        now = time.time()
+        candidates = []
+        total_size = 0
+        for path in self.active_files():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            total_size += stat.st_size
+            candidates.append((path, stat.st_mtime, stat.st_size))
+
+        selected = []
+        for path, mtime, size in candidates:
+            age = now - mtime
+            if age < ACTIVE_GRACE_PERIOD:
+                # Fichier potentiellement encore écrit par un plugin en cours
+                break
+            if age >= max_age or total_size > max_active_size:
+                selected.append(path)
+                total_size -= size
+        return selected
+
+    def rotate(self, max_age: Optional[float] = None,
+               max_active_size: Optional[float] = None) -> List[str]:
+        """
+        Archive les fichiers sélectionnés dans un ou plusieurs segments.
+
+        Args:
+            max_age: Âge maximal en secondes d'un fichier actif
+            max_active_size: Taille totale maximale en octets des fichiers actifs
+
+        Returns:
+            List[str]: Chemins des segments créés
+        """
+        files = self.select_for_rotation(max_age, max_active_size)
+        if not files:
+            return []
+
+        os.makedirs(self.archive_dir, exist_ok=True)
+        segments = []
+        group: List[str] = []
+        group_size = 0
+        for path in files:
+            size = os.path.getsize(path)
+            if group and group_size + size > SEGMENT_MAX_SIZE:
+                segments.append(self._write_segment(group))
+                group, group_size = [], 0
+            group.append(path)
+            group_size += size
+        if group:
+            segments.append(self._write_segment(group))
+
+        segments = [s for s in segments if s]
+        logger.info(f"Rotation des logs: {len(files)} fichier(s) -> {len(segments)} segment(s)")
+        return segments
+
+    def _write_segment(self, files: List[str]) -> Optional[str]:
+        """
+        Concatène des fichiers JSONL dans un segment compressé et écrit son index.
+
+        Args:
+            files: Fichiers JSONL à archiver
+
+        Returns:
+            Optional[str]: Chemin du segment, ou None en cas d'échec
+        """
+        name = f"{SEGMENT_PREFIX}{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
+        segment_path = os.path.join(self.archive_dir, f"{name}{LOG_FILE_SUFFIX}.{self.compression}")
+        tmp_path = segment_path + '.tmp'
+
+        index: Dict[str, Any] = {
+            'segment': os.path.basename(segment_path),
+            'compression': self.compression,
+            'first_ts': None,
+            'last_ts': None,
+            'hosts': set(),
+            'plugins': set(),
+            'levels': {},
+            'lines': 0,
+            'sources': [],
+        }
+
+        try:
+            with _OPENERS[self.compression](tmp_path, 'wt', encoding='utf-8') as out:
+                for path in files:
+                    file_mtime = os.path.getmtime(path)
+                    with open(path, 'r', encoding='utf-8', errors='replace') as src:
+                        for line in src:
+                            if not line.strip():
+                                continue
+                            if not line.endswith('\n'):
+                                line += '\n'
+                            out.write(line)
+                            self._index_line(index, line, file_mtime)
+                    index['sources'].append(os.path.basename(path))
+            os.replace(tmp_path, segment_path)
+        except Exception as e:
+            logger.error(f"Erreur création du segment {segment_path}: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return None
+
+        index['hosts'] = sorted(index['hosts'])
+        index['plugins'] = sorted(index['plugins'])
+        index_path = segment_path[:-len(f"{LOG_FILE_SUFFIX}.{self.compression}")] + INDEX_SUFFIX
+        with open(index_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False)
+
+        # Les sources ne sont supprimées qu'une fois segment et index écrits
+        for path in files:
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.warning(f"Impossible de supprimer {path} après archivage: {e}")
+        return segment_path
+
+    @staticmethod
+    def _index_line(index: Dict[str, Any], line: str, fallback_ts: float) -> None:
+        """Met à jour l'index d'un segment avec une ligne JSONL."""
+        index['lines'] += 1
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError:
+            entry = None
+        if not isinstance(entry, dict):
+            ts = fallback_ts
+        else:
+            ts = _parse_timestamp(entry.get('timestamp')) or fallback_ts
+            if entry.get('target_ip'):
+                index['hosts'].add(entry['target_ip'])
+            if entry.get('plugin_name'):
+                index['plugins'].add(entry['plugin_name'])
+            level = entry.get('level') or 'info'
+            index['levels'][level] = index['levels'].get(level, 0) + 1
+        if index['first_ts'] is None or ts < index['first_ts']:
+            index['first_ts'] = ts
+        if index['last_ts'] is None or ts > index['last_ts']:
+            index['last_ts'] = ts
+
+    # ------------------------------------------------------------------
+    # Consultation
+    # ------------------------------------------------------------------
+
+    def segments(self) -> List[Dict[str, Any]]:
+        """
+        Charge les index de tous les segments, du plus ancien au plus récent.
+
+        Returns:
+            List[Dict[str, Any]]: Index des segments (avec la clé 'path')
+        """
+        indexes = []
+        try:
+            names = sorted(os.listdir(self.archive_dir))
+        except OSError:
+            return indexes
+        for name in names:
+            if not (name.startswith(SEGMENT_PREFIX) and name.endswith(INDEX_SUFFIX)):
+                continue
+            try:
+                with open(os.path.join(self.archive_dir, name), 'r', encoding='utf-8') as f:
+                    index = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                logger.warning(f"Index de segment illisible {name}: {e}")
+                continue
+            index['path'] = os.path.join(self.archive_dir, index['segment'])
+            indexes.append(index)
+        return indexes
+
+    @staticmethod
+    def segment_matches(index: Dict[str, Any], since: Optional[float] = None,
+                        until: Optional[float] = None, host: Optional[str] = None,
+                        plugin: Optional[str] = None, level: Optional[str] = None) -> bool:
+        """
+        Indique, d'après son index seul, si un segment peut contenir des entrées recherchées.
+        """
+        if since is not None and index.get('last_ts') is not None and index['last_ts'] < since:
+            return False
+        if until is not None and index.get('first_ts') is not None and index['first_ts'] > until:
+            return False
+        if host and host not in index.get('hosts', []):
+            return False
+        if plugin and plugin not in index.get('plugins', []):
+            return False
+        if level and level not in index.get('levels', {}):
+            return False
+        return True
+
+    def search(self, since: Optional[float] = None, until: Optional[float] = None,
+               host: Optional[str] = None, plugin: Optional[str] = None,
+               level: Optional[str] = None, contains: Optional[str] = None,
+               include_active: bool = True) -> Iterator[Dict[str, Any]]:
+        """
+        Parcourt les entrées de log correspondant aux critères.
+
+        Seuls les segments retenus par leur index sont décompressés; les
+        fichiers actifs (non archivés) sont lus en dernier.
+
+        Args:
+            since: Timestamp epoch minimal
+            until: Timestamp epoch maximal
+            host: Adresse IP cible
+            plugin: Nom du plugin
+            level: Niveau de log
+            contains: Sous-chaîne recherchée dans le message
+            include_active: Inclure les fichiers JSONL non archivés
+
+        Returns:
+            Iterator[Dict[str, Any]]: Entrées correspondantes
+        """
+        for index in self.segments():
+            if not self.segment_matches(index, since, until, host, plugin, level):
+                continue
+            opener = _OPENERS.get(index.get('compression'), gzip.open)
+            try:
+                with opener(index['path'], 'rt', encoding='utf-8', errors='replace') as f:
+                    yield from self._filter_lines(f, since, until, host, plugin, level, contains)
+            except (OSError, EOFError, lzma.LZMAError) as e:
+                logger.warning(f"Segment illisible {index['path']}: {e}")
+
+        if include_active:
+            for path in self.active_files():
+                try:
+                    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                        yield from self._filter_lines(f, since, until, host, plugin, level, contains)
+                except OSError:
+                    continue
+
+    @staticmethod
+    def _filter_lines(lines, since, until, host, plugin, level, contains) -> Iterator[Dict[str, Any]]:
+        """Filtre les lignes JSONL d'un fichier selon les critères de recherche."""
+        for line in lines:
+            # Préfiltre textuel avant tout décodage JSON
+            if host and host not in line:
+                continue
+            if plugin and plugin not in line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if not isinstance(entry, dict):
+                continue
+            if host and entry.get('target_ip') != host:
+                continue
+            if plugin and entry.get('plugin_name') != plugin:
+                continue
+            if level and entry.get('level') != level:
+                continue
+            if since is not None or until is not None:
+                ts = _parse_timestamp(entry.get('timestamp'))
+                if ts is None or (since is not None and ts < since) or (until is not None and ts > until):
+                    continue
+            if contains and contains not in str(entry.get('message', '')):
+                continue
+            yield entry
+
+
+def rotate_logs() -> List[str]:
+    """
+    Lance une rotation avec les réglages par défaut, sans jamais lever d'exception.
+
+    Returns:
+        List[str]: Segments créés
+    """
+    try:
+        return LogArchive().rotate()
+    except Exception as e:
+        logger.error(f"Erreur lors de la rotation des logs: {e}")
+        return []
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Point d'entrée de la rotation et de la consultation des archives de logs."""
+    parser = argparse.ArgumentParser(description="Archives compressées des logs pcUtils")
+    parser.add_argument('--archive-dir', help="Répertoire des segments")
+    parser.add_argument('--log-dir', action='append', help="Répertoire de logs actifs (répétable)")
+    parser.add_argument('--compression', choices=sorted(_OPENERS))
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_rotate = sub.add_parser('rotate', help="Archiver les fichiers JSONL refroidis")
+    p_rotate.add_argument('--max-age', type=parse_duration,
+                          help="Âge maximal d'un fichier actif (30m, 12h, 7d ou secondes)")
+    p_rotate.add_argument('--max-size', type=float, help="Taille totale max des fichiers actifs (Mo)")
+
+    sub.add_parser('segments', help="Lister les segments et leurs index")
+
+    p_search = sub.add_parser('search', help="Rechercher dans les archives")
+    p_search.add_argument('--host')
+    p_search.add_argument('--plugin')
+    p_search.add_argument('--level')
+    p_search.add_argument('--since', help="Période relative (30m, 12h, 7d) ou timestamp")
+    p_search.add_argument('--until', help="Période relative ou timestamp")
+    p_search.add_argument('--contains')
+    p_search.add_argument('--limit', type=int, default=200)
+    p_search.add_argument('--archived-only', action='store_true', help="Ignorer les fichiers actifs")
+
+    args = parser.parse_args(argv)
+    archive = LogArchive(args.log_dir, args.archive_dir, args.compression)
+    start = time.perf_counter()
+    count = 0
+
+    if args.command == 'rotate':
+        max_size = args.max_size * 1024 * 1024 if args.max_size is not None else None
+        for path in archive.rotate(args.max_age, max_size):
+            print(path)
+            count += 1
+    elif args.command == 'segments':
+        for index in archive.segments():
+            print(f"{index['segment']}  {format_ts(index.get('first_ts'))} -> {format_ts(index.get('last_ts'))}  "
+                  f"lignes={index.get('lines', 0)}  hôtes={len(index.get('hosts', []))}  "
+                  f"plugins={','.join(index.get('plugins', []))}")
+            count += 1
+    else:
+        for entry in archive.search(parse_since(args.since), parse_since(args.until), args.host,
+                                    args.plugin, args.level, args.contains,
+                                    include_active=not args.archived_only):
+            print(f"{entry.get('timestamp', '-')}  {entry.get('level', '-'):8}  "
+                  f"{entry.get('target_ip') or '-':15}  {entry.get('plugin_name') or '-'}  {entry.get('message')}")
+            count += 1
+            if count >= args.limit:
+                break
+
+    print(f"-- {count} ligne(s) en {(time.perf_counter() - start) * 1000:.1f} ms", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -27,6 +27,99 @@ class MessageType(Enum):
     START = auto()
     END = auto()
 
+# Mots-clés de classification des lignes de texte brut, par priorité décroissante
+LEVEL_KEYWORDS = (
+    (MessageType.ERROR, ('error', 'erreur', 'failed', 'failure', 'échec', 'exception', 'traceback',
+                         'unable to', 'impossible de', 'permission denied')),
+    (MessageType.WARNING, ('warning', 'warn', 'attention', 'avertissement', 'caution')),
+    (MessageType.SUCCESS, ('success', 'succès', 'completed', 'terminé', 'réussi')),
+    (MessageType.DEBUG, ('debug', 'trace', 'verbose')),
+)
+
+def _trie_pattern(words) -> str:
+    """
+    Construit une alternation factorisée par préfixes communs (trie) : le moteur
+    d'expressions régulières teste chaque position en un seul parcours de
+    l'arbre au lieu d'essayer chaque mot-clé l'un après l'autre.
+    """
+    trie: Dict[str, Any] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node: Dict[str, Any]) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # Fin de mot possible à ce nœud: suffixe optionnel (gourmand, le mot le plus long l'emporte)
+        return f'(?:{pattern})?' if '' in node else pattern
+
+    return build(trie)
+
+class KeywordClassifier:
+    """
+    Classe une ligne de texte brut d'après des mots-clés, en un seul passage:
+    tous les mots-clés sont réunis dans une alternation compilée (factorisée en
+    trie) et la ligne, mise en minuscules, n'est parcourue qu'une fois quel que
+    soit le nombre de niveaux.
+    """
+
+    def __init__(self, keywords=LEVEL_KEYWORDS):
+        self._type_of: Dict[str, MessageType] = {}
+        self._rank: Dict[MessageType, int] = {}
+        for rank, (message_type, words) in enumerate(keywords):
+            self._rank[message_type] = rank
+            for word in words:
+                self._type_of.setdefault(word.lower(), message_type)
+        self._pattern = re.compile(_trie_pattern(self._type_of))
+
+    def classify(self, text: str, default: MessageType = MessageType.INFO,
+                 include_debug: bool = True) -> MessageType:
+        """
+        Retourne le type de plus haute priorité dont un mot-clé apparaît dans le texte.
+
+        Args:
+            text: Ligne à classer
+            default: Type retourné si aucun mot-clé n'est trouvé
+            include_debug: Si False, les mots-clés de débogage sont ignorés
+
+        Returns:
+            MessageType: Type détecté
+        """
+        best = None
+        best_rank = len(self._rank)
+        for match in self._pattern.finditer(text.lower()):
+            message_type = self._type_of[match.group(0)]
+            if message_type == MessageType.DEBUG and not include_debug:
+                continue
+            rank = self._rank[message_type]
+            if rank < best_rank:
+                best, best_rank = message_type, rank
+                if rank == 0:
+                    break  # Priorité maximale: inutile de lire la suite
+        return best or default
+
+# Classificateur partagé (exécuteurs local et SSH, LoggerUtils, Message)
+LINE_CLASSIFIER = KeywordClassifier()
+
+def classify_line(text: str, include_debug: bool = False) -> MessageType:
+    """
+    Détermine le type d'une ligne de sortie brute (non JSON) d'un plugin.
+
+    Args:
+        text: Ligne de sortie
+        include_debug: Si True, les lignes 'debug'/'trace' sont classées DEBUG
+
+    Returns:
+        MessageType: ERROR, WARNING, SUCCESS, (DEBUG) ou INFO
+    """
+    if not text:
+        return MessageType.INFO
+    return LINE_CLASSIFIER.classify(text, include_debug=include_debug)
+
 class Message:
     """Conteneur pour un message standardisé"""
 
@@ -167,39 +260,7 @@ class Message:
         Returns:
             MessageType: Type détecté
         """
-        if not content:
-            return MessageType.INFO
-
-        content_lower = content.lower()
-
-        # Détection des erreurs
-        if any(term in content_lower for term in [
-            'error', 'erreur', 'failed', 'failure', 'échec', 'exception',
-            'failed to', 'unable to', 'impossible de', 'permission denied'
-        ]):
-            return MessageType.ERROR
-
-        # Détection des avertissements
-        if any(term in content_lower for term in [
-            'warning', 'warn', 'attention', 'avertissement', 'caution'
-        ]):
-            return MessageType.WARNING
-
-        # Détection des succès
-        if any(term in content_lower for term in [
-            'success', 'succès', 'successful', 'completed', 'terminé',
-            'réussi', 'installé avec succès', 'configuré avec succès'
-        ]):
-            return MessageType.SUCCESS
-
-        # Détection des messages de débogage
-        if any(term in content_lower for term in [
-            'debug', 'trace', 'verbose'
-        ]):
-            return MessageType.DEBUG
-
-        # Par défaut
-        return MessageType.INFO
+        return classify_line(content, include_debug=True)
 
 
 class MessageFormatter:
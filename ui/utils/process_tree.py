@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Terminaison d'arborescences de processus.
+
+Les plugins sont lancés dans leur propre session (start_new_session=True):
+leur PID est aussi l'identifiant de leur groupe de processus. Pour arrêter un
+plugin, on signale le groupe entier ainsi que chaque descendant relevé dans
+/proc (certains, comme sudo avec use_pty, créent leur propre session et
+sortent du groupe). SIGTERM d'abord, puis SIGKILL après un délai de grâce
+pour les survivants: apt, dpkg ou sudo ne conservent ainsi ni verrou ni
+ressource pour le plugin suivant.
+
+Un processus appartenant à root ne peut pas être signalé par un utilisateur
+ordinaire: c'est alors sudo, qui relaie SIGTERM à sa commande, qui l'arrête.
+"""
+
+import os
+import time
+import signal
+import asyncio
+import logging
+from typing import Dict, Iterable, List, Set
+
+logger = logging.getLogger('pcUtils.process_tree')
+
+# Délai laissé aux processus pour se terminer après SIGTERM
+DEFAULT_GRACE_PERIOD = 3.0
+# Intervalle de vérification des survivants pendant le délai de grâce
+_POLL_INTERVAL = 0.05
+
+
+def _parent_map() -> Dict[int, List[int]]:
+    """Construit la table PID parent -> PID enfants à partir de /proc."""
+    children: Dict[int, List[int]] = {}
+    try:
+        entries = os.listdir('/proc')
+    except OSError:
+        return children
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'rb') as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # Le nom de commande (2e champ) peut contenir des espaces: lire après la dernière ')'
+        fields = stat[stat.rfind(b')') + 2:].split()
+        if len(fields) > 1:
+            children.setdefault(int(fields[1]), []).append(int(entry))
+    return children
+
+
+def descendant_pids(pid: int) -> Set[int]:
+    """
+    Retourne les PID de tous les descendants d'un processus.
+
+    Args:
+        pid: PID de la racine de l'arborescence
+
+    Returns:
+        Set[int]: PID des descendants (racine exclue)
+    """
+    children = _parent_map()
+    found: Set[int] = set()
+    stack = list(children.get(pid, []))
+    while stack:
+        child = stack.pop()
+        if child in found:
+            continue
+        found.add(child)
+        stack.extend(children.get(child, []))
+    return found
+
+
+def _pid_alive(pid: int) -> bool:
+    """Indique si un processus existe encore (hors zombie non réclamé)."""
+    try:
+        with open(f'/proc/{pid}/stat', 'rb') as f:
+            stat = f.read()
+        return stat[stat.rfind(b')') + 2:stat.rfind(b')') + 3] != b'Z'
+    except OSError:
+        return False
+
+
+def signal_process_tree(pid: int, sig: int, pids: Set[int] = None) -> Set[int]:
+    """
+    Envoie un signal au groupe de processus d'un plugin et à ses descendants.
+
+    Args:
+        pid: PID de la racine (également PGID si lancée avec start_new_session)
+        sig: Signal à envoyer
+        pids: Descendants déjà relevés (relevés dans /proc sinon)
+
+    Returns:
+        Set[int]: Processus signalés (racine incluse)
+    """
+    targets = set(pids) if pids is not None else descendant_pids(pid)
+    targets.add(pid)
+    try:
+        is_group_leader = os.getpgid(pid) == pid
+    except ProcessLookupError:
+        # Racine déjà réclamée: son groupe peut encore avoir des membres
+        is_group_leader = True
+    except OSError:
+        is_group_leader = False
+    if is_group_leader:
+        try:
+            os.killpg(pid, sig)
+        except (ProcessLookupError, PermissionError, OSError):
+            pass
+    for target in targets:
+        try:
+            os.kill(target, sig)
+        except (ProcessLookupError, PermissionError, OSError):
+            pass
+    return targets
+
+
+def _tree_targets(pid: int) -> Set[int]:
+    """Relève l'arborescence avant signal (les orphelins seraient ensuite rattachés à init)."""
+    targets = descendant_pids(pid)
+    targets.add(pid)
+    return targets
+
+
+def terminate_process_trees(pids: Iterable[int], grace: float = DEFAULT_GRACE_PERIOD) -> bool:
+    """
+    Termine plusieurs arborescences de processus: SIGTERM à toutes, une seule
+    attente du délai de grâce, puis SIGKILL aux survivants.
+    Version bloquante (fermeture de l'application).
+
+    Args:
+        pids: PID des racines
+        grace: Délai en secondes avant SIGKILL
+
+    Returns:
+        bool: True si plus aucun processus des arborescences ne survit
+    """
+    trees = {pid: _tree_targets(pid) for pid in pids}
+    for pid, targets in trees.items():
+        signal_process_tree(pid, signal.SIGTERM, targets)
+    deadline = time.monotonic() + grace
+    while time.monotonic() < deadline:
+        if not any(_pid_alive(p) for targets in trees.values() for p in targets):
+            return True
+        time.sleep(_POLL_INTERVAL)
+    killed: Set[int] = set()
+    for pid, targets in trees.items():
+        killed |= _kill_survivors(pid, targets)
+    if not killed:
+        return True
+    time.sleep(_POLL_INTERVAL)
+    return not any(_pid_alive(p) for p in killed)
+
+
+def terminate_process_tree(pid: int, grace: float = DEFAULT_GRACE_PERIOD) -> bool:
+    """
+    Termine une arborescence de processus: SIGTERM, puis SIGKILL après le délai de grâce.
+    Version bloquante (voir terminate_process_trees).
+
+    Args:
+        pid: PID de la racine
+        grace: Délai en secondes avant SIGKILL
+
+    Returns:
+        bool: True si plus aucun processus de l'arborescence ne survit
+    """
+    return terminate_process_trees([pid], grace)
+
+
+async def terminate_process_tree_async(pid: int, grace: float = DEFAULT_GRACE_PERIOD) -> bool:
+    """
+    Termine une arborescence de processus sans bloquer la boucle d'événements.
+
+    Args:
+        pid: PID de la racine
+        grace: Délai en secondes avant SIGKILL
+
+    Returns:
+        bool: True si plus aucun processus de l'arborescence ne survit
+    """
+    targets = signal_process_tree(pid, signal.SIGTERM, _tree_targets(pid))
+    deadline = time.monotonic() + grace
+    while time.monotonic() < deadline:
+        if not any(_pid_alive(p) for p in targets):
+            return True
+        await asyncio.sleep(_POLL_INTERVAL)
+    killed = _kill_survivors(pid, targets)
+    if not killed:
+        return True
+    await asyncio.sleep(_POLL_INTERVAL)
+    return not any(_pid_alive(p) for p in killed)
+
+
+def _kill_survivors(pid: int, targets: Set[int]) -> Set[int]:
+    """
+    Envoie SIGKILL aux processus encore vivants (y compris ceux apparus entre-temps).
+    Ne patiente pas: l'appelant vérifie ensuite, avec time.sleep ou asyncio.sleep.
+
+    Returns:
+        Set[int]: Processus signalés
+    """
+    survivors = {p for p in targets if _pid_alive(p)}
+    if _pid_alive(pid):
+        survivors |= descendant_pids(pid)
+    if survivors:
+        logger.warning(f"SIGKILL pour {len(survivors)} processus encore actifs (racine {pid})")
+        signal_process_tree(pid, signal.SIGKILL, survivors)
+    return survivors